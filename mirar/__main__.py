@@ -15,7 +15,7 @@ from astropy.time import Time
 
 from mirar.data import cache
 from mirar.monitor.base_monitor import Monitor
-from mirar.paths import PACKAGE_NAME, RAW_IMG_SUB_DIR, TEMP_DIR
+from mirar.paths import EXECUTION_BACKENDS, PACKAGE_NAME, RAW_IMG_SUB_DIR, TEMP_DIR
 from mirar.pipelines import Pipeline, get_pipeline
 from mirar.processors.utils import ImageLoader
 from mirar.utils.docs.pipeline_visualisation import flowify
@@ -51,6 +51,31 @@ parser.add_argument(
 parser.add_argument(
     "--failfast", help="Fail on first error", action="store_true", default=False
 )
+parser.add_argument(
+    "--backend",
+    default=None,
+    choices=EXECUTION_BACKENDS,
+    help="Backend used by processors to process batches (thread/process/serial)",
+)
+parser.add_argument(
+    "--streaming",
+    help="Stream each batch through consecutive processors",
+    action="store_true",
+    default=False,
+)
+parser.add_argument(
+    "--checkpoint",
+    nargs="+",
+    default=None,
+    help="Names of processor classes after which to save a checkpoint "
+    "(or 'all', for every processor)",
+)
+parser.add_argument(
+    "--resume",
+    help="Resume from the latest valid checkpoints, skipping completed processors",
+    action="store_true",
+    default=False,
+)
 
 parser.add_argument("-m", "--monitor", action="store_true", default=False)
 parser.add_argument(
@@ -94,6 +119,7 @@ with tempfile.TemporaryDirectory(dir=TEMP_DIR) as temp_dir_path:
     print(f"Using cache {temp_dir_path}")
 
     cache.set_cache_dir(temp_dir_path)
+    cache.start_sweeper()
 
     if args.monitor:
         if args.emailrecipients is not None:
@@ -124,6 +150,8 @@ with tempfile.TemporaryDirectory(dir=TEMP_DIR) as temp_dir_path:
             email_sender=args.emailsender,
             email_recipients=EMAIL_RECIPIENTS,
             raw_dir=args.rawdir,
+            execution_backend=args.backend,
+            streaming=args.streaming,
         )
         monitor.process_realtime()
 
@@ -156,6 +184,10 @@ with tempfile.TemporaryDirectory(dir=TEMP_DIR) as temp_dir_path:
             args.pipeline,
             selected_configurations=CONFIG,
             night=night,
+            execution_backend=args.backend,
+            streaming=args.streaming,
+            checkpoint_after=args.checkpoint,
+            resume=args.resume,
         )
 
         batches, errorstack = pipe.reduce_images(
@@ -182,6 +214,8 @@ with tempfile.TemporaryDirectory(dir=TEMP_DIR) as temp_dir_path:
             _, new_errorstack, _ = pipe.reduce_images(
                 selected_configurations=PROTECTED_KEY,
                 catch_all_errors=True,
+                checkpoint_after=[],
+                resume=False,
             )
             errorstack += new_errorstack
 
@@ -2,29 +2,69 @@
 Module for Catalog base class
 """
 
+import copy
+import json
 import logging
+import os
 from abc import ABC
 from pathlib import Path
 from typing import Type
 
 import astropy.table
+import numpy as np
 
+from mirar.catalog.base.catalog_store import (
+    DEFAULT_CATALOG_STORE_DEPTH,
+    CatalogStore,
+    catalog_store,
+    get_settings_hash,
+    select_cone_sources,
+)
 from mirar.catalog.base.errors import CatalogCacheError
 from mirar.data import Image
 from mirar.data.utils import get_image_center_wcs_coords
 from mirar.paths import BASE_NAME_KEY, REF_CAT_PATH_KEY
+from mirar.utils.healpix import get_tile_ids
 from mirar.utils.ldac_tools import save_table_as_ldac
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_SNR_THRESHOLD = 3.0
 
+USE_CATALOG_STORE: bool = os.getenv("USE_CATALOG_STORE", "false") in [
+    "true",
+    "True",
+    True,
+]
+
 
 class ABCatalog:
     """
     Abstract class for catalog objects
+
+    Attributes:
+        use_catalog_store: Whether to serve queries from the local catalog store
+        (see :module:`mirar.catalog.base.catalog_store`). Defaults to the
+        USE_CATALOG_STORE environment variable.
+        catalog_store_depth: HEALPix depth of the tiles in the catalog store
     """
 
+    catalog_store: CatalogStore = catalog_store
+    catalog_store_depth: int = DEFAULT_CATALOG_STORE_DEPTH
+    store_ra_key: str = "ra"
+    store_dec_key: str = "dec"
+
+    # Attributes which do not change the sources in a catalog tile
+    store_ignored_attributes = (
+        "search_radius_arcmin",
+        "search_radius_arcsec",
+        "use_catalog_store",
+        "cache_catalog_locally",
+        "catalog_cachepath_key",
+        "num_sources",
+        "max_time_ms",
+    )
+
     @property
     def abbreviation(self):
         """
@@ -35,8 +75,90 @@ class ABCatalog:
     def __init__(
         self,
         search_radius_arcmin: float,
+        use_catalog_store: bool | None = None,
     ):
         self.search_radius_arcmin = search_radius_arcmin
+        if use_catalog_store is None:
+            use_catalog_store = USE_CATALOG_STORE
+        self.use_catalog_store = use_catalog_store
+
+    def is_storable(self) -> bool:
+        """
+        Whether the catalog can be saved in the catalog store, i.e whether the
+        sources only depend on position and the catalog settings
+
+        :return: Boolean
+        """
+        return True
+
+    def get_store_settings(self) -> dict:
+        """
+        Get the settings which determine the sources in a catalog tile
+
+        :return: Dictionary of settings
+        """
+        settings = {"catalog": f"{type(self).__module__}.{type(self).__qualname__}"}
+        for key, value in sorted(vars(self).items()):
+            if key in self.store_ignored_attributes:
+                continue
+            try:
+                json.dumps(value)
+            except TypeError:
+                continue
+            settings[key] = value
+        return settings
+
+    def get_store_partition(self) -> str:
+        """
+        Get the name of the partition of the catalog store for this catalog,
+        which is unique to the catalog settings
+
+        :return: Partition name
+        """
+        settings = self.get_store_settings()
+        settings_hash = get_settings_hash(settings)[:12]
+        return f"{self.abbreviation}/{settings_hash}"
+
+    def fetch_tile(
+        self, ra_deg: float, dec_deg: float, radius_deg: float
+    ) -> astropy.table.Table:
+        """
+        Query the catalog backend for all sources in a cone, to fill a store tile
+
+        :param ra_deg: RA
+        :param dec_deg: Dec
+        :param radius_deg: Radius of cone
+        :return: Table of sources
+        """
+        raise NotImplementedError()
+
+    def get_stored_sources(
+        self, ra_deg: float | np.ndarray, dec_deg: float | np.ndarray
+    ) -> astropy.table.Table:
+        """
+        Get all sources in the store tiles overlapping cones of the search radius,
+        fetching any missing tiles from the catalog backend
+
+        :param ra_deg: RA of cone centre(s)
+        :param dec_deg: Dec of cone centre(s)
+        :return: Table of sources
+        """
+        tile_ids = get_tile_ids(
+            ra_deg,
+            dec_deg,
+            radius_deg=self.search_radius_arcmin / 60.0,
+            depth=self.catalog_store_depth,
+        )
+        partition = self.get_store_partition()
+        self.catalog_store.write_settings(partition, self.get_store_settings())
+        return self.catalog_store.get_tiles_table(
+            partition=partition,
+            depth=self.catalog_store_depth,
+            tile_ids=tile_ids,
+            fetch=self.fetch_tile,
+            ra_key=self.store_ra_key,
+            dec_key=self.store_dec_key,
+        )
 
 
 class BaseCatalog(ABCatalog, ABC):
@@ -81,6 +203,47 @@ class BaseCatalog(ABCatalog, ABC):
         """
         raise NotImplementedError()
 
+    def get_store_partition(self) -> str:
+        partition = super().get_store_partition()
+        abbreviation, settings_hash = partition.split("/")
+        return (
+            f"{abbreviation}/{self.filter_name}_{self.min_mag}-{self.max_mag}_"
+            f"{settings_hash}"
+        )
+
+    def fetch_tile(
+        self, ra_deg: float, dec_deg: float, radius_deg: float
+    ) -> astropy.table.Table:
+        tile_catalog = copy.copy(self)
+        tile_catalog.search_radius_arcmin = radius_deg * 60.0
+        return tile_catalog.get_catalog(ra_deg=ra_deg, dec_deg=dec_deg)
+
+    def query_catalog(self, ra_deg: float, dec_deg: float) -> astropy.table.Table:
+        """
+        Returns a catalog centered on ra/dec, from the catalog store if enabled,
+        or otherwise directly from the catalog backend
+
+        :param ra_deg: RA
+        :param dec_deg: Dec
+        :return: Catalog
+        """
+        if not (self.use_catalog_store and self.is_storable()):
+            return self.get_catalog(ra_deg=ra_deg, dec_deg=dec_deg)
+
+        table = self.get_stored_sources(ra_deg, dec_deg)
+        table = select_cone_sources(
+            table,
+            ra_deg,
+            dec_deg,
+            radius_deg=self.search_radius_arcmin / 60.0,
+            ra_key=self.store_ra_key,
+            dec_key=self.store_dec_key,
+        )
+        logger.debug(
+            f"{len(table)} sources found in the catalog store for {self.abbreviation}"
+        )
+        return table
+
     def write_catalog(self, image: Image, output_dir: str | Path) -> Path:
         """
         Generates a custom catalog for an image
@@ -95,7 +258,7 @@ class BaseCatalog(ABCatalog, ABC):
 
         base_name = Path(image[BASE_NAME_KEY]).with_suffix(".ldac").name
 
-        cat = self.get_catalog(ra_deg=ra_deg, dec_deg=dec_deg)
+        cat = self.query_catalog(ra_deg=ra_deg, dec_deg=dec_deg)
 
         output_path = self.get_output_path(output_dir, base_name)
         output_path.unlink(missing_ok=True)
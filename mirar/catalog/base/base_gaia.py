@@ -87,6 +87,10 @@ class BaseGaia2Mass(BaseCatalog, ABC):
             logger.debug(f"Adding {offset:.2f} to convert from 2MASS to AB magnitudes")
         return src_list
 
+    def is_storable(self) -> bool:
+        # Trimmed catalogs depend on the image catalog, not just the position
+        return not self.trim
+
     def get_catalog(
         self,
         ra_deg: float,
@@ -4,6 +4,10 @@ Base Catalog for crossmatching
 
 from abc import ABC
 
+import astropy.units as u
+import numpy as np
+from astropy.coordinates import SkyCoord, search_around_sky
+
 from mirar.catalog.base.base_catalog import ABCatalog
 
 
@@ -12,6 +16,9 @@ class BaseXMatchCatalog(ABCatalog, ABC):
     Base Catalog for crossmatching
     """
 
+    # Crossmatch queries are small cones around each source, so use smaller tiles
+    catalog_store_depth = 8
+
     @property
     def catalog_name(self):
         """
@@ -67,3 +74,81 @@ class BaseXMatchCatalog(ABCatalog, ABC):
         :return: crossmatch
         """
         raise NotImplementedError
+
+    def get_projection_key(self, column_name: str) -> str:
+        """
+        Get the catalog key (in the projection) for a renamed column
+
+        :param column_name: Renamed column
+        :return: Catalog key
+        """
+        for key, new_name in self.column_names.items():
+            if new_name == column_name:
+                return key
+        raise KeyError(f"Column {column_name} not found in {self.column_names}")
+
+    @property
+    def store_ra_key(self) -> str:
+        return self.get_projection_key(self.ra_column_name)
+
+    @property
+    def store_dec_key(self) -> str:
+        return self.get_projection_key(self.dec_column_name)
+
+    def get_store_settings(self) -> dict:
+        settings = super().get_store_settings()
+        settings["catalog_name"] = self.catalog_name
+        settings["projection"] = self.projection
+        return settings
+
+    def query_store(self, coords: dict) -> dict:
+        """
+        Query coords for the nearest sources in the catalog store, fetching any
+        missing tiles from the catalog backend
+
+        :param coords: ra/dec
+        :return: crossmatch
+        """
+        names = list(coords.keys())
+        results = {name: [] for name in names}
+        if len(names) == 0:
+            return results
+
+        ra_deg = np.array([coords[name][0] for name in names], dtype=float)
+        dec_deg = np.array([coords[name][1] for name in names], dtype=float)
+
+        table = self.get_stored_sources(ra_deg, dec_deg)
+        if len(table) == 0:
+            return results
+
+        src_crds = SkyCoord(ra=ra_deg, dec=dec_deg, unit=u.deg)
+        cat_crds = SkyCoord(
+            ra=np.asarray(table[self.store_ra_key], dtype=float),
+            dec=np.asarray(table[self.store_dec_key], dtype=float),
+            unit=u.deg,
+        )
+        src_inds, cat_inds, separations, _ = search_around_sky(
+            src_crds, cat_crds, self.search_radius_arcsec * u.arcsec
+        )
+
+        # Nearest matches first, for each source
+        order = np.lexsort((separations.arcsec, src_inds))
+
+        keys = [
+            key
+            for key, value in self.projection.items()
+            if (value == 1) & (key in table.colnames)
+        ]
+        rows = table[keys][cat_inds[order]]
+
+        for src_ind, row in zip(src_inds[order], rows):
+            matches = results[names[src_ind]]
+            if len(matches) < self.num_sources:
+                matches.append(
+                    {
+                        key: (None if np.ma.is_masked(row[key]) else row[key].item())
+                        for key in keys
+                    }
+                )
+
+        return results
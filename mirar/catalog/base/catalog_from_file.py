@@ -30,6 +30,9 @@ class CatalogFromFile(BaseCatalog):
         if isinstance(self.catalog_path, str):
             self.catalog_path = Path(self.catalog_path)
 
+    def is_storable(self) -> bool:
+        return False
+
     def get_catalog(self, ra_deg: float, dec_deg: float) -> astropy.table.Table:
         catalog = get_table_from_ldac(self.catalog_path)
         return catalog
@@ -0,0 +1,322 @@
+"""
+Module for a persistent local store of catalog sources, shared across nights.
+
+The sky is divided into HEALPix tiles (at a fixed depth for each catalog). The
+sources of each tile are saved as a parquet file, in a directory for the catalog
+and its settings (e.g filter and magnitude cuts). A query for a cone is then served
+from the tiles overlapping the cone. Missing tiles are fetched from the catalog
+backend (e.g Vizier/TAP/Kowalski) with a cone enclosing the tile, trimmed to the
+tile, and saved, so each part of the sky is only ever queried once.
+
+Each tile is written to a temporary file and then moved into place, so only
+complete tiles are ever read, even with several processes sharing a store.
+Recently-used tiles are also kept in memory.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+
+import astropy.units as u
+import numpy as np
+from astropy.coordinates import SkyCoord
+from astropy.table import Table, vstack
+
+from mirar.paths import catalog_store_dir
+from mirar.utils.healpix import get_tile_moc
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_STORE_DEPTH = 6
+MAX_TILES_IN_MEMORY = 64
+
+# Margin added to the radius of the cone enclosing a tile, because tile edges are
+# not exactly great circles
+TILE_RADIUS_MARGIN = 1.01
+
+
+def get_settings_hash(settings: dict) -> str:
+    """
+    Get a hash for a dictionary of catalog settings
+
+    :param settings: Settings
+    :return: Unique hash
+    """
+    return hashlib.sha1(
+        json.dumps(settings, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def get_tile_cone(tile_id: int, depth: int) -> tuple[float, float, float]:
+    """
+    Get a cone enclosing a HEALPix tile
+
+    :param tile_id: Tile id
+    :param depth: HEALPix depth of tile
+    :return: RA, Dec and radius of cone (in degrees)
+    """
+    tile_moc = get_tile_moc(tile_id, depth)
+    centre = tile_moc.barycenter()
+    radius = tile_moc.largest_distance_from_coo_to_vertices(centre)
+    return (
+        float(centre.ra.deg),
+        float(centre.dec.deg),
+        float(radius.to(u.deg).value) * TILE_RADIUS_MARGIN,
+    )
+
+
+def select_tile_sources(
+    table: Table, tile_id: int, depth: int, ra_key: str = "ra", dec_key: str = "dec"
+) -> Table:
+    """
+    Select the sources of a table within a HEALPix tile
+
+    :param table: Table of sources
+    :param tile_id: Tile id
+    :param depth: HEALPix depth of tile
+    :param ra_key: Name of RA column
+    :param dec_key: Name of Dec column
+    :return: Table of sources in tile
+    """
+    if len(table) == 0:
+        return table
+    mask = get_tile_moc(tile_id, depth).contains_lonlat(
+        lon=np.asarray(table[ra_key], dtype=float) * u.deg,
+        lat=np.asarray(table[dec_key], dtype=float) * u.deg,
+    )
+    return table[mask]
+
+
+def select_cone_sources(
+    table: Table,
+    ra_deg: float,
+    dec_deg: float,
+    radius_deg: float,
+    ra_key: str = "ra",
+    dec_key: str = "dec",
+) -> Table:
+    """
+    Select the sources of a table within a cone
+
+    :param table: Table of sources
+    :param ra_deg: RA of cone centre
+    :param dec_deg: Dec of cone centre
+    :param radius_deg: Radius of cone
+    :param ra_key: Name of RA column
+    :param dec_key: Name of Dec column
+    :return: Table of sources in cone
+    """
+    if len(table) == 0:
+        return table
+    crds = SkyCoord(
+        ra=np.asarray(table[ra_key], dtype=float),
+        dec=np.asarray(table[dec_key], dtype=float),
+        unit=u.deg,
+    )
+    centre = SkyCoord(ra=ra_deg, dec=dec_deg, unit=u.deg)
+    return table[crds.separation(centre).deg <= radius_deg]
+
+
+class CatalogStore:
+    """
+    Persistent store of catalog sources, tiled by HEALPix cell
+    """
+
+    def __init__(
+        self,
+        store_dir: Path = catalog_store_dir,
+        max_tiles_in_memory: int = MAX_TILES_IN_MEMORY,
+    ):
+        self.store_dir = Path(store_dir)
+        self.max_tiles_in_memory = max_tiles_in_memory
+        self._tiles = OrderedDict()
+        self._tile_locks = {}
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return f"CatalogStore({self.store_dir})"
+
+    def get_tile_path(self, partition: str, depth: int, tile_id: int) -> Path:
+        """
+        Get the path of a tile
+
+        :param partition: Partition of store (catalog and its settings)
+        :param depth: HEALPix depth of tile
+        :param tile_id: Tile id
+        :return: Path of tile
+        """
+        return self.store_dir.joinpath(partition, f"depth{depth}", f"{tile_id}.parquet")
+
+    @staticmethod
+    def get_empty_path(tile_path: Path) -> Path:
+        """
+        Get the path of the marker file for a tile without sources
+
+        :param tile_path: Path of tile
+        :return: Path of marker
+        """
+        return tile_path.with_suffix(".empty")
+
+    def has_tile(self, partition: str, depth: int, tile_id: int) -> bool:
+        """
+        Check whether a tile is in the store
+
+        :param partition: Partition of store
+        :param depth: HEALPix depth of tile
+        :param tile_id: Tile id
+        :return: Boolean
+        """
+        path = self.get_tile_path(partition, depth, tile_id)
+        return path.exists() or self.get_empty_path(path).exists()
+
+    def write_settings(self, partition: str, settings: dict):
+        """
+        Write the settings of a partition to a json file, for reference
+
+        :param partition: Partition of store
+        :param settings: Settings of catalog
+        :return: None
+        """
+        json_path = self.store_dir.joinpath(partition, "settings.json")
+        if json_path.exists():
+            return
+        json_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = json_path.with_name(f".{os.getpid()}_{json_path.name}")
+        with open(temp_path, "w", encoding="utf8") as json_file:
+            json.dump(settings, json_file, indent=4, sort_keys=True, default=str)
+        os.replace(temp_path, json_path)
+
+    def write_tile(self, table: Table, path: Path):
+        """
+        Save the sources of a tile
+
+        :param table: Table of sources
+        :param path: Path of tile
+        :return: None
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        if len(table.colnames) == 0:
+            self.get_empty_path(path).touch()
+            return
+
+        temp_path = path.with_name(
+            f".{os.getpid()}_{threading.get_ident()}_{path.name}"
+        )
+        table.write(temp_path, format="parquet", overwrite=True)
+        os.replace(temp_path, path)
+
+    def read_tile(self, path: Path) -> Table:
+        """
+        Read the sources of a tile, using the in-memory copy if available
+
+        :param path: Path of tile
+        :return: Table of sources
+        """
+        with self._lock:
+            if path in self._tiles:
+                self._tiles.move_to_end(path)
+                return self._tiles[path]
+
+        if self.get_empty_path(path).exists():
+            table = Table()
+        else:
+            table = Table.read(path, format="parquet")
+
+        with self._lock:
+            self._tiles[path] = table
+            while len(self._tiles) > self.max_tiles_in_memory:
+                self._tiles.popitem(last=False)
+
+        return table
+
+    def _get_tile_lock(self, path: Path) -> threading.Lock:
+        """
+        Get a lock for a tile, so each tile is only fetched once per process
+
+        :param path: Path of tile
+        :return: Lock
+        """
+        with self._lock:
+            if path not in self._tile_locks:
+                self._tile_locks[path] = threading.Lock()
+            return self._tile_locks[path]
+
+    def ensure_tile(
+        self,
+        partition: str,
+        depth: int,
+        tile_id: int,
+        fetch: Callable[[float, float, float], Table],
+        ra_key: str = "ra",
+        dec_key: str = "dec",
+    ) -> Path:
+        """
+        Ensure a tile is in the store, fetching it from the catalog backend if not
+
+        :param partition: Partition of store
+        :param depth: HEALPix depth of tile
+        :param tile_id: Tile id
+        :param fetch: Function returning the sources in a cone (ra, dec, radius)
+        :param ra_key: Name of RA column
+        :param dec_key: Name of Dec column
+        :return: Path of tile
+        """
+        path = self.get_tile_path(partition, depth, tile_id)
+
+        with self._get_tile_lock(path):
+            if not self.has_tile(partition, depth, tile_id):
+                ra_deg, dec_deg, radius_deg = get_tile_cone(tile_id, depth)
+                logger.debug(
+                    f"Catalog store miss for {partition} tile {tile_id}, "
+                    f"fetching a radius of {radius_deg:.3f} deg around "
+                    f"RA {ra_deg:.4f}, Dec {dec_deg:.4f}"
+                )
+                table = fetch(ra_deg, dec_deg, radius_deg)
+                table = select_tile_sources(table, tile_id, depth, ra_key, dec_key)
+                self.write_tile(table, path)
+
+        return path
+
+    def get_tiles_table(
+        self,
+        partition: str,
+        depth: int,
+        tile_ids: list[int] | np.ndarray,
+        fetch: Callable[[float, float, float], Table],
+        ra_key: str = "ra",
+        dec_key: str = "dec",
+    ) -> Table:
+        """
+        Get the sources of several tiles, fetching any missing tiles
+
+        :param partition: Partition of store
+        :param depth: HEALPix depth of tiles
+        :param tile_ids: Tile ids
+        :param fetch: Function returning the sources in a cone (ra, dec, radius)
+        :param ra_key: Name of RA column
+        :param dec_key: Name of Dec column
+        :return: Table of sources (empty, without columns, if no sources)
+        """
+        tables = []
+        for tile_id in tile_ids:
+            path = self.ensure_tile(partition, depth, tile_id, fetch, ra_key, dec_key)
+            table = self.read_tile(path)
+            if len(table) > 0:
+                tables.append(table)
+
+        if len(tables) == 0:
+            return Table()
+
+        if len(tables) == 1:
+            return tables[0].copy()
+
+        return vstack(tables, join_type="outer", metadata_conflicts="silent")
+
+
+catalog_store = CatalogStore()
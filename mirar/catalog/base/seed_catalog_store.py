@@ -0,0 +1,157 @@
+"""
+Module to pre-seed the local catalog store for a survey footprint, so that
+pipelines can later be run from the store without querying catalog backends.
+
+The footprint is a table of pointing centres (e.g a field list), and every
+catalog store tile within a radius of any pointing is fetched. This can be run
+from the terminal like:
+
+.. codeblock:: bash
+    mirar-seed-catalog-store --catalog mirar.catalog.vizier.PS1 \
+        --catalog-kwargs '{"min_mag": 10, "max_mag": 20, "filter_name": "r", \
+        "search_radius_arcmin": 30}' --footprint fields.csv
+"""
+
+import argparse
+import importlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from astropy.table import Table
+
+from mirar.catalog.base.base_catalog import ABCatalog
+from mirar.catalog.base.errors import CatalogError
+from mirar.utils.healpix import get_tile_ids
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEED_N_WORKERS = 4
+
+
+def seed_catalog_store(
+    catalog: ABCatalog,
+    ra_deg: float | np.ndarray,
+    dec_deg: float | np.ndarray,
+    radius_deg: float | None = None,
+    n_workers: int = DEFAULT_SEED_N_WORKERS,
+) -> int:
+    """
+    Fetch all catalog store tiles within a radius of a set of pointings
+
+    :param catalog: Catalog
+    :param ra_deg: RA of pointing(s)
+    :param dec_deg: Dec of pointing(s)
+    :param radius_deg: Radius around each pointing (defaults to catalog radius)
+    :param n_workers: Number of tiles to fetch in parallel
+    :return: Number of tiles fetched
+    """
+    if not catalog.is_storable():
+        err = f"Catalog {catalog.abbreviation} cannot be saved in the catalog store"
+        logger.error(err)
+        raise CatalogError(err)
+
+    if radius_deg is None:
+        radius_deg = catalog.search_radius_arcmin / 60.0
+
+    depth = catalog.catalog_store_depth
+    tile_ids = get_tile_ids(ra_deg, dec_deg, radius_deg=radius_deg, depth=depth)
+
+    store = catalog.catalog_store
+    partition = catalog.get_store_partition()
+    store.write_settings(partition, catalog.get_store_settings())
+
+    missing_tile_ids = [
+        tile_id for tile_id in tile_ids if not store.has_tile(partition, depth, tile_id)
+    ]
+
+    logger.info(
+        f"Seeding {len(missing_tile_ids)} of {len(tile_ids)} tiles "
+        f"for {partition} in {store}"
+    )
+
+    def ensure_tile(tile_id: int):
+        store.ensure_tile(
+            partition,
+            depth,
+            tile_id,
+            fetch=catalog.fetch_tile,
+            ra_key=catalog.store_ra_key,
+            dec_key=catalog.store_dec_key,
+        )
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        list(executor.map(ensure_tile, missing_tile_ids))
+
+    return len(missing_tile_ids)
+
+
+def get_catalog_class(catalog_path: str) -> type[ABCatalog]:
+    """
+    Get a catalog class from its full import path, e.g mirar.catalog.vizier.PS1
+
+    :param catalog_path: Import path of catalog class
+    :return: Catalog class
+    """
+    module_name, class_name = catalog_path.rsplit(".", 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def seed_catalog_store_cli():
+    """
+    Pre-seed the catalog store for a survey footprint, from the terminal
+
+    :return: None
+    """
+    parser = argparse.ArgumentParser(
+        description="Pre-seed the local catalog store for a survey footprint"
+    )
+    parser.add_argument(
+        "--catalog",
+        required=True,
+        help="Import path of catalog class, e.g mirar.catalog.vizier.PS1",
+    )
+    parser.add_argument(
+        "--catalog-kwargs",
+        default="{}",
+        help="JSON dictionary of arguments for the catalog",
+    )
+    parser.add_argument(
+        "--footprint",
+        required=True,
+        help="Table of pointings (any format readable by astropy)",
+    )
+    parser.add_argument("--ra-column", default="ra", help="RA column of footprint")
+    parser.add_argument("--dec-column", default="dec", help="Dec column of footprint")
+    parser.add_argument(
+        "--radius",
+        default=None,
+        type=float,
+        help="Radius around each pointing in degrees (defaults to catalog radius)",
+    )
+    parser.add_argument(
+        "--n-workers",
+        default=DEFAULT_SEED_N_WORKERS,
+        type=int,
+        help="Number of tiles to fetch in parallel",
+    )
+    parser.add_argument("--level", default="INFO", help="Python logging level")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.level)
+
+    catalog_kwargs = json.loads(args.catalog_kwargs)
+    catalog_kwargs["use_catalog_store"] = True
+    catalog = get_catalog_class(args.catalog)(**catalog_kwargs)
+
+    footprint = Table.read(args.footprint)
+
+    n_tiles = seed_catalog_store(
+        catalog,
+        ra_deg=np.asarray(footprint[args.ra_column], dtype=float),
+        dec_deg=np.asarray(footprint[args.dec_column], dtype=float),
+        radius_deg=args.radius,
+        n_workers=args.n_workers,
+    )
+    logger.info(f"Fetched {n_tiles} tiles")
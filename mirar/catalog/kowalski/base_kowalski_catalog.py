@@ -4,9 +4,12 @@ Module containing the base Kowalski catalog object
 
 import logging
 import os
+import threading
 from abc import ABC
 from typing import Optional
 
+import pandas as pd
+from astropy.table import Table
 from penquins import Kowalski
 
 from mirar.catalog.base.base_xmatch_catalog import BaseXMatchCatalog
@@ -19,7 +22,9 @@ class KowalskiError(ProcessorError):
     """Error relating to Kowalski"""
 
 
-PROTOCOL, HOST, PORT = "https", "kowalski.caltech.edu", 443
+PROTOCOL = os.getenv("KOWALSKI_PROTOCOL", "https")
+HOST = os.getenv("KOWALSKI_HOST", "kowalski.caltech.edu")
+PORT = int(os.getenv("KOWALSKI_PORT", "443"))
 KOWALSKI_TIMEOUT = 300.0
 
 kowalski_args = {
@@ -30,6 +35,8 @@ kowalski_args = {
     "timeout": KOWALSKI_TIMEOUT,
 }
 
+_kowalski_lock = threading.Lock()
+
 
 def get_kowalski() -> Kowalski:
     """
@@ -104,6 +111,18 @@ class BaseKowalskiXMatch(BaseXMatchCatalog, ABC):
         self.max_time_ms = max_time_ms
         self.kowalski = kowalski
 
+    def get_kowalski_client(self) -> Kowalski:
+        """
+        Get the Kowalski object of this catalog, connecting on first use.
+        Concurrent queries share a single connection.
+
+        :return: Kowalski object
+        """
+        with _kowalski_lock:
+            if self.kowalski is None:
+                self.kowalski = get_kowalski()
+        return self.kowalski
+
     def near_query_kowalski(self, coords: dict) -> dict:
         """
         Performs a Kowalski query around coords
@@ -129,23 +148,69 @@ class BaseKowalskiXMatch(BaseXMatchCatalog, ABC):
                 "limit": self.num_sources,
             },
         }
-        logger.debug(f"Kowalski is {self.kowalski}")
-        response = self.kowalski.query(query=query)
+        kowalski = self.get_kowalski_client()
+        logger.debug(f"Kowalski is {kowalski}")
+        response = kowalski.query(query=query)
         data = response.get("default").get("data")
 
         return data[self.catalog_name]
 
+    def fetch_tile(self, ra_deg: float, dec_deg: float, radius_deg: float) -> Table:
+        """
+        Performs a Kowalski cone search for all sources in a cone, to fill a
+        catalog store tile
+
+        :param ra_deg: RA
+        :param dec_deg: Dec
+        :param radius_deg: Radius of cone
+        :return: Table of sources
+        """
+        query = {
+            "query_type": "cone_search",
+            "query": {
+                "object_coordinates": {
+                    "cone_search_radius": radius_deg * 3600.0,
+                    "cone_search_unit": "arcsec",
+                    "radec": {"tile": [ra_deg, dec_deg]},
+                },
+                "catalogs": {
+                    f"{self.catalog_name}": {
+                        "filter": self.kowalski_filter,
+                        "projection": self.projection,
+                    }
+                },
+            },
+            "kwargs": {
+                "max_time_ms": KOWALSKI_TIMEOUT * 1000.0,
+            },
+        }
+        response = self.get_kowalski_client().query(query=query)
+        data = response.get("default").get("data")[self.catalog_name]["tile"]
+
+        if len(data) == 0:
+            return Table()
+
+        return Table.from_pandas(pd.DataFrame(data))
+
+    def get_store_settings(self) -> dict:
+        settings = super().get_store_settings()
+        settings["kowalski_filter"] = self.kowalski_filter
+        return settings
+
     def query(self, coords) -> dict:
         """
-        Uses a Kowalski object to query for sources around coords
+        Uses a Kowalski object to query for sources around coords, or the catalog
+        store if enabled
 
         :param coords: ra/dec
         :return: crossmatch sources
         """
-        if self.kowalski is None:
-            self.kowalski = get_kowalski()
-        logger.debug("Querying kowalski")
-        data = self.near_query_kowalski(coords)
+        if self.use_catalog_store:
+            logger.debug("Querying catalog store")
+            data = self.query_store(coords)
+        else:
+            logger.debug("Querying kowalski")
+            data = self.near_query_kowalski(coords)
         data = self.update_data(data)
         return data
 
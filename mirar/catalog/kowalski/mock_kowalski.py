@@ -0,0 +1,311 @@
+"""
+Module for a local mock Kowalski server, for testing crossmatching without
+network access or credentials.
+
+The server speaks the subset of the Kowalski API used by mirar (ping, catalog
+info, 'near' queries and 'cone_search' queries), over plain http, and answers
+queries from in-memory catalogs. It can be used with a normal penquins client,
+either from :meth:`MockKowalskiServer.get_kowalski`, or by pointing
+KOWALSKI_PROTOCOL/KOWALSKI_HOST/KOWALSKI_PORT at the server.
+"""
+
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import astropy.units as u
+import numpy as np
+import pandas as pd
+from astropy.coordinates import SkyCoord
+from penquins import Kowalski
+
+logger = logging.getLogger(__name__)
+
+MOCK_KOWALSKI_TOKEN = "mock_kowalski_token"
+
+distance_units = {"arcsec": u.arcsec, "arcmin": u.arcmin, "deg": u.deg, "rad": u.rad}
+
+filter_operators = {
+    "$eq": np.equal,
+    "$ne": np.not_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+}
+
+
+def apply_kowalski_filter(catalog: pd.DataFrame, query_filter: dict) -> pd.DataFrame:
+    """
+    Apply a (simple) Kowalski filter to a catalog, supporting equality and
+    comparison operators
+
+    :param catalog: Catalog
+    :param query_filter: Filter, e.g {"phot_g_mean_mag": {"$lt": 14}}
+    :return: Filtered catalog
+    """
+    mask = np.ones(len(catalog), dtype=bool)
+    for key, condition in query_filter.items():
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, value in condition.items():
+            mask &= filter_operators[operator](catalog[key].to_numpy(), value)
+    return catalog[mask]
+
+
+def get_documents(catalog: pd.DataFrame, projection: dict) -> list[dict]:
+    """
+    Convert catalog rows to Kowalski documents, with only the projected fields
+
+    :param catalog: Catalog
+    :param projection: Projection, e.g {"_id": 1, "ra": 1}
+    :return: List of documents
+    """
+    keys = [key for key, value in projection.items() if value == 1]
+    catalog = catalog[keys].astype(object).where(catalog[keys].notna(), None)
+    return catalog.to_dict(orient="records")
+
+
+class MockKowalskiServer:
+    """
+    Local mock Kowalski server, serving in-memory catalogs
+    """
+
+    def __init__(
+        self,
+        catalogs: dict[str, pd.DataFrame],
+        coordinate_keys: dict[str, tuple[str, str]] | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        token: str = MOCK_KOWALSKI_TOKEN,
+    ):
+        """
+        :param catalogs: Catalogs, keyed by catalog name
+        :param coordinate_keys: Names of RA/Dec fields of each catalog
+            (defaults to 'ra'/'dec')
+        :param host: Host to serve on
+        :param port: Port to serve on (0 picks a free port)
+        :param token: Token expected from clients
+        """
+        self.catalogs = catalogs
+        self.coordinate_keys = coordinate_keys if coordinate_keys is not None else {}
+        self.token = token
+        self.queries = []
+        self._coords = {}
+        self.server = ThreadingHTTPServer((host, port), self.get_handler())
+        self.thread = None
+
+    @property
+    def host(self) -> str:
+        """Host of server"""
+        return self.server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        """Port of server"""
+        return self.server.server_address[1]
+
+    def start(self):
+        """
+        Start serving in a background thread
+
+        :return: None
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logger.debug(f"Mock Kowalski server running on {self.host}:{self.port}")
+
+    def stop(self):
+        """
+        Stop the server
+
+        :return: None
+        """
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def get_kowalski(self) -> Kowalski:
+        """
+        Get a penquins client connected to this server
+
+        :return: Kowalski object
+        """
+        return Kowalski(
+            token=self.token,
+            protocol="http",
+            host=self.host,
+            port=self.port,
+            verbose=False,
+        )
+
+    def get_catalog_coords(self, catalog_name: str) -> SkyCoord:
+        """
+        Get the coordinates of all sources in a catalog
+
+        :param catalog_name: Name of catalog
+        :return: Coordinates
+        """
+        if catalog_name not in self._coords:
+            ra_key, dec_key = self.coordinate_keys.get(catalog_name, ("ra", "dec"))
+            catalog = self.catalogs[catalog_name]
+            self._coords[catalog_name] = SkyCoord(
+                ra=catalog[ra_key].to_numpy(dtype=float),
+                dec=catalog[dec_key].to_numpy(dtype=float),
+                unit=u.deg,
+            )
+        return self._coords[catalog_name]
+
+    def search(
+        self,
+        catalog_name: str,
+        options: dict,
+        radec: dict,
+        radius: u.Quantity,
+        limit: int | None = None,
+    ) -> dict:
+        """
+        Find the sources of a catalog around each position, sorted by distance
+
+        :param catalog_name: Name of catalog
+        :param options: Filter and projection for catalog
+        :param radec: Positions, keyed by name
+        :param radius: Search radius
+        :param limit: Maximum number of sources per position
+        :return: Documents for each position
+        """
+        catalog = self.catalogs[catalog_name]
+        coords = self.get_catalog_coords(catalog_name)
+
+        results = {}
+        for name, (ra_deg, dec_deg) in radec.items():
+            separations = coords.separation(SkyCoord(ra_deg, dec_deg, unit=u.deg))
+            inds = np.flatnonzero(separations <= radius)
+            inds = inds[np.argsort(separations[inds])]
+            matches = apply_kowalski_filter(
+                catalog.iloc[inds], options.get("filter", {})
+            )
+            if limit is not None:
+                matches = matches.iloc[:limit]
+            results[name] = get_documents(matches, options.get("projection", {}))
+        return results
+
+    def run_query(self, query: dict) -> dict:
+        """
+        Run a Kowalski query
+
+        :param query: Query
+        :return: Response
+        """
+        self.queries.append(query)
+        query_type = query["query_type"]
+        options = query["query"]
+
+        if query_type == "info":
+            return {"status": "success", "data": list(self.catalogs.keys())}
+
+        if query_type == "near":
+            radec = options["radec"]
+            radius = options["max_distance"] * distance_units[options["distance_units"]]
+            limit = query.get("kwargs", {}).get("limit")
+        elif query_type == "cone_search":
+            cone = options["object_coordinates"]
+            radec = cone["radec"]
+            radius = (
+                cone["cone_search_radius"] * distance_units[cone["cone_search_unit"]]
+            )
+            limit = None
+        else:
+            return {"status": "error", "message": f"Unknown query type {query_type}"}
+
+        data = {
+            catalog_name: self.search(
+                catalog_name, catalog_options, radec, radius, limit
+            )
+            for catalog_name, catalog_options in options["catalogs"].items()
+        }
+        return {"status": "success", "data": data}
+
+    def get_handler(self) -> type[BaseHTTPRequestHandler]:
+        """
+        Get a request handler class bound to this server
+
+        :return: Request handler class
+        """
+        mock_server = self
+
+        class MockKowalskiHandler(BaseHTTPRequestHandler):
+            """
+            Handler for requests to the mock Kowalski server
+            """
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                logger.debug(format, *args)
+
+            def send_json(self, content: dict, status: int = 200):
+                """
+                Send a json response
+
+                :param content: Content of response
+                :param status: Status code
+                :return: None
+                """
+                body = json.dumps(content).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def is_authorized(self) -> bool:
+                """
+                Check the token of a request
+
+                :return: Boolean
+                """
+                return self.headers.get("Authorization") == mock_server.token
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                """
+                Respond to a ping
+
+                :return: None
+                """
+                if not self.is_authorized():
+                    self.send_json({"status": "error", "message": "Unauthorized"}, 401)
+                    return
+                self.send_json({"status": "success", "message": "greetings"})
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                """
+                Respond to a query
+
+                :return: None
+                """
+                length = int(self.headers.get("Content-Length", 0))
+                content = json.loads(self.rfile.read(length))
+
+                if self.path.rstrip("/") == "/api/auth":
+                    self.send_json({"status": "success", "token": mock_server.token})
+                    return
+
+                if not self.is_authorized():
+                    self.send_json({"status": "error", "message": "Unauthorized"}, 401)
+                    return
+
+                if self.path.rstrip("/") != "/api/queries":
+                    self.send_json({"status": "error", "message": "Not found"}, 404)
+                    return
+
+                self.send_json(mock_server.run_query(content))
+
+        return MockKowalskiHandler
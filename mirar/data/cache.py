@@ -1,9 +1,42 @@
 """
 Central module for handling the cache, currently used only for storing image data.
+
+Cached image data is stored as npy files, which are read back as copy-on-write
+memory maps. Reading is therefore a zero-copy operation, with pages only loaded
+from disk when they are accessed. Modifying the returned array never changes the
+cached data, which is only updated by saving new data. Writes are tracked
+explicitly: writable arrays handed out by the cache are assumed to be modified, while
+data can also be read as a read-only array, which is known to be clean. Saving the
+latest read-only array of a file back to it is therefore skipped, without reading it.
+New data is written to a temporary file and then moved into place, so existing
+memory maps of the previous version remain valid.
+
+Optionally, a RAM budget can be set (via the CACHE_RAM_BUDGET_GB environment variable,
+or :func:`~mirar.data.cache.Cache.set_ram_budget`). Recently-used arrays are then kept
+in memory, in a 'hot tier' with least-recently-used eviction. Arrays are only written
+to the npy store when they are evicted, and only if they changed since they were last
+read from disk. Hit, miss and eviction counters are available via
+:func:`~mirar.data.cache.Cache.get_statistics`, to tune the budget for a given machine.
+
+Each cached file is reference-counted. Objects using a file call
+:func:`~mirar.data.cache.Cache.register` and :func:`~mirar.data.cache.Cache.release`,
+and the file is deleted as soon as the last reference is released.
+Cache files are named with the id of the process which created them. A background
+sweeper (see :func:`~mirar.data.cache.Cache.start_sweeper`) periodically deletes
+orphaned files, i.e. files from this process which are no longer referenced
+(e.g. if an object was never garbage-collected) and files left behind by
+processes which no longer exist. An optional disk quota (CACHE_DISK_QUOTA_GB)
+bounds the total size of the files written by a process.
 """
 
+import hashlib
+import itertools
 import logging
 import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
 from pathlib import Path
 
 import numpy as np
@@ -11,12 +44,49 @@ import numpy as np
 logger = logging.getLogger(__name__)
 
 USE_CACHE: bool = os.getenv("USE_WINTER_CACHE", "true") in ["true", "True", True]
+RAM_BUDGET_GB: float = float(os.getenv("CACHE_RAM_BUDGET_GB", "0"))
+DISK_QUOTA_GB: float = float(os.getenv("CACHE_DISK_QUOTA_GB", "0"))
+
+DEFAULT_SWEEP_INTERVAL_S = 60.0
 
 
 class CacheError(Exception):
     """Error Relating to cache"""
 
 
+class CacheQuotaError(CacheError):
+    """Error raised when writing to the cache would exceed the disk quota"""
+
+
+def get_file_pid(path: Path) -> int | None:
+    """
+    Get the id of the process which created a cache file
+
+    :param path: Path of cache file
+    :return: Process id, or None if the name does not contain one
+    """
+    prefix = path.name.lstrip(".").split("_", maxsplit=1)[0]
+    if not prefix.isdigit():
+        return None
+    return int(prefix)
+
+
+def pid_is_alive(pid: int) -> bool:
+    """
+    Check whether a process is still running
+
+    :param pid: Process id
+    :return: Boolean
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
 class Cache:
     """
     A cache object for storing temporary data
@@ -24,6 +94,32 @@ class Cache:
 
     cache_dir: Path | None = None
 
+    def __init__(
+        self,
+        ram_budget_bytes: int = int(RAM_BUDGET_GB * 1.0e9),
+        disk_quota_bytes: int = int(DISK_QUOTA_GB * 1.0e9),
+    ):
+        self.ram_budget_bytes = ram_budget_bytes
+        self.disk_quota_bytes = disk_quota_bytes
+        # Maps path -> (read-only array, whether it differs from the npy file)
+        self.hot_tier: OrderedDict[Path, tuple[np.ndarray, bool]] = OrderedDict()
+        self.hot_tier_bytes = 0
+        # Arrays evicted from the hot tier, which are being written to disk
+        self.spilling: dict[Path, np.ndarray] = {}
+        # Latest read-only array handed out for each path, which cannot differ
+        # from the cached data until the path is written again
+        self.clean_arrays: dict[Path, weakref.ref] = {}
+        self.condition = threading.Condition()
+        self.n_hits = 0
+        self.n_misses = 0
+        self.n_evictions = 0
+        # Reference counts and on-disk sizes of files written by this process
+        self.refcounts: dict[Path, int] = {}
+        self.disk_usage: dict[Path, int] = {}
+        self.counter = itertools.count()
+        self.sweeper: threading.Thread | None = None
+        self.stop_sweeping = threading.Event()
+
     def get_cache_dir(self) -> Path:
         """
         Returns the current cache dir
@@ -58,6 +154,490 @@ class Cache:
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
 
+    def get_new_path(self, seed: str = "") -> Path:
+        """
+        Get a new unique path for a cache file, named using the process id
+
+        :param seed: Optional string to include in the file name hash
+        :return: Path of cache file
+        """
+        base = f"{seed}{threading.get_ident()}{next(self.counter)}{time.time_ns()}"
+        name = f"{os.getpid()}_{hashlib.sha1(base.encode()).hexdigest()}.npy"
+        return self.get_cache_dir().joinpath(name)
+
+    def register(self, path: Path):
+        """
+        Register a new reference to a cache file
+
+        :param path: Path of cache file
+        :return: None
+        """
+        with self.condition:
+            self.refcounts[path] = self.refcounts.get(path, 0) + 1
+
+    def release(self, path: Path):
+        """
+        Release a reference to a cache file, deleting it if no references remain
+
+        :param path: Path of cache file
+        :return: None
+        """
+        with self.condition:
+            n_refs = self.refcounts.get(path, 0) - 1
+            if n_refs > 0:
+                self.refcounts[path] = n_refs
+                return
+            self.refcounts.pop(path, None)
+        self.remove_data(path)
+
+    def detach(self, path: Path) -> bool:
+        """
+        Release a reference to a cache file only if it is shared with other
+        references. Used before modifying data, so that other references are
+        unaffected.
+
+        :param path: Path of cache file
+        :return: Whether the reference was released
+        """
+        with self.condition:
+            n_refs = self.refcounts.get(path, 0)
+            if n_refs > 1:
+                self.refcounts[path] = n_refs - 1
+                return True
+            return False
+
+    def get_refcount(self, path: Path) -> int:
+        """
+        Get the number of references to a cache file
+
+        :param path: Path of cache file
+        :return: Number of references
+        """
+        with self.condition:
+            return self.refcounts.get(path, 0)
+
+    def set_disk_quota(self, disk_quota_bytes: int):
+        """
+        Set the disk quota for files written by this process. A quota of 0
+        means no quota.
+
+        :param disk_quota_bytes: Quota in bytes
+        :return: None
+        """
+        self.disk_quota_bytes = disk_quota_bytes
+
+    def sweep(self) -> int:
+        """
+        Delete orphaned cache files, i.e. unreferenced files created by this
+        process, and files created by processes which no longer exist.
+
+        :return: Number of files deleted
+        """
+        if (self.cache_dir is None) or (not self.cache_dir.exists()):
+            return 0
+
+        own_pid = os.getpid()
+        n_deleted = 0
+        total_bytes = 0
+
+        for path in self.cache_dir.iterdir():
+            pid = get_file_pid(path)
+            if pid is None:
+                continue
+
+            if pid == own_pid:
+                # Temporary files are being written by this process
+                if path.suffix == ".tmp":
+                    continue
+                # Files are registered before they are written, so checking
+                # and deleting under the lock never removes a file in use
+                with self.condition:
+                    if (path in self.refcounts) or (path in self.spilling):
+                        continue
+                    path.unlink(missing_ok=True)
+                    self.disk_usage.pop(path, None)
+            elif pid_is_alive(pid):
+                try:
+                    total_bytes += path.stat().st_size
+                except FileNotFoundError:
+                    pass
+                continue
+            else:
+                path.unlink(missing_ok=True)
+
+            n_deleted += 1
+
+        with self.condition:
+            total_bytes += sum(self.disk_usage.values())
+
+        if n_deleted > 0:
+            logger.debug(f"Cache sweeper deleted {n_deleted} orphaned files")
+
+        if 0 < self.disk_quota_bytes < total_bytes:
+            logger.warning(
+                f"Cache directory {self.cache_dir} uses {total_bytes} bytes, "
+                f"exceeding the quota of {self.disk_quota_bytes} bytes"
+            )
+
+        return n_deleted
+
+    def run_sweeper(self, interval_s: float):
+        """
+        Repeatedly sweep the cache, until the sweeper is stopped
+
+        :param interval_s: Time between sweeps, in seconds
+        :return: None
+        """
+        while not self.stop_sweeping.wait(interval_s):
+            try:
+                self.sweep()
+            except OSError as exc:
+                logger.warning(f"Cache sweep failed: {exc}")
+
+    def start_sweeper(self, interval_s: float = DEFAULT_SWEEP_INTERVAL_S):
+        """
+        Start a background thread which periodically deletes orphaned cache files
+
+        :param interval_s: Time between sweeps, in seconds
+        :return: None
+        """
+        if (self.sweeper is not None) and self.sweeper.is_alive():
+            return
+        self.stop_sweeping.clear()
+        self.sweeper = threading.Thread(
+            target=self.run_sweeper, args=(interval_s,), daemon=True
+        )
+        self.sweeper.start()
+
+    def stop_sweeper(self):
+        """
+        Stop the background sweeper thread
+
+        :return: None
+        """
+        self.stop_sweeping.set()
+        if self.sweeper is not None:
+            self.sweeper.join()
+            self.sweeper = None
+
+    def set_ram_budget(self, ram_budget_bytes: int):
+        """
+        Set the RAM budget of the in-memory hot tier. A budget of 0 disables it.
+
+        :param ram_budget_bytes: Budget in bytes
+        :return: None
+        """
+        self.ram_budget_bytes = ram_budget_bytes
+        self.evict()
+
+    def use_hot_tier(self, data: np.ndarray) -> bool:
+        """
+        Check whether an array should be kept in the in-memory hot tier
+
+        :param data: Array data
+        :return: Boolean
+        """
+        return 0 < data.nbytes <= self.ram_budget_bytes
+
+    def load_data(self, path: Path, writable: bool = True) -> np.ndarray:
+        """
+        Load an array from the cache. Arrays in the hot tier are returned as copies,
+        while arrays in the npy store are returned as a copy-on-write memory map
+        (and promoted to the hot tier, if enabled).
+
+        Read-only arrays are instead returned without copying, and recorded as
+        clean, so saving them back to the same path is skipped.
+
+        :param path: Path of cached npy file
+        :param writable: Whether the returned array can be modified
+        :return: Array data
+        """
+        with self.condition:
+            if path in self.hot_tier:
+                self.n_hits += 1
+                self.hot_tier.move_to_end(path)
+                return self.hand_out(path, self.hot_tier[path][0], writable)
+
+            if path in self.spilling:
+                self.n_hits += 1
+                return self.hand_out(path, self.spilling[path], writable)
+
+            if self.ram_budget_bytes > 0:
+                self.n_misses += 1
+
+        data = np.load(
+            path.as_posix(), mmap_mode="c" if writable else "r", allow_pickle=False
+        )
+
+        if self.use_hot_tier(data):
+            array = np.array(data)
+            self.add_to_hot_tier(path, array, dirty=False)
+            with self.condition:
+                return self.hand_out(path, array, writable)
+
+        if not writable:
+            with self.condition:
+                self.clean_arrays[path] = weakref.ref(data)
+
+        return data
+
+    def hand_out(self, path: Path, array: np.ndarray, writable: bool) -> np.ndarray:
+        """
+        Get an array held in memory to return to a caller, either as a copy, or
+        as a read-only view recorded as clean. Must be called while holding
+        self.condition.
+
+        :param path: Path of cached npy file
+        :param array: Array held by the cache
+        :param writable: Whether the returned array can be modified
+        :return: Array data
+        """
+        if writable:
+            return array.copy()
+
+        view = array.view()
+        view.flags.writeable = False
+        self.clean_arrays[path] = weakref.ref(view)
+        return view
+
+    def load_rows(self, path: Path, rows: slice) -> np.ndarray:
+        """
+        Load a strip of rows of an array from the cache, without reading the rest
+        of the array. Partial reads are not promoted to the hot tier.
+
+        :param path: Path of cached npy file
+        :param rows: Slice of rows to load
+        :return: Array data for the selected rows
+        """
+        with self.condition:
+            if path in self.hot_tier:
+                self.n_hits += 1
+                self.hot_tier.move_to_end(path)
+                return self.hot_tier[path][0][rows].copy()
+
+            if path in self.spilling:
+                self.n_hits += 1
+                return self.spilling[path][rows].copy()
+
+        data = np.load(path.as_posix(), mmap_mode="r", allow_pickle=False)
+        return np.array(data[rows])
+
+    def get_shape(self, path: Path) -> tuple[int, ...]:
+        """
+        Get the shape of a cached array, reading only the npy header from disk
+
+        :param path: Path of cached npy file
+        :return: Shape of array
+        """
+        with self.condition:
+            if path in self.hot_tier:
+                return self.hot_tier[path][0].shape
+
+            if path in self.spilling:
+                return self.spilling[path].shape
+
+        return np.load(path.as_posix(), mmap_mode="r", allow_pickle=False).shape
+
+    def is_unchanged(self, path: Path, data: np.ndarray) -> bool:
+        """
+        Check whether data is the latest read-only array handed out for a path,
+        and so cannot differ from the cached data
+
+        :param path: Path of cached npy file
+        :param data: Array data
+        :return: Boolean
+        """
+        with self.condition:
+            ref = self.clean_arrays.get(path)
+            return (ref is not None) and (ref() is data)
+
+    def save_data(self, path: Path, data: np.ndarray):
+        """
+        Save an array to the cache, unless it is unchanged
+
+        :param path: Path of cached npy file
+        :param data: Array data
+        :return: None
+        """
+        if self.is_unchanged(path, data):
+            return
+
+        with self.condition:
+            self.clean_arrays.pop(path, None)
+
+        if self.use_hot_tier(data):
+            self.add_to_hot_tier(path, np.array(data), dirty=True)
+            return
+
+        with self.condition:
+            self.wait_for_spill(path)
+            self.discard_from_hot_tier(path)
+
+        self.write_file(path, data)
+
+    def write_file(self, path: Path, data: np.ndarray):
+        """
+        Write an array to the npy store, via a temporary file
+
+        :param path: Path of cached npy file
+        :param data: Array data
+        :return: None
+        """
+        if self.disk_quota_bytes > 0:
+            with self.condition:
+                new_usage = (
+                    sum(self.disk_usage.values())
+                    - self.disk_usage.get(path, 0)
+                    + data.nbytes
+                )
+            if new_usage > self.disk_quota_bytes:
+                self.sweep()
+                with self.condition:
+                    new_usage = (
+                        sum(self.disk_usage.values())
+                        - self.disk_usage.get(path, 0)
+                        + data.nbytes
+                    )
+                if new_usage > self.disk_quota_bytes:
+                    err = (
+                        f"Writing {path.name} to the cache would use {new_usage} "
+                        f"bytes, exceeding the disk quota of "
+                        f"{self.disk_quota_bytes} bytes."
+                    )
+                    logger.error(err)
+                    raise CacheQuotaError(err)
+
+        temp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        with open(temp_path, "wb") as output_file:
+            np.save(output_file, np.asarray(data), allow_pickle=False)
+        os.replace(temp_path, path)
+
+        with self.condition:
+            self.disk_usage[path] = path.stat().st_size
+
+    def remove_data(self, path: Path):
+        """
+        Remove an array from both the hot tier and the npy store
+
+        :param path: Path of cached npy file
+        :return: None
+        """
+        with self.condition:
+            self.wait_for_spill(path)
+            self.discard_from_hot_tier(path)
+            self.disk_usage.pop(path, None)
+            self.clean_arrays.pop(path, None)
+        path.unlink(missing_ok=True)
+
+    def wait_for_spill(self, path: Path):
+        """
+        Wait until any ongoing write of an evicted array to a path is complete.
+        Must be called while holding self.condition.
+
+        :param path: Path of cached npy file
+        :return: None
+        """
+        while path in self.spilling:
+            self.condition.wait()
+
+    def discard_from_hot_tier(self, path: Path):
+        """
+        Remove an entry from the hot tier, without writing it to disk.
+        Must be called while holding self.condition.
+
+        :param path: Path of cached npy file
+        :return: None
+        """
+        if path in self.hot_tier:
+            array, _ = self.hot_tier.pop(path)
+            self.hot_tier_bytes -= array.nbytes
+
+    def add_to_hot_tier(self, path: Path, array: np.ndarray, dirty: bool):
+        """
+        Add an array to the hot tier, evicting older arrays if the RAM budget
+        is exceeded
+
+        :param path: Path of cached npy file
+        :param array: Array data (not shared with any caller)
+        :param dirty: Whether the array differs from the npy file
+        :return: None
+        """
+        array.flags.writeable = False
+
+        with self.condition:
+            self.wait_for_spill(path)
+            self.discard_from_hot_tier(path)
+            self.hot_tier[path] = (array, dirty)
+            self.hot_tier_bytes += array.nbytes
+
+        self.evict()
+
+    def evict(self):
+        """
+        Evict least-recently-used arrays from the hot tier until it fits within
+        the RAM budget. Arrays which changed are written to the npy store.
+
+        :return: None
+        """
+        to_spill = []
+
+        with self.condition:
+            while (self.hot_tier_bytes > self.ram_budget_bytes) and (
+                len(self.hot_tier) > 0
+            ):
+                path, (array, dirty) = self.hot_tier.popitem(last=False)
+                self.hot_tier_bytes -= array.nbytes
+                self.n_evictions += 1
+                if dirty:
+                    self.spilling[path] = array
+                    to_spill.append(path)
+
+        for path in to_spill:
+            try:
+                self.write_file(path, self.spilling[path])
+            except CacheQuotaError:
+                # Keep the array in memory rather than losing it
+                with self.condition:
+                    array = self.spilling[path]
+                    self.hot_tier[path] = (array, True)
+                    self.hot_tier_bytes += array.nbytes
+            finally:
+                with self.condition:
+                    del self.spilling[path]
+                    self.condition.notify_all()
+
+    def get_statistics(self) -> dict:
+        """
+        Get statistics about usage of the in-memory hot tier and the npy store
+
+        :return: Dictionary of statistics
+        """
+        with self.condition:
+            n_requests = self.n_hits + self.n_misses
+            return {
+                "ram_budget_bytes": self.ram_budget_bytes,
+                "hot_tier_bytes": self.hot_tier_bytes,
+                "hot_tier_entries": len(self.hot_tier),
+                "hits": self.n_hits,
+                "misses": self.n_misses,
+                "evictions": self.n_evictions,
+                "hit_rate": self.n_hits / n_requests if n_requests > 0 else 0.0,
+                "disk_quota_bytes": self.disk_quota_bytes,
+                "disk_bytes": sum(self.disk_usage.values()),
+                "n_files": len(self.refcounts),
+            }
+
+    def reset_statistics(self):
+        """
+        Reset the hit/miss/eviction counters
+
+        :return: None
+        """
+        with self.condition:
+            self.n_hits = 0
+            self.n_misses = 0
+            self.n_evictions = 0
+
     def __str__(self):
         return f"A cache, with path {self.cache_dir}"
 
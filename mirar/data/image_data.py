@@ -14,8 +14,11 @@ To mitigate this, the code can be operated in **cache mode**. In that case,
 after raw images are loaded, only the header data is stored in memory.
 The actual image data itself is stored temporarily in as a npy file
 in a dedicated cache directory, and only loaded into memory when needed.
-When the data is updated, the npy file is changed.
-The path of the file is a unique hash, and includes the read time of the file,
+The npy file is read back as a copy-on-write memory map, so pixels are only paged
+in from disk when they are accessed, and modifying the returned array does not
+change the cache. When the data is updated, the npy file is changed.
+The path of the file is a unique hash, prefixed with the process id.
+Copies of an image share the same file until one of them is modified,
 so multiple copies of an image can be read and modified independently.
 
 In cache mode, all of the image data is temporarily stored in a cache,
@@ -25,12 +28,16 @@ The location of the cache is in the configurable
 To mitigate that, and to avoid cleaning the cache by hand,
 the code tries to automatically delete cache files as needed.
 
+Each cache file is reference-counted by :class:`~mirar.data.cache.Cache`.
 Python provides a default `__del__()` method for handling clean up when an object
-is deleted. Images automatically delete their cache in this method. However, has a
+is deleted. Images release their reference in this method, and the file is deleted
+once no image refers to it. However, has a
 somewhat-complicated method of 'garbage collection' (see
 `the official description <https://devguide.python.org/internals/garbage-collector>`_
 for more info), and it is not guaranteed that Image objects will
-clean themselves.
+clean themselves. A background sweeper therefore also periodically deletes
+orphaned cache files, and an optional disk quota can be set with
+the CACHE_DISK_QUOTA_GB environment variable.
 
 As a fallback, when you run the code from the command line (and therefore call
 __main__),  we use the standard python
@@ -53,24 +60,58 @@ You can change this via an environment variable.
 
 See :doc:`usage` for more information about selecting cache mode,
 and setting the output data directory.
+
+Images can also be created lazily, with
+:func:`~mirar.data.image_data.Image.from_lazy_data`. In that case, only the header
+is held, and the data is only read (e.g from the source fits file) the first time
+it is needed. Processors which only inspect headers, such as image selection and
+batching, therefore never read the pixels of images which are later discarded.
+
+Floating-point image data is stored as IMAGE_DTYPE (float32 by default),
+which halves the memory, cache and I/O footprint compared to float64.
+Processors which need extra precision (e.g the accumulators used to stack images)
+should upcast locally. You can change this via an environment variable.
+
+.. code-block:: bash
+
+    export IMAGE_DTYPE = float64
 """
 
 import copy
-import hashlib
 import logging
-import threading
+import os
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 import numpy as np
 from astropy.io.fits import Header
-from astropy.time import Time
 
 from mirar.data.base_data import DataBatch, DataBlock
 from mirar.data.cache import USE_CACHE, cache
 
 logger = logging.getLogger(__name__)
 
+IMAGE_DTYPE = np.dtype(os.getenv("IMAGE_DTYPE", "float32"))
+
+if not np.issubdtype(IMAGE_DTYPE, np.floating):
+    err = f"IMAGE_DTYPE must be a floating-point type, not '{IMAGE_DTYPE}'"
+    logger.error(err)
+    raise ValueError(err)
+
+
+def cast_image_data(data: np.ndarray) -> np.ndarray:
+    """
+    Cast floating-point image data to IMAGE_DTYPE. Other data
+    (e.g integer or boolean arrays) is returned unchanged.
+
+    :param data: Image data
+    :return: Image data with the pipeline dtype
+    """
+    if isinstance(data, np.ndarray):
+        if np.issubdtype(data.dtype, np.floating) and (data.dtype != IMAGE_DTYPE):
+            return data.astype(IMAGE_DTYPE)
+    return data
+
 
 class Image(DataBlock):
     """
@@ -82,19 +123,80 @@ class Image(DataBlock):
     :class:`~mirar.processors.base_processor.BaseCandidateGenerator` processors.
     """
 
-    cache_files = []
-
     def __init__(self, data: np.ndarray, header: Header):
         self._data = None
+        self._load_data = None
         self.header = header
         super().__init__()
         if USE_CACHE:
             self.cache_path = self.get_cache_path()
-            self.cache_files.append(self.cache_path)
+            cache.register(self.cache_path)
         else:
             self.cache_path = None
         self.set_data(data=data)
 
+    @classmethod
+    def _from_parts(
+        cls,
+        header: Header,
+        cache_path: Path | None = None,
+        load_data: Callable[[], np.ndarray] | None = None,
+    ) -> "Image":
+        """
+        Create an image without setting its data, which is instead either
+        shared through an existing cache file or loaded later
+
+        :param header: Image header
+        :param cache_path: Existing cache file to share (in cache mode),
+            or None to use a new one
+        :param load_data: Function returning the image data, or None
+        :return: Image
+        """
+        new = cls.__new__(cls)
+        new._data = None
+        new._load_data = load_data
+        new.header = header
+        DataBlock.__init__(new)
+        if USE_CACHE and (cache_path is None):
+            cache_path = new.get_cache_path()
+        new.cache_path = cache_path
+        if new.cache_path is not None:
+            cache.register(new.cache_path)
+        return new
+
+    @classmethod
+    def from_lazy_data(
+        cls, load_data: Callable[[], np.ndarray], header: Header
+    ) -> "Image":
+        """
+        Create an image whose data is only loaded when first needed
+
+        :param load_data: Function (with no arguments) returning the image data.
+            Must be picklable to send the image to other processes unloaded.
+        :param header: Image header
+        :return: Image
+        """
+        return cls._from_parts(header, load_data=load_data)
+
+    def is_loaded(self) -> bool:
+        """
+        Check whether the image data has been loaded
+
+        :return: boolean
+        """
+        return self._load_data is None
+
+    def load_lazy_data(self):
+        """
+        Load the image data, if it has not been loaded yet
+
+        :return: None
+        """
+        if self._load_data is not None:
+            load_data = self._load_data
+            logger.debug(f"Loading data for {self.get_name()}")
+            self.set_data(load_data())
+
     def get_cache_path(self) -> Path:
         """
         Get a unique cache path for the image (.npy file).
@@ -103,9 +205,7 @@ class Image(DataBlock):
 
         :return: unique cache file path
         """
-        base = "".join([str(Time.now()), self.get_name(), str(threading.get_ident())])
-        name = f"{hashlib.sha1(base.encode()).hexdigest()}.npy"
-        return cache.get_cache_dir().joinpath(name)
+        return cache.get_new_path(seed=self.get_name())
 
     def set_data(self, data: np.ndarray):
         """
@@ -114,6 +214,8 @@ class Image(DataBlock):
         :param data: Updated image data
         :return: None
         """
+        self._load_data = None
+        data = cast_image_data(data)
         if USE_CACHE:
             self.set_cache_data(data)
         else:
@@ -126,7 +228,11 @@ class Image(DataBlock):
         :param data: Updated image data
         :return: None
         """
-        np.save(self.cache_path.as_posix(), data, allow_pickle=False)
+        # If the cache file is shared with copies of this image, use a new one
+        if cache.detach(self.cache_path):
+            self.cache_path = self.get_cache_path()
+            cache.register(self.cache_path)
+        cache.save_data(self.cache_path, data)
 
     def set_ram_data(self, data: np.ndarray):
         """
@@ -137,16 +243,53 @@ class Image(DataBlock):
         """
         self._data = data
 
-    def get_data(self) -> np.ndarray:
+    def get_data(self, writable: bool = True) -> np.ndarray:
         """
         Get the image data from cache
 
+        :param writable: Whether the returned array can be modified. Read-only
+            data is never copied, and setting it back as the data of the same
+            image does not rewrite the cache.
         :return: image data (numpy array)
         """
+        self.load_lazy_data()
+
+        if USE_CACHE:
+            return self.get_cache_data(writable=writable)
+
+        data = self.get_ram_data()
+        if not writable:
+            data = data.view()
+            data.flags.writeable = False
+        return data
+
+    def get_data_rows(self, rows: slice) -> np.ndarray:
+        """
+        Get a strip of rows of the image data, without loading the full image
+        from the cache
+
+        :param rows: Slice of rows
+        :return: image data for the selected rows (numpy array)
+        """
+        self.load_lazy_data()
+
+        if USE_CACHE:
+            return cache.load_rows(self.cache_path, rows)
+
+        return self.get_ram_data()[rows].copy()
+
+    def get_shape(self) -> tuple[int, ...]:
+        """
+        Get the shape of the image data, without reading the data from the cache
+
+        :return: shape of image data
+        """
+        self.load_lazy_data()
+
         if USE_CACHE:
-            return self.get_cache_data()
+            return cache.get_shape(self.cache_path)
 
-        return self.get_ram_data()
+        return self.get_ram_data().shape
 
     def get_mask(self) -> np.ndarray:
         """
@@ -154,16 +297,17 @@ class Image(DataBlock):
 
         :return: mask data (numpy array)
         """
-        img_data = self.get_data()
+        img_data = self.get_data(writable=False)
         return ~np.isnan(img_data)
 
-    def get_cache_data(self) -> np.ndarray:
+    def get_cache_data(self, writable: bool = True) -> np.ndarray:
         """
         Get the image data from cache
 
+        :param writable: Whether the returned array can be modified
         :return: image data (numpy array)
         """
-        return np.load(self.cache_path.as_posix(), allow_pickle=True)
+        return cache.load_data(self.cache_path, writable=writable)
 
     def get_ram_data(self) -> np.ndarray:
         """
@@ -206,20 +350,49 @@ class Image(DataBlock):
 
     def __del__(self):
         if self.cache_path is not None:
-            self.cache_path.unlink(missing_ok=True)
-            self.cache_files.remove(self.cache_path)
+            cache.release(self.cache_path)
+
+    def __getstate__(self):
+        # Images sent to another process carry their data with them,
+        # because the cache file is deleted when the original is deleted.
+        # Images which are not loaded yet carry their loader instead.
+        state = self.__dict__.copy()
+        if self.is_loaded():
+            state["_data"] = self.get_data(writable=False)
+        state["cache_path"] = None
+        return state
+
+    def __setstate__(self, state):
+        data = state.pop("_data")
+        self.__dict__.update(state)
+        self._data = None
+        if USE_CACHE:
+            self.cache_path = self.get_cache_path()
+            cache.register(self.cache_path)
+        if self.is_loaded():
+            self.set_data(data=data)
+
+    def copy_with_header(self, header: Header) -> "Image":
+        """
+        Create a new image with a given header. In cache mode, the new image
+        shares the cache file until either image updates its data.
+
+        :param header: Header of new image
+        :return: New image
+        """
+        if not self.is_loaded():
+            return type(self).from_lazy_data(self._load_data, header=header)
+
+        if self.cache_path is None:
+            return type(self)(data=copy.deepcopy(self.get_data()), header=header)
+
+        return type(self)._from_parts(header, cache_path=self.cache_path)
 
     def __deepcopy__(self, memo):
-        new = type(self)(
-            data=copy.deepcopy(self.get_data()), header=copy.deepcopy(self.get_header())
-        )
-        return new
+        return self.copy_with_header(copy.deepcopy(self.get_header()))
 
     def __copy__(self):
-        new = type(self)(
-            data=self.get_data().__copy__(), header=self.get_header().__copy__()
-        )
-        return new
+        return self.copy_with_header(self.get_header().__copy__())
 
 
 class ImageBatch(DataBatch):
@@ -10,4 +10,12 @@ from mirar.data.utils.coords import (
     get_xy_from_wcs,
     write_regions_file,
 )
+from mirar.data.utils.cutouts import (
+    CutoutCache,
+    CutoutError,
+    cutout_cache,
+    extract_cutouts,
+    make_cutouts,
+)
 from mirar.data.utils.plot_image import plot_fits_image
+from mirar.data.utils.stack import COMBINE_METHODS, StackingError, stack_images
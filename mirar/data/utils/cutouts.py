@@ -0,0 +1,200 @@
+"""
+Module for extracting square cutouts (stamps) around positions in images.
+
+Cutouts are extracted for all positions in a single vectorised pass, by gathering
+pixels with clipped index arrays and then padding anything outside the image with a
+constant value. Every cutout therefore has the same shape, (2*half_size+1,
+2*half_size+1), regardless of how close it is to the image edge.
+
+A small LRU cache of image data (keyed by path, size and modification time) is
+shared by source detection, photometry and thumbnail generation, so each image is
+opened only once, however many cutouts are made from it.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from astropy.io import fits
+
+from mirar.errors import ProcessorError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CUTOUT_CACHE_SIZE = 8
+
+
+class CutoutError(ProcessorError):
+    """
+    Error raised when cutout generation fails
+    """
+
+
+def extract_cutouts(
+    data: np.ndarray,
+    x_positions: np.ndarray,
+    y_positions: np.ndarray,
+    half_size: int,
+    pad_value: float = 0.0,
+) -> np.ndarray:
+    """
+    Extract square cutouts centred on each (x, y) position, in one vectorised pass.
+    Pixels outside the image are set to pad_value.
+
+    :param data: 2D image data
+    :param x_positions: x (column) pixel positions of cutout centres
+    :param y_positions: y (row) pixel positions of cutout centres
+    :param half_size: Half size of the square cutouts
+    :param pad_value: Value for pixels outside the image
+    :return: Array of cutouts, with shape (N, 2*half_size+1, 2*half_size+1)
+    """
+    x_positions = np.atleast_1d(np.asarray(x_positions)).astype(int)
+    y_positions = np.atleast_1d(np.asarray(y_positions)).astype(int)
+
+    y_image_size, x_image_size = np.shape(data)
+
+    outside = (
+        (x_positions < 0)
+        | (x_positions > x_image_size)
+        | (y_positions < 0)
+        | (y_positions > y_image_size)
+    )
+    if np.any(outside):
+        ind = np.argmax(outside)
+        err = (
+            f"Cutout position {x_positions[ind]},{y_positions[ind]} is outside "
+            f"the image, with shape {np.shape(data)}"
+        )
+        logger.error(err)
+        raise CutoutError(err)
+
+    offsets = np.arange(-half_size, half_size + 1)
+    rows = y_positions[:, None] + offsets
+    cols = x_positions[:, None] + offsets
+
+    valid = ((rows >= 0) & (rows < y_image_size))[:, :, None] & (
+        (cols >= 0) & (cols < x_image_size)
+    )[:, None, :]
+
+    rows = np.clip(rows, 0, y_image_size - 1)
+    cols = np.clip(cols, 0, x_image_size - 1)
+
+    cutouts = np.asarray(data[rows[:, :, None], cols[:, None, :]])
+    cutouts[~valid] = pad_value
+    return cutouts
+
+
+class CutoutCache:
+    """
+    Class for a thread-safe LRU cache of image data used to make cutouts
+    """
+
+    def __init__(self, max_images: int = DEFAULT_CUTOUT_CACHE_SIZE):
+        self.max_images = max_images
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(image_path: str | Path) -> tuple[str, int, int]:
+        """
+        Get the cache key for an image, which changes if the file is rewritten
+
+        :param image_path: Path to image
+        :return: Cache key
+        """
+        stat = os.stat(image_path)
+        return str(Path(image_path).resolve()), stat.st_size, stat.st_mtime_ns
+
+    def get_data(self, image_path: str | Path) -> np.ndarray:
+        """
+        Get the data of an image, reading it (memory-mapped where possible) only
+        if it is not already cached
+
+        :param image_path: Path to image
+        :return: Image data
+        """
+        key = self.get_key(image_path)
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+
+        data = fits.getdata(image_path)
+
+        with self._lock:
+            self._data[key] = data
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_images:
+                self._data.popitem(last=False)
+        return data
+
+    def discard(self, image_path: str | Path):
+        """
+        Remove all cached data for an image (e.g before deleting it)
+
+        :param image_path: Path to image
+        :return: None
+        """
+        path = str(Path(image_path).resolve())
+        with self._lock:
+            for key in [x for x in self._data if x[0] == path]:
+                del self._data[key]
+
+    def clear(self):
+        """
+        Remove all cached data
+
+        :return: None
+        """
+        with self._lock:
+            self._data.clear()
+
+    def get_cutouts(
+        self,
+        image_path: str | Path,
+        x_positions: np.ndarray,
+        y_positions: np.ndarray,
+        half_size: int,
+    ) -> np.ndarray:
+        """
+        Get cutouts from an image for all positions at once
+
+        :param image_path: Path to image
+        :param x_positions: x pixel positions of cutout centres
+        :param y_positions: y pixel positions of cutout centres
+        :param half_size: Half size of the square cutouts
+        :return: Array of cutouts, with shape (N, 2*half_size+1, 2*half_size+1)
+        """
+        try:
+            return extract_cutouts(
+                self.get_data(image_path), x_positions, y_positions, half_size
+            )
+        except CutoutError as exc:
+            raise CutoutError(f"Failed to make cutouts from {image_path}") from exc
+
+
+cutout_cache = CutoutCache()
+
+
+def make_cutouts(
+    image_paths: Path | list[Path], position: tuple, half_size: int
+) -> list[np.array]:
+    """
+    Function to make cutouts at a single position, from one or more images
+
+    :param image_paths: Path or list of paths to the images
+    :param position: (x,y) coordinates of the center of the cutouts
+    :param half_size: half_size of the square cutouts
+    :return: cutout_list: list of 2D numpy arrays
+    """
+    if not isinstance(image_paths, list):
+        image_paths = [image_paths]
+
+    x, y = position
+    return [
+        cutout_cache.get_cutouts(image_path, x, y, half_size)[0]
+        for image_path in image_paths
+    ]
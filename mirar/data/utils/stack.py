@@ -0,0 +1,239 @@
+"""
+Module for combining a stack of images into a single image, e.g. to make master
+bias, dark, flat or sky frames.
+
+Rather than allocating a full (n_frames, nx, ny) cube, images are combined in strips
+of rows. Each strip is read from the image cache (without loading the rest of the
+image), combined, and written into the output array. The strip height is chosen so
+that the strips being combined at any one time fit within a memory budget, which can
+be set via the STACK_MEMORY_BUDGET_GB environment variable. Strips are combined in
+parallel threads, since numpy releases the GIL for the heavy lifting.
+
+Available combination methods are:
+ * 'median': nan-median
+ * 'mean': nan-mean
+ * 'sigma_clipped_mean': iterative sigma-clipping about the median, then nan-mean
+ * 'minmax': rejecting the lowest and highest values of each pixel, then nan-mean
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from mirar.data import IMAGE_DTYPE, Image
+from mirar.paths import max_n_cpu
+
+logger = logging.getLogger(__name__)
+
+STACK_MEMORY_BUDGET_GB: float = float(os.getenv("STACK_MEMORY_BUDGET_GB", "2.0"))
+
+MEDIAN_COMBINE = "median"
+MEAN_COMBINE = "mean"
+SIGMA_CLIPPED_MEAN_COMBINE = "sigma_clipped_mean"
+MINMAX_COMBINE = "minmax"
+
+COMBINE_METHODS = [
+    MEDIAN_COMBINE,
+    MEAN_COMBINE,
+    SIGMA_CLIPPED_MEAN_COMBINE,
+    MINMAX_COMBINE,
+]
+
+# Working memory needed per element of a strip cube, in units of the
+# accumulator size (the cube itself, plus temporary arrays when combining)
+WORKING_MEMORY_FACTOR = 3
+
+
+class StackingError(ValueError):
+    """
+    Error raised when images cannot be combined
+    """
+
+
+def sigma_clipped_mean(
+    cube: np.ndarray, sigma: float = 3.0, max_iters: int = 5
+) -> np.ndarray:
+    """
+    Iteratively sigma-clip a cube about the median along the first axis,
+    and return the mean of the remaining values
+
+    :param cube: Data cube, with frames along the first axis
+    :param sigma: Number of standard deviations for clipping
+    :param max_iters: Maximum number of clipping iterations
+    :return: Combined array
+    """
+    for _ in range(max_iters):
+        center = np.nanmedian(cube, axis=0)
+        std = np.nanstd(cube, axis=0)
+        with np.errstate(invalid="ignore"):
+            clip = np.abs(cube - center) > sigma * std
+        if not np.any(clip):
+            break
+        cube[clip] = np.nan
+
+    return np.nanmean(cube, axis=0)
+
+
+def minmax_mean(cube: np.ndarray, n_low: int = 1, n_high: int = 1) -> np.ndarray:
+    """
+    Reject the n_low lowest and n_high highest values of each pixel along the
+    first axis, and return the mean of the remaining values. NaN values are ignored.
+
+    :param cube: Data cube, with frames along the first axis
+    :param n_low: Number of low values to reject
+    :param n_high: Number of high values to reject
+    :return: Combined array
+    """
+    # NaNs are sorted to the end
+    cube = np.sort(cube, axis=0)
+    n_valid = np.sum(~np.isnan(cube), axis=0)
+    index = np.arange(cube.shape[0]).reshape((-1,) + (1,) * (cube.ndim - 1))
+    keep = (index >= n_low) & (index < n_valid - n_high)
+    n_keep = np.sum(keep, axis=0)
+    total = np.sum(np.where(keep, cube, 0.0), axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n_keep > 0, total / n_keep, np.nan)
+
+
+def combine_cube(cube: np.ndarray, method: str = MEDIAN_COMBINE, **kwargs):
+    """
+    Combine a cube along the first axis
+
+    :param cube: Data cube, with frames along the first axis
+    :param method: Combination method
+    :param kwargs: Additional arguments for the combination method
+    :return: Combined array
+    """
+    if method == MEDIAN_COMBINE:
+        return np.nanmedian(cube, axis=0)
+    if method == MEAN_COMBINE:
+        return np.nanmean(cube, axis=0)
+    if method == SIGMA_CLIPPED_MEAN_COMBINE:
+        return sigma_clipped_mean(cube, **kwargs)
+    if method == MINMAX_COMBINE:
+        return minmax_mean(cube, **kwargs)
+
+    err = f"Unknown combination method '{method}'. Available are {COMBINE_METHODS}."
+    logger.error(err)
+    raise StackingError(err)
+
+
+def get_strip_height(
+    n_frames: int,
+    row_size: int,
+    memory_budget_bytes: float,
+    n_threads: int,
+    itemsize: int = np.dtype(np.float64).itemsize,
+) -> int:
+    """
+    Get the number of rows per strip, so that all strips being combined at once
+    fit within the memory budget
+
+    :param n_frames: Number of frames
+    :param row_size: Number of pixels in a row
+    :param memory_budget_bytes: Memory budget in bytes
+    :param n_threads: Number of strips combined at once
+    :param itemsize: Size of accumulator elements in bytes
+    :return: Number of rows per strip (at least 1)
+    """
+    bytes_per_row = n_frames * row_size * itemsize * WORKING_MEMORY_FACTOR
+    return max(1, int(memory_budget_bytes // (bytes_per_row * n_threads)))
+
+
+def stack_images(
+    images: list[Image],
+    method: str = MEDIAN_COMBINE,
+    scales: Optional[list[float]] = None,
+    masks: Optional[list[Optional[Image]]] = None,
+    memory_budget_bytes: float = STACK_MEMORY_BUDGET_GB * 1.0e9,
+    n_threads: int = max_n_cpu,
+    **kwargs,
+) -> np.ndarray:
+    """
+    Combine images strip-by-strip, within a memory budget
+
+    :param images: Images to combine
+    :param method: Combination method (see COMBINE_METHODS)
+    :param scales: Optional factor to divide each image by before combining
+    :param masks: Optional mask image for each image, with masked pixels equal to 0
+    :param memory_budget_bytes: Peak memory to use for the strips, in bytes
+    :param n_threads: Number of strips to combine in parallel
+    :param kwargs: Additional arguments for the combination method
+        (e.g. sigma/max_iters or n_low/n_high)
+    :return: Combined array, with dtype IMAGE_DTYPE
+    """
+    n_frames = len(images)
+    if n_frames == 0:
+        err = "No images to combine"
+        logger.error(err)
+        raise StackingError(err)
+
+    if method not in COMBINE_METHODS:
+        err = f"Unknown combination method '{method}'. Available are {COMBINE_METHODS}."
+        logger.error(err)
+        raise StackingError(err)
+
+    if scales is None:
+        scales = [1.0] * n_frames
+
+    if masks is None:
+        masks = [None] * n_frames
+
+    if (len(scales) != n_frames) or (len(masks) != n_frames):
+        err = (
+            f"Found {len(scales)} scales and {len(masks)} masks "
+            f"for {n_frames} images"
+        )
+        logger.error(err)
+        raise StackingError(err)
+
+    shape = images[0].get_shape()
+    for image in images[1:]:
+        if image.get_shape() != shape:
+            err = (
+                f"Cannot combine images of different shapes: "
+                f"{image.get_name()} has shape {image.get_shape()}, "
+                f"while {images[0].get_name()} has shape {shape}"
+            )
+            logger.error(err)
+            raise StackingError(err)
+
+    row_size = int(np.prod(shape[1:]))
+    strip_height = get_strip_height(n_frames, row_size, memory_budget_bytes, n_threads)
+    strips = [
+        slice(start, min(start + strip_height, shape[0]))
+        for start in range(0, shape[0], strip_height)
+    ]
+
+    logger.debug(
+        f"Combining {n_frames} images with method '{method}', "
+        f"in {len(strips)} strips of {strip_height} rows"
+    )
+
+    output = np.empty(shape, dtype=IMAGE_DTYPE)
+
+    def combine_strip(rows: slice):
+        # Accumulate in float64, whatever the dtype of the images
+        cube = np.empty(
+            (n_frames, rows.stop - rows.start) + shape[1:], dtype=np.float64
+        )
+        for i, image in enumerate(images):
+            cube[i] = image.get_data_rows(rows)
+            if masks[i] is not None:
+                cube[i][~masks[i].get_data_rows(rows).astype(bool)] = np.nan
+            cube[i] /= scales[i]
+        output[rows] = combine_cube(cube, method=method, **kwargs)
+
+    n_threads = max(1, min(n_threads, len(strips)))
+    if n_threads == 1:
+        for rows in strips:
+            combine_strip(rows)
+    else:
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            # Consume the iterator, so that any errors are raised
+            list(executor.map(combine_strip, strips))
+
+    return output
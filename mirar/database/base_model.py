@@ -13,6 +13,7 @@ from pydantic import (
     ConfigDict,
     Field,
     FieldValidationInfo,
+    TypeAdapter,
     field_validator,
     model_validator,
 )
@@ -21,8 +22,9 @@ from sqlalchemy.exc import IntegrityError
 
 from mirar.database.constants import POSTGRES_DUPLICATE_PROTOCOLS
 from mirar.database.constraints import DBQueryConstraints
+from mirar.database.errors import DataBaseError
 from mirar.database.transactions import select_from_table
-from mirar.database.transactions.insert import _insert_in_table
+from mirar.database.transactions.insert import _bulk_insert_in_table, _insert_in_table
 from mirar.database.transactions.update import _update_database_entry
 from mirar.errors import ProcessorError
 
@@ -211,6 +213,154 @@ class BaseDB(PydanticBase):
         logger.debug(f"Return result {result}")
         return result
 
+    @classmethod
+    def validate_entries(cls, value_dicts: list[dict]) -> list["BaseDB"]:
+        """
+        Validate many entries at once
+
+        :param value_dicts: list of dictionaries of values
+        :return: list of pydantic-ified entries
+        """
+        return TypeAdapter(list[cls]).validate_python(value_dicts)
+
+    @classmethod
+    def get_bulk_conflict_key(cls, entries: list["BaseDB"]) -> str | None:
+        """
+        Get a unique key which can be used to resolve duplicates for many entries,
+        i.e one which is present, non-null and distinct for every entry
+
+        :param entries: entries to insert
+        :return: name of unique key, or None if there is no such key
+        """
+        for key in entries[0].get_available_unique_keys():
+            values = [getattr(x, key.name) for x in entries]
+            if None in values:
+                continue
+            if len(set(values)) == len(values):
+                return key.name
+        return None
+
+    @classmethod
+    def _insert_each_entry(
+        cls,
+        entries: list["BaseDB"],
+        duplicate_protocol: str,
+        returning_key_names: str | list[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Insert entries one by one, using insert_entry
+
+        :param entries: entries to insert
+        :param duplicate_protocol: protocol to follow if duplicate entry is found
+        :param returning_key_names: names of the keys to return
+        :return: dataframe of the sequence keys, with one row per entry
+        """
+        if len(entries) == 0:
+            return pd.DataFrame()
+
+        results = []
+        for entry in entries:
+            res = entry.insert_entry(
+                duplicate_protocol=duplicate_protocol,
+                returning_key_names=returning_key_names,
+            )
+            assert len(res) == 1
+            results.append(res)
+        return pd.concat(results, ignore_index=True)
+
+    @classmethod
+    def _insert_entries(
+        cls,
+        entries: list["BaseDB"],
+        duplicate_protocol: str,
+        returning_key_names: str | list[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Insert many pydantic-ified entries into the corresponding sql database,
+        with bulk multi-row statements. If the bulk insert cannot resolve
+        duplicates, entries are instead inserted one by one.
+
+        :param entries: entries to insert
+        :param duplicate_protocol: protocol to follow if duplicate entry is found
+        :param returning_key_names: names of the keys to return
+        :return: dataframe of the sequence keys, with one row per entry
+        """
+        assert duplicate_protocol in POSTGRES_DUPLICATE_PROTOCOLS
+
+        if len(entries) == 0:
+            return pd.DataFrame()
+
+        if returning_key_names is None:
+            returning_key_names = entries[0].get_primary_key()
+
+        if not isinstance(returning_key_names, list):
+            returning_key_names = [returning_key_names]
+
+        conflict_key = None
+        if duplicate_protocol != "fail":
+            conflict_key = cls.get_bulk_conflict_key(entries)
+            if conflict_key is None:
+                logger.debug(
+                    f"No unique key to resolve duplicates in bulk for "
+                    f"{cls.sql_model.__tablename__}, inserting entries one by one."
+                )
+                return cls._insert_each_entry(
+                    entries,
+                    duplicate_protocol=duplicate_protocol,
+                    returning_key_names=returning_key_names,
+                )
+
+        try:
+            return _bulk_insert_in_table(
+                new_entries=[x.model_dump() for x in entries],
+                sql_table=cls.sql_model,
+                duplicate_protocol=duplicate_protocol,
+                returning_keys=returning_key_names,
+                conflict_key=conflict_key,
+            )
+        except (IntegrityError, DataBaseError) as exc:
+            logger.debug(
+                f"Bulk insert into {cls.sql_model.__tablename__} failed ({exc}), "
+                f"inserting entries one by one."
+            )
+            return cls._insert_each_entry(
+                entries,
+                duplicate_protocol=duplicate_protocol,
+                returning_key_names=returning_key_names,
+            )
+
+    @classmethod
+    def insert_entries(
+        cls,
+        entries: list["BaseDB"],
+        duplicate_protocol: str,
+        returning_key_names: str | list[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Insert many pydantic-ified entries into the corresponding sql database.
+        Models which override insert_entry should also override this function,
+        otherwise their entries are inserted one by one with insert_entry.
+
+        :param entries: entries to insert
+        :param duplicate_protocol: protocol to follow if duplicate entry is found
+        :param returning_key_names: names of the keys to return
+        :return: dataframe of the sequence keys, with one row per entry
+        """
+        if cls.insert_entry is not BaseDB.insert_entry:
+            return cls._insert_each_entry(
+                entries,
+                duplicate_protocol=duplicate_protocol,
+                returning_key_names=returning_key_names,
+            )
+
+        result = cls._insert_entries(
+            entries,
+            duplicate_protocol=duplicate_protocol,
+            returning_key_names=returning_key_names,
+        )
+        logger.debug(f"Inserted {len(result)} entries")
+        return result
+
     def _update_entry(self, update_key_names: list[str] | str | None = None):
         """
         Update database entry
@@ -1,8 +1,21 @@
 """
 Util functions for database interactions
+
+Engines are kept in a process-wide registry, so each process reuses one
+connection pool per database and set of credentials, rather than opening a new
+connection for every transaction. The pool can be configured with environment
+variables (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_POOL_RECYCLE),
+and setting DB_POOL_SIZE=0 disables pooling entirely.
+
+The registry is fork-safe: a child process (e.g a process-pool worker) never
+reuses connections inherited from its parent, and instead builds its own engines.
 """
 
-from sqlalchemy import URL, Engine, NullPool, create_engine
+import logging
+import os
+import threading
+
+from sqlalchemy import URL, Engine, NullPool, QueuePool, create_engine
 
 from mirar.database.credentials import (
     DB_HOSTNAME,
@@ -12,8 +25,48 @@ from mirar.database.credentials import (
     DB_USER,
 )
 
+logger = logging.getLogger(__name__)
 
-def get_engine(
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ["true", "1"]
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+
+_engines: dict[tuple, Engine] = {}
+_engines_pid = os.getpid()
+_engines_lock = threading.Lock()
+
+
+def _forget_inherited_engines():
+    """
+    Forget engines inherited from a parent process, without closing the
+    parent's connections
+
+    :return: None
+    """
+    global _engines_pid  # pylint: disable=global-statement
+    for engine in _engines.values():
+        engine.dispose(close=False)
+    _engines.clear()
+    _engines_pid = os.getpid()
+
+
+def _reset_engines_after_fork():
+    """
+    Reset the engine registry in a forked child process
+
+    :return: None
+    """
+    global _engines_lock  # pylint: disable=global-statement
+    _engines_lock = threading.Lock()
+    _forget_inherited_engines()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_engines_after_fork)
+
+
+def create_new_engine(
     db_name: str,
     db_user: str = DB_USER,
     db_password: str = DB_PASSWORD,
@@ -22,7 +75,8 @@ def get_engine(
     db_schema: str = DB_SCHEMA,
 ) -> Engine:
     """
-    Function to create a postgres engine
+    Function to create a new postgres engine, with a connection pool
+    configured from the environment
 
     :param db_user: User for db
     :param db_password: password for db
@@ -42,9 +96,119 @@ def get_engine(
         database=db_name,
     )
 
+    if DB_POOL_SIZE > 0:
+        pool_kwargs = {
+            "poolclass": QueuePool,
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_pre_ping": DB_POOL_PRE_PING,
+            "pool_recycle": DB_POOL_RECYCLE,
+        }
+    else:
+        pool_kwargs = {"poolclass": NullPool}
+
     return create_engine(
         url_object,
         future=True,
-        poolclass=NullPool,
         connect_args={"options": f"-csearch_path={db_schema}"},
+        **pool_kwargs,
     )
+
+
+def get_engine(
+    db_name: str,
+    db_user: str = DB_USER,
+    db_password: str = DB_PASSWORD,
+    db_hostname: str = DB_HOSTNAME,
+    db_port: int = DB_PORT,
+    db_schema: str = DB_SCHEMA,
+) -> Engine:
+    """
+    Function to get a postgres engine, reusing the engine (and its connection
+    pool) of this process if one already exists
+
+    :param db_user: User for db
+    :param db_password: password for db
+    :param db_name: name of db
+    :param db_hostname: hostname of db
+    :param db_port: port of db
+    :param db_schema: schema of db
+    :return: sqlalchemy engine
+    """
+    key = (db_name, db_user, db_password, db_hostname, str(db_port), db_schema)
+
+    with _engines_lock:
+        if os.getpid() != _engines_pid:
+            _forget_inherited_engines()
+
+        if key not in _engines:
+            _engines[key] = create_new_engine(
+                db_name=db_name,
+                db_user=db_user,
+                db_password=db_password,
+                db_hostname=db_hostname,
+                db_port=db_port,
+                db_schema=db_schema,
+            )
+        return _engines[key]
+
+
+def get_pool_capacity(
+    db_name: str,
+    db_user: str = DB_USER,
+    db_password: str = DB_PASSWORD,
+    db_hostname: str = DB_HOSTNAME,
+    db_port: int = DB_PORT,
+    db_schema: str = DB_SCHEMA,
+) -> int | None:
+    """
+    Function to get the maximum number of connections the engine of a database
+    can hold at once
+
+    :param db_user: User for db
+    :param db_password: password for db
+    :param db_name: name of db
+    :param db_hostname: hostname of db
+    :param db_port: port of db
+    :param db_schema: schema of db
+    :return: Number of connections, or None if connections are not pooled
+    """
+    pool = get_engine(
+        db_name=db_name,
+        db_user=db_user,
+        db_password=db_password,
+        db_hostname=db_hostname,
+        db_port=db_port,
+        db_schema=db_schema,
+    ).pool
+
+    if not isinstance(pool, QueuePool):
+        return None
+
+    # QueuePool has no public accessor for its overflow limit
+    return pool.size() + pool._max_overflow  # pylint: disable=protected-access
+
+
+def get_pool_statistics() -> dict[str, str]:
+    """
+    Get the status of the connection pool of each engine in this process
+
+    :return: Dictionary of pool status, keyed by database user and name
+    """
+    with _engines_lock:
+        return {
+            f"{key[1]}@{key[3]}:{key[4]}/{key[0]}": engine.pool.status()
+            for key, engine in _engines.items()
+        }
+
+
+def dispose_engines():
+    """
+    Close all pooled connections, and forget all engines, in this process
+
+    :return: None
+    """
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
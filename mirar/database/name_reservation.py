@@ -0,0 +1,147 @@
+"""
+Module for reserving blocks of sequential source names (e.g WNTR24aaaab,
+WNTR24aaaac...) in a database, safely across threads and processes.
+
+Each name prefix (e.g WNTR24) has a row in a small counter table, holding the last
+name reserved. A block of names is reserved in a single transaction, which locks
+that row (SELECT ... FOR UPDATE), so concurrent namers never hand out the same
+name. The first time a prefix is used, the counter is seeded from the last name
+already in use (e.g from the source table).
+"""
+
+import logging
+from collections.abc import Callable
+
+from sqlalchemy import VARCHAR, Column, MetaData, Table, select, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError, ProgrammingError
+
+from mirar.database.engine import get_engine
+
+logger = logging.getLogger(__name__)
+
+NAME_COUNTER_TABLE_NAME = "name_counters"
+
+N_LETTERS = 26
+
+name_counter_table = Table(
+    NAME_COUNTER_TABLE_NAME,
+    MetaData(),
+    Column("name_prefix", VARCHAR(40), primary_key=True),
+    Column("last_name", VARCHAR(40), nullable=True),
+)
+
+_created_in_dbs = set()
+
+
+def increment_name_letters(letters: str, n_steps: int = 1) -> str:
+    """
+    Increment a lower-case name by n_steps, e.g aaa -> aab, aaz -> aba,
+    zzz -> aaaa. Once all names of one length are used, names continue with
+    one extra letter.
+
+    :param letters: Letters of name
+    :param n_steps: Number of increments
+    :return: Incremented letters
+    """
+    length = len(letters)
+    value = 0
+    for letter in letters:
+        value = value * N_LETTERS + (ord(letter) - ord("a"))
+
+    value += n_steps
+    while value >= N_LETTERS**length:
+        value -= N_LETTERS**length
+        length += 1
+
+    new_letters = ""
+    for _ in range(length):
+        value, remainder = divmod(value, N_LETTERS)
+        new_letters = chr(ord("a") + remainder) + new_letters
+    return new_letters
+
+
+def create_name_counter_table(db_name: str):
+    """
+    Create the name counter table, if it does not already exist
+
+    :param db_name: Name of database
+    :return: None
+    """
+    if db_name in _created_in_dbs:
+        return
+
+    engine = get_engine(db_name=db_name)
+    try:
+        name_counter_table.create(engine, checkfirst=True)
+    except (IntegrityError, ProgrammingError) as exc:
+        # Another process created the table at the same time
+        logger.debug(f"Could not create {NAME_COUNTER_TABLE_NAME}: {exc}")
+
+    _created_in_dbs.add(db_name)
+
+
+def reserve_names(
+    db_name: str,
+    name_prefix: str,
+    n_names: int,
+    name_start: str,
+    get_last_name: Callable[[], str | None],
+) -> list[str]:
+    """
+    Reserve a block of sequential names, in a single transaction
+
+    :param db_name: Name of database
+    :param name_prefix: Prefix of names (e.g WNTR24)
+    :param n_names: Number of names to reserve
+    :param name_start: Letters of the first name, if none are in use (e.g aaaaa)
+    :param get_last_name: Function returning the last name already in use with
+        this prefix (or None), used the first time a prefix is reserved
+    :return: List of reserved names
+    """
+    if n_names == 0:
+        return []
+
+    create_name_counter_table(db_name)
+
+    prefix_constraint = name_counter_table.c.name_prefix == name_prefix
+    select_for_update = (
+        select(name_counter_table.c.last_name)
+        .where(prefix_constraint)
+        .with_for_update()
+    )
+
+    engine = get_engine(db_name=db_name)
+    with engine.begin() as conn:
+        row = conn.execute(select_for_update).first()
+
+        if row is None:
+            last_name = get_last_name()
+            logger.debug(f"Starting name counter for {name_prefix} from {last_name}")
+            conn.execute(
+                postgresql.insert(name_counter_table)
+                .values(name_prefix=name_prefix, last_name=last_name)
+                .on_conflict_do_nothing()
+            )
+            row = conn.execute(select_for_update).first()
+
+        last_name = row[0]
+        if last_name is None:
+            first_letters = name_start
+        else:
+            first_letters = increment_name_letters(last_name[len(name_prefix) :])
+
+        names = [
+            name_prefix + increment_name_letters(first_letters, i)
+            for i in range(n_names)
+        ]
+
+        conn.execute(
+            update(name_counter_table)
+            .where(prefix_constraint)
+            .values(last_name=names[-1])
+        )
+
+    logger.debug(f"Reserved names {names[0]} to {names[-1]}")
+
+    return names
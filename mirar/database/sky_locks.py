@@ -0,0 +1,83 @@
+"""
+Module for serialising work on a region of sky across threads and processes,
+with postgres advisory locks.
+
+The sky is divided into coarse HEALPix cells, and each cell has its own
+advisory lock. A processor which must check the database and then
+insert (e.g. crossmatching a source, and otherwise naming it as a new source)
+holds the locks of every cell its sources could match while it does both, so
+two namers can never both decide that the same source is new.
+"""
+
+import logging
+import zlib
+from collections.abc import Iterable
+from contextlib import contextmanager
+
+import numpy as np
+from sqlalchemy import func, select
+
+from mirar.database.engine import get_engine
+from mirar.utils.healpix import get_tile_ids
+
+logger = logging.getLogger(__name__)
+
+# HEALPix depth of sky cells, of roughly 1 deg across
+SKY_LOCK_DEPTH = 6
+
+
+def get_lock_namespace(lock_name: str) -> int:
+    """
+    Get the namespace of a set of advisory locks (e.g. one per table), as a
+    positive 32-bit integer
+
+    :param lock_name: Name of set of locks
+    :return: Namespace
+    """
+    return zlib.crc32(lock_name.encode()) & 0x7FFFFFFF
+
+
+def get_sky_cell_keys(
+    ra_deg: float | np.ndarray,
+    dec_deg: float | np.ndarray,
+    radius_arcsec: float,
+    depth: int = SKY_LOCK_DEPTH,
+) -> list[int]:
+    """
+    Get the keys of every sky cell (HEALPix tile) overlapping circles around
+    one or more positions
+
+    :param ra_deg: RA of position(s)
+    :param dec_deg: Dec of position(s)
+    :param radius_arcsec: Radius of circles
+    :param depth: HEALPix depth of cells
+    :return: Sorted list of cell keys
+    """
+    return get_tile_ids(ra_deg, dec_deg, radius_arcsec / 3600.0, depth).tolist()
+
+
+@contextmanager
+def lock_sky_cells(db_name: str, lock_name: str, cell_keys: Iterable[int]):
+    """
+    Hold the advisory locks of several sky cells, waiting until each is free.
+    Locks are taken in order, so concurrent holders cannot deadlock.
+
+    :param db_name: Name of database
+    :param lock_name: Name of set of locks (e.g. the table being written)
+    :param cell_keys: Keys of cells to lock
+    :return: None
+    """
+    namespace = get_lock_namespace(lock_name)
+    engine = get_engine(db_name=db_name)
+
+    with engine.connect() as conn:
+        locked = []
+        try:
+            for key in sorted(set(cell_keys)):
+                conn.execute(select(func.pg_advisory_lock(namespace, key)))
+                locked.append(key)
+            logger.debug(f"Locked {len(locked)} sky cells of {lock_name}")
+            yield
+        finally:
+            for key in locked:
+                conn.execute(select(func.pg_advisory_unlock(namespace, key)))
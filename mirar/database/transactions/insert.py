@@ -6,11 +6,13 @@ import logging
 from typing import Type
 
 import pandas as pd
-from sqlalchemy import Insert, column
+from sqlalchemy import Insert, Select, column
+from sqlalchemy.dialects import postgresql
 
 from mirar.database.base_table import BaseTable
 from mirar.database.constants import POSTGRES_DUPLICATE_PROTOCOLS
 from mirar.database.engine import get_engine
+from mirar.database.errors import DataBaseError
 
 logger = logging.getLogger(__name__)
 
@@ -48,5 +50,102 @@ def _insert_in_table(
     with engine.connect() as conn:
         res = conn.execute(stmt)
         conn.commit()
+        rows = res.fetchall()
 
-    return pd.DataFrame(res.fetchall())
+    return pd.DataFrame(rows)
+
+
+# Postgres allows at most 65535 bind parameters per statement
+MAX_BULK_INSERT_PARAMETERS = 30000
+
+
+def _bulk_insert_in_table(
+    new_entries: list[dict],
+    sql_table: Type[BaseTable],
+    duplicate_protocol: str = "fail",
+    returning_keys: list[str] | str = None,
+    conflict_key: str | None = None,
+) -> pd.DataFrame:
+    """
+    Export many entries to a database table, with multi-row
+    INSERT ... RETURNING statements in a single transaction.
+
+    With the 'fail' protocol, any duplicate raises an error and nothing is inserted.
+    Otherwise, duplicates of conflict_key are resolved with ON CONFLICT
+    (DO NOTHING for 'ignore', DO UPDATE for 'replace'), and the keys of existing
+    entries are selected in one further query.
+
+    :param new_entries: list of dictionaries to export, all with the same keys
+    :param sql_table: table of DB to export to
+    :param duplicate_protocol: protocol to follow if duplicate entry is found
+    :param returning_keys: keys to return
+    :param conflict_key: unique key used to resolve duplicates
+        (required unless duplicate_protocol is 'fail')
+    :return: dataframe of returning keys, with one row per entry, in the same order
+    """
+
+    assert duplicate_protocol in POSTGRES_DUPLICATE_PROTOCOLS
+
+    if not isinstance(returning_keys, list):
+        returning_keys = [returning_keys]
+
+    table = sql_table.__table__
+    engine = get_engine(db_name=sql_table.db_name)
+
+    if len(new_entries) == 0:
+        return pd.DataFrame(columns=returning_keys)
+
+    if duplicate_protocol == "fail":
+        stmt = Insert(sql_table).returning(
+            *[table.c[x] for x in returning_keys], sort_by_parameter_order=True
+        )
+        with engine.connect() as conn:
+            rows = conn.execute(stmt, new_entries).fetchall()
+            conn.commit()
+        return pd.DataFrame(rows, columns=returning_keys)
+
+    assert conflict_key is not None
+
+    output_keys = list(dict.fromkeys([conflict_key] + returning_keys))
+    output_columns = [table.c[x] for x in output_keys]
+    chunk_size = max(1, MAX_BULK_INSERT_PARAMETERS // len(new_entries[0]))
+
+    rows = []
+    with engine.connect() as conn:
+        for i in range(0, len(new_entries), chunk_size):
+            stmt = postgresql.insert(table).values(new_entries[i : i + chunk_size])
+            if duplicate_protocol == "replace":
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[conflict_key],
+                    set_={
+                        key: stmt.excluded[key]
+                        for key in new_entries[0]
+                        if (key != conflict_key) & (not table.c[key].primary_key)
+                    },
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing()
+            rows += conn.execute(stmt.returning(*output_columns)).fetchall()
+
+        found = {row[0] for row in rows}
+        missing = [x[conflict_key] for x in new_entries if x[conflict_key] not in found]
+        for i in range(0, len(missing), MAX_BULK_INSERT_PARAMETERS):
+            stmt = Select(*output_columns).where(
+                table.c[conflict_key].in_(missing[i : i + MAX_BULK_INSERT_PARAMETERS])
+            )
+            rows += conn.execute(stmt).fetchall()
+        conn.commit()
+
+    res = pd.DataFrame(rows, columns=output_keys).drop_duplicates(subset=conflict_key)
+    res = res.set_index(conflict_key, drop=False)
+
+    conflict_values = [x[conflict_key] for x in new_entries]
+    if not set(conflict_values).issubset(res.index):
+        err = (
+            f"Could not find all entries in {sql_table.__tablename__} after "
+            f"inserting with duplicate protocol '{duplicate_protocol}'"
+        )
+        logger.error(err)
+        raise DataBaseError(err)
+
+    return res.loc[conflict_values, returning_keys].reset_index(drop=True)
@@ -114,3 +114,90 @@ def is_populated(
         )
 
     return res.fetchone()[0]
+
+
+def select_q3c_crossmatch(
+    sql_table: BaseTable,
+    source_values: pd.DataFrame,
+    crossmatch_radius_arcsec: float,
+    output_columns: list[str],
+    ra_field_name: str = "ra",
+    dec_field_name: str = "dec",
+    join_constraints: list[str] | None = None,
+    db_constraints: DBQueryConstraints | None = None,
+    max_num_results: int | None = None,
+    order_field_name: str | None = None,
+    order_ascending: bool = False,
+) -> pd.DataFrame:
+    """
+    Crossmatch many sources to a table with a single q3c_join query.
+
+    The source values (at least 'ra' and 'dec') are passed as arrays, and unnested
+    into a table with columns 'src_index', 'src_ra', 'src_dec' etc, which
+    join_constraints can refer to (e.g 'jd < srcs.src_jd').
+
+    :param sql_table: database SQL table
+    :param source_values: dataframe of source values, with columns 'ra' and 'dec'
+    :param crossmatch_radius_arcsec: crossmatch radius in arcsec
+    :param output_columns: columns to output
+    :param ra_field_name: ra field name in database
+    :param dec_field_name: dec field name in database
+    :param join_constraints: additional sql constraints relating sources to the table
+    :param db_constraints: additional database query constraints
+    :param max_num_results: maximum number of results per source (default: all)
+    :param order_field_name: field to order results by (default: distance)
+    :param order_ascending: whether to order results in ascending order
+    :return: results, with a 'src_index' column giving the position of the source
+    """
+    if len(source_values) == 0:
+        return pd.DataFrame(columns=["src_index"] + output_columns)
+
+    table_name = sql_table.__tablename__
+    value_names = list(source_values.columns)
+
+    arrays = ["CAST(:src_index AS bigint[])"] + [
+        f"CAST(:src_{x} AS double precision[])" for x in value_names
+    ]
+    src_columns = ["src_index"] + [f"src_{x}" for x in value_names]
+
+    if order_field_name is not None:
+        order = f"{table_name}.{order_field_name} {['DESC', 'ASC'][order_ascending]}"
+    else:
+        order = (
+            f"q3c_dist(srcs.src_ra, srcs.src_dec, "
+            f"{table_name}.{ra_field_name}, {table_name}.{dec_field_name})"
+        )
+
+    constraints = list(join_constraints) if join_constraints is not None else []
+    if db_constraints is not None:
+        constraints.append(db_constraints.parse_constraints())
+    where = " AND ".join(f"({x})" for x in constraints if len(x) > 0)
+
+    query = (
+        f"SELECT srcs.src_index, "
+        f"{', '.join(f'{table_name}.{x}' for x in output_columns)}, "
+        f"ROW_NUMBER() OVER (PARTITION BY srcs.src_index ORDER BY {order}) "
+        f"AS src_rank "
+        f"FROM unnest({', '.join(arrays)}) AS srcs({', '.join(src_columns)}) "
+        f"JOIN {table_name} ON q3c_join(srcs.src_ra, srcs.src_dec, "
+        f"{table_name}.{ra_field_name}, {table_name}.{dec_field_name}, "
+        f"{crossmatch_radius_arcsec / 3600.0})"
+    )
+    if len(where) > 0:
+        query += f" WHERE {where}"
+
+    query = f"SELECT * FROM ({query}) AS matches"
+    if max_num_results is not None:
+        query += f" WHERE src_rank <= {int(max_num_results)}"
+    query += " ORDER BY src_index, src_rank"
+
+    params = {"src_index": list(range(len(source_values)))}
+    for name in value_names:
+        params[f"src_{name}"] = source_values[name].astype(float).tolist()
+
+    engine = get_engine(db_name=sql_table.db_name)
+
+    with engine.connect() as conn:
+        res = pd.read_sql(text(query), conn, params=params)
+
+    return res[["src_index"] + output_columns]
@@ -29,6 +29,24 @@ class ErrorReport:
         self.t_error = datetime.now()
         self.known_error_bool = isinstance(self.error, BaseProcessorError)
         self.non_critical_bool = isinstance(self.error, NoncriticalProcessingError)
+        self.traceback_lines = None
+
+    def __getstate__(self):
+        # Tracebacks cannot be pickled (e.g for pipeline checkpoints),
+        # so they are kept as text instead
+        state = self.__dict__.copy()
+        state["traceback_lines"] = self.get_traceback_lines()
+        return state
+
+    def get_traceback_lines(self) -> list[str]:
+        """
+        Returns the formatted traceback of the error
+
+        :return: list of traceback lines
+        """
+        if self.traceback_lines is not None:
+            return self.traceback_lines
+        return traceback.format_tb(self.error.__traceback__)
 
     def message_known_error(self) -> str:
         """
@@ -63,7 +81,7 @@ class ErrorReport:
         msg = (
             f"Error for processor {self.processor_name} at {self.t_error} "
             f"(local time): \n "
-            f"{''.join(traceback.format_tb(self.error.__traceback__))}"
+            f"{''.join(self.get_traceback_lines())}"
             f"{self.get_error_name()}: {self.error} \n  "
             f"This error affected the following files: {self.contents} \n"
             f"{self.message_known_error()} \n \n"
@@ -84,7 +102,7 @@ class ErrorReport:
 
         :return: String for single line
         """
-        return traceback.format_tb(self.error.__traceback__)[-1]
+        return self.get_traceback_lines()[-1]
 
     def get_error_line(self) -> str:
         """
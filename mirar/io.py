@@ -5,22 +5,30 @@ All opening/writing of fits files should run via this script.
 """
 
 import copy
+import hashlib
 import logging
+import os
 import warnings
+from functools import partial
 from pathlib import Path
 from typing import Callable
 
 import numpy as np
 from astropy.io import fits
-from astropy.utils.exceptions import AstropyUserWarning, AstropyWarning
+from astropy.utils.exceptions import AstropyWarning
 
-from mirar.data import Image
+from mirar.data import IMAGE_DTYPE, Image
 from mirar.errors.exceptions import ProcessorError
 from mirar.paths import BASE_NAME_KEY, LATEST_SAVE_KEY, RAW_IMG_KEY, core_fields
 
 logger = logging.getLogger(__name__)
 
 
+FITS_BLOCK_SIZE = 2880
+FITS_CARD_SIZE = 80
+FITS_SIZE_KEYWORDS = ["BITPIX", "PCOUNT", "GCOUNT"]
+
+
 class MissingCoreFieldError(KeyError, ProcessorError):
     """Base class for missing core field errors"""
 
@@ -170,6 +178,88 @@ def open_fits(path: str | Path) -> tuple[np.ndarray, fits.Header]:
     return data, header
 
 
+def get_image_hdu(img: fits.HDUList) -> fits.PrimaryHDU | fits.CompImageHDU:
+    """
+    Get the HDU containing the image of a (possibly compressed) fits file
+
+    :param img: Opened fits file
+    :return: HDU with the image
+    """
+    compressed = [
+        x for x in img if isinstance(x, fits.hdu.compressed.compressed.CompImageHDU)
+    ]
+    if len(compressed) > 1:
+        err = "Compressed fits file has more than one extension."
+        logger.error(err)
+        raise ValueError(err)
+    if len(compressed) == 1:
+        return compressed[0]
+    return img[0]
+
+
+def open_fits_header(path: str | Path) -> fits.Header:
+    """
+    Function to open only the header of a fits file saved to <path>,
+    without reading the image data
+
+    :param path: path of fits file
+    :return: image header
+    """
+    if isinstance(path, str):
+        path = Path(path)
+
+    with fits.open(path, lazy_load_hdus=False) as img:
+        header = get_image_hdu(img).header.copy()
+
+    if BASE_NAME_KEY not in header:
+        header[BASE_NAME_KEY] = Path(path).name
+
+    if RAW_IMG_KEY not in header.keys():
+        header[RAW_IMG_KEY] = path.as_posix()
+
+    return header
+
+
+def open_fits_data(path: str | Path) -> np.ndarray:
+    """
+    Function to open only the image data of a fits file saved to <path>.
+    The data is memory-mapped where possible (i.e if it is not scaled),
+    and copied once into an array of IMAGE_DTYPE.
+
+    :param path: path of fits file
+    :return: image data
+    """
+    with fits.open(path) as img:
+        data = get_image_hdu(img).data.astype(IMAGE_DTYPE)
+    return data
+
+
+def open_lazy_image(
+    path: str | Path,
+    open_header: Callable[[str | Path], fits.Header] = open_fits_header,
+    open_data: Callable[[str | Path], np.ndarray] = open_fits_data,
+) -> Image:
+    """
+    Function to open a raw image as an Image object, reading only the header.
+    The data is read with open_data when it is first needed.
+
+    :param path: path of raw image
+    :param open_header: function to open the raw image header
+    :param open_data: function to open the raw image data (must be picklable)
+    :return: Image object
+    """
+    if isinstance(path, str):
+        path = Path(path)
+
+    header = open_header(path)
+
+    new_img = Image.from_lazy_data(partial(open_data, path), header=header)
+
+    check_image_has_core_fields(new_img)
+
+    return new_img
+
+
 def save_fits(
     image: Image,
     path: str | Path,
@@ -210,7 +300,7 @@ def open_raw_image(
 
     data, header = open_f(path)
 
-    new_img = Image(data.astype(np.float64), header)
+    new_img = Image(data.astype(IMAGE_DTYPE), header)
 
     check_image_has_core_fields(new_img)
 
@@ -232,13 +322,47 @@ def open_mef_fits(
         num_ext = len(hdu)
         for ext in range(1, num_ext):
             split_data.append(
-                hdu[ext].data.astype(np.float64)
+                hdu[ext].data.astype(IMAGE_DTYPE)
             )  # pylint: disable=no-member
             split_headers.append(hdu[ext].header)  # pylint: disable=no-member
 
     return primary_header, split_data, split_headers
 
 
+def open_mef_headers(
+    path: str | Path,
+) -> tuple[fits.Header, list[int], list[fits.Header]]:
+    """
+    Function to open only the headers of a MEF fits file saved to <path>,
+    without reading the image data
+
+    :param path: path of fits file
+    :return: tuple containing primary header, extension numbers and extension headers
+    """
+    split_extensions, split_headers = [], []
+    with fits.open(path) as hdu:
+        primary_header = hdu[0].header.copy()  # pylint: disable=no-member
+        num_ext = len(hdu)
+        for ext in range(1, num_ext):
+            split_extensions.append(ext)
+            split_headers.append(hdu[ext].header.copy())  # pylint: disable=no-member
+
+    return primary_header, split_extensions, split_headers
+
+
+def open_mef_extension_data(path: str | Path, extension: int) -> np.ndarray:
+    """
+    Function to open only the image data of a single extension of a MEF fits file
+
+    :param path: path of fits file
+    :param extension: number of the extension
+    :return: image data
+    """
+    with fits.open(path) as hdu:
+        data = hdu[extension].data.astype(IMAGE_DTYPE)  # pylint: disable=no-member
+    return data
+
+
 def combine_mef_extension_file_headers(
     primary_header: fits.Header, extension_header: fits.Header
 ) -> fits.Header:
@@ -337,7 +461,7 @@ def open_mef_image(
         extension_key=extension_key,
     )
 
-    ext_data_list = [x.astype(np.float64) for x in ext_data_list]
+    ext_data_list = [x.astype(IMAGE_DTYPE) for x in ext_data_list]
     split_images_list = []
 
     for i, ext_data in enumerate(ext_data_list):
@@ -354,34 +478,136 @@ def open_mef_image(
     return split_images_list
 
 
-def check_file_is_complete(path: str) -> bool:
+def open_lazy_mef_image(
+    path: str | Path,
+    open_headers: Callable[
+        [str | Path], tuple[fits.Header, list[int], list[fits.Header]]
+    ] = open_mef_headers,
+    open_data: Callable[[str | Path, int], np.ndarray] = open_mef_extension_data,
+    extension_key: str | None = None,
+) -> list[Image]:
+    """
+    Function to open a raw MEF image as a list of Image objects, reading only
+    the headers. The data of each extension is read with open_data when
+    it is first needed.
+
+    :param path: path of raw image
+    :param open_headers: function to open the primary header, extension numbers
+        and extension headers of the raw image
+    :param open_data: function to open the data of a single extension
+        (must be picklable)
+    :param extension_key: key to use to number the MEF frames
+    :return: list of Image objects
+    """
+    primary_header, ext_list, ext_header_list = open_headers(path)
+
+    ext_header_list = tag_mef_extension_file_headers(
+        primary_header=primary_header,
+        extension_headers=ext_header_list,
+        extension_key=extension_key,
+    )
+
+    split_images_list = []
+
+    for i, ext in enumerate(ext_list):
+        image = Image.from_lazy_data(
+            partial(open_data, path, ext), header=copy.deepcopy(ext_header_list[i])
+        )
+        check_image_has_core_fields(image)
+
+        split_images_list.append(image)
+
+    names = [x.get_name() for x in split_images_list]
+    if len(names) != len(set(names)):
+        raise ExtensionParsingError(f"Found duplicate image names in {names}")
+
+    return split_images_list
+
+
+def get_fits_data_size(cards: dict[str, int]) -> int:
+    """
+    Function to get the size in bytes of the data of a fits HDU, from its header
+
+    :param cards: Integer values of the BITPIX, NAXISn, PCOUNT and GCOUNT keywords
+    :return: Size of data, excluding padding
+    """
+    n_axes = cards.get("NAXIS", 0)
+    if n_axes == 0:
+        return 0
+
+    axes = [cards.get(f"NAXIS{i}", 0) for i in range(1, n_axes + 1)]
+    # Random groups have NAXIS1 = 0
+    if (axes[0] == 0) and (n_axes > 1):
+        axes = axes[1:]
+
+    return (
+        abs(cards.get("BITPIX", 8))
+        // 8
+        * cards.get("GCOUNT", 1)
+        * (cards.get("PCOUNT", 0) + int(np.prod(axes)))
+    )
+
+
+def check_file_is_complete(path: str | Path) -> bool:
     """
     Function to check whether a fits file is as large as expected.
     Useful to verify with e.g rsync, where files can be partially transferred
 
-    Disclaimer: I (Robert) do not feel great about having written
-    this code block.
-    It seems to works though, let's hope no one finds out!
-    I will cover my tracks by hiding the astropy warning which
-    inspired this block, informing the user that the file
-    is not as long as expected
+    Only the header blocks are read. The data size of each HDU is calculated
+    from its header, and skipped over, so the file is never decoded.
 
     :param path: path of file to check
     :return: boolean file complete
     """
-    check = False
-    with warnings.catch_warnings():
-        warnings.filterwarnings("ignore", category=AstropyUserWarning)
-        try:
-            with fits.open(path) as hdul:
-                check = (
-                    hdul[-1]._file.tell()  # pylint: disable=protected-access
-                    == hdul[-1]._file.size  # pylint: disable=protected-access
-                )
-        except OSError:
-            pass
+    try:
+        file_size = os.path.getsize(path)
+        position = 0
+        with open(path, "rb") as fits_file:
+            while position < file_size:
+                cards = {}
+                end_found = False
+                while not end_found:
+                    block = fits_file.read(FITS_BLOCK_SIZE)
+                    if len(block) < FITS_BLOCK_SIZE:
+                        return False
+                    position += FITS_BLOCK_SIZE
+                    for i in range(0, FITS_BLOCK_SIZE, FITS_CARD_SIZE):
+                        card = block[i : i + FITS_CARD_SIZE].decode("ascii")
+                        keyword = card[:8].strip()
+                        if keyword == "END":
+                            end_found = True
+                            break
+                        if (card[8:10] == "= ") and (
+                            keyword in FITS_SIZE_KEYWORDS or keyword.startswith("NAXIS")
+                        ):
+                            cards[keyword] = int(card[10:].split("/")[0])
+
+                data_size = get_fits_data_size(cards)
+                position += -(-data_size // FITS_BLOCK_SIZE) * FITS_BLOCK_SIZE
+                fits_file.seek(position)
+    except (OSError, ValueError):
+        return False
+
+    return position == file_size
+
+
+def get_files_key(paths: list[str | Path]) -> str:
+    """
+    Function to get a key describing a set of files, using their names, sizes
+    and modification times. The key changes whenever a file is added, removed
+    or modified.
 
-    return check
+    :param paths: paths of files
+    :return: key
+    """
+    entries = []
+    for path in sorted(Path(x) for x in paths):
+        if path.is_file():
+            stat = path.stat()
+            entries.append(f"{path.as_posix()} {stat.st_size} {stat.st_mtime_ns}")
+        else:
+            entries.append(f"{path.as_posix()} missing")
+    return hashlib.sha1("\n".join(entries).encode()).hexdigest()
 
 
 def check_image_has_core_fields(img: Image):
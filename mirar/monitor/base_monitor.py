@@ -91,6 +91,8 @@ class Monitor:
         log_level: str = "INFO",
         raw_dir: str = RAW_IMG_SUB_DIR,
         base_raw_img_dir: Path = base_raw_dir,
+        execution_backend: Optional[str] = None,
+        streaming: bool = False,
     ):
         logger.info(f"Software version: {PACKAGE_NAME}=={__version__}")
 
@@ -105,7 +107,11 @@ class Monitor:
         self.postprocess_configurations = postprocess_configurations
 
         self.pipeline = get_pipeline(
-            pipeline, night=night, selected_configurations=realtime_configurations
+            pipeline,
+            night=night,
+            selected_configurations=realtime_configurations,
+            execution_backend=execution_backend,
+            streaming=streaming,
         )
 
         for config in realtime_configurations:
@@ -32,6 +32,13 @@ else:
     default_n_cpu = max(int(_n_cpu / 2), 1)
 max_n_cpu: int = int(os.getenv("MAX_N_CPU", default_n_cpu))
 
+# Backends which processors can use to apply themselves to batches
+THREAD_BACKEND = "thread"
+PROCESS_BACKEND = "process"
+SERIAL_BACKEND = "serial"
+EXECUTION_BACKENDS = [THREAD_BACKEND, PROCESS_BACKEND, SERIAL_BACKEND]
+default_execution_backend: str = os.getenv("EXECUTION_BACKEND", THREAD_BACKEND)
+
 # Set up default directories
 
 default_dir = Path.home()
@@ -70,6 +77,34 @@ TEMP_DIR.mkdir(exist_ok=True)
 RAW_IMG_SUB_DIR = "raw"
 CAL_OUTPUT_SUB_DIR = "calibration"
 
+# Persistent store of master calibration images, shared across nights
+# (only used if CALIBRATION_STORE_DIR is set)
+_calibration_store_dir = os.getenv("CALIBRATION_STORE_DIR")
+calibration_store_dir = (
+    None if _calibration_store_dir is None else Path(_calibration_store_dir)
+)
+
+# Persistent store of catalog sources, tiled by HEALPix cell and shared across nights
+_catalog_store_dir = os.getenv("CATALOG_STORE_DIR")
+if _catalog_store_dir is None:
+    catalog_store_dir = base_output_dir.joinpath("catalog_store")
+else:
+    catalog_store_dir = Path(_catalog_store_dir)
+
+# Persistent FFTW wisdom, so that FFT plans (e.g for ZOGY) are only measured once
+_fft_wisdom_path = os.getenv("FFT_WISDOM_PATH")
+if _fft_wisdom_path is None:
+    fft_wisdom_path = base_output_dir.joinpath("fft_wisdom.json")
+else:
+    fft_wisdom_path = Path(_fft_wisdom_path)
+
+# Checkpoints of intermediate pipeline datasets, used to resume interrupted runs
+_checkpoint_dir = os.getenv("CHECKPOINT_DIR")
+if _checkpoint_dir is None:
+    checkpoint_dir = base_output_dir.joinpath("checkpoints")
+else:
+    checkpoint_dir = Path(_checkpoint_dir)
+
 ml_models_dir = base_output_dir.joinpath("ml_models")
 ml_models_dir.mkdir(exist_ok=True)
 
@@ -323,6 +358,9 @@ MAX_DITHER_KEY = "NUMDITHS"
 FILTER_KEY = "FILTER"
 STACKED_COMPONENT_IMAGES_KEY = "STCKCMPT"
 
+# Keys describing the readout state of a detector, for instruments which set them
+DETECTOR_STATE_KEYS = ["READOUTM", "READOUTV", "BOARD_ID"]
+
 FITS_MASK_KEY = "MASKFITS"
 
 # Key for a reference catalog path
@@ -6,6 +6,7 @@ import logging
 
 from mirar.errors import ProcessorError
 from mirar.pipelines.base_pipeline import Pipeline
+from mirar.pipelines.benchmark.benchmark_pipeline import BenchmarkPipeline
 from mirar.pipelines.git.git_pipeline import GITPipeline
 from mirar.pipelines.sedmv2.sedmv2_pipeline import SEDMv2Pipeline
 from mirar.pipelines.summer.summer_pipeline import SummerPipeline
@@ -13,16 +13,29 @@ The pipeline will process data using a chosen list of these individual
 import copy
 import logging
 import os
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
 import numpy as np
+import pandas as pd
 
-from mirar.data import Dataset, Image, ImageBatch
+from mirar.data import Dataset, Image, ImageBatch, cache
+from mirar.database.engine import get_pool_statistics
 from mirar.errors import ErrorStack
 from mirar.paths import get_output_path
+from mirar.pipelines.checkpoint import Checkpointer
+from mirar.pipelines.streaming import BatchStream, split_into_segments
 from mirar.processors.base_processor import BaseProcessor
+from mirar.processors.metrics import (
+    PROMETHEUS_METRICS_PATH,
+    get_metrics_table,
+    write_metrics_report,
+    write_prometheus_metrics,
+)
 from mirar.processors.utils.error_annotator import ErrorStackAnnotator
+from mirar.utils.execute_cmd import get_execution_statistics
+from mirar.utils.staging import staging
 
 logger = logging.getLogger(__name__)
 
@@ -66,13 +79,22 @@ class Pipeline:
         self,
         selected_configurations: str | list[str] = "default",
         night: int | str = "",
+        execution_backend: Optional[str] = None,
+        streaming: bool = False,
+        checkpoint_after: Optional[list[str]] = None,
+        resume: bool = False,
     ):
         self.night_sub_dir = os.path.join(self.name, night)
         self.night = night
+        self.execution_backend = execution_backend
+        self.streaming = streaming
+        self.checkpoint_after = checkpoint_after
+        self.resume = resume
         if not isinstance(selected_configurations, list):
             selected_configurations = [selected_configurations]
         self.selected_configurations = selected_configurations
         self.latest_configuration = None
+        self.latest_metrics = None
         self.set_up_pipeline()
 
     @classmethod
@@ -252,12 +274,64 @@ class Pipeline:
 
         return flowchart
 
+    def export_metrics(
+        self, processors: list[BaseProcessor], output_path: Path, run_info: dict
+    ) -> pd.DataFrame:
+        """
+        Export the latest metrics of each applied processor as a JSON/CSV
+        run report, and as a Prometheus-style text file if
+        PROMETHEUS_METRICS_PATH is set
+
+        :param processors: Processors applied, in order
+        :param output_path: Path of JSON report
+        :param run_info: Dictionary of information about the run
+        :return: Table of metrics
+        """
+        metrics_table = get_metrics_table(processors)
+        self.latest_metrics = metrics_table
+
+        write_metrics_report(metrics_table, output_path, run_info=run_info)
+        logger.info(f"Saved processor metrics to {output_path}")
+
+        if PROMETHEUS_METRICS_PATH is not None:
+            write_prometheus_metrics(
+                metrics_table,
+                PROMETHEUS_METRICS_PATH,
+                labels={"pipeline": self.name, "night": str(self.night)},
+            )
+
+        return metrics_table
+
+    def get_metrics_output_path(self) -> Path:
+        """
+        Generates a unique path for the processor metrics report,
+        in the output data directory.
+        Makes the parent directory structure if needed.
+
+        :return: path for metrics report
+        """
+        metrics_output_path = Path(
+            get_output_path(
+                base_name=f"{Path(self.night).name}_run_metrics.json",
+                dir_root=self.night_sub_dir,
+            )
+        )
+
+        metrics_output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        return metrics_output_path
+
     def reduce_images(
         self,
         dataset: Optional[Dataset] = None,
         output_error_path: Optional[str] = None,
         catch_all_errors: bool = True,
         selected_configurations: Optional[str | list[str]] = None,
+        execution_backend: Optional[str] = None,
+        streaming: Optional[bool] = None,
+        output_metrics_path: Optional[str] = None,
+        checkpoint_after: Optional[list[str]] = None,
+        resume: Optional[bool] = None,
     ) -> tuple[Dataset, ErrorStack]:
         """
         Function to process a given dataset.
@@ -266,6 +340,16 @@ class Pipeline:
         :param output_error_path: optional path to write error summary
         :param catch_all_errors: Either catch errors, or just immediately raise them
         :param selected_configurations: Configuration to use
+        :param execution_backend: Backend ('thread', 'process' or 'serial')
+            used by processors which do not set their own
+        :param streaming: Stream each batch through consecutive processors,
+            rather than waiting for every batch after each processor
+        :param output_metrics_path: optional path to write processor metrics
+            (as JSON, and as CSV with the same stem)
+        :param checkpoint_after: Names of processor classes after which to save
+            a checkpoint of the dataset (or 'all', for every processor)
+        :param resume: Resume each configuration from its latest valid
+            checkpoint, skipping the processors already applied
         :return: Post-processing dataset and summary of errors caught
         """
 
@@ -275,15 +359,43 @@ class Pipeline:
         if output_error_path is None:
             output_error_path = self.get_error_output_path()
 
+        if output_metrics_path is None:
+            output_metrics_path = self.get_metrics_output_path()
+
         err_stack = ErrorStack()
 
         if selected_configurations is None:
             selected_configurations = self.selected_configurations
 
+        if execution_backend is None:
+            execution_backend = self.execution_backend
+
+        if streaming is None:
+            streaming = self.streaming
+
+        if checkpoint_after is None:
+            checkpoint_after = self.checkpoint_after
+
+        if resume is None:
+            resume = self.resume
+
         if not isinstance(selected_configurations, list):
             selected_configurations = [selected_configurations]
 
+        checkpointer = None
+        step_key = None
+        if resume or (checkpoint_after is not None and len(checkpoint_after) > 0):
+            checkpointer = Checkpointer(
+                pipeline_name=self.name,
+                night=self.night,
+                checkpoint_after=checkpoint_after,
+            )
+            step_key = checkpointer.get_initial_key(dataset)
+
         all_processors = []
+        applied_processors = []
+
+        start_time = datetime.now()
 
         for j, configuration in enumerate(selected_configurations):
             logger.info(
@@ -293,24 +405,78 @@ class Pipeline:
 
             processors = self.set_configuration(configuration)
 
-            for i, processor in enumerate(processors):
-                logger.info(
-                    f"Applying '{processor.__class__} to {len(dataset)} batches "
-                    f"(Step {i + 1}/{len(processors)})"
+            i = 0
+
+            if checkpointer is not None:
+                step_keys = checkpointer.get_step_keys(
+                    step_key, configuration, processors
                 )
-                logger.info(f"[{str(processor)}]")
+                if len(step_keys) > 0:
+                    step_key = step_keys[-1]
+
+                if resume:
+                    latest_step = checkpointer.find_latest(configuration, step_keys)
+                    if latest_step is not None:
+                        logger.info(
+                            f"Resuming configuration {configuration} from the "
+                            f"checkpoint after step {latest_step}/{len(processors)} "
+                            f"({processors[latest_step - 1].__class__.__name__})"
+                        )
+                        dataset, err_stack = checkpointer.load(
+                            configuration, latest_step
+                        )
+                        i = latest_step
+
+            if streaming:
+                segments = split_into_segments(processors[i:], execution_backend)
+            else:
+                segments = [[x] for x in processors[i:]]
+
+            if checkpointer is not None:
+                segments = checkpointer.split_segments(segments)
+
+            for segment in segments:
+                if len(segment) == 1:
+                    processor = segment[0]
+                    logger.info(
+                        f"Applying '{processor.__class__} to {len(dataset)} batches "
+                        f"(Step {i + 1}/{len(processors)})"
+                    )
+                    logger.info(f"[{str(processor)}]")
+
+                    dataset, new_err_stack = processor.base_apply(
+                        dataset, execution_backend=execution_backend
+                    )
+                else:
+                    logger.info(
+                        f"Streaming {len(dataset)} batches through "
+                        f"{[x.__class__.__name__ for x in segment]} "
+                        f"(Steps {i + 1}-{i + len(segment)}/{len(processors)})"
+                    )
+                    dataset, new_err_stack = BatchStream(segment).apply(dataset)
 
-                dataset, new_err_stack = processor.base_apply(dataset)
+                i += len(segment)
                 err_stack += new_err_stack
+                applied_processors += segment
 
                 if np.logical_and(not catch_all_errors, len(err_stack.reports) > 0):
                     raise err_stack.reports[0].error
 
+                if checkpointer is not None and checkpointer.is_selected(segment[-1]):
+                    checkpointer.save(
+                        dataset,
+                        err_stack,
+                        configuration=configuration,
+                        step=i,
+                        key=step_keys[i - 1],
+                        processor=segment[-1],
+                    )
+
                 if len(dataset) == 0:
                     logger.error(
                         f"No images left in dataset. "
-                        f"Terminating early, after step {i + 1}/{len(processors)} "
-                        f"({processor.__class__.__name__})."
+                        f"Terminating early, after step {i}/{len(processors)} "
+                        f"({segment[-1].__class__.__name__})."
                     )
                     break
 
@@ -318,6 +484,34 @@ class Pipeline:
 
         self.latest_configuration = all_processors
 
+        self.export_metrics(
+            processors=applied_processors,
+            output_path=output_metrics_path,
+            run_info={
+                "pipeline": self.name,
+                "night": self.night,
+                "configurations": selected_configurations,
+                "execution_backend": execution_backend,
+                "streaming": streaming,
+                "start_time": start_time.isoformat(),
+                "wall_time_s": (datetime.now() - start_time).total_seconds(),
+            },
+        )
+
+        if cache.ram_budget_bytes > 0:
+            logger.info(f"Image cache statistics: {cache.get_statistics()}")
+
+        pool_statistics = get_pool_statistics()
+        if len(pool_statistics) > 0:
+            logger.info(f"Database pool statistics: {pool_statistics}")
+
+        execution_statistics = get_execution_statistics()
+        if len(execution_statistics) > 0:
+            logger.info(f"External tool statistics: {execution_statistics}")
+
+        if staging.enabled:
+            logger.info(f"Staging statistics: {staging.get_statistics()}")
+
         err_stack.summarise_error_stack(output_path=output_error_path)
         err_stack.summarise_error_stack_tsv(
             output_path=output_error_path.with_suffix(".tsv")
@@ -0,0 +1,9 @@
+"""
+Benchmark pipeline, which runs named configurations offline on deterministic
+synthetic WINTER-like data, and records the throughput of each processor
+against a stored baseline. Run it from the command line with:
+
+.. code-block:: bash
+
+    python -m mirar.pipelines.benchmark --config calibration subtract psfphot
+"""
@@ -0,0 +1,145 @@
+"""
+Executable to run the benchmark pipeline. You can execute the code from the
+terminal like:
+
+.. codeblock:: bash
+    python -m mirar.pipelines.benchmark -args...
+
+The process exits with a non-zero status if any processor is slower than
+the baseline by more than the tolerance.
+"""
+
+import argparse
+import logging
+import sys
+import tempfile
+from pathlib import Path
+
+from mirar.data import cache
+from mirar.paths import EXECUTION_BACKENDS, TEMP_DIR, base_output_dir
+from mirar.pipelines.benchmark.benchmark_pipeline import BenchmarkPipeline
+from mirar.pipelines.benchmark.config import (
+    DEFAULT_MIN_N_BLOCKS,
+    DEFAULT_MIN_WALL_TIME_S,
+    DEFAULT_NIGHT,
+    DEFAULT_TOLERANCE,
+    PIPELINE_NAME,
+    WINTER_BOARD_LAYOUT,
+    WINTER_BOARD_SHAPE,
+    benchmark_baseline_path,
+)
+from mirar.pipelines.benchmark.run_benchmark import run_benchmark
+
+logger = logging.getLogger(__name__)
+
+parser = argparse.ArgumentParser(
+    description="Benchmark the reduction hot paths on synthetic WINTER-like data"
+)
+parser.add_argument(
+    "-c",
+    "--config",
+    nargs="+",
+    default=["calibration", "stack", "subtract", "psfphot"],
+    choices=[
+        x for x in BenchmarkPipeline.all_pipeline_configurations if x != "default"
+    ],
+    help="Benchmark configurations to run",
+)
+parser.add_argument(
+    "-o",
+    "--outputdir",
+    default=base_output_dir.joinpath(PIPELINE_NAME),
+    help="Directory for synthetic data and pipeline outputs",
+)
+parser.add_argument("-n", "--night", default=DEFAULT_NIGHT, help="Name of night")
+parser.add_argument("--seed", type=int, default=0, help="Seed of synthetic data")
+parser.add_argument(
+    "--boards",
+    nargs="+",
+    type=int,
+    default=list(WINTER_BOARD_LAYOUT),
+    help="Board IDs to generate",
+)
+parser.add_argument(
+    "--scale",
+    type=float,
+    default=1.0,
+    help="Scale of each board relative to the WINTER board size",
+)
+parser.add_argument(
+    "--nscience", type=int, default=4, help="Number of raw science exposures"
+)
+parser.add_argument(
+    "--nreduced", type=int, default=2, help="Number of reduced images per board"
+)
+parser.add_argument(
+    "--baseline",
+    default=benchmark_baseline_path,
+    help="Path of baseline, with throughputs for each host",
+)
+parser.add_argument(
+    "--tolerance",
+    type=float,
+    default=DEFAULT_TOLERANCE,
+    help="Fractional loss of throughput which is flagged as a regression",
+)
+parser.add_argument(
+    "--minwalltime",
+    type=float,
+    default=DEFAULT_MIN_WALL_TIME_S,
+    help="Minimum wall time (s) in the baseline of steps which are compared",
+)
+parser.add_argument(
+    "--minblocks",
+    type=int,
+    default=DEFAULT_MIN_N_BLOCKS,
+    help="Minimum number of data blocks of steps which are compared",
+)
+parser.add_argument(
+    "--update",
+    action="store_true",
+    default=False,
+    help="Update the baseline with the results",
+)
+parser.add_argument(
+    "--backend",
+    default=None,
+    choices=EXECUTION_BACKENDS,
+    help="Backend used by processors to process batches (thread/process/serial)",
+)
+parser.add_argument("--level", default="INFO", help="Python logging level")
+
+args = parser.parse_args()
+
+log = logging.getLogger("mirar")
+handler = logging.StreamHandler(sys.stdout)
+handler.setFormatter(
+    logging.Formatter("%(name)s [l %(lineno)d] - %(levelname)s - %(message)s")
+)
+log.addHandler(handler)
+log.setLevel(args.level)
+
+with tempfile.TemporaryDirectory(dir=TEMP_DIR) as temp_dir_path:
+    cache.set_cache_dir(temp_dir_path)
+
+    results = run_benchmark(
+        configurations=args.config,
+        output_dir=Path(args.outputdir),
+        baseline_path=Path(args.baseline),
+        night=args.night,
+        tolerance=args.tolerance,
+        min_wall_time_s=args.minwalltime,
+        min_n_blocks=args.minblocks,
+        execution_backend=args.backend,
+        update=args.update,
+        seed=args.seed,
+        n_science=args.nscience,
+        n_reduced=args.nreduced,
+        board_ids=args.boards,
+        shape=tuple(int(round(args.scale * x)) for x in WINTER_BOARD_SHAPE),
+    )
+
+print(results.to_string(index=False))
+
+if results["regression"].any():
+    sys.exit(1)
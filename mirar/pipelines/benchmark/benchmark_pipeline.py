@@ -0,0 +1,51 @@
+"""
+Module to run the benchmark pipeline, on synthetic WINTER-like data
+"""
+
+import logging
+from pathlib import Path
+
+from mirar.data import Image
+from mirar.pipelines.base_pipeline import Pipeline
+from mirar.pipelines.benchmark.blocks import (
+    calibrate,
+    load_raw,
+    load_reduced,
+    psf_photometry,
+    stack,
+    subtract,
+)
+from mirar.pipelines.benchmark.config import PIPELINE_NAME
+from mirar.pipelines.winter.load_winter_image import load_winter_mef_image
+
+logger = logging.getLogger(__name__)
+
+
+class BenchmarkPipeline(Pipeline):
+    """
+    Class to benchmark the reduction hot paths on synthetic WINTER-like data
+    """
+
+    name = PIPELINE_NAME
+
+    non_linear_level = 40000.0
+
+    all_pipeline_configurations = {
+        "default": load_raw + calibrate,
+        "calibration": load_raw + calibrate,
+        "stack": load_raw + calibrate + stack,
+        "subtract": load_reduced + subtract,
+        "psfphot": load_reduced + psf_photometry,
+    }
+
+    @staticmethod
+    def _load_raw_image(path: str | Path) -> Image | list[Image]:
+        return load_winter_mef_image(path)
+
+    @staticmethod
+    def download_raw_images_for_night(night: str | int):
+        """
+        Benchmark data is not downloaded, but generated with
+        :func:`~mirar.pipelines.benchmark.synthetic_data.write_benchmark_data`
+        """
+        raise NotImplementedError
@@ -0,0 +1,92 @@
+"""
+Script containing the various
+:class:`~mirar.processors.base_processor.BaseProcessor`
+lists which are used to build configurations for the
+:class:`~mirar.pipelines.benchmark.benchmark_pipeline.BenchmarkPipeline`.
+
+Each configuration runs offline on the synthetic data of
+:mod:`mirar.pipelines.benchmark.synthetic_data`. Master calibrations are
+always recomputed (rather than loaded from a previous run), and source
+extraction runs in-process, so only the 'stack' configuration requires an
+external executable (swarp).
+"""
+
+from mirar.paths import BASE_NAME_KEY, EXPTIME_KEY, OBSCLASS_KEY, TARGET_KEY
+from mirar.pipelines.benchmark.config import (
+    benchmark_sextractor_config,
+    benchmark_swarp_config_path,
+)
+from mirar.pipelines.benchmark.generator import (
+    benchmark_photcal_catalog_purifier,
+    benchmark_photometric_catalog_generator,
+)
+from mirar.pipelines.benchmark.synthetic_data import REDUCED_SUB_DIR
+from mirar.pipelines.winter.load_winter_image import (
+    get_raw_winter_mask,
+    load_winter_mef_image,
+)
+from mirar.processors.astromatic import Swarp
+from mirar.processors.astromatic.sextractor.inprocess_sextractor import (
+    InProcessSextractor,
+)
+from mirar.processors.dark import DarkCalibrator
+from mirar.processors.flat import FlatCalibrator
+from mirar.processors.mask import MaskPixelsFromFunction
+from mirar.processors.photcal.photcalibrator import PhotCalibrator
+from mirar.processors.photometry import PSFPhotometry
+from mirar.processors.sources import SextractorSourceDetector
+from mirar.processors.utils import (
+    ImageLoader,
+    ImageRebatcher,
+    ImageSaver,
+    ImageSelector,
+    MEFLoader,
+)
+from mirar.processors.zogy.zogy import ZOGY, ZOGYPrepare
+
+load_raw = [
+    MEFLoader(input_sub_dir="raw", load_image=load_winter_mef_image),
+    MaskPixelsFromFunction(mask_function=get_raw_winter_mask),
+]
+
+calibrate = [
+    ImageRebatcher(["BOARD_ID", EXPTIME_KEY]),
+    DarkCalibrator(cache_sub_dir="calibration_darks", try_load_cache=False),
+    ImageSelector((OBSCLASS_KEY, ["science", "flat"])),
+    ImageRebatcher(["BOARD_ID", "FILTER"]),
+    FlatCalibrator(cache_sub_dir="calibration_flats", try_load_cache=False),
+    ImageSelector((OBSCLASS_KEY, "science")),
+    ImageRebatcher(BASE_NAME_KEY),
+    ImageSaver(output_dir_name="calibrated"),
+]
+
+stack = [
+    ImageRebatcher([TARGET_KEY, "FILTER", "BOARD_ID"]),
+    Swarp(
+        swarp_config_path=benchmark_swarp_config_path,
+        include_scamp=False,
+        temp_output_sub_dir="stack",
+    ),
+    ImageSaver(output_dir_name="stack"),
+]
+
+load_reduced = [
+    ImageLoader(input_sub_dir=REDUCED_SUB_DIR),
+    InProcessSextractor(output_sub_dir="sextractor", **benchmark_sextractor_config),
+    PhotCalibrator(
+        ref_catalog_generator=benchmark_photometric_catalog_generator,
+        catalogs_purifier=benchmark_photcal_catalog_purifier,
+        temp_output_sub_dir="phot",
+    ),
+]
+
+subtract = [
+    ZOGYPrepare(output_sub_dir="subtract"),
+    ZOGY(output_sub_dir="subtract"),
+    ImageSaver(output_dir_name="diffs"),
+]
+
+psf_photometry = [
+    SextractorSourceDetector(output_sub_dir="sources", target_only=False),
+    PSFPhotometry(temp_output_sub_dir="psfphot"),
+]
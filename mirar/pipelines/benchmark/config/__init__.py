@@ -0,0 +1,58 @@
+"""
+Module containing the configuration of the benchmark pipeline
+"""
+
+import os
+from pathlib import Path
+
+from mirar.paths import base_output_dir
+from mirar.pipelines.winter.config import (
+    sextractor_photometry_config,
+    swarp_config_path,
+)
+
+PIPELINE_NAME = "benchmark"
+
+benchmark_dir = Path(__file__).parent
+benchmark_file_dir = benchmark_dir.joinpath("files")
+
+DEFAULT_NIGHT = "20240301"
+
+# Baseline throughputs, stored separately for each host
+_benchmark_baseline_path = os.getenv("BENCHMARK_BASELINE_PATH")
+if _benchmark_baseline_path is None:
+    benchmark_baseline_path = base_output_dir.joinpath(PIPELINE_NAME, "baseline.json")
+else:
+    benchmark_baseline_path = Path(_benchmark_baseline_path)
+
+# Fractional loss of throughput which is flagged as a regression
+DEFAULT_TOLERANCE = 0.2
+
+# Steps which take less time in the baseline, or handle fewer data blocks,
+# are too noisy to compare
+DEFAULT_MIN_WALL_TIME_S = 1.0
+DEFAULT_MIN_N_BLOCKS = 2
+
+# Approximate WINTER geometry: six boards of 1984 x 1096 pixels,
+# laid out in three columns and two rows
+WINTER_BOARD_SHAPE = (1096, 1984)
+WINTER_PIXEL_SCALE_ARCSEC = 1.08
+WINTER_BOARD_LAYOUT = {
+    0: (-1, 1),
+    1: (0, 1),
+    2: (1, 1),
+    3: (-1, 0),
+    4: (0, 0),
+    5: (1, 0),
+}
+
+# Header key of the path of the local catalog fixture
+BENCHMARK_CATALOG_KEY = "BENCHCAT"
+
+# WINTER photometry config, without the columns which cannot be measured
+# in-process (CLASS_STAR)
+benchmark_sextractor_config = {
+    **sextractor_photometry_config,
+    "parameter_path": benchmark_file_dir.joinpath("photom.param"),
+}
+benchmark_swarp_config_path = swarp_config_path
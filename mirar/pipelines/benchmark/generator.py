@@ -0,0 +1,49 @@
+"""
+Module containing functions to generate calibration catalogs for the
+benchmark pipeline, from the local catalog fixture
+"""
+
+import logging
+
+from astropy.table import Table
+
+from mirar.catalog import BaseCatalog
+from mirar.catalog.base.catalog_from_file import CatalogFromFile
+from mirar.data import Image
+from mirar.pipelines.benchmark.config import BENCHMARK_CATALOG_KEY
+from mirar.processors.base_catalog_xmatch_processor import (
+    default_image_sextractor_catalog_purifier,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def benchmark_photometric_catalog_generator(image: Image) -> BaseCatalog:
+    """
+    Get the local catalog fixture of a benchmark image, so that photometric
+    calibration runs offline
+
+    :param image: Image
+    :return: Catalog
+    """
+    return CatalogFromFile(catalog_path=image[BENCHMARK_CATALOG_KEY])
+
+
+def benchmark_photcal_catalog_purifier(
+    sci_catalog: Table, ref_catalog: Table, image: Image
+) -> (Table, Table):
+    """
+    Function to purify the photometric image catalog, with a narrower edge
+    than the default so that downscaled benchmark boards keep enough sources
+
+    :param sci_catalog: Catalog of sources in the image
+    :param ref_catalog: Reference catalog
+    :param image: Image
+    :return: Purified catalogs
+    """
+    return default_image_sextractor_catalog_purifier(
+        sci_catalog=sci_catalog,
+        ref_catalog=ref_catalog,
+        image=image,
+        edge_width_pixels=20.0,
+    )
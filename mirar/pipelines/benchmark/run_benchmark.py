@@ -0,0 +1,374 @@
+"""
+Module to run benchmark configurations, and compare the throughput of each
+processor to a stored baseline.
+
+The throughput of a processor is the number of data blocks (images or source
+tables) it handles per second of wall time, taken from the processor metrics
+of :mod:`mirar.processors.metrics`. Baselines are stored as JSON, for each
+host and configuration, together with the settings of the synthetic data used,
+and are only compared to runs on the same host with identical settings.
+Steps which are too short or handle too few data blocks to be timed reliably
+are not compared.
+"""
+
+import inspect
+import json
+import logging
+import os
+import platform
+import shutil
+import socket
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mirar.pipelines.benchmark.benchmark_pipeline import BenchmarkPipeline
+from mirar.pipelines.benchmark.config import (
+    DEFAULT_MIN_N_BLOCKS,
+    DEFAULT_MIN_WALL_TIME_S,
+    DEFAULT_NIGHT,
+    DEFAULT_TOLERANCE,
+)
+from mirar.pipelines.benchmark.synthetic_data import write_benchmark_data
+from mirar.processors.metrics import write_metrics_report
+
+logger = logging.getLogger(__name__)
+
+# External executables required by each configuration
+REQUIRED_EXECUTABLES = {"stack": ["swarp"]}
+
+THROUGHPUT_COLUMNS = [
+    "configuration",
+    "step",
+    "processor",
+    "n_blocks",
+    "wall_time_s",
+    "cpu_time_s",
+    "peak_rss_delta_bytes",
+    "throughput_blocks_per_s",
+]
+
+
+def get_missing_executables(configuration: str) -> list[str]:
+    """
+    Get the external executables required by a configuration which are
+    not installed
+
+    :param configuration: Name of configuration
+    :return: List of missing executables
+    """
+    return [
+        x
+        for x in REQUIRED_EXECUTABLES.get(configuration, [])
+        if shutil.which(x) is None
+    ]
+
+
+def get_data_settings(**data_settings) -> dict:
+    """
+    Get all settings of the synthetic data, including defaults, as stored
+    in the baseline
+
+    :param data_settings: Keyword arguments of
+        :func:`~mirar.pipelines.benchmark.synthetic_data.write_benchmark_data`
+    :return: Dictionary of settings
+    """
+    settings = {
+        key: value.default
+        for key, value in inspect.signature(write_benchmark_data).parameters.items()
+        if key != "night_dir"
+    }
+    settings.update(data_settings)
+    return {
+        key: list(value) if isinstance(value, tuple) else value
+        for key, value in settings.items()
+    }
+
+
+def get_host_key() -> str:
+    """
+    Get the key of the current host in the baseline, from its hostname
+    and CPUs
+
+    :return: Key
+    """
+    return f"{socket.gethostname()}_{platform.machine()}_{os.cpu_count()}cpu"
+
+
+def get_step_key(row: pd.Series) -> str:
+    """
+    Get the key of a step of a configuration, used to match it to the baseline
+
+    :param row: Row of a throughput table
+    :return: Key
+    """
+    return f"{row['step']}_{row['processor']}"
+
+
+def get_throughput_table(
+    metrics_table: pd.DataFrame, configuration: str
+) -> pd.DataFrame:
+    """
+    Get the throughput of each step of a configuration, from its metrics
+
+    :param metrics_table: Table of processor metrics, from
+        :func:`~mirar.processors.metrics.get_metrics_table`
+    :param configuration: Name of configuration
+    :return: Table of throughputs
+    """
+    table = metrics_table.copy()
+    table["configuration"] = configuration
+    # Loaders have no input blocks, so count their outputs instead
+    table["n_blocks"] = np.maximum(table["n_input_blocks"], table["n_output_blocks"])
+    wall_time = table["wall_time_s"].where(table["wall_time_s"] > 0.0)
+    table["throughput_blocks_per_s"] = table["n_blocks"] / wall_time
+    return table[THROUGHPUT_COLUMNS]
+
+
+def run_configuration(
+    configuration: str,
+    night_dir: Path,
+    execution_backend: str | None = None,
+) -> pd.DataFrame:
+    """
+    Run a benchmark configuration on data which has already been generated
+
+    :param configuration: Name of configuration
+    :param night_dir: Directory of night, with synthetic data
+    :param execution_backend: Backend used by processors
+    :return: Table of throughputs
+    """
+    pipeline = BenchmarkPipeline(
+        selected_configurations=configuration,
+        night=night_dir.as_posix(),
+        execution_backend=execution_backend,
+    )
+    pipeline.reduce_images(
+        catch_all_errors=False,
+        output_metrics_path=night_dir.joinpath(f"{configuration}_metrics.json"),
+    )
+    return get_throughput_table(pipeline.latest_metrics, configuration)
+
+
+def load_baseline(baseline_path: Path) -> dict:
+    """
+    Load a baseline of throughputs for each host, or an empty baseline if
+    there is none
+
+    :param baseline_path: Path of baseline
+    :return: Baseline dictionary
+    """
+    if not baseline_path.exists():
+        logger.warning(f"No benchmark baseline found at {baseline_path}")
+        return {"hosts": {}}
+
+    with open(baseline_path, "r", encoding="utf8") as baseline_file:
+        return json.load(baseline_file)
+
+
+def compare_to_baseline(
+    throughput_table: pd.DataFrame,
+    baseline: dict,
+    settings: dict,
+    tolerance: float = DEFAULT_TOLERANCE,
+    min_wall_time_s: float = DEFAULT_MIN_WALL_TIME_S,
+    min_n_blocks: int = DEFAULT_MIN_N_BLOCKS,
+    host_key: str | None = None,
+) -> pd.DataFrame:
+    """
+    Compare the throughput of each step to the baseline of this host. A step
+    is a regression if its throughput is lower than the baseline by more than
+    the tolerance. Steps without a baseline (or with a baseline for different
+    data settings) are not compared, nor are steps which took less than
+    min_wall_time_s in the baseline or handle fewer than min_n_blocks blocks.
+
+    :param throughput_table: Table of throughputs
+    :param baseline: Baseline dictionary
+    :param settings: Settings of synthetic data
+    :param tolerance: Fractional loss of throughput flagged as a regression
+    :param min_wall_time_s: Minimum wall time of compared steps in the baseline
+    :param min_n_blocks: Minimum number of data blocks of compared steps
+    :param host_key: Key of host in the baseline, defaults to the current host
+    :return: Table of throughputs with the baseline throughput, the ratio
+        to the baseline, whether each step was compared, and whether each
+        step is a regression
+    """
+    if host_key is None:
+        host_key = get_host_key()
+
+    host_baseline = baseline["hosts"].get(host_key, {"configurations": {}})
+
+    baseline_throughputs, baseline_wall_times = [], []
+    for _, row in throughput_table.iterrows():
+        config_baseline = host_baseline["configurations"].get(row["configuration"], {})
+        step = {}
+        if config_baseline.get("settings") == settings:
+            step = config_baseline["steps"].get(get_step_key(row), {})
+        for values, key in [
+            (baseline_throughputs, "throughput_blocks_per_s"),
+            (baseline_wall_times, "wall_time_s"),
+        ]:
+            value = step.get(key)
+            values.append(np.nan if value is None else value)
+
+    table = throughput_table.copy()
+    table["baseline_throughput_blocks_per_s"] = np.array(
+        baseline_throughputs, dtype=float
+    )
+    table["throughput_ratio"] = (
+        table["throughput_blocks_per_s"] / table["baseline_throughput_blocks_per_s"]
+    )
+    table["compared"] = (
+        table["throughput_ratio"].notna()
+        & (np.array(baseline_wall_times, dtype=float) >= min_wall_time_s)
+        & (table["n_blocks"] >= min_n_blocks)
+    )
+    table["regression"] = table["compared"] & (
+        table["throughput_ratio"] < (1.0 - tolerance)
+    )
+    return table
+
+
+def update_baseline(
+    throughput_table: pd.DataFrame,
+    baseline_path: Path,
+    settings: dict,
+    host_key: str | None = None,
+) -> dict:
+    """
+    Update the baseline of this host with the throughputs of each
+    configuration run, keeping the baseline of any other host or configuration
+
+    :param throughput_table: Table of throughputs
+    :param baseline_path: Path of baseline
+    :param settings: Settings of synthetic data
+    :param host_key: Key of host in the baseline, defaults to the current host
+    :return: Updated baseline dictionary
+    """
+    if host_key is None:
+        host_key = get_host_key()
+
+    baseline = load_baseline(baseline_path)
+    host_baseline = baseline["hosts"].setdefault(host_key, {"configurations": {}})
+
+    for configuration, config_table in throughput_table.groupby(
+        "configuration", sort=False
+    ):
+        steps = {}
+        for _, row in config_table.iterrows():
+            throughput = row["throughput_blocks_per_s"]
+            steps[get_step_key(row)] = {
+                "throughput_blocks_per_s": (
+                    None if pd.isna(throughput) else float(throughput)
+                ),
+                "wall_time_s": float(row["wall_time_s"]),
+            }
+        host_baseline["configurations"][configuration] = {
+            "settings": settings,
+            "date": datetime.now().isoformat(),
+            "steps": steps,
+        }
+
+    baseline_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(baseline_path, "w", encoding="utf8") as baseline_file:
+        json.dump(baseline, baseline_file, indent=4)
+
+    logger.info(f"Updated benchmark baseline of {host_key} at {baseline_path}")
+    return baseline
+
+
+def run_benchmark(
+    configurations: list[str],
+    output_dir: Path,
+    baseline_path: Path,
+    night: str = DEFAULT_NIGHT,
+    tolerance: float = DEFAULT_TOLERANCE,
+    min_wall_time_s: float = DEFAULT_MIN_WALL_TIME_S,
+    min_n_blocks: int = DEFAULT_MIN_N_BLOCKS,
+    execution_backend: str | None = None,
+    update: bool = False,
+    **data_settings,
+) -> pd.DataFrame:
+    """
+    Generate synthetic data, run each benchmark configuration, and compare
+    the throughput of each processor to the baseline.
+    Configurations requiring executables which are not installed are skipped.
+
+    :param configurations: Names of configurations to run
+    :param output_dir: Output directory (synthetic data is written to a
+        subdirectory for the night, together with the pipeline outputs)
+    :param baseline_path: Path of baseline
+    :param night: Name of night
+    :param tolerance: Fractional loss of throughput flagged as a regression
+    :param min_wall_time_s: Minimum wall time of compared steps in the baseline
+    :param min_n_blocks: Minimum number of data blocks of compared steps
+    :param execution_backend: Backend used by processors
+    :param update: Whether to update the baseline with the results
+    :param data_settings: Keyword arguments of
+        :func:`~mirar.pipelines.benchmark.synthetic_data.write_benchmark_data`
+    :return: Table comparing the throughput of each step to the baseline
+    """
+    night_dir = Path(output_dir).joinpath(night)
+    write_benchmark_data(night_dir, **data_settings)
+
+    settings = get_data_settings(**data_settings)
+
+    throughput_tables = []
+    for configuration in configurations:
+        missing = get_missing_executables(configuration)
+        if len(missing) > 0:
+            logger.warning(
+                f"Skipping benchmark configuration '{configuration}', "
+                f"as {missing} could not be found"
+            )
+            continue
+
+        logger.info(f"Running benchmark configuration '{configuration}'")
+        throughput_tables.append(
+            run_configuration(
+                configuration, night_dir, execution_backend=execution_backend
+            )
+        )
+
+    throughput_table = pd.DataFrame(columns=THROUGHPUT_COLUMNS)
+    if len(throughput_tables) > 0:
+        throughput_table = pd.concat(throughput_tables, ignore_index=True)
+
+    baseline = load_baseline(baseline_path)
+    results = compare_to_baseline(
+        throughput_table,
+        baseline,
+        settings=settings,
+        tolerance=tolerance,
+        min_wall_time_s=min_wall_time_s,
+        min_n_blocks=min_n_blocks,
+    )
+
+    write_metrics_report(
+        results,
+        night_dir.joinpath("benchmark_results.json"),
+        run_info={
+            "baseline_path": baseline_path.as_posix(),
+            "host": get_host_key(),
+            "tolerance": tolerance,
+            "min_wall_time_s": min_wall_time_s,
+            "min_n_blocks": min_n_blocks,
+            "settings": settings,
+            "date": datetime.now().isoformat(),
+        },
+    )
+
+    for _, row in results[results["regression"]].iterrows():
+        logger.warning(
+            f"Throughput regression for {row['processor']} "
+            f"(step {row['step']} of '{row['configuration']}'): "
+            f"{row['throughput_blocks_per_s']:.3g} blocks/s, compared to "
+            f"{row['baseline_throughput_blocks_per_s']:.3g} blocks/s in baseline"
+        )
+
+    if update:
+        update_baseline(throughput_table, baseline_path, settings=settings)
+
+    return results
@@ -0,0 +1,660 @@
+"""
+Module to generate deterministic synthetic data for the benchmark pipeline.
+
+All data is generated from a seed, so that every run of the benchmark processes
+identical inputs:
+
+* a star catalog, saved as a local catalog fixture
+* raw WINTER-like MEF exposures (darks, dome flats and dithered science frames),
+  with one extension per board. Each board has its own WCS, dark current,
+  flat-field response and bad pixels, and stars from the catalog are added
+  with a gaussian PSF, sky background and noise.
+* single-board "reduced" science images, with weight images, PSF models and
+  matching (deeper) reference images, for image subtraction and PSF photometry
+"""
+
+import logging
+from pathlib import Path
+
+import numpy as np
+from astropy.io import fits
+from astropy.table import Table
+from astropy.time import Time
+from astropy.wcs import WCS
+
+from mirar.data import Image, ImageBatch
+from mirar.io import save_fits
+from mirar.paths import (
+    BASE_NAME_KEY,
+    COADD_KEY,
+    EXPTIME_KEY,
+    FILTER_KEY,
+    GAIN_KEY,
+    LATEST_WEIGHT_SAVE_KEY,
+    NORM_PSFEX_KEY,
+    OBSCLASS_KEY,
+    PROC_FAIL_KEY,
+    PROC_HISTORY_KEY,
+    RAW_IMG_KEY,
+    RAW_IMG_SUB_DIR,
+    REF_IMG_KEY,
+    SATURATE_KEY,
+    TARGET_KEY,
+    TIME_KEY,
+    ZP_KEY,
+    ZP_STD_KEY,
+)
+from mirar.pipelines.benchmark.config import (
+    BENCHMARK_CATALOG_KEY,
+    WINTER_BOARD_LAYOUT,
+    WINTER_BOARD_SHAPE,
+    WINTER_PIXEL_SCALE_ARCSEC,
+    benchmark_sextractor_config,
+)
+from mirar.processors.astromatic.sextractor.inprocess_sextractor import (
+    InProcessSextractor,
+)
+from mirar.utils.ldac_tools import get_table_from_ldac, save_table_as_ldac
+
+logger = logging.getLogger(__name__)
+
+CATALOG_SUB_DIR = "catalog"
+REDUCED_SUB_DIR = "reduced"
+FIXTURE_SUB_DIR = "fixtures"
+
+CATALOG_NAME = "benchmark_catalog.ldac"
+
+FIELD_RA_DEG = 150.0
+FIELD_DEC_DEG = 30.0
+FIELD_ID = 5000
+
+# Night-time at Palomar, so that darks are not reclassified as tests
+START_TIME = Time("2024-03-01 08:00:00.000")
+
+# Photometric model (counts per second for a star of magnitude 0 is 10^(0.4 ZP))
+ZEROPOINT = 22.5
+SKY_COUNTS_PER_S = 30.0
+DARK_COUNTS_PER_S = 0.5
+FLAT_COUNTS = 20000.0
+READ_NOISE = 10.0
+HOT_PIXEL_COUNTS = 5000.0
+SCIENCE_EXPTIME = 60.0
+
+SCIENCE_FWHM_PIX = 2.5
+REFERENCE_FWHM_PIX = 3.0
+DITHER_STEP_ARCSEC = 30.0
+PSF_SIZE = 25
+
+
+def get_rng(seed: int, *keys: int) -> np.random.Generator:
+    """
+    Get a random number generator which is unique to a seed and set of keys
+    (e.g. an exposure and board), but is independent of the order of generation
+
+    :param seed: Seed of benchmark
+    :param keys: Integer keys
+    :return: Random number generator
+    """
+    return np.random.default_rng([seed, *keys])
+
+
+def make_star_catalog(
+    n_stars: int,
+    seed: int,
+    ra_deg: float = FIELD_RA_DEG,
+    dec_deg: float = FIELD_DEC_DEG,
+    half_width_deg: float = 1.2,
+    min_mag: float = 10.0,
+    max_mag: float = 18.0,
+    slope: float = 0.3,
+) -> Table:
+    """
+    Make a catalog of stars uniformly distributed over a field, with a
+    power-law distribution of magnitudes (N(<m) ~ 10^(slope m))
+
+    :param n_stars: Number of stars
+    :param seed: Random seed
+    :param ra_deg: Central RA of field
+    :param dec_deg: Central Dec of field
+    :param half_width_deg: Half-width of field
+    :param min_mag: Brightest magnitude
+    :param max_mag: Faintest magnitude
+    :param slope: Slope of magnitude distribution
+    :return: Catalog with ra, dec, magnitude and magnitude_err columns
+    """
+    rng = get_rng(seed)
+    dec = dec_deg + rng.uniform(-half_width_deg, half_width_deg, n_stars)
+    ra = ra_deg + rng.uniform(-half_width_deg, half_width_deg, n_stars) / np.cos(
+        np.radians(dec_deg)
+    )
+
+    low, high = 10.0 ** (slope * min_mag), 10.0 ** (slope * max_mag)
+    magnitude = np.log10(low + rng.uniform(0.0, 1.0, n_stars) * (high - low)) / slope
+
+    return Table(
+        {
+            "ra": ra,
+            "dec": dec,
+            "magnitude": magnitude,
+            "magnitude_err": np.full(n_stars, 0.02),
+        }
+    )
+
+
+def get_board_header(
+    board_id: int,
+    ra_deg: float,
+    dec_deg: float,
+    shape: tuple[int, int] = WINTER_BOARD_SHAPE,
+) -> fits.Header:
+    """
+    Get a TAN WCS header for a board, offset from the pointing by its
+    position in the board layout
+
+    :param board_id: Board ID
+    :param ra_deg: Pointing RA
+    :param dec_deg: Pointing Dec
+    :param shape: Shape of board (ny, nx)
+    :return: Header with WCS keys
+    """
+    n_y, n_x = shape
+    col, row = WINTER_BOARD_LAYOUT[board_id]
+    pixscale = WINTER_PIXEL_SCALE_ARCSEC / 3600.0
+
+    header = fits.Header()
+    header["CTYPE1"] = "RA---TAN"
+    header["CTYPE2"] = "DEC--TAN"
+    header["CRVAL1"] = ra_deg
+    header["CRVAL2"] = dec_deg
+    header["CRPIX1"] = 0.5 * n_x - col * n_x
+    header["CRPIX2"] = 0.5 * n_y - (row - 0.5) * n_y
+    header["CD1_1"] = -pixscale
+    header["CD1_2"] = 0.0
+    header["CD2_1"] = 0.0
+    header["CD2_2"] = pixscale
+    return header
+
+
+def render_stars(
+    catalog: Table,
+    header: fits.Header,
+    shape: tuple[int, int],
+    exptime: float,
+    fwhm_pix: float,
+    zeropoint: float = ZEROPOINT,
+) -> np.ndarray:
+    """
+    Render catalog stars onto an image, with a gaussian PSF
+
+    :param catalog: Star catalog
+    :param header: Header with WCS
+    :param shape: Shape of image
+    :param exptime: Exposure time
+    :param fwhm_pix: FWHM of PSF in pixels
+    :param zeropoint: Zeropoint for an exposure time of 1 second
+    :return: Image of stars in counts
+    """
+    sigma = fwhm_pix / (2.0 * np.sqrt(2.0 * np.log(2.0)))
+    half_size = int(np.ceil(5.0 * sigma))
+
+    x_pos, y_pos = WCS(header).all_world2pix(catalog["ra"], catalog["dec"], 0)
+    fluxes = exptime * 10.0 ** (-0.4 * (np.array(catalog["magnitude"]) - zeropoint))
+
+    in_image = (
+        (x_pos > -half_size)
+        & (x_pos < shape[1] + half_size)
+        & (y_pos > -half_size)
+        & (y_pos < shape[0] + half_size)
+    )
+
+    data = np.zeros(shape)
+    offsets = np.arange(-half_size, half_size + 1)
+    for x_star, y_star, flux in zip(x_pos[in_image], y_pos[in_image], fluxes[in_image]):
+        x_min, y_min = (
+            int(np.rint(x_star)) - half_size,
+            int(np.rint(y_star)) - half_size,
+        )
+        x_grid = x_min + half_size + offsets
+        y_grid = y_min + half_size + offsets
+        stamp = np.outer(
+            np.exp(-((y_grid - y_star) ** 2) / (2.0 * sigma**2)),
+            np.exp(-((x_grid - x_star) ** 2) / (2.0 * sigma**2)),
+        ) * (flux / (2.0 * np.pi * sigma**2))
+
+        x_lo, y_lo = max(x_min, 0), max(y_min, 0)
+        x_hi = min(x_min + len(offsets), shape[1])
+        y_hi = min(y_min + len(offsets), shape[0])
+        data[y_lo:y_hi, x_lo:x_hi] += stamp[
+            y_lo - y_min : y_hi - y_min, x_lo - x_min : x_hi - x_min
+        ]
+
+    return data
+
+
+def get_board_response(
+    board_id: int, seed: int, shape: tuple[int, int]
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get the fixed detector properties of a board: the flat-field response
+    (with vignetting, pixel-to-pixel variations, dead pixels and a dead column)
+    and the dark current (with hot pixels)
+
+    :param board_id: Board ID
+    :param seed: Random seed
+    :param shape: Shape of board
+    :return: Flat response, dark counts per second
+    """
+    rng = get_rng(seed, 1000 + board_id)
+    n_y, n_x = shape
+
+    y_grid, x_grid = np.mgrid[:n_y, :n_x]
+    radius_sq = ((x_grid - 0.5 * n_x) / n_x) ** 2 + ((y_grid - 0.5 * n_y) / n_y) ** 2
+    response = (1.0 - 0.2 * radius_sq) * rng.normal(1.0, 0.01, shape)
+
+    dead_pixels = rng.uniform(0.0, 1.0, shape) < 5.0e-4
+    response[dead_pixels] = 0.05
+    response[:, rng.integers(0, n_x)] = 0.05
+
+    dark = np.full(shape, DARK_COUNTS_PER_S)
+    hot_pixels = rng.uniform(0.0, 1.0, shape) < 1.0e-3
+    dark[hot_pixels] = HOT_PIXEL_COUNTS / SCIENCE_EXPTIME
+
+    return response, dark
+
+
+def get_primary_header(
+    obstype: str,
+    exp_index: int,
+    exptime: float,
+    ra_deg: float,
+    dec_deg: float,
+    dither_index: int,
+    n_dithers: int,
+    catalog_path: Path,
+) -> fits.Header:
+    """
+    Get the primary header of a raw WINTER-like exposure
+
+    :param obstype: Observation type (SCIENCE, DARK or FLAT)
+    :param exp_index: Index of exposure in the night
+    :param exptime: Exposure time
+    :param ra_deg: Pointing RA
+    :param dec_deg: Pointing Dec
+    :param dither_index: Index of dither
+    :param n_dithers: Number of dithers
+    :param catalog_path: Path of local catalog fixture
+    :return: Header
+    """
+    obs_time = START_TIME + exp_index * 2.0 * exptime / 86400.0
+
+    header = fits.Header()
+    header["UTCISO"] = obs_time.iso
+    header["OBSTYPE"] = obstype
+    header[EXPTIME_KEY] = exptime
+    header["FILTERID"] = "dark" if obstype == "DARK" else "J"
+    header["FIELDID"] = FIELD_ID
+    header["RADEG"] = ra_deg
+    header["DECDEG"] = dec_deg
+    header["MIRCOVER"] = "open"
+    header["PROGNAME"] = "2024A000"
+    header["TARGNAME"] = "benchmark"
+    header["DITHNUM"] = dither_index + 1
+    header["NUMDITHS"] = n_dithers
+    header["DITHSTEP"] = DITHER_STEP_ARCSEC
+    header[BENCHMARK_CATALOG_KEY] = catalog_path.as_posix()
+    return header
+
+
+def write_raw_exposure(
+    output_path: Path,
+    primary_header: fits.Header,
+    catalog: Table | None,
+    board_ids: list[int],
+    seed: int,
+    exp_index: int,
+    shape: tuple[int, int],
+):
+    """
+    Write a raw WINTER-like MEF exposure, with one extension per board
+
+    :param output_path: Output path
+    :param primary_header: Primary header
+    :param catalog: Star catalog (None for darks and flats)
+    :param board_ids: Board IDs
+    :param seed: Random seed
+    :param exp_index: Index of exposure in the night
+    :param shape: Shape of each board
+    :return: None
+    """
+    exptime = primary_header[EXPTIME_KEY]
+
+    hdus = [fits.PrimaryHDU(header=primary_header)]
+    for board_id in board_ids:
+        rng = get_rng(seed, exp_index, board_id)
+        response, dark = get_board_response(board_id, seed, shape)
+
+        header = get_board_header(
+            board_id, primary_header["RADEG"], primary_header["DECDEG"], shape
+        )
+        header["BOARD_ID"] = board_id
+
+        if primary_header["OBSTYPE"] == "FLAT":
+            signal = np.full(shape, FLAT_COUNTS)
+        elif primary_header["OBSTYPE"] == "SCIENCE":
+            signal = SKY_COUNTS_PER_S * exptime + render_stars(
+                catalog, header, shape, exptime, SCIENCE_FWHM_PIX
+            )
+        else:
+            signal = np.zeros(shape)
+
+        expected = signal * response + dark * exptime
+        data = rng.poisson(expected) + rng.normal(0.0, READ_NOISE, shape)
+        data = np.clip(np.rint(data), 0, np.iinfo(np.uint16).max).astype(np.uint16)
+
+        hdus.append(fits.ImageHDU(data=data, header=header))
+
+    fits.HDUList(hdus).writeto(output_path, overwrite=True)
+
+
+def write_raw_night(
+    night_dir: Path,
+    catalog_path: Path,
+    seed: int = 0,
+    n_science: int = 4,
+    n_darks: int = 3,
+    n_flats: int = 3,
+    board_ids: list[int] | None = None,
+    shape: tuple[int, int] = WINTER_BOARD_SHAPE,
+) -> list[Path]:
+    """
+    Write a night of raw WINTER-like exposures: darks, dome flats and
+    a dither sequence of science frames, all with the same exposure time
+
+    :param night_dir: Directory of night (raw images are in a 'raw' subdirectory)
+    :param catalog_path: Path of local catalog fixture
+    :param seed: Random seed
+    :param n_science: Number of science exposures
+    :param n_darks: Number of dark exposures
+    :param n_flats: Number of flat exposures
+    :param board_ids: Board IDs (default of all boards)
+    :param shape: Shape of each board
+    :return: Paths of raw exposures
+    """
+    if board_ids is None:
+        board_ids = list(WINTER_BOARD_LAYOUT)
+
+    catalog = get_table_from_ldac(catalog_path)
+
+    raw_dir = night_dir.joinpath(RAW_IMG_SUB_DIR)
+    raw_dir.mkdir(parents=True, exist_ok=True)
+
+    exposures = (
+        [("DARK", 0)] * n_darks
+        + [("FLAT", 0)] * n_flats
+        + [("SCIENCE", i) for i in range(n_science)]
+    )
+
+    dither_rng = get_rng(seed, 2000)
+    dither_offsets = dither_rng.uniform(-1.0, 1.0, (n_science, 2)) * (
+        DITHER_STEP_ARCSEC / 3600.0
+    )
+
+    paths = []
+    for exp_index, (obstype, dither_index) in enumerate(exposures):
+        ra_deg, dec_deg = FIELD_RA_DEG, FIELD_DEC_DEG
+        if obstype == "SCIENCE":
+            ra_deg += dither_offsets[dither_index][0] / np.cos(np.radians(dec_deg))
+            dec_deg += dither_offsets[dither_index][1]
+
+        primary_header = get_primary_header(
+            obstype=obstype,
+            exp_index=exp_index,
+            exptime=SCIENCE_EXPTIME,
+            ra_deg=ra_deg,
+            dec_deg=dec_deg,
+            dither_index=dither_index,
+            n_dithers=n_science if obstype == "SCIENCE" else 1,
+            catalog_path=catalog_path,
+        )
+        obs_time = Time(primary_header["UTCISO"]).datetime
+        output_path = raw_dir.joinpath(
+            f"WINTERcamera_{obs_time.strftime('%Y%m%d-%H%M%S')}-"
+            f"{exp_index:03d}_mef.fits"
+        )
+        write_raw_exposure(
+            output_path,
+            primary_header,
+            catalog=catalog if obstype == "SCIENCE" else None,
+            board_ids=board_ids,
+            seed=seed,
+            exp_index=exp_index,
+            shape=shape,
+        )
+        paths.append(output_path)
+
+    logger.info(f"Wrote {len(paths)} raw exposures to {raw_dir}")
+    return paths
+
+
+def get_gaussian_psf(fwhm_pix: float, size: int = PSF_SIZE) -> np.ndarray:
+    """
+    Get a normalised gaussian PSF model
+
+    :param fwhm_pix: FWHM in pixels
+    :param size: Size of PSF model
+    :return: PSF model
+    """
+    sigma = fwhm_pix / (2.0 * np.sqrt(2.0 * np.log(2.0)))
+    offsets = np.arange(size) - (size - 1) / 2.0
+    psf = np.outer(
+        np.exp(-(offsets**2) / (2.0 * sigma**2)),
+        np.exp(-(offsets**2) / (2.0 * sigma**2)),
+    )
+    return psf / np.sum(psf)
+
+
+def get_reduced_header(name: str, header: fits.Header, exptime: float) -> fits.Header:
+    """
+    Get the header of a reduced image, with the core fields and photometric
+    calibration of a processed image
+
+    :param name: Base name of image
+    :param header: Header with WCS
+    :param exptime: Exposure time
+    :return: Header
+    """
+    header = header.copy()
+    header[BASE_NAME_KEY] = name
+    header[RAW_IMG_KEY] = name
+    header[PROC_HISTORY_KEY] = ""
+    header[PROC_FAIL_KEY] = False
+    header[OBSCLASS_KEY] = "science"
+    header[TARGET_KEY] = f"field_{FIELD_ID}"
+    header[TIME_KEY] = START_TIME.isot
+    header[COADD_KEY] = 1
+    header[EXPTIME_KEY] = exptime
+    header[FILTER_KEY] = "J"
+    header[GAIN_KEY] = 1.0
+    header[SATURATE_KEY] = 40000.0
+    header[ZP_KEY] = ZEROPOINT + 2.5 * np.log10(exptime)
+    header[ZP_STD_KEY] = 0.01
+    return header
+
+
+def make_reduced_image(
+    name: str,
+    header: fits.Header,
+    catalog: Table,
+    exptime: float,
+    fwhm_pix: float,
+    rng: np.random.Generator,
+    shape: tuple[int, int],
+) -> Image:
+    """
+    Make a reduced (calibrated and sky-subtracted) image of catalog stars
+
+    :param name: Base name of image
+    :param header: Header with WCS
+    :param catalog: Star catalog
+    :param exptime: Exposure time
+    :param fwhm_pix: FWHM of PSF in pixels
+    :param rng: Random number generator
+    :param shape: Shape of image
+    :return: Image
+    """
+    sky = SKY_COUNTS_PER_S * exptime
+    stars = render_stars(catalog, header, shape, exptime, fwhm_pix)
+    data = rng.poisson(stars + sky) - sky + rng.normal(0.0, READ_NOISE, shape)
+    return Image(
+        data=data.astype(np.float32),
+        header=get_reduced_header(name, header, exptime),
+    )
+
+
+def write_reduced_images(
+    night_dir: Path,
+    catalog_path: Path,
+    seed: int = 0,
+    n_images: int = 2,
+    board_ids: list[int] | None = None,
+    shape: tuple[int, int] = WINTER_BOARD_SHAPE,
+) -> list[Path]:
+    """
+    Write reduced single-board science images, each with a weight image,
+    a PSF model and a deeper reference image (with a source catalog),
+    as required for image subtraction and PSF photometry
+
+    :param night_dir: Directory of night (images are in a 'reduced' subdirectory)
+    :param catalog_path: Path of local catalog fixture
+    :param seed: Random seed
+    :param n_images: Number of images for each board
+    :param board_ids: Board IDs (default of all boards)
+    :param shape: Shape of each image
+    :return: Paths of reduced images
+    """
+    if board_ids is None:
+        board_ids = list(WINTER_BOARD_LAYOUT)
+
+    catalog = get_table_from_ldac(catalog_path)
+
+    reduced_dir = night_dir.joinpath(REDUCED_SUB_DIR)
+    fixture_dir = night_dir.joinpath(FIXTURE_SUB_DIR)
+    for output_dir in [reduced_dir, fixture_dir]:
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    psf_paths = {}
+    for label, fwhm_pix in [("sci", SCIENCE_FWHM_PIX), ("ref", REFERENCE_FWHM_PIX)]:
+        psf_paths[label] = fixture_dir.joinpath(f"benchmark_{label}.psf.fits")
+        fits.PrimaryHDU(get_gaussian_psf(fwhm_pix)).writeto(
+            psf_paths[label], overwrite=True
+        )
+
+    reference_sextractor = InProcessSextractor(
+        output_sub_dir=fixture_dir.as_posix(), **benchmark_sextractor_config
+    )
+
+    paths = []
+    for board_id in board_ids:
+        header = get_board_header(board_id, FIELD_RA_DEG, FIELD_DEC_DEG, shape)
+        header["BOARD_ID"] = board_id
+        header[BENCHMARK_CATALOG_KEY] = catalog_path.as_posix()
+
+        # Bad pixels of the board have zero weight
+        response, dark = get_board_response(board_id, seed, shape)
+        weight_data = np.ones(shape, dtype=np.float32)
+        weight_data[(response < 0.5) | (dark > DARK_COUNTS_PER_S)] = 0.0
+        weight_name = f"benchmark_{board_id}.weight.fits"
+        weight = Image(
+            data=weight_data,
+            header=get_reduced_header(weight_name, header, SCIENCE_EXPTIME),
+        )
+        weight_path = fixture_dir.joinpath(weight_name)
+        save_fits(weight, weight_path)
+
+        ref_name = f"benchmark_{board_id}_ref.fits"
+        ref_image = make_reduced_image(
+            ref_name,
+            header,
+            catalog,
+            exptime=10.0 * SCIENCE_EXPTIME,
+            fwhm_pix=REFERENCE_FWHM_PIX,
+            rng=get_rng(seed, 3000 + board_id),
+            shape=shape,
+        )
+        ref_image[LATEST_WEIGHT_SAVE_KEY] = weight_path.as_posix()
+        ref_image[NORM_PSFEX_KEY] = psf_paths["ref"].as_posix()
+        ref_image = reference_sextractor.apply(ImageBatch([ref_image]))[0]
+        ref_path = fixture_dir.joinpath(ref_name)
+        save_fits(ref_image, ref_path)
+
+        for i in range(n_images):
+            image = make_reduced_image(
+                f"benchmark_{board_id}_{i}.fits",
+                header,
+                catalog,
+                exptime=SCIENCE_EXPTIME,
+                fwhm_pix=SCIENCE_FWHM_PIX,
+                rng=get_rng(seed, 4000 + board_id, i),
+                shape=shape,
+            )
+            image[LATEST_WEIGHT_SAVE_KEY] = weight_path.as_posix()
+            image[NORM_PSFEX_KEY] = psf_paths["sci"].as_posix()
+            image[REF_IMG_KEY] = ref_path.as_posix()
+            output_path = reduced_dir.joinpath(image[BASE_NAME_KEY])
+            save_fits(image, output_path)
+            paths.append(output_path)
+
+    logger.info(f"Wrote {len(paths)} reduced images to {reduced_dir}")
+    return paths
+
+
+def write_benchmark_data(
+    night_dir: Path,
+    seed: int = 0,
+    n_stars: int = 15000,
+    n_science: int = 4,
+    n_darks: int = 3,
+    n_flats: int = 3,
+    n_reduced: int = 2,
+    board_ids: list[int] | None = None,
+    shape: tuple[int, int] = WINTER_BOARD_SHAPE,
+) -> Path:
+    """
+    Write all synthetic data for the benchmark pipeline: the local catalog
+    fixture, raw exposures and reduced images
+
+    :param night_dir: Directory of night
+    :param seed: Random seed
+    :param n_stars: Number of stars in catalog
+    :param n_science: Number of raw science exposures
+    :param n_darks: Number of raw dark exposures
+    :param n_flats: Number of raw flat exposures
+    :param n_reduced: Number of reduced images for each board
+    :param board_ids: Board IDs (default of all boards)
+    :param shape: Shape of each board
+    :return: Path of catalog fixture
+    """
+    catalog_path = night_dir.joinpath(CATALOG_SUB_DIR, CATALOG_NAME)
+    catalog_path.parent.mkdir(parents=True, exist_ok=True)
+    catalog_path.unlink(missing_ok=True)
+    save_table_as_ldac(make_star_catalog(n_stars, seed), catalog_path)
+
+    write_raw_night(
+        night_dir,
+        catalog_path,
+        seed=seed,
+        n_science=n_science,
+        n_darks=n_darks,
+        n_flats=n_flats,
+        board_ids=board_ids,
+        shape=shape,
+    )
+    write_reduced_images(
+        night_dir,
+        catalog_path,
+        seed=seed,
+        n_images=n_reduced,
+        board_ids=board_ids,
+        shape=shape,
+    )
+    return catalog_path
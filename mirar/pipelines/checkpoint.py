@@ -0,0 +1,520 @@
+"""
+Module for checkpointing the intermediate state of a pipeline run, so that an
+interrupted :func:`~mirar.pipelines.base_pipeline.Pipeline.reduce_images` call
+(e.g. after running out of memory, or a killed node) can be resumed without
+restarting each configuration from the beginning.
+
+After each selected processor, the :class:`~mirar.data.base_data.Dataset` and
+:class:`~mirar.errors.error_stack.ErrorStack` are written to the checkpoint
+directory (configurable with the CHECKPOINT_DIR environment variable).
+Image headers and source tables are pickled, and the data of loaded images is
+saved as npy files. Images which have not been loaded yet keep a reference to
+their original data (e.g. their source fits file) instead.
+Images read back from a checkpoint are lazy, so their data is only read
+when it is needed.
+
+Each checkpoint is keyed by a hash of the inputs (the files read by loaders of
+the configuration, and any preceding configurations) and of every
+processor up to and including the checkpointed step. Processors are hashed by
+their settings: their attributes, with functions identified by their name and
+source code, and files (e.g. config files) by their contents. Changing a processor
+therefore only invalidates the checkpoints which follow it.
+There is at most one checkpoint per step of each configuration, with the key
+recorded in a json file. This file is written last, and the checkpoint is
+moved into place in a single step, so only complete checkpoints are ever read.
+
+In resume mode, the latest valid checkpoint of each configuration is loaded,
+and every processor up to that step is skipped.
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+import re
+import shutil
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from mirar.data import Dataset, Image
+from mirar.errors import ErrorStack
+from mirar.paths import checkpoint_dir
+from mirar.processors.base_processor import BaseProcessor
+from mirar.processors.calibration_store import get_settings_hash
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_ALL = "all"
+
+DATASET_FILE_NAME = "dataset.pkl"
+ERROR_STACK_FILE_NAME = "error_stack.pkl"
+CHECKPOINT_FILE_NAME = "checkpoint.json"
+IMAGE_SUB_DIR = "images"
+
+# Attributes of processors which hold the state of a run, rather than settings
+RUN_STATE_ATTRIBUTES = [
+    "night",
+    "night_sub_dir",
+    "preceding_steps",
+    "passed_batches",
+    "err_stack",
+    "progress",
+]
+
+# Larger files are identified by their size and modification time,
+# rather than their contents
+MAX_HASHED_FILE_SIZE = 10 * 1024**2
+
+# Depth to which attributes of nested objects are included in settings
+MAX_SETTINGS_DEPTH = 4
+
+
+def load_checkpoint_data(path: str) -> np.ndarray:
+    """
+    Load the data of an image saved in a checkpoint
+
+    :param path: Path of npy file
+    :return: Image data
+    """
+    return np.load(path, allow_pickle=False)
+
+
+def is_checkpoint_reference(image: Image) -> bool:
+    """
+    Check whether the data of an image is yet to be loaded from a checkpoint
+
+    :param image: Image
+    :return: boolean
+    """
+    load_data = image._load_data  # pylint: disable=protected-access
+    return isinstance(load_data, partial) and load_data.func is load_checkpoint_data
+
+
+def get_hash(*keys: str) -> str:
+    """
+    Get a hash for a sequence of keys
+
+    :param keys: Keys
+    :return: Unique hash
+    """
+    return hashlib.sha1("\n".join(keys).encode()).hexdigest()
+
+
+def get_file_key(path: Path) -> str:
+    """
+    Get a key describing a file, using its contents (or its size and
+    modification time, for large files)
+
+    :param path: Path of file
+    :return: Key
+    """
+    stat = path.stat()
+    if stat.st_size > MAX_HASHED_FILE_SIZE:
+        return f"{path.as_posix()} {stat.st_size} {stat.st_mtime_ns}"
+
+    with open(path, "rb") as file:
+        return f"{path.as_posix()} {hashlib.sha1(file.read()).hexdigest()}"
+
+
+def get_function_key(function) -> str:
+    """
+    Get a key describing a function, using its name and source code
+
+    :param function: Function
+    :return: Key
+    """
+    function = getattr(function, "__func__", function)
+    name = f"{getattr(function, '__module__', '')}.{function.__qualname__}"
+    try:
+        source = inspect.getsource(function)
+    except (OSError, TypeError):
+        source = ""
+    return f"{name} {get_hash(source)}"
+
+
+def get_settings_value(value, depth: int = 0):
+    """
+    Convert a setting to a json-serialisable value, which is the same for
+    each run. Functions are described by their name and source, existing
+    files by their contents, arrays by their data, and other mirar objects
+    by their attributes. Memory addresses are removed from anything else.
+
+    :param value: Setting
+    :param depth: Depth of nested objects
+    :return: json-serialisable value
+    """
+    if isinstance(value, (str, Path)):
+        if os.path.isfile(value):
+            return get_file_key(Path(value))
+        return str(value) if isinstance(value, Path) else value
+
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+
+    if isinstance(value, np.ndarray):
+        return f"{value.shape} {value.dtype} {get_hash(value.tobytes().hex())}"
+
+    if isinstance(value, (list, tuple, set)):
+        values = [get_settings_value(x, depth) for x in value]
+        return sorted(values, key=str) if isinstance(value, set) else values
+
+    if isinstance(value, dict):
+        return {str(k): get_settings_value(v, depth) for k, v in value.items()}
+
+    if isinstance(value, partial):
+        return {
+            "function": get_settings_value(value.func, depth),
+            "args": get_settings_value(value.args, depth),
+            "keywords": get_settings_value(value.keywords, depth),
+        }
+
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+
+    if callable(value) and hasattr(value, "__qualname__"):
+        return get_function_key(value)
+
+    if isinstance(value, BaseProcessor):
+        return get_processor_settings(value, depth + 1)
+
+    if (
+        type(value).__module__.startswith("mirar")
+        and hasattr(value, "__dict__")
+        and depth < MAX_SETTINGS_DEPTH
+    ):
+        return {
+            "class": get_settings_value(type(value)),
+            **get_settings_value(vars(value), depth + 1),
+        }
+
+    return re.sub(r" at 0x[0-9a-fA-F]+", "", repr(value))
+
+
+def get_processor_settings(processor: BaseProcessor, depth: int = 0) -> dict:
+    """
+    Get the settings of a processor, from its attributes (excluding those
+    holding the state of a run)
+
+    :param processor: Processor
+    :param depth: Depth of nested objects
+    :return: Dictionary of json-serialisable settings
+    """
+    settings = {"class": get_settings_value(type(processor))}
+    for key, value in vars(processor).items():
+        if (key in RUN_STATE_ATTRIBUTES) | key.startswith("latest_"):
+            continue
+        settings[key] = get_settings_value(value, depth)
+    return settings
+
+
+def get_processor_key(processor: BaseProcessor) -> str:
+    """
+    Get a key describing a processor and its settings, which is the same
+    for each run with the same settings
+
+    :param processor: Processor
+    :return: Key
+    """
+    settings_hash = get_settings_hash(get_processor_settings(processor))
+    return f"{processor.__class__.__name__}: {settings_hash}"
+
+
+def get_dataset_key(dataset: Dataset) -> str:
+    """
+    Get a key describing the contents of a dataset, by name
+
+    :param dataset: Dataset
+    :return: Key
+    """
+    return get_hash(*[str(x.get_raw_image_names()) for x in dataset])
+
+
+class Checkpointer:
+    """
+    Class to save and load checkpoints of a pipeline run
+    """
+
+    def __init__(
+        self,
+        pipeline_name: str,
+        night: str,
+        checkpoint_after: Optional[list[str]] = None,
+        base_dir: Path = checkpoint_dir,
+    ):
+        """
+        :param pipeline_name: Name of pipeline
+        :param night: Night of pipeline run
+        :param checkpoint_after: Names of processor classes after which to save
+            checkpoints (or 'all', for every processor)
+        :param base_dir: Base directory for checkpoints
+        """
+        self.pipeline_name = pipeline_name
+        self.night = str(night)
+        if checkpoint_after is None:
+            checkpoint_after = []
+        self.checkpoint_after = checkpoint_after
+        self.base_dir = Path(base_dir)
+
+    def __str__(self):
+        return f"<Checkpointer in {self.get_night_dir()}>"
+
+    def get_night_dir(self) -> Path:
+        """
+        Get the checkpoint directory for the pipeline night
+
+        :return: Directory path
+        """
+        return self.base_dir.joinpath(self.pipeline_name, Path(self.night).name)
+
+    def get_step_dir(self, configuration: str, step: int) -> Path:
+        """
+        Get the directory for the checkpoint after a given step
+
+        :param configuration: Name of configuration
+        :param step: Step number (1-indexed)
+        :return: Directory path
+        """
+        return self.get_night_dir().joinpath(configuration, f"step_{step:03d}")
+
+    def get_initial_key(self, dataset: Dataset) -> str:
+        """
+        Get the key for the start of a pipeline run
+
+        :param dataset: Dataset passed to the pipeline
+        :return: Key
+        """
+        return get_hash(self.pipeline_name, self.night, get_dataset_key(dataset))
+
+    @staticmethod
+    def get_step_keys(
+        start_key: str, configuration: str, processors: list[BaseProcessor]
+    ) -> list[str]:
+        """
+        Get the key after each step of a configuration. The key of each step
+        depends on the start key, and on every processor up to that step,
+        including the input files of processors which load them.
+
+        :param start_key: Key at the start of the configuration
+        :param configuration: Name of configuration
+        :param processors: Processors of the configuration
+        :return: List of keys
+        """
+        key = get_hash(start_key, configuration)
+
+        keys = []
+        for processor in processors:
+            key = get_hash(key, get_processor_key(processor))
+            input_key = processor.get_input_key()
+            if input_key is not None:
+                key = get_hash(key, input_key)
+            keys.append(key)
+        return keys
+
+    def is_selected(self, processor: BaseProcessor) -> bool:
+        """
+        Check whether a checkpoint should be saved after a processor
+
+        :param processor: Processor
+        :return: boolean
+        """
+        return (CHECKPOINT_ALL in self.checkpoint_after) or (
+            processor.__class__.__name__ in self.checkpoint_after
+        )
+
+    def split_segments(
+        self, segments: list[list[BaseProcessor]]
+    ) -> list[list[BaseProcessor]]:
+        """
+        Split streaming segments, so that each selected processor ends
+        a segment (and a checkpoint can therefore be saved after it)
+
+        :param segments: Segments of processors
+        :return: Updated segments
+        """
+        new_segments = []
+        for segment in segments:
+            new_segment = []
+            for processor in segment:
+                new_segment.append(processor)
+                if self.is_selected(processor):
+                    new_segments.append(new_segment)
+                    new_segment = []
+            if len(new_segment) > 0:
+                new_segments.append(new_segment)
+        return new_segments
+
+    def save(
+        self,
+        dataset: Dataset,
+        err_stack: ErrorStack,
+        configuration: str,
+        step: int,
+        key: str,
+        processor: BaseProcessor,
+    ) -> Optional[Path]:
+        """
+        Save a checkpoint of the dataset and error stack after a step.
+        Failing to save a checkpoint does not stop the pipeline, so any
+        error is only logged.
+
+        :param dataset: Dataset after the step
+        :param err_stack: Error stack after the step
+        :param configuration: Name of configuration
+        :param step: Step number (1-indexed)
+        :param key: Key of the step
+        :param processor: Processor applied in the step
+        :return: Path of checkpoint (or None if it could not be saved)
+        """
+        step_dir = self.get_step_dir(configuration, step)
+        temp_dir = step_dir.with_name(f".{os.getpid()}_{step_dir.name}")
+
+        try:
+            if temp_dir.exists():
+                shutil.rmtree(temp_dir)
+            temp_dir.joinpath(IMAGE_SUB_DIR).mkdir(parents=True)
+
+            checkpoint_dataset = self.get_checkpoint_dataset(
+                dataset, image_dir=step_dir.joinpath(IMAGE_SUB_DIR), temp_dir=temp_dir
+            )
+
+            with open(temp_dir.joinpath(DATASET_FILE_NAME), "wb") as dataset_file:
+                pickle.dump(checkpoint_dataset, dataset_file)
+
+            with open(temp_dir.joinpath(ERROR_STACK_FILE_NAME), "wb") as err_file:
+                pickle.dump(err_stack, err_file)
+
+            entry = {
+                "pipeline": self.pipeline_name,
+                "night": self.night,
+                "configuration": configuration,
+                "step": step,
+                "processor": processor.__class__.__name__,
+                "key": key,
+                "n_batches": len(dataset),
+                "date": datetime.now().isoformat(),
+            }
+            with open(
+                temp_dir.joinpath(CHECKPOINT_FILE_NAME), "w", encoding="utf8"
+            ) as json_file:
+                json.dump(entry, json_file)
+
+            if step_dir.exists():
+                shutil.rmtree(step_dir)
+            os.replace(temp_dir, step_dir)
+
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning(
+                f"Could not save checkpoint after step {step} "
+                f"({processor.__class__.__name__}) of {configuration}: {exc}"
+            )
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return None
+
+        logger.info(
+            f"Saved checkpoint after step {step} "
+            f"({processor.__class__.__name__}) to {step_dir}"
+        )
+        return step_dir
+
+    @staticmethod
+    def get_checkpoint_dataset(
+        dataset: Dataset, image_dir: Path, temp_dir: Path
+    ) -> Dataset:
+        """
+        Get a copy of a dataset to pickle, in which the data of each loaded
+        image is saved as a npy file, and replaced with a reference to it.
+        Images which are not loaded keep their original reference, unless it
+        is to another checkpoint (which may be overwritten).
+
+        :param dataset: Dataset
+        :param image_dir: Final directory of npy files
+        :param temp_dir: Temporary checkpoint directory, in which npy files
+            are written
+        :return: Dataset to pickle
+        """
+        checkpoint_dataset = Dataset()
+        for j, batch in enumerate(dataset):
+            new_batch = batch.__class__()
+            for i, block in enumerate(batch):
+                if isinstance(block, Image) and (
+                    block.is_loaded() or is_checkpoint_reference(block)
+                ):
+                    name = f"{j}_{i}.npy"
+                    np.save(
+                        temp_dir.joinpath(IMAGE_SUB_DIR, name),
+                        block.get_data(),
+                        allow_pickle=False,
+                    )
+                    block = type(block).from_lazy_data(
+                        partial(
+                            load_checkpoint_data, image_dir.joinpath(name).as_posix()
+                        ),
+                        header=block.get_header(),
+                    )
+                new_batch.append(block)
+            checkpoint_dataset.append(new_batch)
+        return checkpoint_dataset
+
+    def get_entry(self, configuration: str, step: int) -> Optional[dict]:
+        """
+        Get the record of a complete checkpoint, if it exists
+
+        :param configuration: Name of configuration
+        :param step: Step number (1-indexed)
+        :return: Checkpoint record (or None)
+        """
+        json_path = self.get_step_dir(configuration, step).joinpath(
+            CHECKPOINT_FILE_NAME
+        )
+        if not json_path.exists():
+            return None
+
+        try:
+            with open(json_path, "r", encoding="utf8") as json_file:
+                return json.load(json_file)
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning(f"Skipping unreadable checkpoint {json_path}: {exc}")
+            return None
+
+    def find_latest(self, configuration: str, keys: list[str]) -> Optional[int]:
+        """
+        Find the latest step of a configuration with a valid checkpoint,
+        i.e. with a key matching the current run
+
+        :param configuration: Name of configuration
+        :param keys: Key after each step
+        :return: Step number (1-indexed), or None if there is no valid checkpoint
+        """
+        for step in range(len(keys), 0, -1):
+            entry = self.get_entry(configuration, step)
+            if entry is not None and entry["key"] == keys[step - 1]:
+                return step
+        return None
+
+    def load(self, configuration: str, step: int) -> tuple[Dataset, ErrorStack]:
+        """
+        Load the dataset and error stack of a checkpoint
+
+        :param configuration: Name of configuration
+        :param step: Step number (1-indexed)
+        :return: Dataset and error stack
+        """
+        step_dir = self.get_step_dir(configuration, step)
+
+        with open(step_dir.joinpath(DATASET_FILE_NAME), "rb") as dataset_file:
+            dataset = pickle.load(dataset_file)
+
+        with open(step_dir.joinpath(ERROR_STACK_FILE_NAME), "rb") as err_file:
+            err_stack = pickle.load(err_file)
+
+        logger.info(
+            f"Loaded checkpoint with {len(dataset)} batches "
+            f"after step {step} of {configuration} from {step_dir}"
+        )
+        return dataset, err_stack
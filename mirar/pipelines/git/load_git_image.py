@@ -9,8 +9,8 @@ import astropy
 import numpy as np
 from astropy.time import Time
 
-from mirar.data import Image
-from mirar.io import open_fits, open_raw_image
+from mirar.data import IMAGE_DTYPE, Image
+from mirar.io import open_fits, open_fits_data, open_fits_header, open_lazy_image
 from mirar.paths import (
     COADD_KEY,
     GAIN_KEY,
@@ -29,14 +29,13 @@ logger = logging.getLogger(__name__)
 GIT_NONLINEAR_LEVEL = 30000
 
 
-def load_raw_git_fits(path: str | Path) -> tuple[np.array, astropy.io.fits.Header]:
+def clean_raw_git_header(header: astropy.io.fits.Header) -> astropy.io.fits.Header:
     """
-    Function to load a raw GIT image
+    Function to add/modify the required headers of a raw GIT image
 
-    :param path: path of file
-    :return: data and header of image
+    :param header: Raw image header
+    :return: Updated header
     """
-    data, header = open_fits(path)
     if GAIN_KEY not in header.keys():
         header[GAIN_KEY] = 1.0
     header["FILTER"] = header["FILTER"].strip().lower()
@@ -81,21 +80,61 @@ def load_raw_git_fits(path: str | Path) -> tuple[np.array, astropy.io.fits.Heade
 
     header["ZP"] = header["ZP"]
     header[ZP_STD_KEY] = header["ZP_ERR"]
-    data = data.astype(float)
+    return header
+
+
+def clean_raw_git_data(data: np.ndarray) -> np.ndarray:
+    """
+    Function to mask the empty and saturated pixels of a raw GIT image
+
+    :param data: Raw image data
+    :return: Updated data
+    """
+    data = data.astype(IMAGE_DTYPE)
     data[data == 0.0] = np.nan
 
     data[data > 40000] = np.nan
-    return data, header
+    return data
 
 
-def load_raw_lt_fits(path: str | Path) -> tuple[np.array, astropy.io.fits.Header]:
+def load_raw_git_header(path: str | Path) -> astropy.io.fits.Header:
     """
-    Function to load a raw LT image
+    Function to load only the header of a raw GIT image
+
+    :param path: path of file
+    :return: header of image
+    """
+    return clean_raw_git_header(open_fits_header(path))
+
+
+def load_raw_git_data(path: str | Path) -> np.ndarray:
+    """
+    Function to load only the data of a raw GIT image
+
+    :param path: path of file
+    :return: data of image
+    """
+    return clean_raw_git_data(open_fits_data(path))
+
+
+def load_raw_git_fits(path: str | Path) -> tuple[np.array, astropy.io.fits.Header]:
+    """
+    Function to load a raw GIT image
 
     :param path: path of file
     :return: data and header of image
     """
     data, header = open_fits(path)
+    return clean_raw_git_data(data), clean_raw_git_header(header)
+
+
+def clean_raw_lt_header(header: astropy.io.fits.Header) -> astropy.io.fits.Header:
+    """
+    Function to add/modify the required headers of a raw LT image
+
+    :param header: Raw image header
+    :return: Updated header
+    """
     if GAIN_KEY not in header.keys():
         header[GAIN_KEY] = 1.0
 
@@ -140,28 +179,75 @@ def load_raw_lt_fits(path: str | Path) -> tuple[np.array, astropy.io.fits.Header
 
     # header["ZP"] = header["ZP"]
     # header[ZP_STD_KEY] = header["ZP_ERR"]
-    data = data.astype(float)
+    return header
+
+
+def clean_raw_lt_data(data: np.ndarray) -> np.ndarray:
+    """
+    Function to mask the empty pixels of a raw LT image
+
+    :param data: Raw image data
+    :return: Updated data
+    """
+    data = data.astype(IMAGE_DTYPE)
     data[data == 0.0] = np.nan
 
     # data[data > 40000] = np.nan
-    return data, header
+    return data
+
+
+def load_raw_lt_header(path: str | Path) -> astropy.io.fits.Header:
+    """
+    Function to load only the header of a raw LT image
+
+    :param path: path of file
+    :return: header of image
+    """
+    return clean_raw_lt_header(open_fits_header(path))
+
+
+def load_raw_lt_data(path: str | Path) -> np.ndarray:
+    """
+    Function to load only the data of a raw LT image
+
+    :param path: path of file
+    :return: data of image
+    """
+    return clean_raw_lt_data(open_fits_data(path))
+
+
+def load_raw_lt_fits(path: str | Path) -> tuple[np.array, astropy.io.fits.Header]:
+    """
+    Function to load a raw LT image
+
+    :param path: path of file
+    :return: data and header of image
+    """
+    data, header = open_fits(path)
+    return clean_raw_lt_data(data), clean_raw_lt_header(header)
 
 
 def load_raw_git_image(path: str | Path) -> Image:
     """
-    Function to load a raw GIT image
+    Function to load a raw GIT image.
+    Only the header is read, and the data is loaded when first needed.
 
     :param path: Path to the raw image
     :return: Image object
     """
-    return open_raw_image(path, load_raw_git_fits)
+    return open_lazy_image(
+        path, open_header=load_raw_git_header, open_data=load_raw_git_data
+    )
 
 
 def load_raw_lt_image(path: str | Path) -> Image:
     """
-    Function to load a raw LT image
+    Function to load a raw LT image.
+    Only the header is read, and the data is loaded when first needed.
 
     :param path: Path to the raw image
     :return: Image object
     """
-    return open_raw_image(path, load_raw_lt_fits)
+    return open_lazy_image(
+        path, open_header=load_raw_lt_header, open_data=load_raw_lt_data
+    )
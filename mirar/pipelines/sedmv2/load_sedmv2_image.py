@@ -11,7 +11,7 @@ from astropy.io import fits
 from astropy.time import Time
 
 from mirar.data import Image
-from mirar.io import open_mef_fits, open_mef_image
+from mirar.io import open_lazy_mef_image, open_mef_fits, open_mef_headers
 from mirar.paths import (
     BASE_NAME_KEY,
     EXPTIME_KEY,
@@ -207,13 +207,13 @@ def clean_cal_header(
     return hdr0, split_headers
 
 
-def load_raw_sedmv2_mef(
-    path: str | Path,
-) -> tuple[fits.Header, list[np.array], list[fits.Header]]:
-    """
-    Load mef image
+def check_sedmv2_file_is_needed(path: str | Path):
     """
+    Check that a raw SEDMv2 file is needed, raising InvalidImage otherwise
 
+    :param path: Path to image
+    :return: None
+    """
     sedmv2_ignore_files = [
         "sedm2",
         "speccal",
@@ -223,8 +223,23 @@ def load_raw_sedmv2_mef(
         logger.debug(f"Skipping unneeded SEDMv2 file {path}.")
         raise InvalidImage
 
-    header, split_data, split_headers = open_mef_fits(path)
 
+def clean_raw_sedmv2_mef(
+    path: str | Path,
+    header: fits.Header,
+    split_data: list,
+    split_headers: list[fits.Header],
+) -> tuple[fits.Header, list, list[fits.Header]]:
+    """
+    Clean the headers of a mef image, dropping the first extension
+    of science images in all modes except mode0
+
+    :param path: Path to image
+    :param header: Primary header
+    :param split_data: List of extension data arrays, or of extension numbers
+    :param split_headers: List of extension headers
+    :return: Primary header, list of extension data or numbers, list of headers
+    """
     if "IMGTYPE" in header.keys():  # all modes except mode0
         check_header = header
         skip_first = True
@@ -255,15 +270,42 @@ def load_raw_sedmv2_mef(
     return header, split_data, split_headers
 
 
+def load_raw_sedmv2_mef(
+    path: str | Path,
+) -> tuple[fits.Header, list[np.array], list[fits.Header]]:
+    """
+    Load mef image
+    """
+    check_sedmv2_file_is_needed(path)
+    header, split_data, split_headers = open_mef_fits(path)
+    return clean_raw_sedmv2_mef(path, header, split_data, split_headers)
+
+
+def load_raw_sedmv2_mef_headers(
+    path: str | Path,
+) -> tuple[fits.Header, list[int], list[fits.Header]]:
+    """
+    Load only the headers of a mef image
+
+    :param path: Path to image
+    :return: Primary header, list of extension numbers, list of headers
+    """
+    check_sedmv2_file_is_needed(path)
+    header, split_extensions, split_headers = open_mef_headers(path)
+    return clean_raw_sedmv2_mef(path, header, split_extensions, split_headers)
+
+
 def load_sedmv2_mef_image(
     path: str | Path,
 ) -> list[Image]:
     """
-    Function to load sedmv2 mef images
+    Function to load sedmv2 mef images.
+    Only the headers are read, and the data is loaded when first needed.
+
     :param path: Path to image
     :return: list of images
     """
-    return open_mef_image(path, load_raw_sedmv2_mef)
+    return open_lazy_mef_image(path, load_raw_sedmv2_mef_headers)
 
 
 def date_obs_to_mjd(t_raw: str) -> str:
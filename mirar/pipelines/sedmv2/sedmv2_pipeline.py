@@ -8,7 +8,6 @@ from pathlib import Path
 
 from mirar.data import Image
 from mirar.downloader.caltech import download_via_ssh
-from mirar.io import open_mef_image
 from mirar.pipelines.base_pipeline import Pipeline
 from mirar.pipelines.sedmv2.blocks import (  # transient_phot_psfexsex,
     image_photometry,
@@ -24,7 +23,7 @@ from mirar.pipelines.sedmv2.blocks import (  # transient_phot_psfexsex,
     upload_fritz,
 )
 from mirar.pipelines.sedmv2.config import PIPELINE_NAME, sedmv2_cal_requirements
-from mirar.pipelines.sedmv2.load_sedmv2_image import load_raw_sedmv2_mef
+from mirar.pipelines.sedmv2.load_sedmv2_image import load_sedmv2_mef_image
 
 sedmv2_flats_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)))
 
@@ -75,4 +74,4 @@ class SEDMv2Pipeline(Pipeline):
     # def _load_raw_image(path: str) -> tuple[np.ndarray, astropy.io.fits.header]:
     #   return load_raw_sedmv2_image(path)
     def _load_raw_image(path: str | Path) -> Image | list[Image]:
-        return open_mef_image(path, load_raw_sedmv2_mef)
+        return load_sedmv2_mef_image(path)
@@ -0,0 +1,202 @@
+"""
+Module for streaming batches through consecutive processors.
+
+By default, :func:`~mirar.pipelines.base_pipeline.Pipeline.reduce_images` applies
+each :class:`~mirar.processors.base_processor.BaseProcessor` to every batch in a
+:class:`~mirar.data.base_data.Dataset` before moving on to the next processor.
+One slow batch therefore stalls every other batch.
+
+In streaming mode, each batch instead flows through a run of consecutive processors
+as soon as it is ready. Processors which genuinely need the full dataset,
+such as :class:`~mirar.processors.utils.image_selector.ImageBatcher`,
+:class:`~mirar.processors.utils.image_selector.ImageDebatcher` or calibrators built on
+:class:`~mirar.processors.base_processor.ProcessorWithCache`, set
+`requires_full_dataset` and act as barriers. Processors which override
+:func:`~mirar.processors.base_processor.BaseProcessor.base_apply`, such as
+:class:`~mirar.processors.xmatch.XMatch`, are barriers too, because streaming only
+calls `apply` on each batch. Barriers are applied to the whole
+dataset as usual, and streaming resumes afterwards.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from mirar.data import DataBatch, Dataset
+from mirar.errors import ErrorStack, NoncriticalProcessingError
+from mirar.paths import PROCESS_BACKEND, max_n_cpu
+from mirar.processors.base_processor import BaseProcessor
+from mirar.processors.metrics import BatchMetrics, ProcessorMetrics
+
+logger = logging.getLogger(__name__)
+
+
+def is_barrier(processor: BaseProcessor, execution_backend: str | None = None) -> bool:
+    """
+    Check whether a processor must be applied to the full dataset at once.
+    Processors which override `base_apply` are treated as barriers, because
+    streaming would skip the override. Processors running with the process
+    backend are also treated as barriers, because streaming takes place within
+    threads.
+
+    :param processor: Processor to check
+    :param execution_backend: Backend selected for the pipeline run
+    :return: boolean
+    """
+    if processor.requires_full_dataset:
+        return True
+    if type(processor).base_apply is not BaseProcessor.base_apply:
+        return True
+    return processor.get_execution_backend(execution_backend) == PROCESS_BACKEND
+
+
+def split_into_segments(
+    processors: list[BaseProcessor], execution_backend: str | None = None
+) -> list[list[BaseProcessor]]:
+    """
+    Split a list of processors into segments. Each barrier processor is
+    a segment of its own, while consecutive non-barrier processors are grouped
+    together so that batches can be streamed through them.
+
+    :param processors: Processors to split
+    :param execution_backend: Backend selected for the pipeline run
+    :return: List of segments
+    """
+    segments = []
+    stream = []
+
+    for processor in processors:
+        if is_barrier(processor, execution_backend):
+            if len(stream) > 0:
+                segments.append(stream)
+                stream = []
+            segments.append([processor])
+        else:
+            stream.append(processor)
+
+    if len(stream) > 0:
+        segments.append(stream)
+
+    return segments
+
+
+class BatchStream:
+    """
+    Class to stream each batch of a dataset through a list of processors,
+    without waiting for the other batches. Each processor still runs on
+    at most `max_n_cpu` batches at once.
+    """
+
+    def __init__(self, processors: list[BaseProcessor], n_cpu: int = max_n_cpu):
+        self.processors = processors
+        self.n_cpu = n_cpu
+        self.semaphores = [
+            threading.BoundedSemaphore(1 if x.max_n_cpu < 1 else x.max_n_cpu)
+            for x in self.processors
+        ]
+        self.lock = threading.Lock()
+        self.err_stack = ErrorStack()
+
+    def __str__(self):
+        return (
+            f"<A {self.__class__.__name__} through "
+            f"{[x.__class__.__name__ for x in self.processors]}>"
+        )
+
+    def apply(self, dataset: Dataset) -> tuple[Dataset, ErrorStack]:
+        """
+        Stream every batch of a dataset through the processors
+
+        :param dataset: Input dataset
+        :return: Updated dataset, and any caught errors
+        """
+        self.err_stack = ErrorStack()
+
+        for processor in self.processors:
+            processor.latest_n_input_batches = 0
+            processor.latest_n_input_blocks = 0
+            processor.latest_n_output_batches = 0
+            processor.latest_n_output_blocks = 0
+            processor.latest_error_stack = ErrorStack()
+            processor.latest_metrics = ProcessorMetrics()
+
+        results = {}
+
+        if len(dataset) > 0:
+            n_cpu = min([self.n_cpu, len(dataset)])
+
+            logger.info(
+                f"Streaming {len(dataset)} batches through "
+                f"{len(self.processors)} processors on {n_cpu} threads"
+            )
+
+            with ThreadPoolExecutor(max_workers=n_cpu) as executor:
+                futures = [
+                    executor.submit(self.stream_batch, batch, 0, (j,))
+                    for j, batch in enumerate(dataset)
+                ]
+                for future in futures:
+                    for key, batch in future.result():
+                        results[key] = batch
+
+        # Sort by position at each step, to match the non-streamed ordering
+        new_dataset = Dataset([results[key] for key in sorted(results.keys())])
+
+        return new_dataset, self.err_stack
+
+    def stream_batch(
+        self, batch: DataBatch, step: int, key: tuple[int, ...]
+    ) -> list[tuple[tuple[int, ...], DataBatch]]:
+        """
+        Recursively apply the processors from a given step onwards to a batch
+
+        :param batch: Batch to process
+        :param step: Index of the next processor to apply
+        :param key: Position of the batch at each previous step
+        :return: List of (key, batch) pairs which passed all processors
+        """
+        if step == len(self.processors):
+            return [(key, batch)]
+
+        outputs = []
+        for i, new_batch in enumerate(self.apply_step(batch, step)):
+            outputs += self.stream_batch(new_batch, step + 1, key + (i,))
+        return outputs
+
+    def apply_step(self, batch: DataBatch, step: int) -> Dataset:
+        """
+        Apply a single processor to a batch, catching any errors
+
+        :param batch: Batch to process
+        :param step: Index of processor to apply
+        :return: Dataset of resulting batches (empty if the batch failed)
+        """
+        processor = self.processors[step]
+
+        new_batch = None
+        err = None
+
+        with self.semaphores[step], BatchMetrics() as batch_metrics:
+            try:
+                new_batch = processor.apply(batch)
+            except Exception as exc:  # pylint: disable=broad-except
+                err = processor.generate_error_report(exc, batch)
+                logger.error(err.generate_log_message())
+                if isinstance(exc, NoncriticalProcessingError):
+                    new_batch = batch
+
+        processor.latest_metrics.add_batch(batch_metrics)
+
+        new_dataset = Dataset([new_batch] if new_batch is not None else [])
+        new_dataset = processor.update_dataset(new_dataset)
+
+        with self.lock:
+            processor.latest_n_input_batches += 1
+            processor.latest_n_input_blocks += len(batch)
+            processor.latest_n_output_batches += len(new_dataset)
+            processor.latest_n_output_blocks += sum(len(x) for x in new_dataset)
+            if err is not None:
+                processor.latest_error_stack.add_report(err)
+                self.err_stack.add_report(err)
+
+        return new_dataset
@@ -36,6 +36,10 @@ from mirar.pipelines.summer.models import Diff, Exposure, Proc, Raw
 from mirar.processors import BiasCalibrator, FlatCalibrator
 from mirar.processors.astromatic import PSFex, Scamp, Sextractor, Swarp
 from mirar.processors.astrometry.autoastrometry import AutoAstrometry
+from mirar.processors.calibration_store import (
+    REALTIME_STORE_MAX_AGE_DAYS,
+    calibration_store,
+)
 from mirar.processors.cosmic_rays import LACosmicCleaner
 from mirar.processors.csvlog import CSVLog
 from mirar.processors.database.database_inserter import DatabaseImageInserter
@@ -135,11 +139,29 @@ test_cr = [
     ImageSaver(output_dir_name="crclean"),
 ]
 
-process_raw = [
+detrend = [
     BiasCalibrator(),
     ImageSelector((OBSCLASS_KEY, ["flat", "science"])),
     ImageBatcher(split_key="filter"),
     FlatCalibrator(),
+]
+
+# Realtime batches reuse the best recent master bias and flat from the
+# calibration store (if enabled)
+realtime_detrend = [
+    BiasCalibrator(
+        calibration_store=calibration_store,
+        store_max_age_days=REALTIME_STORE_MAX_AGE_DAYS,
+    ),
+    ImageSelector((OBSCLASS_KEY, ["flat", "science"])),
+    ImageBatcher(split_key="filter"),
+    FlatCalibrator(
+        calibration_store=calibration_store,
+        store_max_age_days=REALTIME_STORE_MAX_AGE_DAYS,
+    ),
+]
+
+process_detrended = [
     ImageBatcher(split_key=BASE_NAME_KEY),
     ImageSelector((OBSCLASS_KEY, ["science"])),
     LACosmicCleaner(effective_gain_key=GAIN_KEY, readnoise=2),
@@ -189,6 +211,10 @@ process_raw = [
     ),
 ]
 
+process_raw = detrend + process_detrended
+
+realtime_process_raw = realtime_detrend + process_detrended
+
 # standard_summer_reduction = export_raw + cal_hunter + process_raw #FIXME
 
 
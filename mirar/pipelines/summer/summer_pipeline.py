@@ -19,6 +19,7 @@ from mirar.pipelines.summer.blocks import (
     load_test,
     load_test_proc,
     process_raw,
+    realtime_process_raw,
     sim_realtime,
     subtract,
     test_cr,
@@ -48,7 +49,7 @@ class SummerPipeline(Pipeline):
         "imsub": load_processed + imsub,
         "test_imsub": load_test_proc + subtract,
         "full": load_raw + build_log + export_raw + cal_hunter + process_raw + imsub,
-        "realtime": export_raw + process_raw,
+        "realtime": export_raw + realtime_process_raw,
         "log": load_raw + build_log,
         "simrealtime": sim_realtime,
         "testlog": load_test + build_log,
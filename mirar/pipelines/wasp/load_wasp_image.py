@@ -12,8 +12,8 @@ import numpy as np
 from astropy.coordinates import Angle
 from astropy.time import Time
 
-from mirar.data import Image
-from mirar.io import open_fits, open_raw_image
+from mirar.data import IMAGE_DTYPE, Image
+from mirar.io import open_fits, open_fits_data, open_fits_header, open_lazy_image
 from mirar.paths import (
     COADD_KEY,
     GAIN_KEY,
@@ -33,14 +33,16 @@ from mirar.pipelines.wasp.config.constants import (
 logger = logging.getLogger(__name__)
 
 
-def load_raw_wasp_fits(path: str | Path) -> tuple[np.array, astropy.io.fits.Header]:
+def clean_raw_wasp_header(
+    header: astropy.io.fits.Header, path: str | Path
+) -> astropy.io.fits.Header:
     """
-    Function to load a raw LT image
+    Function to add/modify the required headers of a raw WASP image
 
+    :param header: Raw image header
     :param path: path of file
-    :return: data and header of image
+    :return: Updated header
     """
-    data, header = open_fits(path)
     if GAIN_KEY not in header.keys():
         header[GAIN_KEY] = WASP_GAIN
 
@@ -86,17 +88,60 @@ def load_raw_wasp_fits(path: str | Path) -> tuple[np.array, astropy.io.fits.Head
     header[PROC_HISTORY_KEY] = ""
     header[PROC_FAIL_KEY] = ""
 
-    data = data.astype(float)
+    return header
+
+
+def clean_raw_wasp_data(data: np.ndarray) -> np.ndarray:
+    """
+    Function to mask the empty pixels of a raw WASP image
+
+    :param data: Raw image data
+    :return: Updated data
+    """
+    data = data.astype(IMAGE_DTYPE)
     data[data == 0.0] = np.nan
+    return data
 
-    return data, header
 
+def load_raw_wasp_header(path: str | Path) -> astropy.io.fits.Header:
+    """
+    Function to load only the header of a raw WASP image
 
-def load_raw_wasp_image(path: str | Path) -> Image:
+    :param path: path of file
+    :return: header of image
+    """
+    return clean_raw_wasp_header(open_fits_header(path), path)
+
+
+def load_raw_wasp_data(path: str | Path) -> np.ndarray:
+    """
+    Function to load only the data of a raw WASP image
+
+    :param path: path of file
+    :return: data of image
+    """
+    return clean_raw_wasp_data(open_fits_data(path))
+
+
+def load_raw_wasp_fits(path: str | Path) -> tuple[np.array, astropy.io.fits.Header]:
     """
     Function to load a raw WASP image
 
+    :param path: path of file
+    :return: data and header of image
+    """
+    data, header = open_fits(path)
+    return clean_raw_wasp_data(data), clean_raw_wasp_header(header, path)
+
+
+def load_raw_wasp_image(path: str | Path) -> Image:
+    """
+    Function to load a raw WASP image.
+    Only the header is read, and the data is loaded when first needed.
+
     :param path: Path to the raw image
     :return: Image object
     """
-    return open_raw_image(path, load_raw_wasp_fits)
+    return open_lazy_image(
+        path, open_header=load_raw_wasp_header, open_data=load_raw_wasp_data
+    )
@@ -105,6 +105,10 @@ from mirar.processors.astromatic.swarp.swarp import Swarp
 from mirar.processors.astrometry.anet.anet_processor import AstrometryNet
 from mirar.processors.astrometry.validate import AstrometryStatsWriter
 from mirar.processors.avro import IPACAvroExporter
+from mirar.processors.calibration_store import (
+    REALTIME_STORE_MAX_AGE_DAYS,
+    calibration_store,
+)
 from mirar.processors.catalog_limiting_mag import CatalogLimitingMagnitudeCalculator
 from mirar.processors.csvlog import CSVLog
 from mirar.processors.dark import DarkCalibrator
@@ -343,20 +347,42 @@ load_and_export_unpacked = load_unpacked + export_unpacked
 
 # Detrend blocks
 
-dark_calibrate = [
-    ImageRebatcher(
-        ["BOARD_ID", EXPTIME_KEY, "SUBCOORD", "GAINCOLT", "GAINCOLB", "GAINROW"]
-    ),
-    DarkCalibrator(
-        cache_sub_dir="calibration_darks",
-        cache_image_name_header_keys=[EXPTIME_KEY, "BOARD_ID"],
-    ),
+dark_batch_keys = [
+    "BOARD_ID",
+    EXPTIME_KEY,
+    "SUBCOORD",
+    "GAINCOLT",
+    "GAINCOLB",
+    "GAINROW",
+]
+
+save_darkcal = [
     ImageRebatcher(BASE_NAME_KEY),
     ImageSaver(output_dir_name="darkcal"),
     ImageSelector((OBSCLASS_KEY, ["science", "flat"])),
     CustomImageBatchModifier(winter_dark_oversubtraction_rejector),
 ]
 
+dark_calibrate = [
+    ImageRebatcher(dark_batch_keys),
+    DarkCalibrator(
+        cache_sub_dir="calibration_darks",
+        cache_image_name_header_keys=[EXPTIME_KEY, "BOARD_ID"],
+    ),
+] + save_darkcal
+
+# Realtime batches reuse the best recent master dark from the calibration store
+# (if enabled), matched on all of the keys used to batch the darks
+realtime_dark_calibrate = [
+    ImageRebatcher(dark_batch_keys),
+    DarkCalibrator(
+        cache_sub_dir="calibration_darks",
+        cache_image_name_header_keys=dark_batch_keys,
+        calibration_store=calibration_store,
+        store_max_age_days=REALTIME_STORE_MAX_AGE_DAYS,
+    ),
+] + save_darkcal
+
 flat_calibrate = [
     ImageSelector((OBSCLASS_KEY, ["science"])),
     ImageRebatcher(
@@ -900,7 +926,15 @@ detrend_unpacked = load_and_export_unpacked + dark_calibrate + flat_calibrate
 
 only_ref = load_ref + select_ref + refbuild
 
-realtime = extract_all + mask_and_split + save_raw + full_reduction
+realtime_reduction = (
+    realtime_dark_calibrate
+    + flat_calibrate
+    + fourier_filter
+    + process_and_stack
+    + photcal_and_export
+)
+
+realtime = extract_all + mask_and_split + save_raw + realtime_reduction
 
 candidates = detect_candidates + process_candidates
 
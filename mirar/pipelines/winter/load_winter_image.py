@@ -18,9 +18,10 @@ from mirar.data import Image, ImageBatch
 from mirar.io import (
     ExtensionParsingError,
     open_fits,
+    open_lazy_image,
+    open_lazy_mef_image,
     open_mef_fits,
-    open_mef_image,
-    open_raw_image,
+    open_mef_headers,
     tag_mef_extension_file_headers,
 )
 from mirar.paths import (
@@ -353,24 +354,27 @@ def load_test_winter_image(
     :param path: Path to image
     :return: Image object
     """
-    image = open_raw_image(path)
+    image = open_lazy_image(path)
     header = clean_header(image.header)
 
     image.set_header(header)
     return image
 
 
-def load_raw_winter_mef(
+def clean_raw_winter_mef_headers(
     path: str,
-) -> tuple[astropy.io.fits.Header, list[np.array], list[astropy.io.fits.Header]]:
+    primary_header: astropy.io.fits.Header,
+    split_headers: list[astropy.io.fits.Header],
+) -> tuple[astropy.io.fits.Header, list[astropy.io.fits.Header]]:
     """
-    Load mef image.
+    Clean the primary and extension headers of a raw mef image,
+    marking the image as corrupted if the headers cannot be parsed.
 
     :param path: Path to image
-    :return: Primary header, list of data arrays, list of headers
+    :param primary_header: Primary header
+    :param split_headers: List of extension headers
+    :return: Primary header, list of extension headers
     """
-    primary_header, split_data, split_headers = open_mef_fits(path)
-
     img_name = Path(path).name
     primary_header[BASE_NAME_KEY] = img_name
     primary_header[RAW_IMG_KEY] = path
@@ -451,19 +455,55 @@ def load_raw_winter_mef(
         if "BOARD_ID" in board_header.keys():
             board_header["BOARD_ID"] = int(board_header["BOARD_ID"])
 
+    return primary_header, split_headers
+
+
+def load_raw_winter_mef(
+    path: str,
+) -> tuple[astropy.io.fits.Header, list[np.array], list[astropy.io.fits.Header]]:
+    """
+    Load mef image.
+
+    :param path: Path to image
+    :return: Primary header, list of data arrays, list of headers
+    """
+    primary_header, split_data, split_headers = open_mef_fits(path)
+    primary_header, split_headers = clean_raw_winter_mef_headers(
+        path, primary_header, split_headers
+    )
     return primary_header, split_data, split_headers
 
 
+def load_raw_winter_mef_headers(
+    path: str,
+) -> tuple[astropy.io.fits.Header, list[int], list[astropy.io.fits.Header]]:
+    """
+    Load only the headers of a mef image.
+
+    :param path: Path to image
+    :return: Primary header, list of extension numbers, list of headers
+    """
+    primary_header, split_extensions, split_headers = open_mef_headers(path)
+    primary_header, split_headers = clean_raw_winter_mef_headers(
+        path, primary_header, split_headers
+    )
+    return primary_header, split_extensions, split_headers
+
+
 def load_winter_mef_image(
     path: str | Path,
 ) -> list[Image]:
     """
-    Function to load winter mef images
+    Function to load winter mef images.
+    Only the headers are read, and the data of each board is loaded
+    when first needed.
 
     :param path: Path to image
     :return: list of images
     """
-    images = open_mef_image(path, load_raw_winter_mef, extension_key="BOARD_ID")
+    images = open_lazy_mef_image(
+        path, load_raw_winter_mef_headers, extension_key="BOARD_ID"
+    )
     return images
 
 
@@ -369,3 +369,36 @@ class Candidate(BaseDB):
             duplicate_protocol=duplicate_protocol,
             returning_key_names=returning_key_names,
         )
+
+    @classmethod
+    def insert_entries(
+        cls, entries, duplicate_protocol, returning_key_names=None
+    ) -> pd.DataFrame:
+        """
+        Insert many pydantic-ified entries into the corresponding sql database,
+        checking each distinct program only once
+
+        :param entries: entries to insert
+        :param duplicate_protocol: protocol to follow if duplicate entry is found
+        :param returning_key_names: names of the keys to return
+        :return: dataframe of the sequence keys, with one row per entry
+        """
+        for progname in sorted({x.progname for x in entries}):
+            prog_match = select_from_table(
+                DBQueryConstraints(columns="progname", accepted_values=progname),
+                sql_table=Program.sql_model,
+            )
+            if prog_match.empty:
+                logger.debug(
+                    f"Program {progname} not found in database. "
+                    f"Using default program {default_program.progname}"
+                )
+                for entry in entries:
+                    if entry.progname == progname:
+                        entry.progname = default_program.progname
+
+        return cls._insert_entries(
+            entries,
+            duplicate_protocol=duplicate_protocol,
+            returning_key_names=returning_key_names,
+        )
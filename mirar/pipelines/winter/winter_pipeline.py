@@ -6,7 +6,6 @@ import logging
 
 from mirar.data import Image
 from mirar.downloader.caltech import download_via_ssh
-from mirar.io import open_mef_image
 from mirar.pipelines.base_pipeline import Pipeline
 from mirar.pipelines.winter.blocks import (
     astrometry,
@@ -48,7 +47,7 @@ from mirar.pipelines.winter.blocks import (
     unpack_subset,
 )
 from mirar.pipelines.winter.config import PIPELINE_NAME, winter_cal_requirements
-from mirar.pipelines.winter.load_winter_image import load_raw_winter_mef
+from mirar.pipelines.winter.load_winter_image import load_winter_mef_image
 from mirar.pipelines.winter.models import set_up_winter_databases
 
 logger = logging.getLogger(__name__)
@@ -117,7 +116,7 @@ class WINTERPipeline(Pipeline):
 
     @staticmethod
     def _load_raw_image(path: str) -> Image | list[Image]:
-        return open_mef_image(path, load_raw_winter_mef, extension_key="BOARD_ID")
+        return load_winter_mef_image(path)
 
     @staticmethod
     def download_raw_images_for_night(night: str):
@@ -9,8 +9,8 @@ import astropy
 import numpy as np
 from astropy.time import Time
 
-from mirar.data import Image
-from mirar.io import open_fits, open_raw_image
+from mirar.data import IMAGE_DTYPE, Image
+from mirar.io import open_fits, open_fits_data, open_fits_header, open_lazy_image
 from mirar.paths import (
     COADD_KEY,
     GAIN_KEY,
@@ -37,14 +37,13 @@ sncosmo_filters = {
 }
 
 
-def load_raw_wirc_fits(path: str | Path) -> tuple[np.array, astropy.io.fits.Header]:
+def clean_raw_wirc_header(header: astropy.io.fits.Header) -> astropy.io.fits.Header:
     """
-    Function to load a raw WIRC image
+    Function to add/modify the required headers of a raw WIRC image
 
-    :param path: path of file
-    :return: data and header of image
+    :param header: Raw image header
+    :return: Updated header
     """
-    data, header = open_fits(path)
     if GAIN_KEY not in header.keys():
         header[GAIN_KEY] = 1.2
     header["FILTER"] = header["AFT"].split("__")[0]
@@ -96,16 +95,60 @@ def load_raw_wirc_fits(path: str | Path) -> tuple[np.array, astropy.io.fits.Head
         if "ZP_AUTO" in header.keys():
             header[ZP_KEY] = float(header["ZP_AUTO"])
             header[ZP_STD_KEY] = float(header["ZP_AUTO_std"])
-    data = data.astype(float)
+    return header
+
+
+def clean_raw_wirc_data(data: np.ndarray) -> np.ndarray:
+    """
+    Function to mask the empty pixels of a raw WIRC image
+
+    :param data: Raw image data
+    :return: Updated data
+    """
+    data = data.astype(IMAGE_DTYPE)
     data[data == 0.0] = np.nan
-    return data, header
+    return data
 
 
-def load_raw_wirc_image(path: str | Path) -> Image:
+def load_raw_wirc_header(path: str | Path) -> astropy.io.fits.Header:
+    """
+    Function to load only the header of a raw WIRC image
+
+    :param path: path of file
+    :return: header of image
+    """
+    return clean_raw_wirc_header(open_fits_header(path))
+
+
+def load_raw_wirc_data(path: str | Path) -> np.ndarray:
+    """
+    Function to load only the data of a raw WIRC image
+
+    :param path: path of file
+    :return: data of image
+    """
+    return clean_raw_wirc_data(open_fits_data(path))
+
+
+def load_raw_wirc_fits(path: str | Path) -> tuple[np.array, astropy.io.fits.Header]:
     """
     Function to load a raw WIRC image
 
+    :param path: path of file
+    :return: data and header of image
+    """
+    data, header = open_fits(path)
+    return clean_raw_wirc_data(data), clean_raw_wirc_header(header)
+
+
+def load_raw_wirc_image(path: str | Path) -> Image:
+    """
+    Function to load a raw WIRC image.
+    Only the header is read, and the data is loaded when first needed.
+
     :param path: Path to the raw image
     :return: Image object
     """
-    return open_raw_image(path, load_raw_wirc_fits)
+    return open_lazy_image(
+        path, open_header=load_raw_wirc_header, open_data=load_raw_wirc_data
+    )
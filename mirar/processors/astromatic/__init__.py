@@ -7,5 +7,8 @@ from mirar.processors.astromatic.scamp.scamp import Scamp
 from mirar.processors.astromatic.sextractor.background_subtractor import (
     SextractorBkgSubtractor,
 )
+from mirar.processors.astromatic.sextractor.inprocess_sextractor import (
+    InProcessSextractor,
+)
 from mirar.processors.astromatic.sextractor.sextractor import Sextractor
 from mirar.processors.astromatic.swarp.swarp import Swarp
@@ -26,6 +26,7 @@ from mirar.processors.astromatic.sextractor.sextractor import (
 )
 from mirar.processors.base_processor import BaseImageProcessor
 from mirar.utils import execute
+from mirar.utils.staging import staging
 
 logger = logging.getLogger(__name__)
 
@@ -155,37 +156,47 @@ class Scamp(BaseImageProcessor):
 
         out_files = []
 
-        with open(scamp_image_list_path, "w", encoding="utf8") as img_list_f:
-            for image in batch:
-                temp_sextractor_cat_path = copy_temp_file(
-                    output_dir=scamp_output_dir, file_path=image[SEXTRACTOR_HEADER_KEY]
-                )
-                img_list_f.write(f"{temp_sextractor_cat_path}\n")
-                temp_files += [temp_sextractor_cat_path]
-
-                out_path = Path(
-                    os.path.splitext(temp_sextractor_cat_path)[0]
-                ).with_suffix(".head")
-                out_files.append(out_path)
-        num_files = len(batch)
-        run_scamp(
-            scamp_list_path=scamp_image_list_path,
-            scamp_config_path=self.scamp_config,
-            ast_ref_cat_path=ref_cat_path,
-            output_dir=scamp_output_dir,
-            timeout_seconds=30.0 * num_files,
-        )
-
-        if not self.cache:
-            for path in temp_files:
-                logger.debug(f"Deleting temp file {path}")
-                path.unlink()
+        try:
+            with open(scamp_image_list_path, "w", encoding="utf8") as img_list_f:
+                for image in batch:
+                    if self.cache:
+                        temp_sextractor_cat_path = copy_temp_file(
+                            output_dir=scamp_output_dir,
+                            file_path=image[SEXTRACTOR_HEADER_KEY],
+                        )
+                    else:
+                        temp_sextractor_cat_path = staging.copy_temp_file(
+                            output_dir=scamp_output_dir,
+                            file_path=Path(image[SEXTRACTOR_HEADER_KEY]),
+                        )
+                    img_list_f.write(f"{temp_sextractor_cat_path}\n")
+                    temp_files += [temp_sextractor_cat_path]
+
+                    out_path = Path(
+                        os.path.splitext(temp_sextractor_cat_path)[0]
+                    ).with_suffix(".head")
+                    out_files.append(out_path)
+            num_files = len(batch)
+            run_scamp(
+                scamp_list_path=scamp_image_list_path,
+                scamp_config_path=self.scamp_config,
+                ast_ref_cat_path=ref_cat_path,
+                output_dir=scamp_output_dir,
+                timeout_seconds=30.0 * num_files,
+            )
+        finally:
+            # Release staged files (and their reserved space) even on failure
+            if not self.cache:
+                for path in temp_files:
+                    logger.debug(f"Deleting temp file {path}")
+                    staging.release(path)
 
         assert len(batch) == len(out_files)
 
         for i, out_path in enumerate(out_files):
             image = batch[i]
-            new_out_path = get_untemp_path(out_path)
+            # Scamp writes headers beside the (possibly staged) catalogs
+            new_out_path = scamp_output_dir.joinpath(get_untemp_path(out_path).name)
             shutil.move(out_path, new_out_path)
             image[SCAMP_HEADER_KEY] = str(new_out_path).strip()
             if self.copy_scamp_header_to_image:
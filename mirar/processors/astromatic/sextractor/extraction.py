@@ -0,0 +1,935 @@
+"""
+Module for in-process source extraction, following the Sextractor algorithm
+(background estimation, filtered threshold detection, deblending, and
+measurement) with photutils, rather than running the sextractor executable.
+
+The settings are read from the same Sextractor config, parameter and filter
+files used by :func:`~mirar.processors.astromatic.sextractor.sourceextractor.
+run_sextractor_single`, and the output catalog uses the same column names
+(and the same 1-indexed pixel convention). Only the columns listed in
+SUPPORTED_COLUMNS can be measured. Other columns in a parameter file
+(e.g. CLASS_STAR or PSF-fitting measurements) are omitted from the catalog.
+
+Deblending uses photutils, which requires scikit-image. If scikit-image is not
+installed, sources are not deblended.
+"""
+
+import functools
+import importlib.util
+import logging
+import math
+import warnings
+from pathlib import Path
+
+import numpy as np
+from astropy.io import fits
+from astropy.stats import SigmaClip
+from astropy.table import Table
+from astropy.utils.exceptions import AstropyUserWarning, AstropyWarning
+from astropy.wcs import WCS
+from astropy.wcs.utils import proj_plane_pixel_scales
+from photutils.background import Background2D, SExtractorBackground, StdBackgroundRMS
+from photutils.segmentation import (
+    SegmentationImage,
+    SourceCatalog,
+    deblend_sources,
+    detect_sources,
+)
+from photutils.utils import NoDetectionsWarning, calc_total_error
+from scipy import ndimage
+
+logger = logging.getLogger(__name__)
+
+# Defaults used by Sextractor when a key is missing from the config file
+DEFAULT_SEXTRACTOR_CONFIG = {
+    "DETECT_MINAREA": "5",
+    "THRESH_TYPE": "RELATIVE",
+    "DETECT_THRESH": "1.5",
+    "FILTER": "Y",
+    "DEBLEND_NTHRESH": "32",
+    "DEBLEND_MINCONT": "0.005",
+    "PHOT_APERTURES": "5",
+    "PHOT_AUTOPARAMS": "2.5,3.5",
+    "PHOT_FLUXFRAC": "0.5",
+    "SATUR_KEY": "SATURATE",
+    "SATUR_LEVEL": "50000.0",
+    "MAG_ZEROPOINT": "0.0",
+    "GAIN": "0.0",
+    "BACK_SIZE": "64",
+    "BACK_FILTERSIZE": "3",
+}
+
+SUPPORTED_COLUMNS = [
+    "NUMBER",
+    "X_IMAGE",
+    "Y_IMAGE",
+    "XWIN_IMAGE",
+    "YWIN_IMAGE",
+    "XPEAK_IMAGE",
+    "YPEAK_IMAGE",
+    "ERRAWIN_IMAGE",
+    "ERRBWIN_IMAGE",
+    "ERRTHETAWIN_IMAGE",
+    "ALPHA_J2000",
+    "DELTA_J2000",
+    "ALPHAWIN_J2000",
+    "DELTAWIN_J2000",
+    "A_IMAGE",
+    "B_IMAGE",
+    "THETA_IMAGE",
+    "ELONGATION",
+    "ELLIPTICITY",
+    "FWHM_IMAGE",
+    "FWHM_WORLD",
+    "FLUX_RADIUS",
+    "KRON_RADIUS",
+    "ISOAREA_IMAGE",
+    "FLUX_ISO",
+    "FLUXERR_ISO",
+    "MAG_ISO",
+    "MAGERR_ISO",
+    "FLUX_AUTO",
+    "FLUXERR_AUTO",
+    "MAG_AUTO",
+    "MAGERR_AUTO",
+    "FLUX_APER",
+    "FLUXERR_APER",
+    "MAG_APER",
+    "MAGERR_APER",
+    "FLUX_MAX",
+    "BACKGROUND",
+    "SNR_WIN",
+    "FLAGS",
+    "VIGNET",
+]
+
+INT_COLUMNS = {
+    "NUMBER": np.int32,
+    "XPEAK_IMAGE": np.int32,
+    "YPEAK_IMAGE": np.int32,
+    "ISOAREA_IMAGE": np.int32,
+    "FLAGS": np.int16,
+}
+
+# Units of world columns, as for Sextractor (e.g. required by SkyCoord)
+COLUMN_UNITS = {
+    "ALPHA_J2000": "deg",
+    "DELTA_J2000": "deg",
+    "ALPHAWIN_J2000": "deg",
+    "DELTAWIN_J2000": "deg",
+    "FWHM_WORLD": "deg",
+}
+
+# Sextractor flag bits
+BLENDED_FLAG = 2
+SATURATED_FLAG = 4
+TRUNCATED_FLAG = 8
+
+# Value of masked pixels in VIGNET, as for Sextractor
+VIGNET_MASK_VALUE = -1.0e30
+
+# Range of half-sizes of the stamps used for windowed measurements
+MIN_WINDOW_HALF_SIZE = 4
+MAX_WINDOW_HALF_SIZE = 16
+# Maximum iterations and tolerance (pixels) for windowed centroids
+WINDOW_MAX_ITERATIONS = 16
+WINDOW_TOLERANCE = 2.0e-4
+STAMP_CHUNK_SIZE = 2048
+
+DEBLENDING_AVAILABLE = importlib.util.find_spec("skimage") is not None
+
+FWHM_TO_SIGMA = 1.0 / (2.0 * np.sqrt(2.0 * np.log(2.0)))
+
+
+def parse_sextractor_config(config_path: str | Path) -> dict[str, str]:
+    """
+    Parse a Sextractor config file, filling missing keys with Sextractor defaults
+
+    :param config_path: Path of config file
+    :return: Dictionary of config values (as strings)
+    """
+    config = DEFAULT_SEXTRACTOR_CONFIG.copy()
+    with open(config_path, "r", encoding="utf8") as config_file:
+        for line in config_file:
+            line = line.split("#")[0].strip()
+            if len(line) == 0:
+                continue
+            key, *value = line.split(None, 1)
+            if len(value) > 0:
+                config[key] = value[0].strip()
+    return config
+
+
+def parse_sextractor_parameters(
+    parameter_path: str | Path,
+) -> list[tuple[str, tuple[int, ...]]]:
+    """
+    Parse a Sextractor parameter file
+
+    :param parameter_path: Path of parameter file
+    :return: List of (column name, vector shape) for each parameter
+    """
+    parameters = []
+    with open(parameter_path, "r", encoding="utf8") as param_file:
+        for line in param_file:
+            line = line.split("#")[0].strip()
+            if len(line) == 0:
+                continue
+            name, *shape = line.replace(")", "").split("(")
+            if len(shape) > 0:
+                shape = tuple(int(x) for x in shape[0].split(","))
+            else:
+                shape = ()
+            parameters.append((name.strip(), shape))
+    return parameters
+
+
+def load_sextractor_filter(filter_path: str | Path) -> np.ndarray:
+    """
+    Load a Sextractor convolution filter
+
+    :param filter_path: Path of filter file
+    :return: Filter kernel (normalised if the file specifies 'CONV NORM')
+    """
+    normalise = False
+    rows = []
+    with open(filter_path, "r", encoding="utf8") as filter_file:
+        for line in filter_file:
+            line = line.split("#")[0].strip()
+            if len(line) == 0:
+                continue
+            if line.startswith("CONV"):
+                normalise = "NORM" in line and "NONORM" not in line
+                continue
+            rows.append([float(x) for x in line.split()])
+
+    kernel = np.array(rows)
+    if normalise:
+        kernel /= np.sum(np.abs(kernel))
+    return kernel
+
+
+def get_config_values(value: str, dtype: type = float) -> list:
+    """
+    Split a comma-separated Sextractor config value
+
+    :param value: Config value
+    :param dtype: Type of each entry
+    :return: List of entries
+    """
+    return [dtype(x) for x in value.replace(",", " ").split()]
+
+
+def get_extraction_settings(
+    config_path: str | Path,
+    filter_path: str | Path | None = None,
+) -> dict:
+    """
+    Get the settings for :func:`extract_sources` from a Sextractor config file
+
+    :param config_path: Path of Sextractor config file
+    :param filter_path: Path of filter file (overrides FILTER_NAME)
+    :return: Dictionary of settings
+    """
+    config = parse_sextractor_config(config_path)
+
+    if filter_path is None:
+        filter_path = config.get("FILTER_NAME")
+
+    filter_kernel = None
+    if (config["FILTER"].upper().startswith("Y")) & (filter_path is not None):
+        filter_kernel = load_sextractor_filter(filter_path)
+
+    back_size = get_config_values(config["BACK_SIZE"], int)
+    back_filtersize = get_config_values(config["BACK_FILTERSIZE"], int)
+
+    return {
+        "detect_thresh": get_config_values(config["DETECT_THRESH"])[0],
+        "thresh_type": config["THRESH_TYPE"].upper(),
+        "detect_minarea": int(get_config_values(config["DETECT_MINAREA"])[0]),
+        "filter_kernel": filter_kernel,
+        "deblend_nthresh": int(get_config_values(config["DEBLEND_NTHRESH"])[0]),
+        "deblend_mincont": get_config_values(config["DEBLEND_MINCONT"])[0],
+        "back_size": (back_size[-1], back_size[0]),
+        "back_filtersize": (back_filtersize[-1], back_filtersize[0]),
+        "phot_apertures": get_config_values(config["PHOT_APERTURES"]),
+        "phot_autoparams": tuple(get_config_values(config["PHOT_AUTOPARAMS"])[:2]),
+        "phot_fluxfrac": get_config_values(config["PHOT_FLUXFRAC"]),
+        "satur_key": config["SATUR_KEY"],
+        "saturation": get_config_values(config["SATUR_LEVEL"])[0],
+        "mag_zp": get_config_values(config["MAG_ZEROPOINT"])[0],
+        "gain": get_config_values(config["GAIN"])[0],
+    }
+
+
+def estimate_background(
+    data: np.ndarray,
+    mask: np.ndarray,
+    back_size: tuple[int, int],
+    back_filtersize: tuple[int, int],
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Estimate the background and background RMS of an image, on a mesh of
+    boxes as for Sextractor
+
+    :param data: Image data
+    :param mask: Boolean mask (True for masked pixels)
+    :param back_size: Size (ny, nx) of background boxes
+    :param back_filtersize: Size (ny, nx) of median filter applied to the mesh
+    :return: Background, background RMS
+    """
+    box_size = tuple(min(size, dim) for size, dim in zip(back_size, data.shape))
+    # The median filter must have an odd size (Sextractor allows even sizes)
+    filter_size = tuple(size + 1 - size % 2 for size in back_filtersize)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", AstropyUserWarning)
+        bkg = Background2D(
+            data,
+            box_size=box_size,
+            filter_size=filter_size,
+            mask=mask,
+            sigma_clip=SigmaClip(sigma=3.0),
+            bkg_estimator=SExtractorBackground(),
+            bkgrms_estimator=StdBackgroundRMS(),
+            exclude_percentile=90.0,
+        )
+    return bkg.background, bkg.background_rms
+
+
+def get_stamps(
+    data: np.ndarray,
+    x_pix: np.ndarray,
+    y_pix: np.ndarray,
+    shape: tuple[int, int],
+    fill_value: float,
+) -> np.ndarray:
+    """
+    Get stamps of an image around each of a list of (0-indexed) positions
+
+    :param data: Image data
+    :param x_pix: x positions
+    :param y_pix: y positions
+    :param shape: Shape (ny, nx) of stamps
+    :param fill_value: Value for pixels outside the image
+    :return: Stamps, of shape (n_positions, ny, nx)
+    """
+    offsets_y = np.arange(shape[0]) - shape[0] // 2
+    offsets_x = np.arange(shape[1]) - shape[1] // 2
+
+    centre_x = np.rint(np.nan_to_num(x_pix, nan=-1.0e6)).astype(int)
+    centre_y = np.rint(np.nan_to_num(y_pix, nan=-1.0e6)).astype(int)
+
+    inds_y = centre_y[:, None, None] + offsets_y[None, :, None]
+    inds_x = centre_x[:, None, None] + offsets_x[None, None, :]
+    inside = (
+        (inds_y >= 0)
+        & (inds_y < data.shape[0])
+        & (inds_x >= 0)
+        & (inds_x < data.shape[1])
+    )
+
+    stamps = data[
+        np.clip(inds_y, 0, data.shape[0] - 1), np.clip(inds_x, 0, data.shape[1] - 1)
+    ]
+    return np.where(inside, stamps, fill_value)
+
+
+def get_flux_radii(  # pylint: disable=too-many-arguments
+    data_stamps: np.ndarray,
+    d_x: np.ndarray,
+    d_y: np.ndarray,
+    total_flux: np.ndarray,
+    fractions: list[float],
+    max_radius: float,
+) -> np.ndarray:
+    """
+    Get the radii enclosing given fractions of the total flux of each source,
+    by interpolating the growth curve of pixels sorted by radius. The radius
+    after summing k pixels is taken as that of a circle of area k, which avoids
+    the bias of using the radius of the last pixel centre.
+
+    :param data_stamps: Stamps around each source
+    :param d_x: x offset of stamp pixels from each source centre
+    :param d_y: y offset of stamp pixels from each source centre
+    :param total_flux: Total flux of each source
+    :param fractions: Flux fractions
+    :param max_radius: Radius beyond which pixels are ignored
+    :return: Radii, of shape (n_sources, n_fractions)
+    """
+    n_sources = len(data_stamps)
+    rows = np.arange(n_sources)
+
+    radius = np.broadcast_to(np.sqrt(d_x**2 + d_y**2), data_stamps.shape)
+    radius = radius.reshape(n_sources, -1)
+    flux = np.where(radius <= max_radius, data_stamps.reshape(n_sources, -1), 0.0)
+
+    order = np.argsort(radius, axis=1)
+    growth = np.cumsum(np.take_along_axis(flux, order, axis=1), axis=1)
+    area_radius = np.sqrt(np.arange(1, growth.shape[1] + 1) / np.pi)
+
+    radii = np.full((n_sources, len(fractions)), np.nan)
+    for i, fraction in enumerate(fractions):
+        target = fraction * total_flux
+        reached = growth >= target[:, None]
+        ind = np.argmax(reached, axis=1)
+        prev_ind = np.maximum(ind - 1, 0)
+
+        prev_growth = np.where(ind > 0, growth[rows, prev_ind], 0.0)
+        prev_radius = np.where(ind > 0, area_radius[prev_ind], 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = (target - prev_growth) / (growth[rows, ind] - prev_growth)
+        valid = reached[rows, ind] & (np.nan_to_num(total_flux) > 0.0)
+        radii[:, i] = np.where(
+            valid, prev_radius + step * (area_radius[ind] - prev_radius), np.nan
+        )
+    return radii
+
+
+def get_windowed_centroids(
+    data_stamps: np.ndarray, d_x: np.ndarray, d_y: np.ndarray, sigma: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Iteratively find the centroids of sources weighted by a Gaussian window,
+    as for Sextractor XWIN_IMAGE/YWIN_IMAGE
+
+    :param data_stamps: Stamps around each source
+    :param d_x: x offset of stamp pixels from each source's starting centre
+    :param d_y: y offset of stamp pixels from each source's starting centre
+    :param sigma: Width of Gaussian window for each source
+    :return: x shift, y shift from each starting centre
+    """
+    shift_x = np.zeros(len(data_stamps))
+    shift_y = np.zeros(len(data_stamps))
+    active = np.ones(len(data_stamps), dtype=bool)
+
+    for _ in range(WINDOW_MAX_ITERATIONS):
+        offset_x = d_x[active] - shift_x[active, None, None]
+        offset_y = d_y[active] - shift_y[active, None, None]
+        weights = np.exp(
+            -(offset_x**2 + offset_y**2) / (2.0 * sigma[active, None, None] ** 2)
+        )
+        weighted_data = weights * data_stamps[active]
+        norm = np.sum(weighted_data, axis=(1, 2))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step_x = 2.0 * np.sum(weighted_data * offset_x, axis=(1, 2)) / norm
+            step_y = 2.0 * np.sum(weighted_data * offset_y, axis=(1, 2)) / norm
+
+        # Sources with no positive windowed flux keep their starting centre
+        valid = (norm > 0.0) & np.isfinite(step_x) & np.isfinite(step_y)
+        inds = np.flatnonzero(active)
+        shift_x[inds[valid]] += step_x[valid]
+        shift_y[inds[valid]] += step_y[valid]
+
+        converged = (step_x**2 + step_y**2 < WINDOW_TOLERANCE**2) | ~valid
+        active[inds[converged]] = False
+        if not np.any(active):
+            break
+
+    return shift_x, shift_y
+
+
+def get_magnitudes(
+    flux: np.ndarray, flux_err: np.ndarray, mag_zp: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convert fluxes to magnitudes, with Sextractor's value of 99 for
+    non-positive fluxes
+
+    :param flux: Fluxes
+    :param flux_err: Flux errors
+    :param mag_zp: Magnitude zero point
+    :return: Magnitudes, magnitude errors
+    """
+    positive = np.nan_to_num(flux) > 0.0
+    safe_flux = np.where(positive, flux, 1.0)
+    mag = np.where(positive, mag_zp - 2.5 * np.log10(safe_flux), 99.0)
+    mag_err = np.where(positive, 2.5 / np.log(10.0) * flux_err / safe_flux, 99.0)
+    return mag, mag_err
+
+
+def get_error_ellipse(
+    var_x: np.ndarray, var_y: np.ndarray, cov_xy: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Get the semi-axes and position angle of error ellipses from the
+    position covariance, as for Sextractor ERRA/ERRB/ERRTHETA
+
+    :param var_x: Variance in x
+    :param var_y: Variance in y
+    :param cov_xy: Covariance of x and y
+    :return: Semi-major axis, semi-minor axis, position angle (deg)
+    """
+    mean = (var_x + var_y) / 2.0
+    diff = np.sqrt(((var_x - var_y) / 2.0) ** 2 + cov_xy**2)
+    err_a = np.sqrt(np.maximum(mean + diff, 0.0))
+    err_b = np.sqrt(np.maximum(mean - diff, 0.0))
+    err_theta = np.degrees(0.5 * np.arctan2(2.0 * cov_xy, var_x - var_y))
+    return err_a, err_b, err_theta
+
+
+class ExtractedSources:  # pylint: disable=too-many-instance-attributes
+    """
+    Class to measure Sextractor catalog columns for detected sources
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        data: np.ndarray,
+        background: np.ndarray,
+        variance: np.ndarray,
+        mask: np.ndarray,
+        segment_img: SegmentationImage | None,
+        blended: np.ndarray,
+        wcs: WCS | None,
+        settings: dict,
+    ):
+        """
+        :param data: Background-subtracted image data
+        :param background: Background
+        :param variance: Total variance of each pixel
+        :param mask: Boolean mask (True for masked pixels)
+        :param segment_img: Segmentation image (None if there are no sources)
+        :param blended: Boolean array of whether each source was deblended
+        :param wcs: Celestial WCS of image (None if unavailable)
+        :param settings: Extraction settings
+        """
+        self.data = data
+        self.background = background
+        self.variance = variance
+        self.mask = mask
+        self.segment_img = segment_img
+        self.blended = blended
+        self.wcs = wcs
+        self.settings = settings
+
+        self.aperture_photometry = {}
+
+        self.n_sources = 0 if segment_img is None else segment_img.nlabels
+
+        self.catalog = None
+        if self.n_sources > 0:
+            self.catalog = SourceCatalog(
+                data,
+                segment_img,
+                error=np.sqrt(variance),
+                mask=mask,
+                background=background,
+                kron_params=settings["phot_autoparams"],
+            )
+
+    def world_coords(
+        self, x_image: np.ndarray, y_image: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Convert (1-indexed) pixel positions to RA/Dec
+
+        :param x_image: x positions
+        :param y_image: y positions
+        :return: RA (deg), Dec (deg)
+        """
+        if self.wcs is None:
+            return np.full(len(x_image), np.nan), np.full(len(y_image), np.nan)
+        ra_deg, dec_deg = self.wcs.all_pix2world(x_image, y_image, 1)
+        return np.asarray(ra_deg), np.asarray(dec_deg)
+
+    @functools.cached_property
+    def windowed(self) -> dict[str, np.ndarray]:
+        """
+        Measurements on stamps around each source: flux-fraction radii from the
+        growth curve, and windowed measurements with a Gaussian window of
+        FWHM equal to the half-light diameter (as for Sextractor)
+
+        :return: Dictionary of (0-indexed) windowed centroids, FLUX_RADIUS,
+            SNR_WIN and windowed error ellipse columns
+        """
+        x_bary = self.catalog.xcentroid
+        y_bary = self.catalog.ycentroid
+        fwhm = self.catalog.fwhm.value
+        total_flux = self.catalog.kron_flux
+        fractions = [0.5] + list(self.settings["phot_fluxfrac"])
+
+        half_size = int(
+            np.clip(
+                np.ceil(2.0 * np.nanmax(fwhm, initial=1.0)),
+                MIN_WINDOW_HALF_SIZE,
+                MAX_WINDOW_HALF_SIZE,
+            )
+        )
+        shape = (2 * half_size + 1, 2 * half_size + 1)
+        offsets = np.arange(shape[0]) - half_size
+
+        data = np.where(self.mask, 0.0, self.data)
+        variance = np.where(self.mask, 0.0, self.variance)
+
+        results = {
+            key: np.full(self.n_sources, np.nan)
+            for key in ["x", "y", "flux", "var", "xx", "yy", "xy"]
+        }
+        radii = np.full((self.n_sources, len(fractions)), np.nan)
+
+        for start in range(0, self.n_sources, STAMP_CHUNK_SIZE):
+            chunk = slice(start, start + STAMP_CHUNK_SIZE)
+            data_stamps = get_stamps(data, x_bary[chunk], y_bary[chunk], shape, 0.0)
+            var_stamps = get_stamps(variance, x_bary[chunk], y_bary[chunk], shape, 0.0)
+
+            # Offsets of stamp pixels from the barycentre of each source
+            centre_x = np.rint(np.nan_to_num(x_bary[chunk], nan=-1.0e6))
+            centre_y = np.rint(np.nan_to_num(y_bary[chunk], nan=-1.0e6))
+            d_x = (centre_x - x_bary[chunk])[:, None, None] + offsets[None, None, :]
+            d_y = (centre_y - y_bary[chunk])[:, None, None] + offsets[None, :, None]
+
+            radii[chunk] = get_flux_radii(
+                data_stamps, d_x, d_y, total_flux[chunk], fractions, half_size
+            )
+
+            sigma = 2.0 * radii[chunk, 0] * FWHM_TO_SIGMA
+            sigma = np.where(np.isfinite(sigma), sigma, fwhm[chunk] * FWHM_TO_SIGMA)
+            sigma = np.clip(np.nan_to_num(sigma, nan=1.0), 0.5, None)
+
+            shift_x, shift_y = get_windowed_centroids(data_stamps, d_x, d_y, sigma)
+            results["x"][chunk] = x_bary[chunk] + shift_x
+            results["y"][chunk] = y_bary[chunk] + shift_y
+            d_x = d_x - shift_x[:, None, None]
+            d_y = d_y - shift_y[:, None, None]
+
+            weights = np.exp(-(d_x**2 + d_y**2) / (2.0 * sigma[:, None, None] ** 2))
+            weighted_var = weights**2 * var_stamps
+
+            results["flux"][chunk] = np.sum(weights * data_stamps, axis=(1, 2))
+            results["var"][chunk] = np.sum(weighted_var, axis=(1, 2))
+            results["xx"][chunk] = np.sum(weighted_var * d_x**2, axis=(1, 2))
+            results["yy"][chunk] = np.sum(weighted_var * d_y**2, axis=(1, 2))
+            results["xy"][chunk] = np.sum(weighted_var * d_x * d_y, axis=(1, 2))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            snr = results["flux"] / np.sqrt(results["var"])
+            norm = 4.0 / results["flux"] ** 2
+            err_a, err_b, err_theta = get_error_ellipse(
+                results["xx"] * norm, results["yy"] * norm, results["xy"] * norm
+            )
+
+        return {
+            "X_WIN": results["x"],
+            "Y_WIN": results["y"],
+            "FLUX_RADIUS": radii[:, 1:],
+            "SNR_WIN": snr,
+            "ERRAWIN_IMAGE": err_a,
+            "ERRBWIN_IMAGE": err_b,
+            "ERRTHETAWIN_IMAGE": err_theta,
+        }
+
+    @functools.cached_property
+    def flags(self) -> np.ndarray:
+        """
+        Sextractor flags: 2 for deblended sources, 4 for sources with
+        saturated pixels, and 8 for sources truncated by the image edge
+
+        :return: Flags
+        """
+        flags = np.where(self.blended, BLENDED_FLAG, 0)
+
+        peak = (
+            self.catalog.max_value
+            + self.background[self.catalog.maxval_yindex, self.catalog.maxval_xindex]
+        )
+        flags |= np.where(peak >= self.settings["saturation"], SATURATED_FLAG, 0)
+
+        truncated = (
+            (self.catalog.bbox_xmin == 0)
+            | (self.catalog.bbox_ymin == 0)
+            | (self.catalog.bbox_xmax == self.data.shape[1] - 1)
+            | (self.catalog.bbox_ymax == self.data.shape[0] - 1)
+        )
+        flags |= np.where(truncated, TRUNCATED_FLAG, 0)
+        return flags
+
+    def get_aperture_photometry(
+        self, size: int
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get circular aperture photometry, for the first PHOT_APERTURES diameters
+
+        :param size: Number of apertures
+        :return: Fluxes, flux errors, magnitudes, magnitude errors
+            (each of shape (n_sources, n_apertures))
+        """
+        diameters = tuple(self.settings["phot_apertures"][: max(size, 1)])
+        if diameters in self.aperture_photometry:
+            return self.aperture_photometry[diameters]
+
+        fluxes, flux_errs = [], []
+        for diameter in diameters:
+            flux, flux_err = self.catalog.circular_photometry(diameter / 2.0)
+            fluxes.append(flux)
+            flux_errs.append(flux_err)
+        fluxes = np.stack(fluxes, axis=1)
+        flux_errs = np.stack(flux_errs, axis=1)
+        mags, mag_errs = get_magnitudes(fluxes, flux_errs, self.settings["mag_zp"])
+        self.aperture_photometry[diameters] = (fluxes, flux_errs, mags, mag_errs)
+        return self.aperture_photometry[diameters]
+
+    def get_column(  # pylint: disable=too-many-return-statements,too-many-branches
+        self, name: str, shape: tuple[int, ...]
+    ) -> np.ndarray:
+        """
+        Measure a Sextractor catalog column
+
+        :param name: Name of column
+        :param shape: Vector shape of column (from the parameter file)
+        :return: Column values
+        """
+        # pylint: disable=too-many-statements
+        cat = self.catalog
+        mag_zp = self.settings["mag_zp"]
+
+        if name == "NUMBER":
+            return cat.label
+        if name == "X_IMAGE":
+            return cat.xcentroid + 1.0
+        if name == "Y_IMAGE":
+            return cat.ycentroid + 1.0
+        if name == "XWIN_IMAGE":
+            return self.windowed["X_WIN"] + 1.0
+        if name == "YWIN_IMAGE":
+            return self.windowed["Y_WIN"] + 1.0
+        if name == "XPEAK_IMAGE":
+            return cat.maxval_xindex + 1
+        if name == "YPEAK_IMAGE":
+            return cat.maxval_yindex + 1
+        if name in ["ALPHA_J2000", "DELTA_J2000"]:
+            coords = self.world_coords(cat.xcentroid + 1.0, cat.ycentroid + 1.0)
+            return coords[name == "DELTA_J2000"]
+        if name in ["ALPHAWIN_J2000", "DELTAWIN_J2000"]:
+            coords = self.world_coords(
+                self.windowed["X_WIN"] + 1.0, self.windowed["Y_WIN"] + 1.0
+            )
+            return coords[name == "DELTAWIN_J2000"]
+        if name == "A_IMAGE":
+            return cat.semimajor_sigma.value
+        if name == "B_IMAGE":
+            return cat.semiminor_sigma.value
+        if name == "THETA_IMAGE":
+            return cat.orientation.value
+        if name == "ELONGATION":
+            return cat.elongation.value
+        if name == "ELLIPTICITY":
+            return cat.ellipticity.value
+        if name == "FWHM_IMAGE":
+            return cat.fwhm.value
+        if name == "FWHM_WORLD":
+            if self.wcs is None:
+                return np.full(self.n_sources, np.nan)
+            pixel_scale = np.mean(proj_plane_pixel_scales(self.wcs))
+            return cat.fwhm.value * pixel_scale
+        if name == "FLUX_RADIUS":
+            return self.windowed["FLUX_RADIUS"][:, : max(math.prod(shape), 1)]
+        if name == "KRON_RADIUS":
+            return cat.kron_radius.value
+        if name == "ISOAREA_IMAGE":
+            return cat.area.value
+        if name in ["FLUX_ISO", "FLUXERR_ISO", "MAG_ISO", "MAGERR_ISO"]:
+            iso = (cat.segment_flux, cat.segment_fluxerr)
+            iso = iso + get_magnitudes(*iso, mag_zp)
+            return iso[["FLUX_ISO", "FLUXERR_ISO", "MAG_ISO", "MAGERR_ISO"].index(name)]
+        if name in ["FLUX_AUTO", "FLUXERR_AUTO", "MAG_AUTO", "MAGERR_AUTO"]:
+            auto = (cat.kron_flux, cat.kron_fluxerr)
+            auto = auto + get_magnitudes(*auto, mag_zp)
+            return auto[
+                ["FLUX_AUTO", "FLUXERR_AUTO", "MAG_AUTO", "MAGERR_AUTO"].index(name)
+            ]
+        if name in ["FLUX_APER", "FLUXERR_APER", "MAG_APER", "MAGERR_APER"]:
+            aper = self.get_aperture_photometry(math.prod(shape))
+            return aper[
+                ["FLUX_APER", "FLUXERR_APER", "MAG_APER", "MAGERR_APER"].index(name)
+            ]
+        if name == "FLUX_MAX":
+            return cat.max_value
+        if name == "BACKGROUND":
+            return cat.background_centroid
+        if name in ["SNR_WIN", "ERRAWIN_IMAGE", "ERRBWIN_IMAGE", "ERRTHETAWIN_IMAGE"]:
+            return self.windowed[name]
+        if name == "FLAGS":
+            return self.flags
+        if name == "VIGNET":
+            vignet = np.where(self.mask, VIGNET_MASK_VALUE, self.data)
+            return get_stamps(
+                vignet,
+                cat.xcentroid,
+                cat.ycentroid,
+                shape[::-1],
+                VIGNET_MASK_VALUE,
+            ).astype(np.float32)
+
+        err = f"Column {name} cannot be measured in-process"
+        logger.error(err)
+        raise KeyError(err)
+
+    def get_table(self, parameters: list[tuple[str, tuple[int, ...]]]) -> Table:
+        """
+        Get a catalog table, with the given Sextractor parameters as columns
+
+        :param parameters: List of (column name, vector shape)
+        :return: Catalog table
+        """
+        table = Table()
+        for name, shape in parameters:
+            if name not in SUPPORTED_COLUMNS:
+                continue
+
+            dtype = INT_COLUMNS.get(name, np.float64)
+
+            if name == "VIGNET":
+                column_shape = shape[::-1]
+            elif math.prod(shape) > 1:
+                column_shape = (math.prod(shape),)
+            else:
+                column_shape = ()
+
+            if self.n_sources == 0:
+                values = np.zeros((0, *column_shape), dtype=dtype)
+            else:
+                values = np.asarray(self.get_column(name, shape))
+                if column_shape == ():
+                    values = values.reshape(len(values), -1)[:, 0]
+
+            table[name] = values.astype(dtype if name != "VIGNET" else np.float32)
+            if name in COLUMN_UNITS:
+                table[name].unit = COLUMN_UNITS[name]
+        return table
+
+
+def get_celestial_wcs(header: fits.Header | None) -> WCS | None:
+    """
+    Get the celestial WCS of an image header, if it has one
+
+    :param header: Image header
+    :return: WCS (or None)
+    """
+    if header is None:
+        return None
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", AstropyWarning)
+        try:
+            wcs = WCS(header)
+        except (ValueError, KeyError, MemoryError):
+            return None
+    if not wcs.has_celestial:
+        return None
+    return wcs.celestial
+
+
+def extract_sources(  # pylint: disable=too-many-arguments,too-many-locals
+    data: np.ndarray,
+    parameters: list[tuple[str, tuple[int, ...]]],
+    settings: dict,
+    mask: np.ndarray | None = None,
+    header: fits.Header | None = None,
+) -> tuple[Table, dict[str, np.ndarray]]:
+    """
+    Detect and measure sources in an image, following the Sextractor algorithm
+
+    :param data: Image data
+    :param parameters: Catalog columns, as returned by
+        :func:`parse_sextractor_parameters`
+    :param settings: Extraction settings, as returned by
+        :func:`get_extraction_settings`
+    :param mask: Boolean mask (True for masked pixels). Non-finite pixels are
+        always masked.
+    :param header: Image header, used for the WCS
+    :return: Catalog table, dictionary of check images (BACKGROUND,
+        BACKGROUND_RMS, -BACKGROUND and SEGMENTATION)
+    """
+    data = np.asarray(data, dtype=np.float64)
+    if mask is None:
+        mask = np.zeros(data.shape, dtype=bool)
+    mask = mask | ~np.isfinite(data)
+
+    background, background_rms = estimate_background(
+        np.where(mask, 0.0, data),
+        mask,
+        back_size=settings["back_size"],
+        back_filtersize=settings["back_filtersize"],
+    )
+    sub_data = np.where(mask, 0.0, data - background)
+
+    if settings["filter_kernel"] is not None:
+        detection_data = ndimage.convolve(
+            sub_data, settings["filter_kernel"], mode="constant"
+        )
+    else:
+        detection_data = sub_data
+
+    if settings["thresh_type"] == "ABSOLUTE":
+        threshold = np.full(data.shape, settings["detect_thresh"])
+    else:
+        threshold = settings["detect_thresh"] * background_rms
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", NoDetectionsWarning)
+        segment_img = detect_sources(
+            detection_data,
+            threshold,
+            npixels=settings["detect_minarea"],
+            connectivity=8,
+            mask=mask,
+        )
+
+    blended = np.zeros(0, dtype=bool)
+    if segment_img is not None:
+        blended = np.zeros(segment_img.nlabels, dtype=bool)
+        if (settings["deblend_mincont"] < 1.0) & (not DEBLENDING_AVAILABLE):
+            logger.warning(
+                "scikit-image is not installed, so sources will not be deblended"
+            )
+        elif settings["deblend_mincont"] < 1.0:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", AstropyUserWarning)
+                deblended_img = deblend_sources(
+                    detection_data,
+                    segment_img,
+                    npixels=settings["detect_minarea"],
+                    nlevels=settings["deblend_nthresh"],
+                    contrast=settings["deblend_mincont"],
+                    connectivity=8,
+                    progress_bar=False,
+                )
+            parents = ndimage.maximum(
+                segment_img.data, labels=deblended_img.data, index=deblended_img.labels
+            )
+            _, inverse, counts = np.unique(
+                parents, return_inverse=True, return_counts=True
+            )
+            blended = counts[inverse] > 1
+            segment_img = deblended_img
+
+    gain = settings["gain"]
+    if gain > 0.0:
+        error = calc_total_error(sub_data, background_rms, gain)
+    else:
+        error = background_rms
+
+    sources = ExtractedSources(
+        data=sub_data,
+        background=background,
+        variance=np.where(mask, 0.0, error**2),
+        mask=mask,
+        segment_img=segment_img,
+        blended=blended,
+        wcs=get_celestial_wcs(header),
+        settings=settings,
+    )
+    catalog = sources.get_table(parameters)
+
+    check_images = {
+        "BACKGROUND": background,
+        "BACKGROUND_RMS": background_rms,
+        "-BACKGROUND": np.where(mask, np.nan, data - background),
+        "SEGMENTATION": (
+            np.zeros(data.shape, dtype=np.int32)
+            if segment_img is None
+            else segment_img.data.astype(np.int32)
+        ),
+    }
+
+    return catalog, check_images
@@ -0,0 +1,229 @@
+"""
+Module to run in-process source extraction
+(:func:`~mirar.processors.astromatic.sextractor.extraction.extract_sources`)
+as a processor, in place of the sextractor executable.
+
+The processor reads the same Sextractor config, parameter and filter files as
+:class:`~mirar.processors.astromatic.sextractor.sextractor.Sextractor`, and
+writes an LDAC catalog with the same column names, saving its path to
+SEXTRACTOR_HEADER_KEY. Detection runs on the in-memory image data, without
+temporary FITS files or a subprocess, so unlike Sextractor it can be run on
+several batches at once.
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Optional
+
+from astropy.table import Table
+
+from mirar.data import Image, ImageBatch
+from mirar.data.utils.coords import write_regions_file
+from mirar.paths import BASE_NAME_KEY, LATEST_WEIGHT_SAVE_KEY, max_n_cpu
+from mirar.processors.astromatic.sextractor.extraction import (
+    SUPPORTED_COLUMNS,
+    extract_sources,
+    get_extraction_settings,
+    parse_sextractor_parameters,
+)
+from mirar.processors.astromatic.sextractor.sextractor import (
+    SEXTRACTOR_HEADER_KEY,
+    Sextractor,
+    sextractor_checkimg_map,
+)
+from mirar.processors.astromatic.sextractor.sourceextractor import (
+    default_config_path,
+    default_filter_name,
+    default_param_path,
+    default_starnnw_path,
+    parse_checkimage,
+)
+from mirar.utils.ldac_tools import save_table_as_ldac
+
+logger = logging.getLogger(__name__)
+
+INPROCESS_CHECKIMAGE_TYPES = [
+    "BACKGROUND",
+    "BACKGROUND_RMS",
+    "-BACKGROUND",
+    "SEGMENTATION",
+]
+
+
+class InProcessSextractor(Sextractor):
+    """
+    Processor to detect and measure sources in images in-process, producing
+    the same catalogs as Sextractor
+    """
+
+    base_key = "inprocesssextractor"
+    max_n_cpu = max_n_cpu
+
+    def __init__(
+        self,
+        output_sub_dir: str,
+        config_path: str = default_config_path,
+        parameter_path: str = default_param_path,
+        filter_path: str = default_filter_name,
+        starnnw_path: str = default_starnnw_path,
+        saturation: float = None,
+        checkimage_type: Optional[str | list] = None,
+        gain: Optional[float] = None,
+        cache: bool = False,
+        mag_zp: Optional[float] = None,
+        write_regions_bool: bool = False,
+        catalog_purifier: Callable[[Table, Image], Table] = None,
+    ):
+        """
+        :param output_sub_dir: subdirectory to output catalogs
+        :param config_path: path to sextractor config file
+        :param parameter_path: path to sextractor parameter file
+        :param filter_path: path to sextractor filter file
+        :param starnnw_path: path to sextractor starnnw file (unused, as
+            CLASS_STAR is not measured in-process)
+        :param saturation: saturation level. Leave to None to use the header
+            (SATUR_KEY) or config value
+        :param checkimage_type: type of checkimage to output, from
+            BACKGROUND, BACKGROUND_RMS, -BACKGROUND and SEGMENTATION
+        :param gain: gain. Leave to None to use the header or config value.
+        :param cache: unused, as no temporary files are written
+        :param mag_zp: magnitude zero point. Leave to None to use the config value.
+        :param write_regions_bool: whether to write regions file for ds9
+        :param catalog_purifier: If not None, will apply this function to the
+        catalog before saving
+        """
+        super().__init__(
+            output_sub_dir=output_sub_dir,
+            config_path=config_path,
+            parameter_path=parameter_path,
+            filter_path=filter_path,
+            starnnw_path=starnnw_path,
+            saturation=saturation,
+            checkimage_type=checkimage_type,
+            gain=gain,
+            cache=cache,
+            mag_zp=mag_zp,
+            write_regions_bool=write_regions_bool,
+            catalog_purifier=catalog_purifier,
+        )
+
+        if self.checkimage_type is not None:
+            for checkimg_type in self.checkimage_type:
+                if checkimg_type not in INPROCESS_CHECKIMAGE_TYPES:
+                    err = (
+                        f"Checkimage type {checkimg_type} is not available for "
+                        f"in-process extraction. "
+                        f"Available types are {INPROCESS_CHECKIMAGE_TYPES}."
+                    )
+                    logger.error(err)
+                    raise ValueError(err)
+
+        self.settings = get_extraction_settings(self.config, self.filter_name)
+        self.parameters = parse_sextractor_parameters(self.parameters_name)
+
+        unsupported = [x for x, _ in self.parameters if x not in SUPPORTED_COLUMNS]
+        if len(unsupported) > 0:
+            logger.warning(
+                f"The following parameters in {self.parameters_name} cannot be "
+                f"measured in-process, and will be omitted from catalogs: "
+                f"{unsupported}"
+            )
+
+    def description(self) -> str:
+        return (
+            f"Processor to detect sources in images in-process, "
+            f"and save detected sources to the '{self.output_sub_dir}' directory."
+        )
+
+    def get_image_settings(self, image: Image) -> dict:
+        """
+        Get the extraction settings for an image, applying the processor
+        and header values of saturation and gain
+
+        :param image: Image
+        :return: Extraction settings
+        """
+        settings = self.settings.copy()
+
+        if self.saturation is not None:
+            settings["saturation"] = self.saturation
+        elif settings["satur_key"] in image.keys():
+            settings["saturation"] = float(image[settings["satur_key"]])
+
+        if self.gain is not None:
+            settings["gain"] = self.gain
+        elif "GAIN" in image.keys():
+            settings["gain"] = float(image["GAIN"])
+
+        if self.mag_zp is not None:
+            settings["mag_zp"] = self.mag_zp
+
+        return settings
+
+    def get_image_mask(self, image: Image):
+        """
+        Get the mask of an image, including zero-weight pixels of its
+        weight image (if any)
+
+        :param image: Image
+        :return: Boolean mask (True for masked pixels)
+        """
+        mask = ~image.get_mask()
+        if LATEST_WEIGHT_SAVE_KEY in image.keys():
+            weight_path = Path(image[LATEST_WEIGHT_SAVE_KEY])
+            if weight_path.exists():
+                mask |= self.open_fits(weight_path).get_data() <= 0.0
+        return mask
+
+    def _apply_to_images(
+        self,
+        batch: ImageBatch,
+    ) -> ImageBatch:
+        output_dir = self.get_sextractor_output_dir()
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        for image in batch:
+            header = image.get_header()
+
+            catalog, check_images = extract_sources(
+                data=image.get_data(),
+                parameters=self.parameters,
+                settings=self.get_image_settings(image),
+                mask=self.get_image_mask(image),
+                header=header,
+            )
+
+            if self.catalog_purifier is not None:
+                catalog = self.catalog_purifier(catalog, image)
+
+            output_cat = output_dir.joinpath(
+                image[BASE_NAME_KEY].replace(".fits", ".cat")
+            )
+            save_table_as_ldac(catalog, output_cat, image_header=header)
+
+            if self.write_regions:
+                write_regions_file(
+                    regions_path=output_cat.with_suffix(".reg"),
+                    x_coords=catalog["X_IMAGE"],
+                    y_coords=catalog["Y_IMAGE"],
+                    system="image",
+                    region_radius=5,
+                )
+
+            image[SEXTRACTOR_HEADER_KEY] = output_cat.as_posix()
+
+            _, checkimage_name = parse_checkimage(
+                checkimage_type=self.checkimage_type,
+                image=os.path.join(output_dir, image[BASE_NAME_KEY]),
+            )
+
+            for checkimg_type, checkimg_path in zip(
+                self.checkimage_type or [], checkimage_name
+            ):
+                self.save_fits(
+                    Image(check_images[checkimg_type], header.copy()), checkimg_path
+                )
+                image[sextractor_checkimg_map[checkimg_type]] = checkimg_path
+
+        return batch
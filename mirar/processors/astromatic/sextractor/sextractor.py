@@ -6,7 +6,6 @@ Module to run
 
 import logging
 import os
-import shutil
 from pathlib import Path
 from typing import Callable, Optional
 
@@ -20,6 +19,7 @@ from mirar.paths import (
     BASE_NAME_KEY,
     LATEST_WEIGHT_SAVE_KEY,
     PSFEX_CAT_KEY,
+    copy_temp_file,
     get_output_dir,
     get_temp_path,
 )
@@ -33,6 +33,7 @@ from mirar.processors.base_processor import (
     PrerequisiteError,
 )
 from mirar.utils.ldac_tools import convert_table_to_ldac, get_table_from_ldac
+from mirar.utils.staging import staging
 
 logger = logging.getLogger(__name__)
 
@@ -208,78 +209,91 @@ class Sextractor(BaseImageProcessor):  # pylint: disable=too-many-instance-attri
             if self.gain is None and "GAIN" in image.keys():
                 self.gain = image["GAIN"]
 
-            temp_path = get_temp_path(sextractor_out_dir, image[BASE_NAME_KEY])
-
-            if not temp_path.exists():
-                self.save_fits(image, temp_path)
+            if self.cache:
+                temp_path = get_temp_path(sextractor_out_dir, image[BASE_NAME_KEY])
+            else:
+                # Reserve space for the image and its mask
+                temp_path = staging.get_temp_path(
+                    sextractor_out_dir,
+                    image[BASE_NAME_KEY],
+                    n_bytes=2 * image.get_data().nbytes,
+                )
 
             temp_files = [temp_path]
 
-            weight_path = None
+            try:
+                if not temp_path.exists():
+                    self.save_fits(image, temp_path)
 
-            if LATEST_WEIGHT_SAVE_KEY in image.keys():
-                image_weight_path = sextractor_out_dir.joinpath(
-                    image[LATEST_WEIGHT_SAVE_KEY]
-                )
-                temp_weight_path = get_temp_path(
-                    sextractor_out_dir, image[LATEST_WEIGHT_SAVE_KEY]
-                )
-                if image_weight_path.exists():
-                    shutil.copyfile(image_weight_path, temp_weight_path)
-                    weight_path = temp_weight_path
+                weight_path = None
+
+                if LATEST_WEIGHT_SAVE_KEY in image.keys():
+                    image_weight_path = sextractor_out_dir.joinpath(
+                        image[LATEST_WEIGHT_SAVE_KEY]
+                    )
+                    if image_weight_path.exists():
+                        if self.cache:
+                            weight_path = copy_temp_file(
+                                sextractor_out_dir, image_weight_path
+                            )
+                        else:
+                            weight_path = staging.copy_temp_file(
+                                sextractor_out_dir, image_weight_path
+                            )
+                        temp_files.append(weight_path)
+
+                if weight_path is None:
+                    weight_path = self.save_mask_image(image, temp_path)
                     temp_files.append(weight_path)
 
-            if weight_path is None:
-                weight_path = self.save_mask_image(image, temp_path)
-                temp_files.append(weight_path)
+                if self.use_psfex:
+                    if PSFEX_CAT_KEY in image.keys():
+                        self.psf_path = Path(image[PSFEX_CAT_KEY])
+
+                    if self.psf_path is None:
+                        raise ValueError(
+                            f"PSFex catalog not found in image {image[BASE_NAME_KEY]}"
+                            f"Please run PSFex on this image that should add the path "
+                            f"to the header, or specify the path manually using "
+                            f"psf_name argument"
+                        )
+                self.check_psf_prerequisite()
+
+                output_cat = sextractor_out_dir.joinpath(
+                    image[BASE_NAME_KEY].replace(".fits", ".cat")
+                )
 
-            if self.use_psfex:
-                if PSFEX_CAT_KEY in image.keys():
-                    self.psf_path = Path(image[PSFEX_CAT_KEY])
-
-                if self.psf_path is None:
-                    raise ValueError(
-                        f"PSFex catalog not found in image {image[BASE_NAME_KEY]}"
-                        f"Please run PSFex on this image that should add the path to "
-                        f"the header, or specify the path manually using psf_name "
-                        f"argument"
-                    )
-            self.check_psf_prerequisite()
-
-            output_cat = sextractor_out_dir.joinpath(
-                image[BASE_NAME_KEY].replace(".fits", ".cat")
-            )
-
-            _, checkimage_name = parse_checkimage(
-                checkimage_name=None,
-                checkimage_type=self.checkimage_type,
-                image=os.path.join(sextractor_out_dir, image[BASE_NAME_KEY]),
-            )
-
-            logger.debug(f"Sextractor checkimage name is {checkimage_name}")
-
-            output_cat, checkimage_name = run_sextractor_single(
-                img=temp_path,
-                config=self.config,
-                output_dir=sextractor_out_dir,
-                parameters_name=self.parameters_name,
-                filter_name=self.filter_name,
-                starnnw_name=self.starnnw_name,
-                saturation=self.saturation,
-                weight_image=weight_path,
-                verbose_type=self.verbose_type,
-                checkimage_name=checkimage_name,
-                checkimage_type=self.checkimage_type,
-                gain=self.gain,
-                psf_name=self.psf_path,
-                catalog_name=output_cat,
-            )
-
-            logger.debug(f"Cache save is {self.cache}")
-            if not self.cache:
-                for temp_file in temp_files:
-                    temp_file.unlink()
-                    logger.debug(f"Deleted temporary file {temp_file}")
+                _, checkimage_name = parse_checkimage(
+                    checkimage_name=None,
+                    checkimage_type=self.checkimage_type,
+                    image=os.path.join(sextractor_out_dir, image[BASE_NAME_KEY]),
+                )
+
+                logger.debug(f"Sextractor checkimage name is {checkimage_name}")
+
+                output_cat, checkimage_name = run_sextractor_single(
+                    img=temp_path,
+                    config=self.config,
+                    output_dir=sextractor_out_dir,
+                    parameters_name=self.parameters_name,
+                    filter_name=self.filter_name,
+                    starnnw_name=self.starnnw_name,
+                    saturation=self.saturation,
+                    weight_image=weight_path,
+                    verbose_type=self.verbose_type,
+                    checkimage_name=checkimage_name,
+                    checkimage_type=self.checkimage_type,
+                    gain=self.gain,
+                    psf_name=self.psf_path,
+                    catalog_name=output_cat,
+                )
+            finally:
+                # Release staged files (and their reserved space) even on failure
+                logger.debug(f"Cache save is {self.cache}")
+                if not self.cache:
+                    for temp_file in temp_files:
+                        staging.release(temp_file)
+                        logger.debug(f"Deleted temporary file {temp_file}")
 
             if self.catalog_purifier is not None:
                 output_catalog = get_table_from_ldac(output_cat)
@@ -33,6 +33,7 @@ from mirar.paths import (
 from mirar.processors.astromatic.scamp.scamp import SCAMP_HEADER_KEY
 from mirar.processors.astromatic.swarp.swarp_wrapper import run_swarp
 from mirar.processors.base_processor import BaseImageProcessor
+from mirar.utils.staging import staging
 
 logger = logging.getLogger(__name__)
 
@@ -174,6 +175,24 @@ class Swarp(BaseImageProcessor):
         self,
         batch: ImageBatch,
     ) -> ImageBatch:
+        temp_files = []
+        try:
+            return self.stack_batch(batch, temp_files)
+        finally:
+            # Release staged files (and their reserved space) even on failure
+            if not self.cache:
+                for temp_file in temp_files:
+                    staging.release(temp_file)
+                    logger.debug(f"Deleted temporary file {temp_file}")
+
+    def stack_batch(self, batch: ImageBatch, temp_files: list[Path]) -> ImageBatch:
+        """
+        Stack a batch of images with Swarp
+
+        :param batch: Batch of images
+        :param temp_files: List to which temporary files are added, as they are made
+        :return: Batch with the stacked image
+        """
         basenames = [x[BASE_NAME_KEY] for x in batch]
         sort_inds = np.argsort(basenames)
         batch = ImageBatch([batch[i] for i in sort_inds])
@@ -195,7 +214,7 @@ class Swarp(BaseImageProcessor):
         )
         logger.debug(f"Writing file list to {swarp_image_list_path}")
 
-        temp_files = [swarp_image_list_path, swarp_weight_list_path]
+        temp_files += [swarp_image_list_path, swarp_weight_list_path]
 
         # If swarp is run with combine -N option,
         # it outputs an intermediate file called inpname+.resamp.fits. This name is not
@@ -276,12 +295,6 @@ class Swarp(BaseImageProcessor):
                     all_pixscales.append(pixscale)
                     all_imgpixsizes.append(imgpixsize)
 
-                if self.include_scamp:
-                    temp_head_path = copy_temp_file(
-                        output_dir=swarp_output_dir,
-                        file_path=Path(image[SCAMP_HEADER_KEY]),
-                    )
-
                 if np.logical_and(
                     SWARP_FLUX_SCALING_KEY in image.header.keys(),
                     self.flux_scaling_factor is not None,
@@ -299,10 +312,29 @@ class Swarp(BaseImageProcessor):
                     else:
                         image[SWARP_FLUX_SCALING_KEY] = self.flux_scaling_factor
 
-                temp_img_path = get_temp_path(swarp_output_dir, image[BASE_NAME_KEY])
+                if self.cache:
+                    temp_img_path = get_temp_path(
+                        swarp_output_dir, image[BASE_NAME_KEY]
+                    )
+                else:
+                    # Reserve space for the image and its mask
+                    temp_img_path = staging.get_temp_path(
+                        swarp_output_dir,
+                        image[BASE_NAME_KEY],
+                        n_bytes=2 * image.get_data().nbytes,
+                    )
+                temp_files.append(temp_img_path)
 
                 self.save_fits(image, temp_img_path, compress=False)
 
+                if self.include_scamp:
+                    # Swarp reads the scamp header from beside the image
+                    temp_head_path = copy_temp_file(
+                        output_dir=temp_img_path.parent,
+                        file_path=Path(image[SCAMP_HEADER_KEY]),
+                    )
+                    temp_files.append(temp_head_path)
+
                 logger.debug(f"Saving mask image for {temp_img_path}")
                 temp_mask_path = self.save_mask_image(
                     image, temp_img_path, compress=False
@@ -311,10 +343,7 @@ class Swarp(BaseImageProcessor):
                 img_list.write(f"{temp_img_path}\n")
                 weight_list.write(f"{temp_mask_path}\n")
 
-                temp_files += [temp_img_path, temp_mask_path]
-
-                if self.include_scamp:
-                    temp_files += [temp_head_path]
+                temp_files.append(temp_mask_path)
 
         if pixscale_to_use is None:
             pixscale_to_use = np.max(all_pixscales)
@@ -451,9 +480,6 @@ class Swarp(BaseImageProcessor):
             raise SwarpError(err) from err
 
         if not self.cache:
-            for temp_file in temp_files:
-                temp_file.unlink()
-                logger.debug(f"Deleted temporary file {temp_file}")
             # Remove the output file made by Swarp, as we are passing along the image
             # we made. Also, the Swarp output image does not have any of the header
             # keywords we added above.
@@ -1,6 +1,10 @@
 """
 Component module for autoastrometry, dealing with crossmatching image sources with
 reference sources
+
+Source lists are converted to arrays, so that neighbouring sources are found with a
+KD tree, and the distances between neighbours are matched with a binary search
+over all (sorted) reference distances, rather than by comparing every pair.
 """
 
 import logging
@@ -8,16 +12,17 @@ import os
 from typing import Optional
 
 import numpy as np
+from scipy.spatial import cKDTree
 
 from mirar.processors.astrometry.autoastrometry.sources import (
     BaseSource,
     SextractorSource,
-    distance,
-    pixel_distance,
-    position_angle,
-    quickdistance,
+    angular_distances,
+    get_source_arrays,
+    position_angles,
+    wrap_position_angle,
 )
-from mirar.processors.astrometry.autoastrometry.utils import median, mode, stdev, unique
+from mirar.processors.astrometry.autoastrometry.utils import median, mode, stdev
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +30,139 @@ FAST_MATCH = False
 SHOW_MATCH = False
 
 
+def get_neighbours(
+    ra_deg: np.ndarray,
+    dec_deg: np.ndarray,
+    ra_scale: float,
+    min_rad: float,
+    max_rad: float,
+) -> tuple[list[np.ndarray], list[np.ndarray]]:
+    """
+    Find the neighbours of each source with a separation between min_rad and
+    max_rad, using a cartesian approximation (beware poles...)
+
+    :param ra_deg: ra of sources (degrees)
+    :param dec_deg: dec of sources (degrees)
+    :param ra_scale: cos(declination)
+    :param min_rad: min radius (arcsec)
+    :param max_rad: max radius (arcsec)
+    :return: indices of neighbours of each source (in ascending order),
+        and distances to them (arcsec)
+    """
+    n_src = len(ra_deg)
+    if n_src == 0:
+        return [], []
+
+    # Measure ra relative to the first source, so that meridian crossings are safe
+    ra_offset = (ra_deg - ra_deg[0] + 180.0) % 360.0 - 180.0
+    coords = 3600.0 * np.column_stack([ra_scale * ra_offset, dec_deg])
+
+    pairs = cKDTree(coords).query_pairs(max_rad, output_type="ndarray")
+    pairs = np.concatenate([pairs, pairs[:, ::-1]]).reshape(-1, 2)
+    dists = np.hypot(*(coords[pairs[:, 1]] - coords[pairs[:, 0]]).T)
+
+    mask = (dists > min_rad) & (dists < max_rad)
+    pairs, dists = pairs[mask], dists[mask]
+
+    order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+    pairs, dists = pairs[order], dists[order]
+
+    splits = np.searchsorted(pairs[:, 0], np.arange(1, n_src))
+    return np.split(pairs[:, 1], splits), np.split(dists, splits)
+
+
+def get_ratio_matches(
+    img_dists: np.ndarray,
+    sorted_ref_dists: np.ndarray,
+    ref_order: np.ndarray,
+    ref_dists: np.ndarray,
+    tolerance: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find all pairs of image distances and reference distances with a ratio
+    within tolerance of 1
+
+    :param img_dists: distances from an image source to its neighbours
+    :param sorted_ref_dists: all reference distances, sorted
+    :param ref_order: indices which sort the reference distances
+    :param ref_dists: all reference distances
+    :param tolerance: tolerance on ratio of distances
+    :return: index of image distance of each pair,
+        index of reference distance of each pair
+    """
+    # |d_img / d_ref - 1| < tolerance, with a small margin for rounding,
+    # as the exact condition is applied below
+    lower = img_dists / (1.0 + tolerance) * (1.0 - 1e-9)
+    if tolerance < 1.0:
+        upper = img_dists / (1.0 - tolerance) * (1.0 + 1e-9)
+    else:
+        upper = np.full(len(img_dists), np.inf)
+
+    starts = np.searchsorted(sorted_ref_dists, lower, side="left")
+    ends = np.searchsorted(sorted_ref_dists, upper, side="right")
+    counts = ends - starts
+
+    img_js = np.repeat(np.arange(len(img_dists)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    ref_inds = ref_order[np.repeat(starts, counts) + offsets]
+
+    mask = np.abs((img_dists[img_js] / ref_dists[ref_inds]) - 1.0) < tolerance
+    return img_js[mask], ref_inds[mask]
+
+
+def has_pa_cluster(
+    owners: np.ndarray,
+    dpa: np.ndarray,
+    n_ref: int,
+    n_required: int,
+    pa_tolerance: float,
+) -> np.ndarray:
+    """
+    Check, for each reference source, whether enough of its matches could lie
+    within pa_tolerance of their mode dPA. As the mode is one of the values, this
+    requires a pair of values within pa_tolerance, and n_required values within
+    2 * pa_tolerance.
+
+    :param owners: reference source of each match
+    :param dpa: dPA of each match
+    :param n_ref: number of reference sources
+    :param n_required: number of matches required
+    :param pa_tolerance: pa tolerance needed
+    :return: boolean array for reference sources
+    """
+    order = np.lexsort((dpa, owners))
+    owners, dpa = owners[order], dpa[order]
+    margin = 1.0 + 1e-9
+
+    has_pair = np.zeros(n_ref, dtype=bool)
+    close = (owners[1:] == owners[:-1]) & (np.diff(dpa) <= pa_tolerance * margin)
+    has_pair[owners[1:][close]] = True
+
+    has_cluster = np.zeros(n_ref, dtype=bool)
+    offset = n_required - 1
+    if len(dpa) > offset:
+        clustered = (owners[offset:] == owners[: len(owners) - offset]) & (
+            dpa[offset:] - dpa[: len(dpa) - offset] <= 2.0 * pa_tolerance * margin
+        )
+        has_cluster[owners[offset:][clustered]] = True
+
+    return has_pair & has_cluster
+
+
+def keep_matches(mask: np.ndarray, *match_lists: list) -> list[list]:
+    """
+    Keep only the selected entries of each of a set of (parallel) match lists
+
+    :param mask: boolean mask of entries to keep
+    :param match_lists: lists of match properties
+    :return: filtered lists
+    """
+    return [
+        [value for value, keep in zip(match_list, mask) if keep]
+        for match_list in match_lists
+    ]
+
+
 def distance_match(
     img_src_list: list[SextractorSource],
     ref_src_list: list[BaseSource],
@@ -72,63 +210,43 @@ def distance_match(
     if unc_pa is None:
         unc_pa = 720.0
 
-    dec_list = []
-    for src in img_src_list:
-        dec_list.append(src.dec_rad)
-    median_dec_rad = median(dec_list)  # faster distance computation
-    ra_scale = np.cos(median_dec_rad)  # will mess up meridian crossings, however
-
-    # Calculate all the distances
-
-    # In image catalog:
-    img_src_dists = []
-    img_src_match_ids = []
-    for i, src in enumerate(img_src_list):
-        distances = []
-        distances_j_index = []
-        for j, src2 in enumerate(img_src_list):
-            if i == j:
-                continue
-
-            if abs(src.dec_deg - src2.dec_deg) > max_rad:
-                continue
-            if ra_scale * abs(src.ra_deg - src2.ra_deg) > max_rad:
-                continue
-
-            dist = quickdistance(src, src2, ra_scale)
+    img_ra_rad, img_dec_rad, _ = get_source_arrays(img_src_list)
+    ref_ra_rad, ref_dec_rad, _ = get_source_arrays(ref_src_list)
 
-            if min_rad < dist < max_rad:
-                distances.append(dist)
-                distances_j_index.append(j)
+    median_dec_rad = median(img_dec_rad)  # faster distance computation
+    ra_scale = np.cos(median_dec_rad)
 
-        img_src_dists.append(distances)
-        img_src_match_ids.append(distances_j_index)
-
-    # In reference catalog:
-    ref_src_dists = []
-    ref_src_match_ids = []
-    for i, src in enumerate(ref_src_list):
-        distances = []
-        distances_j_index = []
-        for j, src2 in enumerate(ref_src_list):
-            if i == j:
-                continue
-
-            if abs(src.dec_deg - src2.dec_deg) > max_rad:
-                continue
-            if ra_scale * abs(src.ra_deg - src2.ra_deg) > max_rad:
-                continue
-
-            dist = quickdistance(src, src2, ra_scale)
-
-            if min_rad < dist < max_rad:
-                distances.append(dist)
-                distances_j_index.append(j)
-
-        ref_src_dists.append(distances)
-        ref_src_match_ids.append(distances_j_index)
+    # Calculate all the distances, in image and reference catalog
+    img_src_match_ids, img_src_dists = get_neighbours(
+        np.degrees(img_ra_rad), np.degrees(img_dec_rad), ra_scale, min_rad, max_rad
+    )
+    ref_src_match_ids, ref_src_dists = get_neighbours(
+        np.degrees(ref_ra_rad), np.degrees(ref_dec_rad), ra_scale, min_rad, max_rad
+    )
 
     # Now look for matches in the reference catalog to distances in the image catalog.
+    # All reference distances are flattened and sorted, so that the reference
+    # distances matching each image distance can be found by binary search.
+
+    ref_lengths = np.array([len(x) for x in ref_src_dists], dtype=int)
+    ref_owner = np.repeat(np.arange(len(ref_src_list)), ref_lengths)
+    ref_local = np.concatenate([np.arange(n) for n in ref_lengths] + [[]]).astype(int)
+    ref_nbr = np.concatenate(ref_src_match_ids + [[]]).astype(int)
+    ref_dist = np.concatenate(ref_src_dists + [[]])
+
+    usable_ref = ref_lengths[ref_owner] >= 2
+    ref_owner, ref_local = ref_owner[usable_ref], ref_local[usable_ref]
+    ref_nbr, ref_dist = ref_nbr[usable_ref], ref_dist[usable_ref]
+    ref_order = np.argsort(ref_dist, kind="stable")
+    sorted_ref_dist = ref_dist[ref_order]
+
+    # PA from each reference source to each of its neighbours
+    ref_pa = position_angles(
+        ref_ra_rad[ref_owner],
+        ref_dec_rad[ref_owner],
+        ref_ra_rad[ref_nbr],
+        ref_dec_rad[ref_nbr],
+    )
 
     n_great_matches = 0
 
@@ -144,87 +262,89 @@ def distance_match(
         if len(img_dist_array) < 2:
             continue
 
-        for ref_i, ref_dist_array in enumerate(ref_src_dists):
-            if len(ref_dist_array) < 2:
-                continue
+        img_js, ref_inds = get_ratio_matches(
+            img_dist_array, sorted_ref_dist, ref_order, ref_dist, tolerance
+        )
+        owners = ref_owner[ref_inds]
+
+        # Each image distance counts once per reference source, further matches
+        # to the same reference source indicate degeneracies
+        n_img_dists = len(img_dist_array)
+        match = np.bincount(
+            np.unique(owners * n_img_dists + img_js) // n_img_dists,
+            minlength=len(ref_src_list),
+        )
 
-            match = 0
-            img_match_in = []
-            ref_match_in = []
+        # Pairs are ordered by reference source, image distance and reference
+        # distance, so each reference source has a contiguous slice
+        order = np.lexsort((ref_local[ref_inds], img_js, owners))
+        owners, img_js, ref_inds = owners[order], img_js[order], ref_inds[order]
+
+        # Here, dpa[n] is the mean rotation of the PA from
+        # the primary star of this match to the stars in its match
+        # RELATIVE TO those same angles for those same stars
+        # in the catalog.  Therefore it is a robust measurement of the rotation.
+        img_match_ids = img_src_match_ids[img_i]
+        img_pa = position_angles(
+            img_ra_rad[img_i],
+            img_dec_rad[img_i],
+            img_ra_rad[img_match_ids],
+            img_dec_rad[img_match_ids],
+        )
+        pair_dpa = wrap_position_angle(img_pa[img_js] - ref_pa[ref_inds])
+
+        # If user was confident the initial PA was right, remove bad PA'src
+        # right away
+        mask = np.abs(pair_dpa) <= unc_pa
+        owners, img_js, ref_inds, pair_dpa = (
+            owners[mask],
+            img_js[mask],
+            ref_inds[mask],
+            pair_dpa[mask],
+        )
 
-            for img_j, img_src_dist in enumerate(img_dist_array):
-                new_match = 1
+        # Matches which do not pass the reqmatch cut are discarded later,
+        # so skip reference sources without enough matches of a consistent PA
+        candidates = has_pa_cluster(
+            owners,
+            pair_dpa,
+            n_ref=len(ref_src_list),
+            n_required=max(2, req_match),
+            pa_tolerance=pa_tolerance,
+        )
 
-                for ref_j, ref_src_dist in enumerate(ref_dist_array):
-                    if abs((img_src_dist / ref_src_dist) - 1.0) < tolerance:
-                        match += new_match
+        for ref_i in np.flatnonzero((match >= req_match) & candidates):
+            lower, upper = np.searchsorted(owners, [ref_i, ref_i + 1])
+            img_match_in = img_match_ids[img_js[lower:upper]]
+            ref_match_in = ref_nbr[ref_inds[lower:upper]]
+            dpa = pair_dpa[lower:upper]
 
-                        # further matches before the next
-                        # img_j loop indicate degeneracies
-                        new_match = 0
+            mode_dpa = mode(dpa)
 
-                        img_match_in.append(img_src_match_ids[img_i][img_j])
-                        ref_match_in.append(ref_src_match_ids[ref_i][ref_j])
+            # Remove deviant matches by PA
+            mask = np.abs(dpa - mode_dpa) <= pa_tolerance
+            img_match_in, ref_match_in = img_match_in[mask], ref_match_in[mask]
 
-            if match >= req_match:
-                dpa = []
-                # Here, dpa[n] is the mean rotation of the PA from
-                # the primary star of this match to the stars in its match
-                # RELATIVE TO those same angles for those same stars
-                # in the catalog.  Therefore it is a robust measurement of the rotation.
+            if len(img_match_in) < 2:
+                continue
 
-                for i, match_index in enumerate(img_match_in):
-                    ddpa = position_angle(
-                        img_src_list[img_i], img_src_list[match_index]
-                    ) - position_angle(
-                        ref_src_list[ref_i], ref_src_list[ref_match_in[i]]
-                    )
-                    while ddpa > 200.0:
-                        ddpa -= 360.0
-                    while ddpa < -160.0:
-                        ddpa += 360.0
-                    dpa.append(ddpa)
-
-                # If user was confident the initial PA was right, remove bad PA'src
-                # right away
-                for i in range(len(img_match_in) - 1, -1, -1):
-                    if abs(dpa[i]) > unc_pa:
-                        del img_match_in[i]
-                        del ref_match_in[i]
-                        del dpa[i]
-
-                if len(img_match_in) < 2:
-                    continue
-
-                mode_dpa = mode(dpa)
-
-                # Remove deviant matches by PA
-                for i in range(len(img_match_in) - 1, -1, -1):
-                    if abs(dpa[i] - mode_dpa) > pa_tolerance:
-                        del img_match_in[i]
-                        del ref_match_in[i]
-                        del dpa[i]
-
-                if len(img_match_in) < 2:
-                    continue
-
-                n_degeneracies = (
-                    len(img_match_in)
-                    - len(unique(img_match_in))
-                    + len(ref_match_in)
-                    - len(unique(ref_match_in))
-                )
-                # this isn't quite accurate (overestimates if degeneracies are mixed up)
+            n_degeneracies = (
+                len(img_match_in)
+                - len(np.unique(img_match_in))
+                + len(ref_match_in)
+                - len(np.unique(ref_match_in))
+            )
+            # this isn't quite accurate (overestimates if degeneracies are mixed up)
 
-                mpa.append(mode_dpa)
-                primary_match_img.append(img_i)
-                primary_match_ref.append(ref_i)
-                img_match.append(img_match_in)
-                ref_match.append(ref_match_in)
-                match_ns.append(len(img_match_in) - n_degeneracies)
+            mpa.append(mode_dpa)
+            primary_match_img.append(img_i)
+            primary_match_ref.append(int(ref_i))
+            img_match.append(img_match_in.tolist())
+            ref_match.append(ref_match_in.tolist())
+            match_ns.append(len(img_match_in) - n_degeneracies)
 
-                if len(img_match_in) - n_degeneracies > 6:
-                    n_great_matches += 1
+            if len(img_match_in) - n_degeneracies > 6:
+                n_great_matches += 1
 
         if n_great_matches > 16 and FAST_MATCH is True:
             break  # save processing time
@@ -243,14 +363,22 @@ def distance_match(
 
     # Get rid of matches that don't pass the reqmatch cut
     # if n_matches > 10 and max(match_ns) >= reqmatch:
-    for i in range(len(primary_match_img) - 1, -1, -1):
-        if match_ns[i] < req_match:
-            del mpa[i]
-            del primary_match_img[i]
-            del primary_match_ref[i]
-            del img_match[i]
-            del ref_match[i]
-            del match_ns[i]
+    (
+        mpa,
+        primary_match_img,
+        primary_match_ref,
+        img_match,
+        ref_match,
+        match_ns,
+    ) = keep_matches(
+        np.array(match_ns) >= req_match,
+        mpa,
+        primary_match_img,
+        primary_match_ref,
+        img_match,
+        ref_match,
+        match_ns,
+    )
 
     if len(img_match) < 1:
         logger.error(f"Found no matching clusters of reqmatch = {req_match}")
@@ -268,14 +396,22 @@ def distance_match(
 
     if len(match_ns) > 16 and count_not_min > 3:
         logger.debug(f"Too many matches: increasing reqmatch to {req_match + 1}")
-        for i in range(len(primary_match_img) - 1, -1, -1):
-            if match_ns[i] == min_match:
-                del mpa[i]
-                del primary_match_img[i]
-                del primary_match_ref[i]
-                del img_match[i]
-                del ref_match[i]
-                del match_ns[i]
+        (
+            mpa,
+            primary_match_img,
+            primary_match_ref,
+            img_match,
+            ref_match,
+            match_ns,
+        ) = keep_matches(
+            np.array(match_ns) != min_match,
+            mpa,
+            primary_match_img,
+            primary_match_ref,
+            img_match,
+            ref_match,
+            match_ns,
+        )
 
     n_matches = len(
         img_match
@@ -288,70 +424,100 @@ def distance_match(
 
     if len(img_match) > 2:
         # Coarse iteration for anything away from the mode
-        for i in range(len(primary_match_img) - 1, -1, -1):
-            if abs(mpa[i] - offset_pa) > pa_tolerance:
-                del mpa[i]
-                del primary_match_img[i]
-                del primary_match_ref[i]
-                del img_match[i]
-                del ref_match[i]
-                del match_ns[i]
-                rejects += 1
+        mask = np.abs(np.array(mpa) - offset_pa) <= pa_tolerance
+        rejects += int(np.sum(~mask))
+        (
+            mpa,
+            primary_match_img,
+            primary_match_ref,
+            img_match,
+            ref_match,
+            match_ns,
+        ) = keep_matches(
+            mask,
+            mpa,
+            primary_match_img,
+            primary_match_ref,
+            img_match,
+            ref_match,
+            match_ns,
+        )
 
         st_dev_pa = stdev(mpa)
         refined_tolerance = 2.2 * st_dev_pa
 
         # Fine iteration to flag outliers now that we know most are reliable
-        for i in range(len(primary_match_img) - 1, -1, -1):
-            if abs(mpa[i] - offset_pa) > refined_tolerance:
-                del mpa[i]
-                del primary_match_img[i]
-                del primary_match_ref[i]
-                del img_match[i]
-                del ref_match[i]
-                del match_ns[i]
-                rejects += (
-                    1  # these aren't necessarily bad, just making more manageable.
-                )
+        # these aren't necessarily bad, just making more manageable.
+        mask = np.abs(np.array(mpa) - offset_pa) <= refined_tolerance
+        rejects += int(np.sum(~mask))
+        (
+            mpa,
+            primary_match_img,
+            primary_match_ref,
+            img_match,
+            ref_match,
+            match_ns,
+        ) = keep_matches(
+            mask,
+            mpa,
+            primary_match_img,
+            primary_match_ref,
+            img_match,
+            ref_match,
+            match_ns,
+        )
 
     # New verification step: calculate distances and PAs between central stars
     # of matches
-    n_dist_flags = [0] * len(primary_match_img)
+    n_dist_flags = np.zeros(len(primary_match_img), dtype=int)
     for _ in range(2):  # two iterations
         # find bad pairs
         if len(primary_match_img) == 0:
             break
 
-        for i, img_i in enumerate(primary_match_img):
-            for j, img_j in enumerate(primary_match_img):
-                if i == j:
-                    continue
+        img_inds = np.array(primary_match_img)
+        ref_inds = np.array(primary_match_ref)
 
-                ref_i = primary_match_ref[i]
-                ref_j = primary_match_ref[j]
-
-                img_dist_ij = distance(img_src_list[img_i], img_src_list[img_j])
-                ref_dist_ij = distance(ref_src_list[ref_i], ref_src_list[ref_j])
+        img_dist_ij = angular_distances(
+            img_ra_rad[img_inds, None],
+            img_dec_rad[img_inds, None],
+            img_ra_rad[None, img_inds],
+            img_dec_rad[None, img_inds],
+        )
+        ref_dist_ij = angular_distances(
+            ref_ra_rad[ref_inds, None],
+            ref_dec_rad[ref_inds, None],
+            ref_ra_rad[None, ref_inds],
+            ref_dec_rad[None, ref_inds],
+        )
 
-                try:
-                    if abs((img_dist_ij / ref_dist_ij) - 1.0) > tolerance:
-                        n_dist_flags[i] += 1
-                except ZeroDivisionError:  # (occasionally will get divide by zero)
-                    pass
+        # (occasionally will get divide by zero)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bad_pairs = np.abs((img_dist_ij / ref_dist_ij) - 1.0) > tolerance
+        np.fill_diagonal(bad_pairs, False)
+        n_dist_flags[: len(img_inds)] += bad_pairs.sum(axis=1)
 
         # delete bad clusters
+        # if every comparison is bad, this is a bad match
         n_test_matches = len(primary_match_img)
-        for i in range(n_test_matches - 1, -1, -1):
-            if (
-                n_dist_flags[i] == n_test_matches - 1
-            ):  # if every comparison is bad, this is a bad match
-                del mpa[i]
-                del primary_match_img[i]
-                del primary_match_ref[i]
-                del img_match[i]
-                del ref_match[i]
-                del match_ns[i]
-                rejects += 1
+        mask = n_dist_flags[:n_test_matches] != n_test_matches - 1
+        rejects += int(np.sum(~mask))
+        (
+            mpa,
+            primary_match_img,
+            primary_match_ref,
+            img_match,
+            ref_match,
+            match_ns,
+        ) = keep_matches(
+            mask,
+            mpa,
+            primary_match_img,
+            primary_match_ref,
+            img_match,
+            ref_match,
+            match_ns,
+        )
 
     logger.debug(f"Rejected {rejects} bad matches.")
     n_matches = len(primary_match_img)
@@ -361,19 +527,20 @@ def distance_match(
         return [], [], []
 
     # check the pixel scale while we're at it
-    pix_scale_list = []
     if len(primary_match_img) >= 2:
-        for i in range(len(primary_match_img) - 1):
-            for j in range(i + 1, len(primary_match_img)):
-                img_i = primary_match_img[i]
-                ref_i = primary_match_ref[i]
-                img_j = primary_match_img[j]
-                ref_j = primary_match_ref[j]
-
-                pix_scale_list.append(
-                    distance(ref_src_list[ref_i], ref_src_list[ref_j])
-                    / pixel_distance(img_src_list[img_i], img_src_list[img_j])
-                )
+        img_inds = np.array(primary_match_img)
+        ref_inds = np.array(primary_match_ref)
+        first, second = np.triu_indices(len(img_inds), k=1)
+
+        img_x = np.array([img_src_list[i].x for i in img_inds])
+        img_y = np.array([img_src_list[i].y for i in img_inds])
+
+        pix_scale_list = angular_distances(
+            ref_ra_rad[ref_inds[first]],
+            ref_dec_rad[ref_inds[first]],
+            ref_ra_rad[ref_inds[second]],
+            ref_dec_rad[ref_inds[second]],
+        ) / np.hypot(img_x[first] - img_x[second], img_y[first] - img_y[second])
 
         pix_scale = median(pix_scale_list)
         pix_scale_std = stdev(pix_scale_list)
@@ -460,6 +627,49 @@ def distance_match(
     return primary_match_img, primary_match_ref, mpa
 
 
+def remove_close_pairs(src_list: list[BaseSource], min_sep: float) -> list[BaseSource]:
+    """
+    Remove the fainter object of every pair of sources closer than min_sep
+
+    :param src_list: list of sources
+    :param min_sep: minimum separation (arcsec)
+    :return: list of sources without close pairs
+    """
+    if len(src_list) < 2:
+        return src_list
+
+    ra_rad, dec_rad, mags = get_source_arrays(src_list)
+
+    # Find candidate pairs on the unit sphere, then apply the exact separation
+    unit_vectors = np.column_stack(
+        [
+            np.cos(dec_rad) * np.cos(ra_rad),
+            np.cos(dec_rad) * np.sin(ra_rad),
+            np.sin(dec_rad),
+        ]
+    )
+    max_chord = 2.0 * np.sin(np.radians(min_sep / 3600.0) / 2.0) * (1.0 + 1e-6)
+    first, second = (
+        cKDTree(unit_vectors)
+        .query_pairs(max_chord, output_type="ndarray")
+        .reshape(-1, 2)
+        .T
+    )
+
+    close = (
+        angular_distances(
+            ra_rad[first], dec_rad[first], ra_rad[second], dec_rad[second]
+        )
+        < min_sep
+    )
+    first, second = first[close], second[close]
+
+    keep = np.ones(len(src_list), dtype=bool)
+    keep[np.where(mags[first] > mags[second], first, second)] = False
+
+    return [src for src, keep_src in zip(src_list, keep) if keep_src]
+
+
 def crosscheck_source_lists(
     img_src_list: list[SextractorSource],
     n_img: int,
@@ -518,33 +728,7 @@ def crosscheck_source_lists(
     # Remove fainter object in close pairs for both lists
     min_sep = 3
 
-    delete_list = []
-    for i, src in enumerate(img_src_list):
-        for j, src2 in enumerate(img_src_list[i + 1 :]):
-            dist = distance(src, src2)
-            if dist < min_sep:
-                if src.mag > src2.mag:
-                    delete_list.append(i)
-                else:
-                    delete_list.append(i + j + 1)
-
-    delete_list = unique(delete_list)
-    delete_list.reverse()
-    for del_index in delete_list:
-        del img_src_list[del_index]
-
-    for i, src in enumerate(ref_src_list):
-        for j, src2 in enumerate(ref_src_list[i + 1 :]):
-            dist = distance(src, src2)
-            if dist < min_sep:
-                if src.mag > src2.mag:
-                    delete_list.append(i)
-                else:
-                    delete_list.append(i + j + 1)
-
-    delete_list = unique(delete_list)
-    delete_list.reverse()
-    for del_index in delete_list:
-        del ref_src_list[del_index]
+    img_src_list = remove_close_pairs(img_src_list, min_sep=min_sep)
+    ref_src_list = remove_close_pairs(ref_src_list, min_sep=min_sep)
 
     return img_src_list, n_img, img_density, ref_src_list, n_ref, ref_density
@@ -86,20 +86,27 @@ def pixel_distance(obj1: SextractorSource, obj2: SextractorSource) -> float:
     return ((obj1.x - obj2.x) ** 2 + (obj1.y - obj2.y) ** 2) ** 0.5
 
 
-def distance(obj1: BaseSource, obj2: BaseSource) -> float:
+def angular_distances(
+    ra1_rad: np.ndarray | float,
+    dec1_rad: np.ndarray | float,
+    ra2_rad: np.ndarray | float,
+    dec2_rad: np.ndarray | float,
+) -> np.ndarray:
     """
-    # Great circle distance between two points.
+    Great circle distances between arrays of points (broadcast against each other)
 
-    :param obj1: object 1
-    :param obj2: object 2
-    :return: great circle distance
+    :param ra1_rad: ra of points 1 (radians)
+    :param dec1_rad: dec of points 1 (radians)
+    :param ra2_rad: ra of points 2 (radians)
+    :param dec2_rad: dec of points 2 (radians)
+    :return: great circle distances (arcsec)
     """
-    ddec = obj2.dec_rad - obj1.dec_rad
-    dra = obj2.ra_rad - obj1.ra_rad
+    ddec = np.subtract(dec2_rad, dec1_rad)
+    dra = np.subtract(ra2_rad, ra1_rad)
     dist_rad = 2 * np.arcsin(
         np.sqrt(
             (np.sin(ddec / 2.0)) ** 2
-            + np.cos(obj1.dec_rad) * np.cos(obj2.dec_rad) * (np.sin(dra / 2.0)) ** 2
+            + np.cos(dec1_rad) * np.cos(dec2_rad) * (np.sin(dra / 2.0)) ** 2
         )
     )
 
@@ -108,6 +115,17 @@ def distance(obj1: BaseSource, obj2: BaseSource) -> float:
     return dist_arc_sec
 
 
+def distance(obj1: BaseSource, obj2: BaseSource) -> float:
+    """
+    # Great circle distance between two points.
+
+    :param obj1: object 1
+    :param obj2: object 2
+    :return: great circle distance
+    """
+    return angular_distances(obj1.ra_rad, obj1.dec_rad, obj2.ra_rad, obj2.dec_rad)
+
+
 def quickdistance(obj1: BaseSource, obj2: BaseSource, cosdec: float) -> float:
     """
     Cartestian-approximation distance between two objects
@@ -125,31 +143,78 @@ def quickdistance(obj1: BaseSource, obj2: BaseSource, cosdec: float) -> float:
     return 3600 * np.sqrt(ddec**2 + (cosdec * dra) ** 2)
 
 
-def position_angle(obj1: BaseSource, obj2: BaseSource) -> float:
+def wrap_position_angle(angle_deg: np.ndarray | float) -> np.ndarray:
     """
-    Calculate the (spherical) position angle between two objects.
+    Make position angles single-valued, in the range [-160, 200] degrees.
+    Note there is a crossing point at PA=200, images at this exact PA
+    will have the number of matches cut by half at each comparison level
 
-    :param obj1: Object 1
-    :param obj2: Object 2
-    :return: angle (degrees)
+    :param angle_deg: angles (degrees)
+    :return: wrapped angles (degrees)
     """
-    dra = obj2.ra_rad - obj1.ra_rad
+    angle_deg = np.asarray(angle_deg, dtype=float)
+    angle_deg = np.where(
+        angle_deg > 200.0,
+        angle_deg - 360.0 * np.ceil((angle_deg - 200.0) / 360.0),
+        angle_deg,
+    )
+    return np.where(
+        angle_deg < -160.0,
+        angle_deg + 360.0 * np.ceil((-160.0 - angle_deg) / 360.0),
+        angle_deg,
+    )
+
+
+def position_angles(
+    ra1_rad: np.ndarray | float,
+    dec1_rad: np.ndarray | float,
+    ra2_rad: np.ndarray | float,
+    dec2_rad: np.ndarray | float,
+) -> np.ndarray:
+    """
+    Calculate the (spherical) position angles between arrays of points
+    (broadcast against each other)
+
+    :param ra1_rad: ra of points 1 (radians)
+    :param dec1_rad: dec of points 1 (radians)
+    :param ra2_rad: ra of points 2 (radians)
+    :param dec2_rad: dec of points 2 (radians)
+    :return: angles (degrees east of north)
+    """
+    dra = np.subtract(ra2_rad, ra1_rad)
     pa_rad = np.arctan2(
-        np.cos(obj1.dec_rad) * np.tan(obj2.dec_rad)
-        - np.sin(obj1.dec_rad) * np.cos(dra),
+        np.cos(dec1_rad) * np.tan(dec2_rad) - np.sin(dec1_rad) * np.cos(dra),
         np.sin(dra),
     )
     pa_deg = pa_rad * 180.0 / np.pi
     pa_deg = 90.0 - pa_deg  # defined as degrees east of north
-    while pa_deg > 200:
-        pa_deg -= 360.0  # make single-valued
-    while pa_deg < -160:
-        pa_deg += (
-            360.0  # note there is a crossing point at PA=200, images at this exact PA
-        )
-    return (
-        pa_deg  # will have the number of matches cut by half at each comparison level
-    )
+    return wrap_position_angle(pa_deg)
+
+
+def position_angle(obj1: BaseSource, obj2: BaseSource) -> float:
+    """
+    Calculate the (spherical) position angle between two objects.
+
+    :param obj1: Object 1
+    :param obj2: Object 2
+    :return: angle (degrees)
+    """
+    return float(position_angles(obj1.ra_rad, obj1.dec_rad, obj2.ra_rad, obj2.dec_rad))
+
+
+def get_source_arrays(
+    src_list: list[BaseSource],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Get the coordinates and magnitudes of a list of sources as arrays
+
+    :param src_list: list of sources
+    :return: ra (radians), dec (radians), magnitudes
+    """
+    ra_rad = np.array([src.ra_rad for src in src_list], dtype=float)
+    dec_rad = np.array([src.dec_rad for src in src_list], dtype=float)
+    mags = np.array([src.mag for src in src_list], dtype=float)
+    return ra_rad, dec_rad, mags
 
 
 def compare_mag(source: SextractorSource) -> float:
@@ -56,12 +56,24 @@ def mode(float_list: list[float]) -> float:
     min_mean = diff.sum()
     i_mean = n_diffs / 2
 
-    for i in range(n_diffs):
-        step_index = [int(max(i - step, 0)), int(min(i + step, n_diffs))]
-        step_mean = diff[step_index[0] : step_index[1]].mean()
-        if step_mean < min_mean:
-            min_mean = step_mean
-            i_mean = i
+    # Approximate mean of the differences in a window around each index,
+    # from a cumulative sum
+    inds = np.arange(n_diffs)
+    window_starts = np.maximum(inds - step, 0).astype(int)
+    window_ends = np.minimum(inds + step, n_diffs).astype(int)
+    cumulative_diff = np.concatenate([[0.0], np.cumsum(diff)])
+    step_means = (cumulative_diff[window_ends] - cumulative_diff[window_starts]) / (
+        window_ends - window_starts
+    )
+
+    # Only windows close to the minimum are averaged exactly, in order
+    if n_diffs > 0:
+        tolerance = 1e-9 * (np.abs(step_means).max() + np.abs(diff).sum())
+        for i in np.flatnonzero(step_means <= step_means.min() + tolerance):
+            step_mean = diff[window_starts[i] : window_ends[i]].mean()
+            if step_mean < min_mean:
+                min_mean = step_mean
+                i_mean = i
 
     list_mode = sorted_array[int(i_mean)]  # + s[i_mean+1])/2
 
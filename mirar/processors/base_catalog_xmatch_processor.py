@@ -213,6 +213,13 @@ class BaseProcessorWithCrossMatch(BaseImageProcessor, ABC):
         mask = [isinstance(x, Sextractor) for x in self.preceding_steps]
         return np.array(self.preceding_steps)[mask][-1]
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        # The Sextractor apertures are still needed when applied in a worker
+        if self.preceding_steps is not None:
+            state["preceding_steps"] = [self.get_sextractor_module()]
+        return state
+
     def check_prerequisites(
         self,
     ):
@@ -6,9 +6,12 @@ import datetime
 import getpass
 import hashlib
 import logging
+import multiprocessing
+import pickle
 import socket
 import threading
 from abc import ABC
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from queue import Queue
 from threading import Thread
@@ -18,7 +21,15 @@ import numpy as np
 import pandas as pd
 from tqdm.auto import tqdm
 
-from mirar.data import DataBatch, Dataset, Image, ImageBatch, SourceBatch
+from mirar.data import (
+    IMAGE_DTYPE,
+    DataBatch,
+    Dataset,
+    Image,
+    ImageBatch,
+    SourceBatch,
+    cache,
+)
 from mirar.errors import (
     ErrorReport,
     ErrorStack,
@@ -29,15 +40,27 @@ from mirar.io import MissingCoreFieldError, open_fits, save_fits
 from mirar.paths import (
     BASE_NAME_KEY,
     CAL_OUTPUT_SUB_DIR,
+    EXECUTION_BACKENDS,
     LATEST_WEIGHT_SAVE_KEY,
     PACKAGE_NAME,
     PROC_HISTORY_KEY,
+    PROCESS_BACKEND,
     RAW_IMG_KEY,
+    SERIAL_BACKEND,
+    THREAD_BACKEND,
     core_source_fields,
+    default_execution_backend,
     get_mask_path,
     get_output_path,
     max_n_cpu,
 )
+from mirar.processors.calibration_store import (
+    CalibrationStore,
+    get_content_hash,
+    get_mean_mjd,
+    get_settings_hash,
+)
+from mirar.processors.metrics import BatchMetrics, ProcessorMetrics
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +85,68 @@ class DuplicationError(ProcessorError):
     """
 
 
+class ExecutionBackendError(ProcessorError):
+    """
+    An error raised if an unknown execution backend is requested
+    """
+
+
+def validate_execution_backend(backend: str) -> str:
+    """
+    Check that an execution backend is recognised
+
+    :param backend: Name of backend
+    :return: Validated backend name
+    """
+    if backend not in EXECUTION_BACKENDS:
+        err = (
+            f"Unknown execution backend '{backend}'. "
+            f"Available backends are {EXECUTION_BACKENDS}."
+        )
+        logger.error(err)
+        raise ExecutionBackendError(err)
+    return backend
+
+
+# Worker processes are started from a fresh interpreter rather than forked, so
+# they never inherit the threads (e.g the cache sweeper or database pools) or the
+# cache refcounts and hot tier of the parent process
+PROCESS_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+_worker_processor = None
+
+
+def _init_process_worker(cache_dir: Path | None, pickled_processor: bytes):
+    """
+    Initialise a worker process, so that it shares the parent cache directory,
+    and unpickle the processor once for all the batches the worker applies it to
+
+    :param cache_dir: Cache directory of the parent process
+    :param pickled_processor: Pickled processor to apply
+    :return: None
+    """
+    global _worker_processor  # pylint: disable=global-statement
+
+    if cache_dir is not None:
+        cache.set_cache_dir(cache_dir)
+
+    _worker_processor = pickle.loads(pickled_processor)
+
+
+def _apply_in_process(batch: DataBatch) -> tuple[DataBatch, BatchMetrics]:
+    """
+    Apply the processor of the worker to a batch inside a worker process
+
+    :param batch: Batch to process
+    :return: Processed batch, and metrics of the worker
+    """
+    with BatchMetrics() as batch_metrics:
+        new_batch = _worker_processor.apply(batch)
+    return new_batch, batch_metrics
+
+
 class BaseProcessor:
     """
     Base processor class, to be inherited from for all processors
@@ -77,6 +162,8 @@ class BaseProcessor:
         raise NotImplementedError
 
     max_n_cpu: int = max_n_cpu
+    execution_backend: str | None = None
+    requires_full_dataset: bool = False
 
     subclasses = {}
 
@@ -96,6 +183,7 @@ class BaseProcessor:
         self.latest_n_output_blocks = 0
         self.latest_n_output_batches = 0
         self.latest_error_stack = ErrorStack()
+        self.latest_metrics = ProcessorMetrics()
 
     @classmethod
     def __init_subclass__(cls, **kwargs):
@@ -122,6 +210,44 @@ class BaseProcessor:
         """
         self.preceding_steps = previous_steps
 
+    def set_execution_backend(self, backend: str | None):
+        """
+        Pins the backend used to apply the processor to batches
+        ('thread', 'process' or 'serial'). If None, the backend chosen
+        for the pipeline run (or the global default) is used instead.
+
+        :param backend: Name of backend
+        :return: None
+        """
+        if backend is not None:
+            validate_execution_backend(backend)
+        self.execution_backend = backend
+
+    def get_execution_backend(self, run_backend: str | None = None) -> str:
+        """
+        Gets the backend used to apply the processor to batches.
+        A backend set on the processor takes precedence over the backend
+        of the pipeline run, which in turn takes precedence over the
+        default set by the EXECUTION_BACKEND environment variable.
+
+        :param run_backend: Backend selected for the pipeline run
+        :return: Name of backend
+        """
+        for backend in [self.execution_backend, run_backend]:
+            if backend is not None:
+                return validate_execution_backend(backend)
+        return validate_execution_backend(default_execution_backend)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # The per-run caches are only meaningful within the parent process
+        for key in ["passed_batches", "err_stack", "progress"]:
+            state[key] = {}
+        state["latest_metrics"] = ProcessorMetrics()
+        # The rest of the pipeline is only needed to check prerequisites
+        state["preceding_steps"] = None
+        return state
+
     def set_night(self, night_sub_dir: str | int = ""):
         """
         Sets the night subdirectory for the processor to read/write data
@@ -132,6 +258,16 @@ class BaseProcessor:
         self.night_sub_dir = night_sub_dir
         self.night = night_sub_dir.split("/")[-1]
 
+    def get_input_key(self) -> str | None:
+        """
+        Get a key describing the files which the processor reads from outside
+        the pipeline (e.g raw images), which changes whenever they change.
+        Used to check whether checkpoints of a pipeline run are still valid.
+
+        :return: Key, or None if the processor does not read input files
+        """
+        return None
+
     def generate_error_report(
         self, exception: Exception, batch: DataBatch
     ) -> ErrorReport:
@@ -173,11 +309,14 @@ class BaseProcessor:
         del self.passed_batches[cache_id]
         del self.err_stack[cache_id]
 
-    def base_apply(self, dataset: Dataset) -> tuple[Dataset, ErrorStack]:
+    def base_apply(
+        self, dataset: Dataset, execution_backend: str | None = None
+    ) -> tuple[Dataset, ErrorStack]:
         """
         Core function to act on a dataset, and return an updated dataset
 
         :param dataset: Input dataset
+        :param execution_backend: Backend selected for the pipeline run
         :return: Updated dataset, and any caught errors
         """
         cache_id = threading.get_ident()
@@ -187,36 +326,49 @@ class BaseProcessor:
 
         self.latest_n_input_batches = len(dataset)
         self.latest_n_input_blocks = sum(len(x) for x in dataset)
+        self.latest_metrics = ProcessorMetrics()
 
         if len(dataset) > 0:
             n_cpu = min([self.max_n_cpu, len(dataset)])
 
-            logger.info(f"Running {self.__class__.__name__} on {n_cpu} threads")
+            backend = self.get_execution_backend(execution_backend)
 
-            watchdog_queue = Queue()
+            if (backend == PROCESS_BACKEND) and (n_cpu == 1):
+                # A single worker process gains nothing, and would discard
+                # any state the processor accumulates (e.g. CSVLog rows)
+                backend = SERIAL_BACKEND
 
-            workers = []
+            pickled_processor = None
+            if backend == PROCESS_BACKEND:
+                pickled_processor = self.pickle_for_workers()
+                if pickled_processor is None:
+                    logger.warning(
+                        f"{self.__class__.__name__} cannot be sent to worker "
+                        f"processes, so threads will be used instead."
+                    )
+                    backend = THREAD_BACKEND
 
-            for _ in range(n_cpu):
-                # Set up a worker thread to process database load
-                worker = Thread(
-                    target=self.apply_to_batch, args=(watchdog_queue, cache_id)
-                )
-                worker.daemon = True
-                worker.start()
+            if backend == SERIAL_BACKEND:
+                n_cpu = 1
 
-                workers.append(worker)
+            logger.info(
+                f"Running {self.__class__.__name__} on {n_cpu} "
+                f"{['threads', 'processes'][backend == PROCESS_BACKEND]}"
+            )
 
             with tqdm(total=len(dataset), position=0, leave=False) as progress:
                 # Set up progress bar
                 self.progress[cache_id] = progress
 
-                # Loop over batches to add to queue
-                for j, batch in enumerate(dataset):
-                    watchdog_queue.put(item=(j, batch))
-
-                # Wait for the queue to empty
-                watchdog_queue.join()
+                if backend == SERIAL_BACKEND:
+                    for j, batch in enumerate(dataset):
+                        self.process_batch(j, batch, cache_id)
+                elif backend == PROCESS_BACKEND:
+                    self.apply_with_processes(
+                        dataset, n_cpu, cache_id, pickled_processor
+                    )
+                else:
+                    self.apply_with_threads(dataset, n_cpu, cache_id)
 
                 self.progress[cache_id].refresh()
                 self.progress[cache_id].close()
@@ -237,6 +389,131 @@ class BaseProcessor:
 
         return dataset, err_stack
 
+    def pickle_for_workers(self) -> bytes | None:
+        """
+        Pickle the processor, so it can be sent to worker processes
+
+        :return: Pickled processor, or None if the processor cannot be pickled
+        """
+        try:
+            return pickle.dumps(self)
+        except Exception:  # pylint: disable=broad-except
+            return None
+
+    def apply_with_threads(self, dataset: Dataset, n_cpu: int, cache_id: int):
+        """
+        Apply the processor to each batch of a dataset, using a pool of threads
+
+        :param dataset: Input dataset
+        :param n_cpu: Number of threads
+        :param cache_id: key for cache
+        :return: None
+        """
+        watchdog_queue = Queue()
+
+        workers = []
+
+        for _ in range(n_cpu):
+            # Set up a worker thread to process database load
+            worker = Thread(target=self.apply_to_batch, args=(watchdog_queue, cache_id))
+            worker.daemon = True
+            worker.start()
+
+            workers.append(worker)
+
+        # Loop over batches to add to queue
+        for j, batch in enumerate(dataset):
+            watchdog_queue.put(item=(j, batch))
+
+        # Wait for the queue to empty
+        watchdog_queue.join()
+
+    def apply_with_processes(
+        self,
+        dataset: Dataset,
+        n_cpu: int,
+        cache_id: int,
+        pickled_processor: bytes | None = None,
+    ):
+        """
+        Apply the processor to each batch of a dataset, using a pool of processes.
+        The processor is sent once to each worker process, and then each batch
+        is sent to a worker, and the results and errors are merged back in the
+        original order. Any changes the processor makes to its own attributes
+        within a worker are not propagated back.
+
+        :param dataset: Input dataset
+        :param n_cpu: Number of processes
+        :param cache_id: key for cache
+        :param pickled_processor: Processor already pickled by the parent process
+        :return: None
+        """
+        if pickled_processor is None:
+            pickled_processor = pickle.dumps(self)
+
+        with ProcessPoolExecutor(
+            max_workers=n_cpu,
+            mp_context=multiprocessing.get_context(PROCESS_START_METHOD),
+            initializer=_init_process_worker,
+            initargs=(cache.cache_dir, pickled_processor),
+        ) as executor:
+            futures = {
+                executor.submit(_apply_in_process, batch): (j, batch)
+                for j, batch in enumerate(dataset)
+            }
+
+            for future in as_completed(futures):
+                j, batch = futures[future]
+                try:
+                    new_batch, batch_metrics = future.result()
+                    self.passed_batches[cache_id][j] = new_batch
+                    self.latest_metrics.add_batch(batch_metrics)
+                except Exception as exc:  # pylint: disable=broad-except
+                    self.handle_batch_error(exc, j, batch, cache_id)
+
+                self.progress[cache_id].update(1)
+                self.progress[cache_id].refresh()
+
+    def process_batch(self, j: int, batch: DataBatch, cache_id: int):
+        """
+        Run self.apply on a single batch, catch any errors, and then
+        update the internal cache with the results.
+
+        :param j: index of batch in dataset
+        :param batch: batch to process
+        :param cache_id: key for cache
+        :return: None
+        """
+        with BatchMetrics() as batch_metrics:
+            try:
+                self.passed_batches[cache_id][j] = self.apply(batch)
+            except Exception as exc:  # pylint: disable=broad-except
+                self.handle_batch_error(exc, j, batch, cache_id)
+
+        self.latest_metrics.add_batch(batch_metrics)
+
+        self.progress[cache_id].update(1)
+        self.progress[cache_id].refresh()
+
+    def handle_batch_error(
+        self, exc: Exception, j: int, batch: DataBatch, cache_id: int
+    ):
+        """
+        Record an error raised while processing a batch. Batches raising
+        noncritical errors are still passed on.
+
+        :param exc: exception raised
+        :param j: index of batch in dataset
+        :param batch: batch which raised the exception
+        :param cache_id: key for cache
+        :return: None
+        """
+        err = self.generate_error_report(exc, batch)
+        logger.error(err.generate_log_message())
+        self.err_stack[cache_id].add_report(err)
+        if isinstance(exc, NoncriticalProcessingError):
+            self.passed_batches[cache_id][j] = batch
+
     def apply_to_batch(self, queue, cache_id: int):
         """
         Function to run self.apply on a batch in the queue, catch any errors, and then
@@ -248,22 +525,7 @@ class BaseProcessor:
         """
         while True:
             j, batch = queue.get()
-            try:
-                batch = self.apply(batch)
-                self.passed_batches[cache_id][j] = batch
-            except NoncriticalProcessingError as exc:
-                err = self.generate_error_report(exc, batch)
-                logger.error(err.generate_log_message())
-                self.err_stack[cache_id].add_report(err)
-                self.passed_batches[cache_id][j] = batch
-            except Exception as exc:  # pylint: disable=broad-except
-                err = self.generate_error_report(exc, batch)
-                logger.error(err.generate_log_message())
-                self.err_stack[cache_id].add_report(err)
-
-            self.progress[cache_id].update(1)
-            self.progress[cache_id].refresh()
-
+            self.process_batch(j, batch, cache_id)
             queue.task_done()
 
     def apply(self, batch: DataBatch):
@@ -400,7 +662,9 @@ class ImageHandler:
                 logger.warning(
                     f"Could not find weight file {image.header[LATEST_WEIGHT_SAVE_KEY]}"
                 )
-        self.save_fits(Image(mask.astype(float), header), mask_path, compress=compress)
+        self.save_fits(
+            Image(mask.astype(IMAGE_DTYPE), header), mask_path, compress=compress
+        )
 
         return mask_path
 
@@ -438,6 +702,13 @@ class ProcessorWithCache(BaseImageProcessor, ABC):
     Image processor with cached images associated to it, e.g a master flat
     """
 
+    requires_full_dataset = True
+
+    # Header keys which must match for a stored master to be reused
+    store_metadata_keys: list[str] = []
+    # Header keys which must also match, if the images have them
+    store_optional_metadata_keys: list[str] = []
+
     def __init__(
         self,
         try_load_cache: bool = True,
@@ -445,6 +716,8 @@ class ProcessorWithCache(BaseImageProcessor, ABC):
         overwrite: bool = True,
         cache_sub_dir: str = CAL_OUTPUT_SUB_DIR,
         cache_image_name_header_keys: str | list[str] | None = None,
+        calibration_store: CalibrationStore | None = None,
+        store_max_age_days: float | None = None,
     ):
         super().__init__()
         self.try_load_cache = try_load_cache
@@ -452,6 +725,8 @@ class ProcessorWithCache(BaseImageProcessor, ABC):
         self.overwrite = overwrite
         self.cache_sub_dir = cache_sub_dir
         self.cache_image_name_header_keys = cache_image_name_header_keys
+        self.calibration_store = calibration_store
+        self.store_max_age_days = store_max_age_days
 
     def select_cache_images(self, images: ImageBatch) -> ImageBatch:
         """
@@ -518,7 +793,10 @@ class ProcessorWithCache(BaseImageProcessor, ABC):
             logger.debug(f"Loading cached file {path}")
             return self.open_fits(path)
 
-        image = self.make_image(images)
+        if self.calibration_store is None:
+            image = self.make_image(images)
+        else:
+            image = self.get_image_from_store(images)
 
         if self.write_to_cache:
             if np.sum([not exists, self.overwrite]) > 0:
@@ -526,6 +804,87 @@ class ProcessorWithCache(BaseImageProcessor, ABC):
 
         return image
 
+    def get_store_settings(self) -> dict:
+        """
+        Get the settings used to make a cached image, which must match for
+        a master from the calibration store to be reused
+
+        :return: Dictionary of settings
+        """
+        return {"processor": self.__class__.__name__}
+
+    def get_store_metadata(self, images: ImageBatch) -> dict:
+        """
+        Get the header metadata which must match for a master from the
+        calibration store to be reused
+
+        :param images: images to process
+        :return: Dictionary of metadata
+        """
+        keys = list(self.store_metadata_keys)
+        header_keys = self.cache_image_name_header_keys
+        if header_keys is not None:
+            if isinstance(header_keys, str):
+                header_keys = [header_keys]
+            keys += header_keys
+
+        header = images[0].get_header()
+        keys += [x for x in self.store_optional_metadata_keys if x in header]
+
+        return {key: images[0][key] for key in keys}
+
+    def get_image_from_store(self, images: ImageBatch) -> Image:
+        """
+        Get a cached image via the calibration store. If store_max_age_days is set,
+        the closest matching master within that many days is used. Otherwise,
+        a master made from the same frames is used. Failing both, the image is
+        made as usual and added to the store.
+
+        :param images: images to process
+        :return: cached image to use
+        """
+        instrument = str(self.night_sub_dir).split("/", maxsplit=1)[0]
+        cache_images = self.select_cache_images(images)
+        metadata = self.get_store_metadata(
+            cache_images if len(cache_images) > 0 else images
+        )
+        settings = self.get_store_settings()
+        settings_hash = get_settings_hash(settings)
+
+        if self.store_max_age_days is not None:
+            path = self.calibration_store.find_best(
+                instrument=instrument,
+                base_key=self.base_key,
+                metadata=metadata,
+                settings_hash=settings_hash,
+                mjd=get_mean_mjd(images),
+                max_age_days=self.store_max_age_days,
+            )
+            if path is not None:
+                logger.debug(f"Using stored master {path}")
+                return self.open_fits(path)
+
+        if len(cache_images) == 0:
+            return self.make_image(images)
+
+        content_hash = get_content_hash(cache_images, settings)
+        path = self.calibration_store.get(instrument, self.base_key, content_hash)
+        if path is not None:
+            logger.debug(f"Using stored master {path}")
+            return self.open_fits(path)
+
+        image = self.make_image(images)
+        self.calibration_store.add(
+            image,
+            instrument=instrument,
+            base_key=self.base_key,
+            content_hash=content_hash,
+            metadata=metadata,
+            settings_hash=settings_hash,
+            mjd=get_mean_mjd(cache_images),
+        )
+        return image
+
     def make_image(self, images: ImageBatch) -> Image:
         """
         Make a cached image (e.g master flat)
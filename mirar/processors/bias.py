@@ -8,8 +8,14 @@ from collections.abc import Callable
 import numpy as np
 
 from mirar.data import Image, ImageBatch
+from mirar.data.utils.stack import MEDIAN_COMBINE, stack_images
 from mirar.errors import ImageNotFoundError
-from mirar.paths import BIAS_FRAME_KEY, LATEST_SAVE_KEY, SATURATE_KEY
+from mirar.paths import (
+    BIAS_FRAME_KEY,
+    DETECTOR_STATE_KEYS,
+    LATEST_SAVE_KEY,
+    SATURATE_KEY,
+)
 from mirar.processors.base_processor import ProcessorPremadeCache, ProcessorWithCache
 from mirar.processors.utils.image_selector import select_from_images
 
@@ -35,14 +41,18 @@ class BiasCalibrator(ProcessorWithCache):
 
     base_key = "bias"
 
+    store_optional_metadata_keys = DETECTOR_STATE_KEYS
+
     def __init__(
         self,
         *args,
         select_bias_images: Callable[[ImageBatch], ImageBatch] = default_select_bias,
+        combine_method: str = MEDIAN_COMBINE,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
         self.select_cache_images = select_bias_images
+        self.combine_method = combine_method
 
     def description(self) -> str:
         return "Creates a bias image, and subtracts this from the other images."
@@ -62,6 +72,11 @@ class BiasCalibrator(ProcessorWithCache):
                 image[SATURATE_KEY] -= np.nanmedian(master_bias.get_data())
         return batch
 
+    def get_store_settings(self) -> dict:
+        settings = super().get_store_settings()
+        settings["combine_method"] = self.combine_method
+        return settings
+
     def make_image(
         self,
         images: ImageBatch,
@@ -75,15 +90,15 @@ class BiasCalibrator(ProcessorWithCache):
             logger.error(err)
             raise ImageNotFoundError(err)
 
-        nx, ny = images[0].get_data().shape
-
-        biases = np.zeros((nx, ny, n_frames))
-
-        for i, img in enumerate(images):
-            biases[:, :, i] = img.get_data()
-
-        logger.debug(f"Median combining {n_frames} biases")
-        master_bias = Image(np.nanmedian(biases, axis=2), header=images[0].get_header())
+        logger.debug(f"Combining {n_frames} biases with '{self.combine_method}'")
+        master_bias = Image(
+            stack_images(
+                images.get_batch(),
+                method=self.combine_method,
+                n_threads=self.max_n_cpu,
+            ),
+            header=images[0].get_header(),
+        )
 
         return master_bias
 
@@ -0,0 +1,249 @@
+"""
+Module for a persistent store of master calibration images (e.g master bias,
+dark or flat images), shared across nights and pipeline configurations.
+
+Each master image is saved as a fits file, named by a content hash of the input
+frames (their pixel data) and the settings used to combine them. Next to each image,
+a json file records the instrument, the header metadata (e.g filter) which must
+match for the master to be reused, and the mean MJD of the input frames.
+The json file is written last, so only complete entries are ever read.
+
+Masters can then be looked up either exactly (by content hash), or as the
+best available master (closest in time) within a given number of days.
+
+The store is enabled by setting CALIBRATION_STORE_DIR. Realtime pipeline
+configurations then reuse the best available master within
+CALIBRATION_STORE_MAX_AGE_DAYS (with a default of 3), rather than rebuilding
+masters from the calibration frames of each batch.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from astropy.time import Time
+
+from mirar.data import Image, ImageBatch
+from mirar.io import check_image_has_core_fields, save_to_path
+from mirar.paths import LATEST_SAVE_KEY, TIME_KEY, calibration_store_dir
+
+logger = logging.getLogger(__name__)
+
+REALTIME_STORE_MAX_AGE_DAYS: float = float(
+    os.getenv("CALIBRATION_STORE_MAX_AGE_DAYS", "3")
+)
+
+
+def get_mean_mjd(images: ImageBatch) -> float:
+    """
+    Get the mean MJD of a batch of images
+
+    :param images: Images
+    :return: Mean MJD
+    """
+    return float(np.mean(Time([x[TIME_KEY] for x in images]).mjd))
+
+
+def get_settings_hash(settings: dict) -> str:
+    """
+    Get a hash for a dictionary of settings
+
+    :param settings: Settings
+    :return: Unique hash
+    """
+    return hashlib.sha1(
+        json.dumps(settings, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def get_content_hash(images: ImageBatch, settings: dict) -> str:
+    """
+    Get a hash for the pixel data of a set of images, and the settings used
+    to combine them. The hash does not depend on the order of the images.
+
+    :param images: Images to combine
+    :param settings: Settings used to combine the images
+    :return: Unique hash
+    """
+    frame_hashes = []
+    for image in images:
+        data = np.ascontiguousarray(image.get_data())
+        frame_hash = hashlib.sha1(f"{data.shape}{data.dtype}".encode())
+        frame_hash.update(memoryview(data).cast("B"))
+        frame_hashes.append(frame_hash.hexdigest())
+
+    key = "".join(sorted(frame_hashes)) + get_settings_hash(settings)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+class CalibrationStore:
+    """
+    Class for a persistent, content-addressed store of master calibration images
+    """
+
+    def __init__(self, store_dir: Path):
+        self.store_dir = Path(store_dir)
+
+    def __str__(self):
+        return f"<CalibrationStore in {self.store_dir}>"
+
+    def get_entry_dir(self, instrument: str, base_key: str) -> Path:
+        """
+        Get the directory for masters of a given instrument and type
+
+        :param instrument: Instrument/pipeline name
+        :param base_key: Type of master (e.g 'flat')
+        :return: Directory path
+        """
+        return self.store_dir.joinpath(instrument, base_key)
+
+    def get_image_path(self, instrument: str, base_key: str, content_hash: str) -> Path:
+        """
+        Get the path of a stored master image
+
+        :param instrument: Instrument/pipeline name
+        :param base_key: Type of master (e.g 'flat')
+        :param content_hash: Content hash of master
+        :return: Path of fits file
+        """
+        return self.get_entry_dir(instrument, base_key).joinpath(
+            f"{base_key}_{content_hash}.fits"
+        )
+
+    def add(
+        self,
+        image: Image,
+        instrument: str,
+        base_key: str,
+        content_hash: str,
+        metadata: dict,
+        settings_hash: str,
+        mjd: float,
+    ) -> Path:
+        """
+        Add a master image to the store
+
+        :param image: Master image
+        :param instrument: Instrument/pipeline name
+        :param base_key: Type of master (e.g 'flat')
+        :param content_hash: Content hash of the input frames and settings
+        :param metadata: Header metadata which must match for reuse
+        :param settings_hash: Hash of settings used to make the master
+        :param mjd: Mean MJD of the input frames
+        :return: Path of the stored image
+        """
+        path = self.get_image_path(instrument, base_key, content_hash)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        check_image_has_core_fields(image)
+        header = image.get_header().copy()
+        header[LATEST_SAVE_KEY] = path.as_posix()
+
+        # Write to temporary files first, so concurrent writers and readers
+        # never see a partial entry
+        temp_path = path.with_name(f".{os.getpid()}_{path.name}")
+        save_to_path(image.get_data(), header, temp_path)
+        os.replace(temp_path, path)
+
+        entry = {
+            "instrument": instrument,
+            "base_key": base_key,
+            "content_hash": content_hash,
+            "settings_hash": settings_hash,
+            "metadata": metadata,
+            "mjd": mjd,
+            "path": path.name,
+        }
+        json_path = path.with_suffix(".json")
+        temp_json_path = json_path.with_name(f".{os.getpid()}_{json_path.name}")
+        with open(temp_json_path, "w", encoding="utf8") as json_file:
+            json.dump(entry, json_file, default=str)
+        os.replace(temp_json_path, json_path)
+
+        logger.debug(f"Added {path} to {self}")
+
+        return path
+
+    def get(self, instrument: str, base_key: str, content_hash: str) -> Optional[Path]:
+        """
+        Get the path of a master with an exact content hash, if it is in the store
+
+        :param instrument: Instrument/pipeline name
+        :param base_key: Type of master (e.g 'flat')
+        :param content_hash: Content hash of the input frames and settings
+        :return: Path of stored image, or None
+        """
+        path = self.get_image_path(instrument, base_key, content_hash)
+        if path.with_suffix(".json").exists():
+            return path
+        return None
+
+    def list_entries(self, instrument: str, base_key: str) -> list[dict]:
+        """
+        List all complete entries for a given instrument and type of master
+
+        :param instrument: Instrument/pipeline name
+        :param base_key: Type of master (e.g 'flat')
+        :return: List of entries
+        """
+        entry_dir = self.get_entry_dir(instrument, base_key)
+        if not entry_dir.exists():
+            return []
+
+        entries = []
+        for json_path in sorted(entry_dir.glob(f"{base_key}_*.json")):
+            try:
+                with open(json_path, "r", encoding="utf8") as json_file:
+                    entries.append(json.load(json_file))
+            except (OSError, json.JSONDecodeError) as exc:
+                logger.warning(f"Skipping unreadable entry {json_path}: {exc}")
+        return entries
+
+    def find_best(
+        self,
+        instrument: str,
+        base_key: str,
+        metadata: dict,
+        settings_hash: str,
+        mjd: float,
+        max_age_days: float,
+    ) -> Optional[Path]:
+        """
+        Find the best available master, i.e the one closest in time to mjd,
+        with matching metadata and settings, and made within max_age_days
+
+        :param instrument: Instrument/pipeline name
+        :param base_key: Type of master (e.g 'flat')
+        :param metadata: Header metadata which must match
+        :param settings_hash: Hash of settings which must match
+        :param mjd: MJD of the images to be calibrated
+        :param max_age_days: Maximum time difference in days
+        :return: Path of stored image, or None
+        """
+        metadata = json.loads(json.dumps(metadata, default=str))
+
+        best_path, best_delta = None, None
+        for entry in self.list_entries(instrument, base_key):
+            if entry["settings_hash"] != settings_hash:
+                continue
+            if entry["metadata"] != metadata:
+                continue
+            delta = abs(entry["mjd"] - mjd)
+            if delta > max_age_days:
+                continue
+            if (best_delta is None) or (delta < best_delta):
+                best_path = self.get_entry_dir(instrument, base_key).joinpath(
+                    entry["path"]
+                )
+                best_delta = delta
+
+        return best_path
+
+
+calibration_store = (
+    None if calibration_store_dir is None else CalibrationStore(calibration_store_dir)
+)
@@ -9,11 +9,13 @@ from copy import copy
 import numpy as np
 
 from mirar.data import Image, ImageBatch
+from mirar.data.utils.stack import MEDIAN_COMBINE, stack_images
 from mirar.errors import ImageNotFoundError
 from mirar.paths import (
     BASE_NAME_KEY,
     COADD_KEY,
     DARK_FRAME_KEY,
+    DETECTOR_STATE_KEYS,
     EXPTIME_KEY,
     LATEST_SAVE_KEY,
     OBSCLASS_KEY,
@@ -52,14 +54,19 @@ class DarkCalibrator(ProcessorWithCache):
     base_name = "master_dark"
     base_key = "dark"
 
+    store_metadata_keys = [EXPTIME_KEY]
+    store_optional_metadata_keys = DETECTOR_STATE_KEYS
+
     def __init__(
         self,
         *args,
         select_cache_images: Callable[[ImageBatch], ImageBatch] = default_select_dark,
+        combine_method: str = MEDIAN_COMBINE,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
         self.select_cache_images = select_cache_images
+        self.combine_method = combine_method
 
     def description(self) -> str:
         return (
@@ -85,6 +92,11 @@ class DarkCalibrator(ProcessorWithCache):
             image[DARK_FRAME_KEY] = master_dark[LATEST_SAVE_KEY]
         return batch
 
+    def get_store_settings(self) -> dict:
+        settings = super().get_store_settings()
+        settings["combine_method"] = self.combine_method
+        return settings
+
     def make_image(
         self,
         images: ImageBatch,
@@ -101,24 +113,23 @@ class DarkCalibrator(ProcessorWithCache):
             logger.error(err)
             raise MissingDarkError(err)
 
-        nx, ny = dark_images[0].get_data().shape
-
-        darks = np.zeros((nx, ny, n_frames))
+        dark_exptimes = [img[EXPTIME_KEY] for img in dark_images]
+        individual_dark_exptimes = [str(x) for x in dark_exptimes]
+        imagenames_key = [img[BASE_NAME_KEY] for img in dark_images]
 
-        individual_dark_exptimes, imagenames_key = [], []
-        for i, img in enumerate(dark_images):
-            dark_exptime = img[EXPTIME_KEY]
-            darks[:, :, i] = img.get_data() / dark_exptime
-            individual_dark_exptimes.append(str(dark_exptime))
-            imagenames_key.append(img[BASE_NAME_KEY])
-
-        logger.debug(f"Median combining {n_frames} darks")
+        logger.debug(f"Combining {n_frames} darks with '{self.combine_method}'")
+        master_dark_data = stack_images(
+            dark_images.get_batch(),
+            method=self.combine_method,
+            scales=dark_exptimes,
+            n_threads=self.max_n_cpu,
+        )
         master_dark_header = copy(dark_images[0].get_header())
         master_dark_header[EXPTIME_KEY] = 1.0
         master_dark_header[COADD_KEY] = n_frames
         master_dark_header["INDIVEXP"] = ",".join(individual_dark_exptimes)
         master_dark_header[STACKED_COMPONENT_IMAGES_KEY] = ",".join(imagenames_key)
-        master_dark = Image(np.nanmedian(darks, axis=2), header=master_dark_header)
+        master_dark = Image(master_dark_data, header=master_dark_header)
 
         return master_dark
 
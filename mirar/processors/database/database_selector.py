@@ -12,6 +12,7 @@ import pandas as pd
 from mirar.data import DataBlock, Image, ImageBatch, SourceBatch
 from mirar.database.constraints import DBQueryConstraints
 from mirar.database.transactions import select_from_table
+from mirar.database.transactions.select import select_q3c_crossmatch
 from mirar.paths import SOURCE_HISTORY_KEY
 from mirar.processors.base_processor import BaseImageProcessor, BaseSourceProcessor
 from mirar.processors.database.base_database_processor import BaseDatabaseProcessor
@@ -181,17 +182,26 @@ class BaseDatabaseSourceSelector(BaseDatabaseSelector, BaseSourceProcessor, ABC)
         for source_table in batch:
             metadata = source_table.get_metadata()
             candidate_table = source_table.get_data()
-            results = []
-            for _, source in candidate_table.iterrows():
-
-                res = self.query_for_source(source, metadata)
-
-                results.append(res)
-
+            results = self.query_for_sources(candidate_table, metadata)
             new_table = self.update_dataframe(candidate_table, results)
             source_table.set_data(new_table)
         return batch
 
+    def query_for_sources(
+        self, candidate_table: pd.DataFrame, metadata: dict
+    ) -> list[pd.DataFrame]:
+        """
+        Query the database for all sources in a table
+
+        :param candidate_table: Table of sources
+        :param metadata: Source Batch metadata
+        :return: Results from the database, for each source
+        """
+        return [
+            self.query_for_source(source, metadata)
+            for _, source in candidate_table.iterrows()
+        ]
+
     def query_for_source(self, source: pd.Series, metadata: dict) -> pd.DataFrame:
         """
         Query the database for a single source
@@ -321,6 +331,95 @@ class BaseSpatialCrossmatchSource(BaseDatabaseSourceSelector, ABC):
     def get_constraints(self, data: dict) -> DBQueryConstraints:
         return self.get_source_crossmatch_constraints(data)
 
+    def get_join_values(self, data: dict) -> dict[str, float]:
+        """
+        Get the values of a single source used in a set-based crossmatch query
+
+        :param data: Dictionary containing source data
+        :return: Dictionary of values, including 'ra' and 'dec'
+        """
+        return {"ra": data["ra"], "dec": data["dec"]}
+
+    def get_join_constraints(self) -> list[str]:
+        """
+        Get sql constraints relating each source to the database table, in a
+        set-based crossmatch query. Source values from
+        get_join_values are available as 'srcs.src_<name>'. These should
+        mirror any per-source constraints added in get_constraints.
+
+        :return: List of sql constraints
+        """
+        return []
+
+    def uses_join_constraints(self) -> bool:
+        """
+        Check whether the constraints of get_constraints are mirrored by
+        get_join_constraints, i.e. whether get_join_constraints is defined
+        in the same class as get_constraints, or a subclass of it.
+
+        :return: boolean
+        """
+        mro = type(self).__mro__
+        constraints_cls = next(x for x in mro if "get_constraints" in vars(x))
+        join_cls = next(x for x in mro if "get_join_constraints" in vars(x))
+        return issubclass(join_cls, constraints_cls)
+
+    def query_for_sources(
+        self, candidate_table: pd.DataFrame, metadata: dict
+    ) -> list[pd.DataFrame]:
+        """
+        Query the database for all sources in a table at once, with a single
+        q3c_join crossmatch. If there are several matches and max_num_results
+        is set, the closest matches (or first by order_field_name) are kept.
+
+        If get_constraints is overridden without get_join_constraints, each
+        source is instead queried separately, so that its constraints apply.
+
+        :param candidate_table: Table of sources
+        :param metadata: Source Batch metadata
+        :return: Results from the database, for each source
+        """
+        if not self.uses_join_constraints():
+            logger.debug(
+                f"{self.__class__.__name__} overrides get_constraints but not "
+                f"get_join_constraints, so each source is queried separately."
+            )
+            return super().query_for_sources(candidate_table, metadata)
+
+        output_columns = self.db_output_columns
+        if not isinstance(output_columns, list):
+            output_columns = [output_columns]
+
+        source_values = pd.DataFrame(
+            [
+                self.get_join_values(self.generate_super_dict(metadata, source))
+                for _, source in candidate_table.iterrows()
+            ]
+        )
+
+        res = select_q3c_crossmatch(
+            sql_table=self.db_table.sql_model,
+            source_values=source_values,
+            crossmatch_radius_arcsec=self.xmatch_radius_arcsec,
+            output_columns=output_columns,
+            ra_field_name=self.ra_field_name,
+            dec_field_name=self.dec_field_name,
+            join_constraints=self.get_join_constraints(),
+            db_constraints=self.additional_query_constraints,
+            max_num_results=self.max_num_results,
+            order_field_name=self.order_field_name,
+            order_ascending=self.order_ascending,
+        )
+
+        matches = {
+            ind: group[output_columns].reset_index(drop=True)
+            for ind, group in res.groupby("src_index")
+        }
+        no_match = res[output_columns].iloc[0:0]
+        return [
+            matches.get(ind, no_match.copy()) for ind in range(len(candidate_table))
+        ]
+
 
 class SingleSpatialCrossmatchSource(
     BaseSpatialCrossmatchSource, DatabaseSingleMatchSelector
@@ -383,3 +482,15 @@ class DatabaseHistorySelector(SpatialCrossmatchSourceWithDatabase):
             accepted_values=data[self.time_field_name] - self.history_duration_days,
         )
         return query_constraints
+
+    def get_join_values(self, data: dict) -> dict[str, float]:
+        values = super().get_join_values(data)
+        values[self.time_field_name] = data[self.time_field_name]
+        return values
+
+    def get_join_constraints(self) -> list[str]:
+        src_time = f"srcs.src_{self.time_field_name}"
+        return super().get_join_constraints() + [
+            f"{self.time_field_name} < {src_time}",
+            f"{self.time_field_name} >= {src_time} - {self.history_duration_days}",
+        ]
@@ -11,11 +11,13 @@ from copy import copy
 import numpy as np
 
 from mirar.data import Image, ImageBatch
+from mirar.data.utils.stack import MEDIAN_COMBINE, stack_images
 from mirar.errors import ImageNotFoundError
 from mirar.paths import (
     BASE_NAME_KEY,
     COADD_KEY,
     EXPTIME_KEY,
+    FILTER_KEY,
     FLAT_FRAME_KEY,
     LATEST_SAVE_KEY,
     OBSCLASS_KEY,
@@ -51,6 +53,8 @@ class FlatCalibrator(ProcessorWithCache):
 
     base_key = "flat"
 
+    store_metadata_keys = [FILTER_KEY]
+
     def __init__(
         self,
         *args,
@@ -61,6 +65,7 @@ class FlatCalibrator(ProcessorWithCache):
         flat_nan_threshold: float = 0.0,
         select_flat_images: Callable[[ImageBatch], ImageBatch] = default_select_flat,
         flat_mask_key: str = None,
+        combine_method: str = MEDIAN_COMBINE,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
@@ -71,6 +76,7 @@ class FlatCalibrator(ProcessorWithCache):
         self.flat_nan_threshold = flat_nan_threshold
         self.select_cache_images = select_flat_images
         self.flat_mask_key = flat_mask_key
+        self.combine_method = combine_method
 
     def description(self) -> str:
         return "Creates a flat image, divides other images by this image."
@@ -95,6 +101,13 @@ class FlatCalibrator(ProcessorWithCache):
 
         return batch
 
+    def get_store_settings(self) -> dict:
+        settings = super().get_store_settings()
+        settings["combine_method"] = self.combine_method
+        settings["subregion"] = [self.x_min, self.x_max, self.y_min, self.y_max]
+        settings["flat_mask_key"] = self.flat_mask_key
+        return settings
+
     def make_image(
         self,
         images: ImageBatch,
@@ -109,13 +122,9 @@ class FlatCalibrator(ProcessorWithCache):
             logger.error(err)
             raise MissingFlatError(err)
 
-        nx, ny = images[0].get_data().shape
-
-        flats = np.zeros((nx, ny, n_frames))
-
-        flat_exptimes = []
-        for i, img in enumerate(images):
-            data = img.get_data()
+        flat_exptimes, medians, masks = [], [], []
+        for img in images:
+            mask_img = None
 
             if self.flat_mask_key is not None:
                 if self.flat_mask_key not in img.header.keys():
@@ -134,23 +143,35 @@ class FlatCalibrator(ProcessorWithCache):
                     raise FileNotFoundError(err)
 
                 mask_img = self.open_fits(mask_file)
-                pixels_to_keep = mask_img.get_data().astype(bool)
-                mask = ~pixels_to_keep
+
+            masks.append(mask_img)
+            flat_exptimes.append(img[EXPTIME_KEY])
+
+            # Only the normalisation subregion is read here,
+            # the full frames are combined strip-by-strip below
+            subregion = (
+                slice(self.x_min, self.x_max),
+                slice(self.y_min, self.y_max),
+            )
+            data = np.array(img.get_data()[subregion], dtype=float)
+            if mask_img is not None:
+                mask = ~mask_img.get_data()[subregion].astype(bool)
                 logger.debug(
                     f"Masking {np.sum(mask)} pixels in flat {img[BASE_NAME_KEY]}"
                 )
                 data[mask] = np.nan
 
-            flat_exptimes.append(img[EXPTIME_KEY])
-
-            median = np.nanmedian(
-                data[self.x_min : self.x_max, self.y_min : self.y_max]
-            )
-            flats[:, :, i] = data / median
+            medians.append(np.nanmedian(data))
 
-        logger.debug(f"Median combining {n_frames} flats")
+        logger.debug(f"Combining {n_frames} flats with '{self.combine_method}'")
 
-        master_flat = np.nanmedian(flats, axis=2)
+        master_flat = stack_images(
+            images.get_batch(),
+            method=self.combine_method,
+            scales=medians,
+            masks=masks,
+            n_threads=self.max_n_cpu,
+        )
 
         master_flat_image = Image(master_flat, header=copy(images[0].get_header()))
         master_flat_image[COADD_KEY] = n_frames
@@ -0,0 +1,298 @@
+"""
+Module for collecting timing, memory and I/O metrics of processors.
+
+Each time a :class:`~mirar.processors.base_processor.BaseProcessor` is applied
+to a batch, a :class:`BatchMetrics` records:
+
+* the wall time (latency) of the batch
+* the CPU time of the thread applying the processor
+* the increase in the peak resident set size (RSS) of the process
+* the bytes read and written by the thread (from /proc, so only on Linux)
+
+The metrics of all batches are aggregated by a :class:`ProcessorMetrics`
+for each processor, which is stored as `latest_metrics`. At the end of
+:func:`~mirar.pipelines.base_pipeline.Pipeline.reduce_images`, the metrics of
+each step are exported as a JSON/CSV run report, and optionally as a
+Prometheus-style text file (set PROMETHEUS_METRICS_PATH), to compare runs
+between nights.
+
+Memory is measured for the process as a whole, so batches applied
+concurrently in threads share any increase in peak RSS.
+"""
+
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_prometheus_metrics_path = os.getenv("PROMETHEUS_METRICS_PATH")
+PROMETHEUS_METRICS_PATH: Path | None = (
+    None if _prometheus_metrics_path is None else Path(_prometheus_metrics_path)
+)
+
+PROMETHEUS_PREFIX = "mirar_processor"
+
+LATENCY_PERCENTILES = [50, 90, 99]
+
+# ru_maxrss is in bytes on macOS, and in kilobytes elsewhere
+RSS_UNIT_BYTES = 1 if sys.platform == "darwin" else 1024
+
+THREAD_IO_PATH = Path("/proc/thread-self/io")
+
+
+def get_peak_rss() -> int:
+    """
+    Get the peak resident set size of this process
+
+    :return: Peak RSS in bytes
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT_BYTES
+
+
+def get_thread_io() -> tuple[int, int]:
+    """
+    Get the total bytes read and written by this thread, including
+    reads served from the page cache. Returns zeros if /proc is not available.
+
+    :return: bytes read, bytes written
+    """
+    try:
+        with open(THREAD_IO_PATH, "r", encoding="utf8") as io_file:
+            counters = dict(line.split(": ") for line in io_file.read().splitlines())
+    except OSError:
+        return 0, 0
+    return int(counters["rchar"]), int(counters["wchar"])
+
+
+class BatchMetrics:
+    """
+    Class to measure the application of a processor to a single batch,
+    used as a context manager
+    """
+
+    def __init__(self):
+        self.start_time = None
+        self.end_time = None
+        self.cpu_time_s = 0.0
+        self.peak_rss_delta_bytes = 0
+        self.read_bytes = 0
+        self.write_bytes = 0
+
+        self._start_cpu = None
+        self._start_rss = None
+        self._start_io = None
+
+    def __enter__(self):
+        self._start_rss = get_peak_rss()
+        self._start_io = get_thread_io()
+        self._start_cpu = time.thread_time()
+        self.start_time = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.end_time = time.time()
+        self.cpu_time_s = time.thread_time() - self._start_cpu
+        self.peak_rss_delta_bytes = get_peak_rss() - self._start_rss
+        read_bytes, write_bytes = get_thread_io()
+        self.read_bytes = read_bytes - self._start_io[0]
+        self.write_bytes = write_bytes - self._start_io[1]
+
+    @property
+    def wall_time_s(self) -> float:
+        """
+        Wall time taken to apply the processor to the batch
+
+        :return: Time in seconds
+        """
+        return self.end_time - self.start_time
+
+
+class ProcessorMetrics:
+    """
+    Class to aggregate the metrics of every batch a processor is applied to
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def add_batch(self, batch_metrics: BatchMetrics):
+        """
+        Add the metrics of a batch
+
+        :param batch_metrics: Metrics of batch
+        :return: None
+        """
+        with self.lock:
+            self.batches.append(batch_metrics)
+
+    def get_summary(self) -> dict:
+        """
+        Get a summary of the metrics of all batches. The wall time runs from
+        the start of the first batch to the end of the last batch, and
+        batch latencies are summarised by their mean and percentiles.
+
+        :return: Dictionary of metrics
+        """
+        with self.lock:
+            batches = list(self.batches)
+
+        latencies = np.array([x.wall_time_s for x in batches])
+
+        summary = {
+            "n_batches": len(batches),
+            "wall_time_s": 0.0,
+            "batch_time_s": float(np.sum(latencies)),
+            "cpu_time_s": float(sum(x.cpu_time_s for x in batches)),
+            "peak_rss_delta_bytes": int(
+                max([x.peak_rss_delta_bytes for x in batches], default=0)
+            ),
+            "read_bytes": int(sum(x.read_bytes for x in batches)),
+            "write_bytes": int(sum(x.write_bytes for x in batches)),
+            "latency_mean_s": np.nan,
+        }
+        for percentile in LATENCY_PERCENTILES:
+            summary[f"latency_p{percentile}_s"] = np.nan
+        summary["latency_max_s"] = np.nan
+
+        if len(batches) > 0:
+            summary["wall_time_s"] = max(x.end_time for x in batches) - min(
+                x.start_time for x in batches
+            )
+            summary["latency_mean_s"] = float(np.mean(latencies))
+            for percentile in LATENCY_PERCENTILES:
+                summary[f"latency_p{percentile}_s"] = float(
+                    np.percentile(latencies, percentile)
+                )
+            summary["latency_max_s"] = float(np.max(latencies))
+
+        return summary
+
+
+def get_metrics_table(processors: list) -> pd.DataFrame:
+    """
+    Get a table of the latest metrics of each step of a pipeline run
+
+    :param processors: Processors applied, in order
+    :return: Dataframe with one row per step
+    """
+    columns = [
+        "step",
+        "processor",
+        "n_input_batches",
+        "n_input_blocks",
+        "n_output_batches",
+        "n_output_blocks",
+        "n_errors",
+        *ProcessorMetrics().get_summary(),
+    ]
+
+    rows = []
+    for step, processor in enumerate(processors):
+        row = {
+            "step": step + 1,
+            "processor": processor.__class__.__name__,
+            "n_input_batches": processor.latest_n_input_batches,
+            "n_input_blocks": processor.latest_n_input_blocks,
+            "n_output_batches": processor.latest_n_output_batches,
+            "n_output_blocks": processor.latest_n_output_blocks,
+            "n_errors": len(processor.latest_error_stack.reports),
+        }
+        row.update(processor.latest_metrics.get_summary())
+        rows.append(row)
+    # Keep the columns when no processors were applied (e.g. after resuming
+    # from the final checkpoint)
+    return pd.DataFrame(rows, columns=columns)
+
+
+def write_metrics_report(
+    metrics_table: pd.DataFrame, output_path: Path, run_info: dict
+) -> tuple[Path, Path]:
+    """
+    Write a run report of processor metrics, as a JSON file (with general
+    information about the run) and as a CSV file
+
+    :param metrics_table: Table of metrics, from :func:`get_metrics_table`
+    :param output_path: Path of JSON report (the CSV has the same stem)
+    :param run_info: Dictionary of information about the run
+    :return: Paths of JSON and CSV reports
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # NaN is not valid JSON
+    steps = metrics_table.astype(object).where(metrics_table.notna(), None)
+    report = {**run_info, "steps": steps.to_dict(orient="records")}
+
+    with open(output_path, "w", encoding="utf8") as json_file:
+        json.dump(report, json_file, indent=4, default=str)
+
+    csv_path = output_path.with_suffix(".csv")
+    metrics_table.to_csv(csv_path, index=False)
+
+    logger.debug(f"Saved processor metrics to {output_path} and {csv_path}")
+    return output_path, csv_path
+
+
+def write_prometheus_metrics(
+    metrics_table: pd.DataFrame, output_path: Path, labels: dict[str, str]
+):
+    """
+    Write processor metrics as a Prometheus-style text file, e.g. for the
+    textfile collector of the node exporter
+
+    :param metrics_table: Table of metrics, from :func:`get_metrics_table`
+    :param output_path: Path of text file
+    :param labels: Labels applied to every metric (e.g. pipeline and night)
+    :return: None
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    lines = []
+    for column in metrics_table.columns:
+        if column in ["step", "processor"]:
+            continue
+        name = f"{PROMETHEUS_PREFIX}_{column}"
+        lines += [
+            f"# HELP {name} {column.replace('_', ' ')} of each processor",
+            f"# TYPE {name} gauge",
+        ]
+        for _, row in metrics_table.iterrows():
+            if pd.isna(row[column]):
+                continue
+            row_labels = {
+                **labels,
+                "step": str(row["step"]),
+                "processor": row["processor"],
+            }
+            label_str = ",".join(
+                f'{key}="{value}"' for key, value in row_labels.items()
+            )
+            lines.append(f"{name}{{{label_str}}} {float(row[column])}")
+
+    # Write atomically, so a scraper never reads a partial file
+    temp_path = output_path.with_name(f".{output_path.name}.tmp")
+    with open(temp_path, "w", encoding="utf8") as prom_file:
+        prom_file.write("\n".join(lines) + "\n")
+    temp_path.replace(output_path)
+
+    logger.debug(f"Saved Prometheus metrics to {output_path}")
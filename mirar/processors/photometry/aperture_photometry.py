@@ -87,14 +87,15 @@ class AperturePhotometry(BasePhotometryProcessor):
             all_fluxes, all_fluxuncs = [], []
             temp_imagename, temp_unc_imagename = self.save_temp_image_uncimage(metadata)
 
-            for cand_ind in range(len(candidate_table)):
-                row = candidate_table.iloc[cand_ind]
+            image_cutouts, unc_image_cutouts = self.generate_all_cutouts(
+                imagename=temp_imagename,
+                unc_imagename=temp_unc_imagename,
+                table=candidate_table,
+            )
 
-                image_cutout, unc_image_cutout = self.generate_cutouts(
-                    imagename=temp_imagename,
-                    unc_imagename=temp_unc_imagename,
-                    data_item=row,
-                )
+            for cand_ind, (image_cutout, unc_image_cutout) in enumerate(
+                zip(image_cutouts, unc_image_cutouts)
+            ):
 
                 fluxes, fluxuncs = self.perform_photometry(
                     image_cutout=image_cutout, unc_image_cutout=unc_image_cutout
@@ -129,8 +130,7 @@ class AperturePhotometry(BasePhotometryProcessor):
                 candidate_table[f"{APMAG_PREFIX_KEY}{suffix}"] = magnitudes
                 candidate_table[f"{APMAGUNC_PREFIX_KEY}{suffix}"] = magnitudes_unc
 
-            temp_imagename.unlink()
-            temp_unc_imagename.unlink()
+            self.delete_temp_image_uncimage(temp_imagename, temp_unc_imagename)
             source_table.set_data(candidate_table)
 
         return batch
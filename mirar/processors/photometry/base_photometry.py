@@ -10,6 +10,7 @@ import numpy as np
 import pandas as pd
 
 from mirar.data import Image
+from mirar.data.utils import cutout_cache
 from mirar.paths import (
     BASE_NAME_KEY,
     LATEST_SAVE_KEY,
@@ -22,7 +23,7 @@ from mirar.paths import (
     get_output_dir,
 )
 from mirar.processors.base_processor import BaseSourceProcessor, ImageHandler
-from mirar.processors.photometry.utils import get_rms_image, make_cutouts
+from mirar.processors.photometry.utils import get_rms_image
 
 logger = logging.getLogger(__name__)
 
@@ -97,9 +98,8 @@ class BasePhotometryProcessor(BaseSourceProcessor, ABC, ImageHandler):
         self, imagename: Path, unc_imagename: Path, data_item: Image | pd.Series
     ) -> tuple[np.ndarray, np.ndarray]:
         """
-        Generate image and uncertainty image cutouts. This function first saves the
-        image and uncertainty image to temporary files, then generates the cutouts,
-        then deletes the temporary files.
+        Generate image and uncertainty image cutouts for a single source.
+        The images are read once, and then cached for subsequent cutouts.
         :param imagename: Path to the image
         :param unc_imagename: Path to the uncertainty image
         :param data_item: pandas DataFrame Series or astropy fits Header
@@ -108,14 +108,47 @@ class BasePhotometryProcessor(BaseSourceProcessor, ABC, ImageHandler):
         """
 
         x, y = self.get_physical_coordinates(data_item)
-        image_cutout, unc_image_cutout = make_cutouts(
-            image_paths=[imagename, unc_imagename],
-            position=(x, y),
-            half_size=self.phot_cutout_half_size,
-        )
+        image_cutout, unc_image_cutout = [
+            cutout_cache.get_cutouts(path, x, y, self.phot_cutout_half_size)[0]
+            for path in [imagename, unc_imagename]
+        ]
 
         return image_cutout, unc_image_cutout
 
+    def generate_all_cutouts(
+        self, imagename: Path, unc_imagename: Path, table: pd.DataFrame
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Generate image and uncertainty image cutouts for all sources in a table,
+        in a single pass over each image
+
+        :param imagename: Path to the image
+        :param unc_imagename: Path to the uncertainty image
+        :param table: Table of sources
+        :return: 3D numpy arrays of the image cutouts and uncertainty image cutouts
+        """
+        x_positions = table[self.xpos_key].to_numpy(dtype=float).astype(int)
+        y_positions = table[self.ypos_key].to_numpy(dtype=float).astype(int)
+        image_cutouts, unc_image_cutouts = [
+            cutout_cache.get_cutouts(
+                path, x_positions, y_positions, self.phot_cutout_half_size
+            )
+            for path in [imagename, unc_imagename]
+        ]
+        return image_cutouts, unc_image_cutouts
+
+    def delete_temp_image_uncimage(self, imagename: Path, unc_imagename: Path):
+        """
+        Delete temporary image and uncertainty image files, and their cached data
+
+        :param imagename: Path to the image
+        :param unc_imagename: Path to the uncertainty image
+        :return: None
+        """
+        for path in [imagename, unc_imagename]:
+            cutout_cache.discard(path)
+            path.unlink()
+
     def save_temp_image_uncimage(self, metadata: dict) -> tuple[Path, Path]:
         """
         Function to save the image and uncertainty image to temporary files
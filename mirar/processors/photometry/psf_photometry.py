@@ -19,8 +19,9 @@ from mirar.processors.base_processor import PrerequisiteError
 from mirar.processors.photometry.base_photometry import BasePhotometryProcessor
 from mirar.processors.photometry.utils import (
     get_mags_from_fluxes,
-    make_psf_shifted_array,
+    get_psf_shifted_array,
     psf_photometry,
+    psf_photometry_batch,
 )
 
 logger = logging.getLogger(__name__)
@@ -49,10 +50,8 @@ class PSFPhotometry(BasePhotometryProcessor):
         :param psf_filename: filename of psf file
         :return: flux, fluxunc, minchi2, xshift, yshift
         """
-        if not isinstance(psf_filename, Path):
-            psf_filename = Path(psf_filename)
-        psfmodels = make_psf_shifted_array(
-            psf_filename=psf_filename.as_posix(),
+        psfmodels = get_psf_shifted_array(
+            psf_filename=psf_filename,
             cutout_size_psf_phot=int(image_cutout.shape[0] / 2),
         )
 
@@ -84,8 +83,6 @@ class PSFPhotometry(BasePhotometryProcessor):
 
             metadata = source_table.get_metadata()
 
-            fluxes, fluxuncs, minchi2s, xshifts, yshifts = [], [], [], [], []
-
             if self.psf_file_key not in metadata:
                 raise PrerequisiteError(
                     f"PSF file key {self.psf_file_key} not in source table."
@@ -95,23 +92,26 @@ class PSFPhotometry(BasePhotometryProcessor):
             psf_filename = source_table[self.psf_file_key]
             temp_imagename, temp_unc_imagename = self.save_temp_image_uncimage(metadata)
 
-            for ind, row in candidate_table.iterrows():
-                image_cutout, unc_image_cutout = self.generate_cutouts(
-                    imagename=temp_imagename,
-                    unc_imagename=temp_unc_imagename,
-                    data_item=row,
-                )
-                (
-                    flux,
-                    fluxunc,
-                    minchi2,
-                    xshift,
-                    yshift,
-                ) = self.perform_photometry(
-                    image_cutout, unc_image_cutout, psf_filename=psf_filename
-                )
+            image_cutouts, unc_image_cutouts = self.generate_all_cutouts(
+                imagename=temp_imagename,
+                unc_imagename=temp_unc_imagename,
+                table=candidate_table,
+            )
 
-                if self.save_cutouts:
+            psfmodels = get_psf_shifted_array(
+                psf_filename=psf_filename,
+                cutout_size_psf_phot=self.phot_cutout_half_size,
+            )
+            fluxes, fluxuncs, minchi2s, xshifts, yshifts, _ = psf_photometry_batch(
+                image_cutouts=image_cutouts,
+                image_unc_cutouts=unc_image_cutouts,
+                psfmodels=psfmodels,
+            )
+
+            if self.save_cutouts:
+                for ind, image_cutout, unc_image_cutout in zip(
+                    candidate_table.index, image_cutouts, unc_image_cutouts
+                ):
                     image_cutout_path = get_output_dir(
                         self.temp_output_sub_dir, self.night_sub_dir
                     ).joinpath(f"image_cutout_{ind}.dat")
@@ -123,12 +123,6 @@ class PSFPhotometry(BasePhotometryProcessor):
                     logger.debug(f"Writing cutout to {unc_image_cutout_path}")
                     np.savetxt(X=unc_image_cutout, fname=unc_image_cutout_path)
 
-                fluxes.append(flux)
-                fluxuncs.append(fluxunc)
-                minchi2s.append(minchi2)
-                xshifts.append(xshift)
-                yshifts.append(yshift)
-
             candidate_table[PSF_FLUX_KEY] = fluxes
             candidate_table[PSF_FLUXUNC_KEY] = fluxuncs
             candidate_table["chipsf"] = minchi2s
@@ -145,8 +139,7 @@ class PSFPhotometry(BasePhotometryProcessor):
             candidate_table[MAG_PSF_KEY] = magnitudes
             candidate_table[MAGERR_PSF_KEY] = magnitudes_unc
 
-            temp_imagename.unlink()
-            temp_unc_imagename.unlink()
+            self.delete_temp_image_uncimage(temp_imagename, temp_unc_imagename)
 
             source_table.set_data(candidate_table)
 
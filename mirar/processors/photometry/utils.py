@@ -3,6 +3,8 @@ Module with utis for photometry
 """
 
 import logging
+import os
+from functools import lru_cache
 from pathlib import Path
 
 import matplotlib.pyplot as plt
@@ -13,76 +15,102 @@ from matplotlib.patches import Circle
 from photutils.aperture import CircularAnnulus, CircularAperture, aperture_photometry
 
 from mirar.data import Image
-from mirar.errors import ProcessorError
+from mirar.data.utils.cutouts import CutoutError, make_cutouts  # pylint: disable=W0611
 from mirar.paths import GAIN_KEY
 
 logger = logging.getLogger(__name__)
 
+PSF_MODEL_CACHE_SIZE = 16
 
-class CutoutError(ProcessorError):
+
+def get_psf_model_shifts(psfmodels: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
     """
-    Error raised when cutout generation fails
+    Get the x and y shift of each PSF model in a shifted-PSF grid,
+    relative to the reference model
+
+    :param psfmodels: 3D numpy array of the PSF models
+    :return: xshifts, yshifts of each model
     """
+    numpsfmodels = psfmodels.shape[2]
+    flat_models = psfmodels.reshape(-1, numpsfmodels)
+    inds = np.unravel_index(np.argmax(flat_models, axis=0), psfmodels.shape[:2])
+    ys_cen, xs_cen = inds[0], inds[1]
+    unshifted_ind = numpsfmodels // 2 + 1
+    return xs_cen - xs_cen[unshifted_ind], ys_cen - ys_cen[unshifted_ind]
 
 
-def make_cutouts(
-    image_paths: Path | list[Path], position: tuple, half_size: int
-) -> list[np.array]:
+def psf_photometry_batch(
+    image_cutouts: np.ndarray,
+    image_unc_cutouts: np.ndarray,
+    psfmodels: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
     """
-    Function to make cutouts
-    Args:
-        :param: image_paths: Path or list of paths to the images
-        :param: position: (x,y) coordinates of the center of the cutouts
-        :param: half_size: half_size of the square cutouts
-
-    Returns:
-        :return: cutout_list: list of 2D numpy arrays
+    Function to perform PSF photometry on many sources at once.
+    The flux for every source and every PSF model is fit by linear least squares,
+    as a single matrix product, and the model with the lowest chi2 is then
+    selected for each source.
+
+    Pixels which are NaN, or have zero uncertainty (e.g padding beyond the image
+    edge), do not contribute to the chi2.
+
+    :param image_cutouts: 3D numpy array of image cutouts, (N, size, size)
+    :param image_unc_cutouts: 3D numpy array of uncertainty cutouts, (N, size, size)
+    :param psfmodels: 3D numpy array of the PSF models, (size, size, M)
+    :return: psf_fluxes, psf_flux_uncs, chi2s, xshifts, yshifts, best-fit model index
     """
-    if not isinstance(image_paths, list):
-        image_paths = [image_paths]
-
-    cutout_list = []
-    for image_path in image_paths:
-        data = fits.getdata(image_path)
-        y_image_size, x_image_size = np.shape(data)
-        x, y = position
-
-        if x < 0 or x > x_image_size or y < 0 or y > y_image_size:
-            raise CutoutError(
-                f"Cutout position {x},{y} is outside the image {image_path}"
-            )
-
-        if x < half_size:
-            xmin, xmax = 0, x + half_size + 1
-            x_pad_width = (half_size - x, 0)
-
-        elif x + half_size + 1 > x_image_size:
-            xmin, xmax = x - half_size, x_image_size
-            x_pad_width = (0, (half_size + x + 1) - x_image_size)
-        else:
-            xmin, xmax = x - half_size, x + half_size + 1
-            x_pad_width = (0, 0)
-
-        if y < half_size:
-            ymin, ymax = 0, y + half_size + 1
-            y_pad_width = (half_size - y, 0)
-
-        elif y + half_size + 1 > y_image_size:
-            ymin, ymax = y - half_size, y_image_size
-            y_pad_width = (0, (half_size + y + 1) - y_image_size)
-        else:
-            ymin, ymax = y - half_size, y + half_size + 1
-            y_pad_width = (0, 0)
-
-        cutout = data[ymin:ymax, xmin:xmax]
-        cutout = np.pad(cutout, (y_pad_width, x_pad_width), "constant")
-        cutout_list.append(cutout)
-
-        assert cutout.shape == (2 * half_size + 1, 2 * half_size + 1), (
-            f"Cutout shape is not correct for x={x} and y={y} and "
-            f"half_size={half_size}. Shape is {cutout.shape} Data shape is {data.shape}"
+    n_sources = len(image_cutouts)
+    numpsfmodels = psfmodels.shape[2]
+
+    if n_sources == 0:
+        return (
+            np.zeros(0),
+            np.zeros(0),
+            np.zeros(0),
+            np.zeros(0, dtype=int),
+            np.zeros(0, dtype=int),
+            np.zeros(0, dtype=int),
         )
-    return cutout_list
+
+    models = psfmodels.reshape(-1, numpsfmodels).astype(float)
+    models_sq = np.square(models)
+    norms = np.sum(models_sq, axis=0)
+
+    images = np.asarray(image_cutouts, dtype=float).reshape(n_sources, -1)
+    uncs = np.asarray(image_unc_cutouts, dtype=float).reshape(n_sources, -1)
+
+    image_valid = np.isfinite(images)
+    images = np.where(image_valid, images, 0.0)
+    unc_sq = np.where(np.isfinite(uncs), np.square(uncs), 0.0)
+
+    # Least-squares flux, and its uncertainty, for every source and model
+    fluxes = (images @ models) / norms
+    flux_uncs = np.sqrt(unc_sq @ models_sq) / norms
+
+    # chi2 = sum(w * (image - flux * model)^2), expanded so that it can be
+    # evaluated with matrix products for all sources and models at once
+    valid = image_valid & (unc_sq > 0.0)
+    weights = np.divide(1.0, unc_sq, out=np.zeros_like(unc_sq), where=valid)
+    weighted_images = weights * images
+    chi2s = (
+        np.sum(weighted_images * images, axis=1)[:, None]
+        - 2.0 * fluxes * (weighted_images @ models)
+        + np.square(fluxes) * (weights @ models_sq)
+    )
+    deg_freedom = images.shape[1] - 1
+    chi2s = np.maximum(chi2s, 0.0) / deg_freedom
+
+    best_inds = np.argmin(chi2s, axis=1)
+    rows = np.arange(n_sources)
+    model_xshifts, model_yshifts = get_psf_model_shifts(psfmodels)
+
+    return (
+        fluxes[rows, best_inds],
+        flux_uncs[rows, best_inds],
+        chi2s[rows, best_inds],
+        model_xshifts[best_inds],
+        model_yshifts[best_inds],
+        best_inds,
+    )
 
 
 def psf_photometry(
@@ -104,49 +132,16 @@ def psf_photometry(
         :return xshifts: xshift required to match PSF to the source
         :return yshifts: yshift required to match PSF to the source
     """
-    numpsfmodels = psfmodels.shape[2]
-
-    chi2s, psf_fluxes, psf_flux_uncs = [], [], []
-    for ind in range(numpsfmodels):
-        psfmodel = psfmodels[:, :, ind]
-        psf_flux = np.nansum(psfmodel * image_cutout) / np.nansum(np.square(psfmodel))
-        psf_flux_unc = np.sqrt(
-            np.nansum(np.square(psfmodel) * np.square(image_unc_cutout))
-        ) / np.nansum(np.square(psfmodel))
-        deg_freedom = np.size(image_cutout) - 1
-        chi2 = (
-            np.nansum(
-                np.square(image_cutout - psfmodel * psf_flux)
-                / np.square(image_unc_cutout)
-            )
-            / deg_freedom
-        )
-
-        psf_fluxes.append(psf_flux)
-        psf_flux_uncs.append(psf_flux_unc)
-        chi2s.append(chi2)
-
-    minchi2_ind = np.argmin(chi2s)
-    minchi2 = np.min(chi2s)
-    best_fit_psf_flux = psf_fluxes[minchi2_ind]
-    best_fit_psf_fluxunc = psf_flux_uncs[minchi2_ind]
-
-    best_fit_psfmodel = psfmodels[:, :, minchi2_ind]
-    ys_cen, xs_cen = np.where(best_fit_psfmodel == np.max(best_fit_psfmodel))
-
-    unshifted_psf = psfmodels[:, :, numpsfmodels // 2 + 1]
-
-    y_cen, x_cen = np.where(unshifted_psf == np.max(unshifted_psf))
-    yshift = (ys_cen[0] - y_cen)[0]
-    xshift = (xs_cen[0] - x_cen)[0]
-
+    fluxes, fluxuncs, chi2s, xshifts, yshifts, best_inds = psf_photometry_batch(
+        image_cutout[None], image_unc_cutout[None], psfmodels
+    )
     return (
-        best_fit_psf_flux,
-        best_fit_psf_fluxunc,
-        minchi2,
-        xshift,
-        yshift,
-        best_fit_psfmodel,
+        fluxes[0],
+        fluxuncs[0],
+        chi2s[0],
+        xshifts[0],
+        yshifts[0],
+        psfmodels[:, :, best_inds[0]],
     )
 
 
@@ -185,8 +180,8 @@ def make_psf_shifted_array(
     unshifted_ind = int(ngrid / 2) + 1
     normpsfmax = np.max(normpsf)
     xcen_1, xcen_2 = np.where(padpsfs[:, :, unshifted_ind] == normpsfmax)
-    xcen_1 = int(xcen_1)
-    xcen_2 = int(xcen_2)
+    xcen_1 = int(xcen_1[0])
+    xcen_2 = int(xcen_2[0])
 
     psfmodels = padpsfs[
         xcen_1 - cutout_size_psf_phot : xcen_1 + cutout_size_psf_phot + 1,
@@ -195,6 +190,44 @@ def make_psf_shifted_array(
     return psfmodels
 
 
+@lru_cache(maxsize=PSF_MODEL_CACHE_SIZE)
+def _get_cached_psf_shifted_array(
+    psf_key: tuple[str, int, int], cutout_size_psf_phot: int, pad_psf_size: int
+) -> np.ndarray:
+    """
+    Make a shifted-PSF grid, cached by PSF file path, size and modification time
+
+    :param psf_key: (path, size, mtime) of the PSF file
+    :param cutout_size_psf_phot: Half size of the PSF models
+    :param pad_psf_size: Size of padded PSF
+    :return: 3D numpy array of the PSF models (read-only)
+    """
+    psfmodels = make_psf_shifted_array(
+        psf_filename=psf_key[0],
+        cutout_size_psf_phot=cutout_size_psf_phot,
+        pad_psf_size=pad_psf_size,
+    )
+    psfmodels.setflags(write=False)
+    return psfmodels
+
+
+def get_psf_shifted_array(
+    psf_filename: str | Path, cutout_size_psf_phot: int = 20, pad_psf_size: int = 60
+) -> np.ndarray:
+    """
+    Get the shifted-PSF grid for a PSF file, making it only once per PSFEx output.
+    A rewritten PSF file is detected by its size and modification time.
+
+    :param psf_filename: PSF file
+    :param cutout_size_psf_phot: Half size of the PSF models
+    :param pad_psf_size: Size of padded PSF
+    :return: 3D numpy array of the PSF models (read-only)
+    """
+    stat = os.stat(psf_filename)
+    psf_key = (Path(psf_filename).resolve().as_posix(), stat.st_size, stat.st_mtime_ns)
+    return _get_cached_psf_shifted_array(psf_key, cutout_size_psf_phot, pad_psf_size)
+
+
 def aper_photometry(
     image_cutout: np.ndarray,
     image_unc_cutout: np.ndarray,
@@ -3,12 +3,19 @@ Module containing a processor for assigning names to sources
 """
 
 import logging
+from functools import partial
 
+import numpy as np
 import pandas as pd
+from astropy import units as u
+from astropy.coordinates import SkyCoord
 from astropy.time import Time
 from sqlalchemy import select
 
 from mirar.data import SourceBatch
+from mirar.database.engine import get_pool_capacity
+from mirar.database.name_reservation import increment_name_letters, reserve_names
+from mirar.database.sky_locks import get_sky_cell_keys, lock_sky_cells
 from mirar.database.transactions.select import run_select
 from mirar.paths import SOURCE_NAME_KEY, TIME_KEY
 from mirar.processors.database.database_selector import SingleSpatialCrossmatchSource
@@ -17,12 +24,17 @@ logger = logging.getLogger(__name__)
 
 
 class CandidateNamer(SingleSpatialCrossmatchSource):
-    """Processor to sequentially assign names to sources, of the form a, aa, aba..."""
+    """
+    Processor to sequentially assign names to sources, of the form a, aa, aba...
 
-    base_key = "namer"
+    New names are reserved in blocks through a database counter, so several
+    namers can run in parallel without assigning the same name twice. Each
+    source table is crossmatched and its new sources inserted while holding
+    locks on the surrounding sky, so parallel namers cannot both name the same
+    new source.
+    """
 
-    # Go one at a time to avoid... race conditions
-    max_n_cpu = 1
+    base_key = "namer"
 
     def __init__(
         self,
@@ -43,7 +55,13 @@ class CandidateNamer(SingleSpatialCrossmatchSource):
         self.base_name = base_name
         self.name_start = name_start
         self.name_key = name_key
-        self.lastname = None
+
+        # While holding the connection of its sky locks, a namer can check out
+        # two more pooled connections at once (reserving names, and seeding the
+        # name counter), so the number of parallel namers is kept within the pool
+        pool_capacity = get_pool_capacity(db_name=self.db_name)
+        if pool_capacity is not None:
+            self.max_n_cpu = max(1, min(self.max_n_cpu, pool_capacity // 3))
 
     def description(self) -> str:
         return (
@@ -52,97 +70,156 @@ class CandidateNamer(SingleSpatialCrossmatchSource):
         )
 
     @staticmethod
-    def increment_string(string: str):
+    def increment_string(string: str) -> str:
         """
+        Increment a name, e.g. aaa -> aab, aaz -> aba, azz -> baa, zzz-> aaaa
 
-        Parameters
-        ----------
-        string
+        :param string: letters of name
+        :return: incremented letters
+        """
+        return increment_name_letters(string)
 
-        Returns
-        -------
-        An incremented string, eg. aaa -> aab, aaz -> aba, azz -> baa, zzz-> aaaa
+    def get_name_prefix(self, detection_time: Time) -> str:
         """
-        character_position = len(string) - 1
-        # will iteratively try to increment characters starting from the last
-        increment_bool = False
-        new_string = ""
-        while character_position >= 0:
-            cref = string[character_position]
-            if increment_bool:
-                new_string = cref + new_string
-                character_position -= 1
-                continue
-            cref_ordered = ord(cref)
-            # increment each character, if at 'z', increment the next one
-            if cref_ordered + 1 > 122:
-                new_string = "a" + new_string
-                if character_position == 0:
-                    new_string = "a" + new_string
-            else:
-                next_character = chr(cref_ordered + 1)
-                new_string = next_character + new_string
-                increment_bool = True
-            character_position -= 1
-            continue
-
-        return new_string
-
-    def extract_last_year(self, last_name: str) -> int:
+        Get the prefix of names for a given detection time, e.g WNTR24
+
+        :param detection_time: detection time (Astropy Time object)
+        :return: name prefix
         """
-        Extract the year from the last name
+        cand_year = detection_time.datetime.year % 1000
+        return self.base_name + str(cand_year)
 
-        :param last_name: last name
-        :return: year
+    def get_last_name(self, cand_year: int) -> str | None:
         """
-        last_year = int(last_name[len(self.base_name) : len(self.base_name) + 2])
-        return last_year
+        Get the most recent name of a given year in the database
 
-    def get_next_name(self, detection_time: Time, last_name: str = None) -> str:
+        :param cand_year: year of candidate (e.g 24)
+        :return: last name, or None if there are no names from that year
         """
-        Function to get a new candidate name
+        col = self.db_table.sql_model.__table__.c[self.db_name_field]
+
+        # Select most recent name of same year
+        sel = select(col).where(col.contains(cand_year)).order_by(col.desc()).limit(1)
+
+        res = run_select(query=sel, sql_table=self.db_table.sql_model)
+
+        if len(res) == 0:
+            return None
+
+        logger.debug(res)
+        return res[self.db_name_field].iloc[0]
+
+    def reserve_new_names(self, detection_time: Time, n_names: int) -> list[str]:
+        """
+        Reserve a block of new names in the database
 
         :param detection_time: detection time (Astropy Time object)
-        :param last_name: last name
-        :return: new name
+        :param n_names: number of names to reserve
+        :return: list of new names
         """
-        cand_year = detection_time.datetime.year % 1000
+        return reserve_names(
+            db_name=self.db_table.sql_model.db_name,
+            name_prefix=self.get_name_prefix(detection_time),
+            n_names=n_names,
+            name_start=self.name_start,
+            get_last_name=partial(
+                self.get_last_name, detection_time.datetime.year % 1000
+            ),
+        )
 
-        if last_name is not None:
-            last_year = self.extract_last_year(last_name)
-            if last_year != cand_year:
-                last_name = None
+    def get_repeated_new_sources(
+        self, super_dicts: list[dict], new_inds: list[int]
+    ) -> dict[int, int]:
+        """
+        Find new sources which are within the crossmatch radius of an earlier new
+        source in the same table, and so are the same source
 
-        if last_name is None:
+        :param super_dicts: source data, for each source in the table
+        :param new_inds: indices of sources without a match in the database
+        :return: dictionary mapping each repeated source index to the earlier one
+        """
+        if len(new_inds) < 2:
+            return {}
 
-            col = self.db_table.sql_model.__table__.c[self.db_name_field]
+        crds = SkyCoord(
+            ra=[super_dicts[i]["ra"] for i in new_inds],
+            dec=[super_dicts[i]["dec"] for i in new_inds],
+            unit="deg",
+        )
+        idx_1, idx_2, _, _ = crds.search_around_sky(
+            crds, self.xmatch_radius_arcsec * u.arcsec
+        )
 
-            # Select most recent name of same year
-            sel = (
-                select(col).where(col.contains(cand_year)).order_by(col.desc()).limit(1)
-            )
+        repeats = {}
+        for ind_1, ind_2 in sorted(zip(idx_1, idx_2)):
+            if (ind_1 >= ind_2) | (new_inds[ind_1] in repeats):
+                continue
+            if new_inds[ind_2] not in repeats:
+                repeats[new_inds[ind_2]] = new_inds[ind_1]
+        return repeats
 
-            res = run_select(query=sel, sql_table=self.db_table.sql_model)
+    def get_sky_cell_keys(self, super_dicts: list[dict]) -> list[int]:
+        """
+        Get the keys of the sky cells which sources in a table could match
 
-            # If no names of the same year, start from the beginning
-            if len(res) == 0:
-                name = self.base_name + str(cand_year) + self.name_start
-                return name
+        :param super_dicts: source data, for each source in the table
+        :return: list of cell keys
+        """
+        return get_sky_cell_keys(
+            ra_deg=np.array([x["ra"] for x in super_dicts]),
+            dec_deg=np.array([x["dec"] for x in super_dicts]),
+            radius_arcsec=self.xmatch_radius_arcsec,
+        )
 
-            last_name = res[self.db_name_field].iloc[0]
-            logger.debug(res)
+    def name_sources(
+        self,
+        sources: pd.DataFrame,
+        metadata: dict,
+        super_dicts: list[dict],
+        detection_time: Time,
+    ) -> tuple[list[pd.DataFrame], dict[int, int]]:
+        """
+        Crossmatch sources to the database, and insert those without a match
+        with new names. Should be called while holding the locks of the sky
+        cells of the sources, so the crossmatch is still valid at insertion.
 
-        last_year = self.extract_last_year(last_name)
+        :param sources: table of sources
+        :param metadata: source table metadata
+        :param super_dicts: source data, for each source in the table
+        :param detection_time: detection time (Astropy Time object)
+        :return: database entry for each source, except for repeated new
+            sources, and a dictionary mapping repeated sources to the earlier one
+        """
+        matches = self.query_for_sources(sources, metadata)
+
+        new_inds = [i for i, match in enumerate(matches) if len(match) == 0]
+        repeats = self.get_repeated_new_sources(super_dicts, new_inds)
+        new_inds = [i for i in new_inds if i not in repeats]
+
+        logger.debug(
+            f"Found {len(sources) - len(new_inds) - len(repeats)} sources "
+            f"with existing names, naming {len(new_inds)} new sources."
+        )
 
-        assert (
-            last_year == cand_year
-        ), f"Last year {last_year} does not match candidate year {cand_year}"
+        if len(new_inds) > 0:
+            new_names = self.reserve_new_names(detection_time, len(new_inds))
 
-        last_name_letters = last_name[len(self.base_name) + 2 :]
-        new_name_letters = self.increment_string(last_name_letters)
-        name = self.base_name + str(cand_year) + new_name_letters
-        logger.debug(f"Assigning name: {name}")
-        return name
+            new_dicts = []
+            for ind, source_name in zip(new_inds, new_names):
+                source = sources.iloc[ind].copy()
+                source[self.name_key] = source_name
+                new_dicts.append(self.generate_super_dict(metadata, source))
+
+            entries = self.db_table.validate_entries(new_dicts)
+            res = self.db_table.insert_entries(
+                entries,
+                duplicate_protocol="fail",
+                returning_key_names=self.db_output_columns,
+            )
+            for i, ind in enumerate(new_inds):
+                matches[ind] = res.iloc[[i]].reset_index(drop=True)
+
+        return matches, repeats
 
     def _apply_to_sources(
         self,
@@ -151,44 +228,34 @@ class CandidateNamer(SingleSpatialCrossmatchSource):
         for source_table in batch:
             sources = source_table.get_data()
 
+            if len(sources) == 0:
+                continue
+
             metadata = source_table.get_metadata()
 
             detection_time = Time(source_table[TIME_KEY])
 
-            matches = []
-
-            for ind, source in sources.iterrows():
-
-                match = self.query_for_source(source, metadata)
-
-                if len(match) > 0:
-                    source_name = match[self.name_key].iloc[0]
-                    logger.debug(f"Source already has name: {source_name}")
-                    matches.append(match)
-
-                else:
-                    source_name = self.get_next_name(
-                        detection_time, last_name=self.lastname
-                    )
-                    self.lastname = source_name
-                    logger.debug(f"Assigning name: {source_name} to source # {ind}.")
-
-                    # Insert the name into the source table
-                    source[self.name_key] = source_name
+            super_dicts = [
+                self.generate_super_dict(metadata, source)
+                for _, source in sources.iterrows()
+            ]
 
-                    metadata_dict = self.generate_super_dict(metadata, source)
+            with lock_sky_cells(
+                db_name=self.db_name,
+                lock_name=self.db_table.sql_model.__tablename__,
+                cell_keys=self.get_sky_cell_keys(super_dicts),
+            ):
+                matches, repeats = self.name_sources(
+                    sources, metadata, super_dicts, detection_time
+                )
 
-                    new = self.db_table(**metadata_dict)
-                    match = new.insert_entry(
-                        duplicate_protocol="fail",
-                        returning_key_names=self.db_output_columns,
-                    )
-                    matches.append(match)
+            for ind, original_ind in repeats.items():
+                matches[ind] = matches[original_ind]
 
             match_df = pd.concat(matches, ignore_index=True, axis=0)
 
             for column in self.db_output_columns:
-                sources[column] = match_df[column]
+                sources[column] = match_df[column].to_numpy()
 
             source_table.set_data(sources)
 
@@ -73,7 +73,7 @@ def generate_candidates_table(
     det_srcs[CAND_DEC_KEY] = det_srcs["DELTAWIN_J2000"]
     det_srcs["fwhm"] = det_srcs["FWHM_IMAGE"]
     det_srcs["elong"] = det_srcs["ELONGATION"]
-    det_srcs[SOURCE_HISTORY_KEY] = pd.DataFrame()
+    det_srcs[SOURCE_HISTORY_KEY] = [pd.DataFrame() for _ in range(len(det_srcs))]
     det_srcs[SOURCE_NAME_KEY] = None
 
     return det_srcs
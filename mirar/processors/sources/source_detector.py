@@ -9,11 +9,10 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 from astropy.coordinates import SkyCoord
-from astropy.io import fits
 from astropy.wcs import WCS
 
 from mirar.data import Image, ImageBatch, SourceBatch, SourceTable
-from mirar.data.utils import encode_img, write_regions_file
+from mirar.data.utils import cutout_cache, encode_img, write_regions_file
 from mirar.paths import (
     BASE_NAME_KEY,
     CAND_DEC_KEY,
@@ -31,7 +30,6 @@ from mirar.paths import (
 )
 from mirar.processors.astromatic.sextractor.sourceextractor import run_sextractor_dual
 from mirar.processors.base_processor import BaseSourceGenerator, PrerequisiteError
-from mirar.processors.photometry.utils import make_cutouts
 from mirar.processors.zogy.zogy import ZOGY
 from mirar.utils.ldac_tools import get_table_from_ldac
 
@@ -82,7 +80,7 @@ def generate_candidates_table(
     xpeaks, ypeaks = det_srcs["XPEAK_IMAGE"] - 1, det_srcs["YPEAK_IMAGE"] - 1
     det_srcs["xpeak"] = xpeaks
     det_srcs["ypeak"] = ypeaks
-    scorr_data = fits.getdata(diff_scorr_path)
+    scorr_data = cutout_cache.get_data(diff_scorr_path)
     scorr_peaks = scorr_data[ypeaks, xpeaks]
     det_srcs["scorr"] = scorr_peaks
 
@@ -124,27 +122,18 @@ def generate_candidates_table(
 
     cutout_size_display = 40
 
-    display_sci_ims = []
-    display_ref_ims = []
-    display_diff_ims = []
-
-    # Cutouts
-    for _, row in det_srcs.iterrows():
-        xpeak, ypeak = int(row["xpeak"]), int(row["ypeak"])
-
-        display_sci_cutout, display_ref_cutout, display_diff_cutout = make_cutouts(
-            [sci_resamp_image_path, ref_resamp_image_path, diff_path],
-            (xpeak, ypeak),
-            cutout_size_display,
-        )
-
-        display_sci_bit = encode_img(display_sci_cutout)
-        display_ref_bit = encode_img(display_ref_cutout)
-        display_diff_bit = encode_img(display_diff_cutout)
-
-        display_sci_ims.append(display_sci_bit)
-        display_ref_ims.append(display_ref_bit)
-        display_diff_ims.append(display_diff_bit)
+    # Cutouts, made for all candidates at once from each image
+    xpeaks = det_srcs["xpeak"].to_numpy(dtype=int)
+    ypeaks = det_srcs["ypeak"].to_numpy(dtype=int)
+    display_sci_ims, display_ref_ims, display_diff_ims = [
+        [
+            encode_img(cutout)
+            for cutout in cutout_cache.get_cutouts(
+                image_path, xpeaks, ypeaks, cutout_size_display
+            )
+        ]
+        for image_path in [sci_resamp_image_path, ref_resamp_image_path, diff_path]
+    ]
 
     det_srcs["cutout_science"] = display_sci_ims
     det_srcs["cutout_template"] = display_ref_ims
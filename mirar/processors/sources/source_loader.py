@@ -8,6 +8,7 @@ from pathlib import Path
 from typing import Optional
 
 from mirar.data import SourceBatch, SourceTable
+from mirar.io import get_files_key
 from mirar.paths import base_output_dir, get_output_dir
 from mirar.processors.base_processor import BaseSourceProcessor
 from mirar.processors.sources.source_exporter import SOURCE_SUFFIX
@@ -51,15 +52,26 @@ class SourceLoader(BaseSourceProcessor):
             f"files in {self.input_dir_name} . "
         )
 
-    def _apply_to_sources(
-        self,
-        batch: SourceBatch,
-    ) -> SourceBatch:
-        input_dir = get_output_dir(
+    def get_input_dir(self) -> Path:
+        """
+        Get the directory from which source tables are loaded
+
+        :return: Input directory
+        """
+        return get_output_dir(
             dir_root=self.input_dir_name,
             sub_dir=self.night_sub_dir,
             output_dir=self.input_dir,
         )
+
+    def get_input_key(self) -> str:
+        return get_files_key(self.get_input_dir().glob(f"*{SOURCE_SUFFIX}"))
+
+    def _apply_to_sources(
+        self,
+        batch: SourceBatch,
+    ) -> SourceBatch:
+        input_dir = self.get_input_dir()
         input_dir.mkdir(parents=True, exist_ok=True)
 
         new_batch = SourceBatch()
@@ -139,6 +139,7 @@ class SourceBatcher(BaseSourceProcessor):
     """
 
     base_key = "batch"
+    requires_full_dataset = True
 
     def __init__(self, split_key: str | list[str]):
         super().__init__()
@@ -180,6 +181,7 @@ class SourceDebatcher(BaseSourceProcessor):
     """
 
     base_key = "debatch"
+    requires_full_dataset = True
 
     def _apply_to_sources(
         self,
@@ -2,11 +2,16 @@
 Module for loading images
 """
 
+import json
 import logging
 import os
+import threading
 from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from glob import glob
 from pathlib import Path
+from typing import Optional
 
 from tqdm import tqdm
 
@@ -16,15 +21,40 @@ from mirar.io import (
     MissingCoreFieldError,
     check_file_is_complete,
     check_image_has_core_fields,
-    open_mef_image,
+    get_files_key,
+    open_lazy_image,
+    open_lazy_mef_image,
     open_raw_image,
 )
-from mirar.paths import RAW_IMG_KEY, RAW_IMG_SUB_DIR, base_raw_dir
+from mirar.paths import (
+    EXPTIME_KEY,
+    FILTER_KEY,
+    OBSCLASS_KEY,
+    RAW_IMG_KEY,
+    RAW_IMG_SUB_DIR,
+    TARGET_KEY,
+    TIME_KEY,
+    base_raw_dir,
+    get_output_path,
+)
 from mirar.processors.base_processor import BaseImageProcessor
 
 logger = logging.getLogger(__name__)
 
 
+LOADED_STATUS = "loaded"
+INVALID_STATUS = "invalid"
+BAD_STATUS = "bad"
+
+DEFAULT_MANIFEST_HEADER_KEYS = [
+    OBSCLASS_KEY,
+    TARGET_KEY,
+    FILTER_KEY,
+    EXPTIME_KEY,
+    TIME_KEY,
+]
+
+
 class BadImageError(ProcessorError):
     """Exception for bad images"""
 
@@ -47,39 +77,222 @@ def unzip(zipped_list: list[str]) -> list[str]:
     return unzipped_list
 
 
+class LoadManifest:
+    """
+    Class for a small json manifest of the files loaded from a directory.
+    For each file, it records the size, modification time, whether the file could
+    be loaded, and key header values of the loaded images. Files which are unchanged
+    since the manifest was written do not need to be validated again, and can be
+    skipped entirely when loading incrementally.
+    """
+
+    def __init__(self, path: str | Path, header_keys: Optional[list[str]] = None):
+        self.path = Path(path)
+        if header_keys is None:
+            header_keys = DEFAULT_MANIFEST_HEADER_KEYS
+        self.header_keys = header_keys
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.load()
+
+    def __str__(self):
+        return f"<LoadManifest at {self.path} with {len(self.entries)} entries>"
+
+    def load(self):
+        """
+        Load the manifest from disk, if it exists
+
+        :return: None
+        """
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf8") as manifest_file:
+                    self.entries = json.load(manifest_file)
+            except (OSError, json.JSONDecodeError) as exc:
+                logger.warning(f"Ignoring unreadable manifest {self.path}: {exc}")
+                self.entries = {}
+
+    def save(self):
+        """
+        Save the manifest to disk
+
+        :return: None
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f".{os.getpid()}_{self.path.name}")
+        with self.lock:
+            with open(temp_path, "w", encoding="utf8") as manifest_file:
+                json.dump(self.entries, manifest_file, default=str)
+        os.replace(temp_path, self.path)
+
+    @staticmethod
+    def get_file_stats(path: str | Path) -> dict:
+        """
+        Get the size and modification time of a file
+
+        :param path: Path of file
+        :return: Dictionary of file stats
+        """
+        stats = os.stat(path)
+        return {"size": stats.st_size, "mtime_ns": stats.st_mtime_ns}
+
+    def is_unchanged(self, path: str | Path) -> bool:
+        """
+        Check whether a file is in the manifest, and unchanged since it was recorded
+
+        :param path: Path of file
+        :return: boolean
+        """
+        with self.lock:
+            entry = self.entries.get(str(path))
+        if entry is None:
+            return False
+        return all(
+            entry[key] == value for key, value in self.get_file_stats(path).items()
+        )
+
+    def get_status(self, path: str | Path) -> Optional[str]:
+        """
+        Get the recorded load status of a file
+
+        :param path: Path of file
+        :return: Load status, or None if the file is not in the manifest
+        """
+        with self.lock:
+            entry = self.entries.get(str(path))
+        if entry is None:
+            return None
+        return entry["status"]
+
+    def update(self, path: str | Path, status: str, images: list[Image]):
+        """
+        Record a loaded file in the manifest
+
+        :param path: Path of file
+        :param status: Load status
+        :param images: Images loaded from the file
+        :return: None
+        """
+        entry = self.get_file_stats(path)
+        entry["status"] = status
+        entry["headers"] = [
+            {key: image[key] for key in self.header_keys if key in image.keys()}
+            for image in images
+        ]
+        with self.lock:
+            self.entries[str(path)] = entry
+
+
+def load_file(
+    path: str | Path,
+    open_f: Callable[[str | Path], Image | list[Image]],
+    manifest: Optional[LoadManifest] = None,
+) -> list[Image]:
+    """
+    Validate and load the images in a single file
+
+    :param path: Path of file
+    :param open_f: Function to open images
+    :param manifest: Optional manifest of previously-loaded files
+    :return: List of images (empty if the file was skipped)
+    """
+    if (manifest is not None) and manifest.is_unchanged(path):
+        # Known files do not need to be checked for completeness again
+        status = manifest.get_status(path)
+        if status == INVALID_STATUS:
+            logger.warning(f"Image {path} is invalid. Skipping!")
+            return []
+        if status == BAD_STATUS:
+            logger.error(f"Image {path} cannot be parsed. Skipping!")
+            return []
+    elif not check_file_is_complete(path):
+        logger.warning(f"File {path} is not complete. Skipping!")
+        return []
+
+    images = []
+    status = LOADED_STATUS
+    try:
+        image_list = open_f(path)
+
+        if not isinstance(image_list, list):
+            image_list = [image_list]
+
+        for image in image_list:
+            try:
+                check_image_has_core_fields(image)
+            except MissingCoreFieldError as err:
+                raise BadImageError(err) from err
+            images.append(image)
+    except InvalidImage:
+        logger.warning(f"Image {path} is invalid. Skipping!")
+        status = INVALID_STATUS
+        images = []
+    except BadImageError:
+        logger.error(f"Image {path} cannot be parsed. Skipping!")
+        status = BAD_STATUS
+        images = []
+
+    if manifest is not None:
+        manifest.update(path, status, images)
+
+    return images
+
+
 def load_from_list(
     img_list: list[str | Path],
     open_f: Callable[[str | Path], Image | list[Image]],
+    n_cpu: int = 1,
+    manifest: Optional[LoadManifest] = None,
+    incremental: bool = False,
 ) -> ImageBatch:
     """
     Load images from a list of files
 
     :param img_list: Image list
     :param open_f: Function to open images
+    :param n_cpu: Number of files to validate and load in parallel
+    :param manifest: Optional manifest of previously-loaded files, to update
+    :param incremental: Only load files which are new or changed since
+        they were recorded in the manifest
     :return: ImageBatch object
     """
+    if incremental:
+        if manifest is None:
+            err = "A manifest is required to load files incrementally"
+            logger.error(err)
+            raise ValueError(err)
+
+        new_img_list = [x for x in img_list if not manifest.is_unchanged(x)]
+        logger.info(
+            f"Skipping {len(img_list) - len(new_img_list)} files which are unchanged "
+            f"since they were recorded in {manifest}"
+        )
+        img_list = new_img_list
+
     images = ImageBatch()
 
-    for path in tqdm(img_list):
-        if check_file_is_complete(path):
-            try:
-                image_list = open_f(path)
-
-                if not isinstance(image_list, list):
-                    image_list = [image_list]
-
-                for image in image_list:
-                    try:
-                        check_image_has_core_fields(image)
-                    except MissingCoreFieldError as err:
-                        raise BadImageError(err) from err
-                    images.append(image)
-            except InvalidImage:
-                logger.warning(f"Image {path} is invalid. Skipping!")
-            except BadImageError:
-                logger.error(f"Image {path} cannot be parsed. Skipping!")
-        else:
-            logger.warning(f"File {path} is not complete. Skipping!")
+    n_cpu = max(1, min(n_cpu, len(img_list)))
+
+    if n_cpu == 1:
+        image_lists = [load_file(x, open_f, manifest) for x in tqdm(img_list)]
+    else:
+        with ThreadPoolExecutor(max_workers=n_cpu) as executor:
+            image_lists = list(
+                tqdm(
+                    executor.map(
+                        partial(load_file, open_f=open_f, manifest=manifest),
+                        img_list,
+                    ),
+                    total=len(img_list),
+                )
+            )
+
+    for image_list in image_lists:
+        for image in image_list:
+            images.append(image)
+
+    if manifest is not None:
+        manifest.save()
 
     return images
 
@@ -87,12 +300,19 @@ def load_from_list(
 def load_from_dir(
     input_dir: str | Path,
     open_f: Callable[[str | Path], Image | list[Image]],
+    n_cpu: int = 1,
+    manifest: Optional[LoadManifest] = None,
+    incremental: bool = False,
 ) -> ImageBatch:
     """
     Function to load all images in a directory
 
     :param input_dir: Input directory
     :param open_f: Function to open images
+    :param n_cpu: Number of files to validate and load in parallel
+    :param manifest: Optional manifest of previously-loaded files, to update
+    :param incremental: Only load files which are new or changed since
+        they were recorded in the manifest
     :return: ImageBatch object
     """
     img_list = sorted(glob(f"{input_dir}/*.fits"))
@@ -109,22 +329,30 @@ def load_from_dir(
         logger.error(err)
         raise ImageNotFoundError(err)
 
-    return load_from_list(img_list, open_f)
+    return load_from_list(
+        img_list, open_f, n_cpu=n_cpu, manifest=manifest, incremental=incremental
+    )
 
 
 class ImageLoader(BaseImageProcessor):
-    """Processor to load raw images."""
+    """
+    Processor to load raw images. By default, only the headers are read,
+    and the data is loaded when first needed.
+    """
 
     base_key = "load"
 
     image_type = Image
-    default_load_image = staticmethod(open_raw_image)
+    default_load_image = staticmethod(open_lazy_image)
 
     def __init__(
         self,
         input_sub_dir: str = RAW_IMG_SUB_DIR,
         input_img_dir: str | Path = base_raw_dir,
         load_image: Callable[[str], Image | list[Image]] = None,
+        use_manifest: bool = False,
+        incremental: bool = False,
+        manifest_header_keys: Optional[list[str]] = None,
     ):
         super().__init__()
         self.input_sub_dir = input_sub_dir
@@ -132,6 +360,9 @@ class ImageLoader(BaseImageProcessor):
         if load_image is None:
             load_image = self.default_load_image
         self.load_image = load_image
+        self.use_manifest = use_manifest or incremental
+        self.incremental = incremental
+        self.manifest_header_keys = manifest_header_keys
 
     def description(self):
         return (
@@ -139,14 +370,48 @@ class ImageLoader(BaseImageProcessor):
             f"using the '{self.load_image.__name__}' function"
         )
 
-    def _apply_to_images(self, batch: ImageBatch) -> ImageBatch:
-        input_dir = self.input_img_dir.joinpath(
+    def get_manifest_path(self) -> Path:
+        """
+        Get the path of the manifest of loaded files. This is in the output
+        directory, and is specific to the load function.
+
+        :return: Path of manifest
+        """
+        return get_output_path(
+            base_name=f"{self.load_image.__name__}_manifest.json",
+            dir_root=self.input_sub_dir,
+            sub_dir=self.night_sub_dir,
+        )
+
+    def get_input_dir(self) -> Path:
+        """
+        Get the directory from which images are loaded
+
+        :return: Input directory
+        """
+        return self.input_img_dir.joinpath(
             os.path.join(self.night_sub_dir, self.input_sub_dir)
         )
 
+    def get_input_key(self) -> str:
+        input_dir = self.get_input_dir()
+        return get_files_key(glob(f"{input_dir}/*.fits") + glob(f"{input_dir}/*.fz"))
+
+    def _apply_to_images(self, batch: ImageBatch) -> ImageBatch:
+        input_dir = self.get_input_dir()
+
+        manifest = None
+        if self.use_manifest:
+            manifest = LoadManifest(
+                self.get_manifest_path(), header_keys=self.manifest_header_keys
+            )
+
         return load_from_dir(
             input_dir,
             open_f=self.load_image,
+            n_cpu=self.max_n_cpu,
+            manifest=manifest,
+            incremental=self.incremental,
         )
 
 
@@ -202,7 +467,7 @@ class ImageListLoader(BaseImageProcessor):
     base_key = "loadlist"
 
     image_type = Image
-    default_load_image = staticmethod(open_raw_image)
+    default_load_image = staticmethod(open_lazy_image)
 
     def __init__(
         self,
@@ -225,6 +490,9 @@ class ImageListLoader(BaseImageProcessor):
             f"list of {len(self.img_list)} files"
         )
 
+    def get_input_key(self) -> str:
+        return get_files_key(self.img_list)
+
     def _apply_to_images(self, batch: ImageBatch) -> ImageBatch:
         """
         Load images from a list of files
@@ -239,6 +507,7 @@ class ImageListLoader(BaseImageProcessor):
         return load_from_list(
             self.img_list,
             open_f=self.load_image,
+            n_cpu=self.max_n_cpu,
         )
 
 
@@ -246,4 +515,4 @@ class MEFLoader(ImageLoader):
     """Processor to load MEF images."""
 
     base_key = "load_mef"
-    default_load_image = staticmethod(open_mef_image)
+    default_load_image = staticmethod(open_lazy_mef_image)
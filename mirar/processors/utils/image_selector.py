@@ -147,6 +147,7 @@ class ImageBatcher(BaseImageProcessor):
     """
 
     base_key = "batch"
+    requires_full_dataset = True
 
     def __init__(self, split_key: str | list[str]):
         super().__init__()
@@ -185,6 +186,7 @@ class ImageDebatcher(BaseImageProcessor):
     """
 
     base_key = "debatch"
+    requires_full_dataset = True
 
     def _apply_to_images(
         self,
@@ -1,19 +1,32 @@
 """
 Module to cross-match a candidate_table with different catalogs
+
+The positions of all sources in a dataset are queried together before any batch
+is processed, in chunks of up to query_chunk_size positions, with at most
+max_concurrent_queries queries in flight at once. Each batch then joins the
+matches of its sources onto its candidate table in one step, rather than cell
+by cell. Any positions which were not queried in advance (e.g because the
+dataset-level query failed) are queried when the batch is processed.
 """
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 import astropy.units as u
 import numpy as np
+import pandas as pd
 from astropy.coordinates import SkyCoord
 
 from mirar.catalog.base.base_xmatch_catalog import BaseXMatchCatalog
-from mirar.data import SourceBatch
+from mirar.data import Dataset, SourceBatch
+from mirar.errors import ErrorStack
 from mirar.processors.base_processor import BaseSourceProcessor
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_QUERY_CHUNK_SIZE = 500
+DEFAULT_MAX_CONCURRENT_QUERIES = 4
+
 
 class XMatch(BaseSourceProcessor):
     """
@@ -27,8 +40,13 @@ class XMatch(BaseSourceProcessor):
     def __init__(
         self,
         catalog: BaseXMatchCatalog,
+        query_chunk_size: int = DEFAULT_QUERY_CHUNK_SIZE,
+        max_concurrent_queries: int = DEFAULT_MAX_CONCURRENT_QUERIES,
     ):
         self.catalog = catalog
+        self.query_chunk_size = query_chunk_size
+        self.max_concurrent_queries = max_concurrent_queries
+        self.prefetched_matches = {}
         super().__init__()
 
     def description(self):
@@ -37,6 +55,166 @@ class XMatch(BaseSourceProcessor):
             f"'{self.catalog.catalog_name}' catalog."
         )
 
+    def query_positions(
+        self, positions: list[tuple[float, float]]
+    ) -> dict[tuple[float, float], list[dict]]:
+        """
+        Query the catalog for matches around each position, in chunks,
+        with bounded concurrency
+
+        :param positions: List of (ra, dec) positions
+        :return: Matches for each position
+        """
+        chunks = [
+            positions[i : i + self.query_chunk_size]
+            for i in range(0, len(positions), self.query_chunk_size)
+        ]
+
+        def query_chunk(chunk: list[tuple[float, float]]) -> dict:
+            query_coords = {f"q{ind}": [ra, dec] for ind, (ra, dec) in enumerate(chunk)}
+            query_results = self.catalog.query(query_coords)
+            return {
+                position: query_results[f"q{ind}"] for ind, position in enumerate(chunk)
+            }
+
+        matches = {}
+
+        if len(chunks) == 0:
+            return matches
+
+        logger.debug(
+            f"Querying {self.catalog.catalog_name} for {len(positions)} positions, "
+            f"with {len(chunks)} queries"
+        )
+
+        n_workers = min(self.max_concurrent_queries, len(chunks))
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            for chunk_matches in executor.map(query_chunk, chunks):
+                matches.update(chunk_matches)
+
+        return matches
+
+    @staticmethod
+    def get_dataset_positions(dataset: Dataset) -> list[tuple[float, float]]:
+        """
+        Get the unique positions of all sources in a dataset
+
+        :param dataset: Dataset of source batches
+        :return: List of (ra, dec) positions
+        """
+        positions = []
+        for batch in dataset:
+            for source_list in batch:
+                candidate_table = source_list.get_data()
+                if ("ra" in candidate_table.columns) & (
+                    "dec" in candidate_table.columns
+                ):
+                    positions += zip(candidate_table["ra"], candidate_table["dec"])
+        return list(dict.fromkeys(positions))
+
+    def base_apply(
+        self, dataset: Dataset, execution_backend: str | None = None
+    ) -> tuple[Dataset, ErrorStack]:
+        positions = [
+            position
+            for position in self.get_dataset_positions(dataset)
+            if position not in self.prefetched_matches
+        ]
+
+        try:
+            self.prefetched_matches.update(self.query_positions(positions))
+        except Exception as exc:  # pylint: disable=broad-except
+            # Errors are instead raised (and reported) for each batch
+            logger.warning(
+                f"Could not query {self.catalog.catalog_name} for the full dataset, "
+                f"so each batch will be queried separately: {exc}"
+            )
+
+        try:
+            return super().base_apply(dataset, execution_backend=execution_backend)
+        finally:
+            for position in positions:
+                self.prefetched_matches.pop(position, None)
+
+    def join_matches(
+        self, candidate_table: pd.DataFrame, matches: list[list[dict]]
+    ) -> pd.DataFrame:
+        """
+        Join the catalog matches of each source onto the candidate table
+
+        :param candidate_table: Candidate table
+        :param matches: List of matches for each row of the candidate table
+        :return: Updated candidate table
+        """
+        catalog = self.catalog
+
+        available_projection_keys = [
+            key for key, value in catalog.projection.items() if value == 1
+        ]
+
+        n_matches = np.array([len(x) for x in matches], dtype=int)
+        n_kept = np.minimum(n_matches, catalog.num_sources)
+
+        # One row per match, with the index of the source and the rank of the match
+        source_inds = np.repeat(np.arange(len(candidate_table)), n_kept)
+        ranks = np.concatenate([np.arange(n) for n in n_kept] + [np.zeros(0, int)])
+        match_table = pd.DataFrame.from_records(
+            [result for results, n in zip(matches, n_kept) for result in results[:n]],
+            columns=available_projection_keys,
+        )
+
+        new_columns = {}
+
+        for num in range(catalog.num_sources):
+            rank_mask = ranks == num
+            rank_source_inds = source_inds[rank_mask]
+            rank_matches = match_table[rank_mask]
+
+            for key in available_projection_keys:
+                colname = catalog.column_names[key]
+                dtype = catalog.column_dtypes[colname]
+                values = np.full(
+                    len(candidate_table),
+                    np.array(np.nan, dtype=dtype).item(),
+                    dtype=object,
+                )
+                values[rank_source_inds] = rank_matches[key].to_numpy(dtype=object)
+                column = pd.Series(values, index=candidate_table.index)
+                if dtype is float:
+                    column = column.astype(float)
+                new_columns[colname + f"{num + 1}"] = column
+
+        # Add column for number of matches
+        new_columns[f"nmtch{catalog.abbreviation}"] = pd.Series(
+            n_matches, index=candidate_table.index
+        )
+
+        # Calculate distances between query and result
+        crds = SkyCoord(candidate_table["ra"], candidate_table["dec"], unit=u.deg)
+        for num in range(catalog.num_sources):
+            result_ras = new_columns[catalog.ra_column_name + f"{num + 1}"]
+            result_decs = new_columns[catalog.dec_column_name + f"{num + 1}"]
+            distances = np.full(len(candidate_table), np.nan)
+            crd_nanmask = np.invert(np.isnan(result_ras.to_numpy(dtype=float)))
+            result_crds = SkyCoord(
+                ra=result_ras[crd_nanmask].to_numpy(dtype=float),
+                dec=result_decs[crd_nanmask].to_numpy(dtype=float),
+                unit=u.deg,
+            )
+            distances[crd_nanmask] = crds[crd_nanmask].separation(result_crds).arcsec
+            new_columns[f"dist{catalog.abbreviation}nr{num + 1}"] = pd.Series(
+                distances, index=candidate_table.index
+            )
+
+        candidate_table = candidate_table.drop(
+            columns=[x for x in new_columns if x in candidate_table.columns]
+        )
+        candidate_table = pd.concat(
+            [candidate_table, pd.DataFrame(new_columns)], axis=1
+        )
+
+        return candidate_table.replace({np.nan: None})
+
     def _apply_to_sources(
         self,
         batch: SourceBatch,
@@ -44,62 +222,20 @@ class XMatch(BaseSourceProcessor):
         for source_list in batch:
             candidate_table = source_list.get_data()
 
-            ras = candidate_table["ra"]
-            decs = candidate_table["dec"]
-            crds = SkyCoord(ras, decs, unit=u.deg)
-            query_names = np.array([f"q{x}" for x in np.arange(len(ras))])
+            positions = list(zip(candidate_table["ra"], candidate_table["dec"]))
 
-            catalog = self.catalog
-            logger.debug(f"Querying {catalog.catalog_name} for {len(ras)} sources.")
-            query_coords = {
-                f"{query_names[ind]}": [ras[ind], decs[ind]] for ind in range(len(ras))
-            }
-            query_results = catalog.query(query_coords)
-
-            available_projection_keys = []
-            for k in catalog.projection.keys():
-                if catalog.projection[k] == 1:
-                    available_projection_keys += [k]
-
-            # Add placeholder columns for each catalog column
-            for key in available_projection_keys:
-                for num in range(self.catalog.num_sources):
-                    colname = catalog.column_names[key]
-                    candidate_table[colname + f"{num + 1}"] = np.array(
-                        np.nan,
-                        dtype=catalog.column_dtypes[colname],
-                    )
-
-            # Add column for number of matches
-            nmatch_colname = f"nmtch{self.catalog.abbreviation}"
-            candidate_table[nmatch_colname] = 0
-
-            for query_ind, query_name in enumerate(query_names):
-                results = query_results[query_name]
-                for result_ind, result in enumerate(results):
-                    for key in result.keys():
-                        colname = catalog.column_names[key] + f"{result_ind + 1}"
-                        candidate_table.at[query_ind, colname] = result[key]
-
-                candidate_table.at[query_ind, nmatch_colname] = len(results)
-
-            # Calculate distances between query and result and add to table
-            for num in range(self.catalog.num_sources):
-                result_ra_colname = self.catalog.ra_column_name + f"{num + 1}"
-                result_dec_colname = self.catalog.dec_column_name + f"{num + 1}"
-                dist_colname = f"dist{self.catalog.abbreviation}nr{num + 1}"
-                candidate_table[dist_colname] = np.array(np.nan, dtype=float)
-                crd_nanmask = np.invert(np.isnan(candidate_table[result_ra_colname]))
-                result_crds = SkyCoord(
-                    ra=candidate_table[result_ra_colname][crd_nanmask],
-                    dec=candidate_table[result_dec_colname][crd_nanmask],
-                    unit=u.deg,
-                )
-                candidate_table.loc[crd_nanmask, [dist_colname]] = (
-                    crds[crd_nanmask].separation(result_crds).arcsec
-                )
+            matches = {}
+            missing_positions = []
+            for position in dict.fromkeys(positions):
+                if position in self.prefetched_matches:
+                    matches[position] = self.prefetched_matches[position]
+                else:
+                    missing_positions.append(position)
+            matches.update(self.query_positions(missing_positions))
 
-            candidate_table = candidate_table.replace({np.nan: None})
+            candidate_table = self.join_matches(
+                candidate_table, [matches.get(position, []) for position in positions]
+            )
 
             source_list.set_data(candidate_table)
 
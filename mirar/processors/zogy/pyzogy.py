@@ -14,14 +14,11 @@ Core ZOGY algorithm implementation in Python.
 import logging
 
 import numpy as np
-import pyfftw
-import pyfftw.interfaces.numpy_fft as fft
 from astropy.stats import sigma_clipped_stats
 
-logger = logging.getLogger(__name__)
+from mirar.processors.zogy.zogy_fft import ZOGYFFT, get_default_zogy_fft
 
-pyfftw.interfaces.cache.enable()
-pyfftw.interfaces.cache.set_keepalive_time(1.0)
+logger = logging.getLogger(__name__)
 
 
 def pyzogy(
@@ -35,6 +32,7 @@ def pyzogy(
     ref_avg_unc: float,
     dx: float = 0.25,
     dy: float = 0.25,
+    fft_context: ZOGYFFT | None = None,
 ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
     Python implementation of ZOGY image subtraction algorithm.
@@ -52,6 +50,8 @@ def pyzogy(
     :param ref_avg_unc: Average uncertainty (sigma) of Reference image
     :param dx: Astrometric uncertainty (sigma) in x coordinate
     :param dy: Astrometric uncertainty (sigma) in y coordinate
+    :param fft_context: Context for Fourier transforms, with reusable plans
+        and cached reference transforms (defaults to a shared context)
 
     Returns:
     diff: Subtracted image
@@ -66,6 +66,11 @@ def pyzogy(
     assert ref_data.shape[0] % 2 == 0, "Ref image has odd number of rows"
     assert ref_data.shape[1] % 2 == 0, "Ref image has odd number of columns"
 
+    if fft_context is None:
+        fft_context = get_default_zogy_fft()
+
+    shape = new_data.shape
+
     # Set nans to zero in new and ref images
     new_nanmask = np.isnan(new_data)
     ref_nanmask = np.isnan(ref_data)
@@ -104,8 +109,8 @@ def pyzogy(
     )
 
     # Shift the PSF to the origin, so that it will not introduce a shift
-    new_psf_big = fft.fftshift(new_psf_big)
-    ref_psf_big = fft.fftshift(ref_psf_big)
+    new_psf_big = np.fft.fftshift(new_psf_big)
+    ref_psf_big = np.fft.fftshift(ref_psf_big)
 
     logger.debug(
         f"Max of big PSF shift is "
@@ -113,12 +118,14 @@ def pyzogy(
         f"PSF shape {new_data.shape} and ref data shape {ref_data.shape}"
     )
 
-    # Take all the Fourier Transforms
-    new_hat = fft.fft2(new_data)
-    ref_hat = fft.fft2(ref_data)
+    # Take all the Fourier Transforms. As all images are real, only half of each
+    # transform is needed. Reference transforms are reused between new images.
+    new_hat = fft_context.rfft2(new_data)
+    ref_hat = fft_context.cached_rfft2(ref_data)
 
-    new_psf_hat = fft.fft2(new_psf_big)
-    ref_psf_hat = fft.fft2(ref_psf_big)
+    # PSFs are always transformed exactly, as we divide by their transforms
+    new_psf_hat = fft_context.rfft2(new_psf_big, exact=True)
+    ref_psf_hat = fft_context.cached_rfft2(ref_psf_big, exact=True)
 
     # Fourier Transform of Difference Image (Equation 13)
     diff_hat_numerator = ref_psf_hat * new_hat - new_psf_hat * ref_hat
@@ -132,13 +139,13 @@ def pyzogy(
     logger.debug(f"Calculated flux_zero_point {flux_zero_point} ")
 
     # Difference Image
-    diff = np.real(fft.ifft2(diff_hat)) / flux_zero_point
+    diff = fft_context.irfft2(diff_hat, shape) / flux_zero_point
     # Fourier Transform of PSF of Subtraction Image (Equation 14)
     diff_hat_psf = ref_psf_hat * new_psf_hat / flux_zero_point / diff_hat_denominator
 
     # PSF of Subtraction Image
-    diff_psf = np.real(fft.ifft2(diff_hat_psf))
-    diff_psf = fft.ifftshift(diff_psf)
+    diff_psf = fft_context.irfft2(diff_hat_psf, shape)
+    diff_psf = np.fft.ifftshift(diff_psf)
     diff_psf = diff_psf[y_min:y_max, x_min:x_max]
     logger.debug(
         f"Max of diff PSF is "
@@ -151,7 +158,7 @@ def pyzogy(
     score_hat = flux_zero_point * diff_hat * np.conj(diff_hat_psf)
 
     # Score Image
-    score = np.real(fft.ifft2(score_hat))
+    score = fft_context.irfft2(score_hat, shape)
 
     # Now start calculating Scorr matrix (including all noise terms)
 
@@ -163,24 +170,24 @@ def pyzogy(
     ref_variance = ref_sigma**2
 
     # Fourier Transform of variance images
-    new_variance_hat = fft.fft2(new_variance)
-    ref_variance_hat = fft.fft2(ref_variance)
+    new_variance_hat = fft_context.rfft2(new_variance)
+    ref_variance_hat = fft_context.cached_rfft2(ref_variance)
 
     # Equation 28
     k_r_hat = np.conj(ref_psf_hat) * np.abs(new_psf_hat**2) / (diff_hat_denominator**2)
-    k_r = np.real(fft.ifft2(k_r_hat))
+    k_r = fft_context.irfft2(k_r_hat, shape)
 
     # Equation 29
     k_n_hat = np.conj(new_psf_hat) * np.abs(ref_psf_hat**2) / (diff_hat_denominator**2)
-    k_n = np.real(fft.ifft2(k_n_hat))
+    k_n = fft_context.irfft2(k_n_hat, shape)
 
     # Noise in New Image: Equation 26
-    new_noise = np.real(fft.ifft2(new_variance_hat * fft.fft2(k_n**2)))
+    new_noise = fft_context.irfft2(new_variance_hat * fft_context.rfft2(k_n**2), shape)
     # Noise in Reference Image: Equation 27
-    ref_noise = np.real(fft.ifft2(ref_variance_hat * fft.fft2(k_r**2)))
+    ref_noise = fft_context.irfft2(ref_variance_hat * fft_context.rfft2(k_r**2), shape)
     # Astrometric Noise
     # Equation 31
-    new_sigma = np.real(fft.ifft2(k_n_hat * new_hat))
+    new_sigma = fft_context.irfft2(k_n_hat * new_hat, shape)
     dsn_dx = new_sigma - np.roll(new_sigma, 1, axis=1)
     dsn_dy = new_sigma - np.roll(new_sigma, 1, axis=0)
 
@@ -188,7 +195,7 @@ def pyzogy(
     v_ast_s_n = dx**2 * dsn_dx**2 + dy**2 * dsn_dy**2
 
     # Equation 33
-    ref_sigma = np.real(fft.ifft2(k_r_hat * ref_hat))
+    ref_sigma = fft_context.irfft2(k_r_hat * ref_hat, shape)
     dsr_dx = ref_sigma - np.roll(ref_sigma, 1, axis=1)
     dsr_dy = ref_sigma - np.roll(ref_sigma, 1, axis=0)
 
@@ -46,6 +46,7 @@ from mirar.paths import (
 )
 from mirar.processors.base_processor import BaseImageProcessor, PrerequisiteError
 from mirar.processors.zogy.pyzogy import pyzogy
+from mirar.processors.zogy.zogy_fft import ZOGYFFT
 from mirar.utils.ldac_tools import get_table_from_ldac
 
 logger = logging.getLogger(__name__)
@@ -451,11 +452,15 @@ class ZOGY(ZOGYPrepare):
         *args,
         output_sub_dir: str = "sub",
         sci_zp_header_key: str = "ZP",
+        fft_precision: str = "double",
+        fft_threads: int = 1,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
         self.output_sub_dir = output_sub_dir
         self.sci_zp_header_key = sci_zp_header_key
+        # FFT plans, and transforms of the reference, are reused between images
+        self.fft_context = ZOGYFFT(precision=fft_precision, n_threads=fft_threads)
 
     def description(self) -> str:
         return "Processor to produce difference images using ZOGY."
@@ -512,6 +517,7 @@ class ZOGY(ZOGYPrepare):
                 ref_avg_unc=ref_rms,
                 dx=ast_unc_x,
                 dy=ast_unc_y,
+                fft_context=self.fft_context,
             )
 
             sci_image_path = self.get_path(image[BASE_NAME_KEY])
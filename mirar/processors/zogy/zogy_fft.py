@@ -0,0 +1,315 @@
+"""
+Module for the Fourier transforms used by ZOGY, with reusable FFTW plans.
+
+A :class:`ZOGYFFT` context builds pyfftw plans once for each frame shape, and
+reuses them for every subtraction. FFTW wisdom is saved to disk (by default at
+:data:`mirar.paths.fft_wisdom_path`), so that plans for shapes seen before are
+fast to create, even in a new run.
+
+As all ZOGY inputs are real, transforms are real-to-complex, on half of the
+Fourier plane. They can be performed in single precision (complex64), which
+halves memory use and is typically faster. Transforms of reference-side data
+(the reference image, PSF and variance) can be cached by content, so that they are only
+computed once when many science images are subtracted against the same reference.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pyfftw
+
+from mirar.paths import fft_wisdom_path
+
+logger = logging.getLogger(__name__)
+
+FFT_PRECISIONS = {
+    "double": (np.float64, np.complex128),
+    "single": (np.float32, np.complex64),
+}
+
+DEFAULT_PLANNER_EFFORT = "FFTW_MEASURE"
+DEFAULT_MAX_CACHED_FFTS = 3
+
+WISDOM_KEYS = ["double", "single", "long_double"]
+
+wisdom_lock = threading.Lock()
+
+
+def load_wisdom(path: Path) -> bool:
+    """
+    Load FFTW wisdom from a file, if it exists
+
+    :param path: Path of wisdom file
+    :return: Boolean whether wisdom was loaded
+    """
+    path = Path(path)
+    if not path.exists():
+        return False
+
+    try:
+        with open(path, "r", encoding="utf8") as wisdom_file:
+            wisdom = json.load(wisdom_file)
+        with wisdom_lock:
+            pyfftw.import_wisdom(tuple(wisdom[key].encode() for key in WISDOM_KEYS))
+    except (OSError, ValueError, KeyError) as exc:
+        logger.warning(f"Could not load FFTW wisdom from {path}: {exc}")
+        return False
+
+    logger.debug(f"Loaded FFTW wisdom from {path}")
+    return True
+
+
+def save_wisdom(path: Path):
+    """
+    Save the accumulated FFTW wisdom to a file
+
+    :param path: Path of wisdom file
+    :return: None
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with wisdom_lock:
+        wisdom = dict(zip(WISDOM_KEYS, pyfftw.export_wisdom()))
+
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(temp_path, "w", encoding="utf8") as wisdom_file:
+        json.dump({key: value.decode() for key, value in wisdom.items()}, wisdom_file)
+    os.replace(temp_path, path)
+
+
+def get_fft_cache_key(data: np.ndarray) -> tuple:
+    """
+    Get a key identifying an array by its content
+
+    :param data: Array
+    :return: Key
+    """
+    data = np.ascontiguousarray(data)
+    digest = hashlib.blake2b(data.view(np.uint8), digest_size=16).hexdigest()
+    return data.shape, data.dtype.str, digest
+
+
+class ZOGYFFT:
+    """
+    Context for the real-to-complex Fourier transforms of ZOGY, reusing
+    FFTW plans for each frame shape
+    """
+
+    def __init__(
+        self,
+        precision: str = "double",
+        n_threads: int = 1,
+        planner_effort: str = DEFAULT_PLANNER_EFFORT,
+        wisdom_path: Path | None = fft_wisdom_path,
+        max_cached_ffts: int = DEFAULT_MAX_CACHED_FFTS,
+    ):
+        """
+        :param precision: Precision of transforms, 'double' (complex128)
+            or 'single' (complex64)
+        :param n_threads: Number of threads used by each transform
+        :param planner_effort: FFTW planner effort for new plans
+        :param wisdom_path: Path to load/save FFTW wisdom (None to disable)
+        :param max_cached_ffts: Maximum number of cached transforms
+        """
+        if precision not in FFT_PRECISIONS:
+            err = (
+                f"Unrecognised FFT precision '{precision}', "
+                f"must be one of {list(FFT_PRECISIONS)}"
+            )
+            logger.error(err)
+            raise ValueError(err)
+
+        self.precision = precision
+        self.real_dtype, self.complex_dtype = FFT_PRECISIONS[precision]
+        self.n_threads = n_threads
+        self.planner_effort = planner_effort
+        self.wisdom_path = wisdom_path
+        self.max_cached_ffts = max_cached_ffts
+
+        self._setup()
+
+        if self.wisdom_path is not None:
+            load_wisdom(self.wisdom_path)
+
+    def _setup(self):
+        """
+        Set up the (unpicklable) plans, locks and cache
+
+        :return: None
+        """
+        self.plans = {}
+        self.cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ["plans", "cache", "_lock"]:
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
+
+    def get_plan(
+        self,
+        shape: tuple[int, int],
+        inverse: bool = False,
+        precision: str | None = None,
+    ) -> tuple[pyfftw.FFTW, threading.Lock]:
+        """
+        Get the plan for transforms of a given (real) shape, building it
+        on first use
+
+        :param shape: Shape of real array
+        :param inverse: Whether the plan is for the inverse transform
+        :param precision: Precision of plan (defaults to the context precision)
+        :return: FFTW plan, lock for plan
+        """
+        precision = self.precision if precision is None else precision
+        key = (tuple(shape), inverse, precision)
+        with self._lock:
+            if key not in self.plans:
+                self.plans[key] = (
+                    self.build_plan(shape, inverse, precision),
+                    threading.Lock(),
+                )
+            return self.plans[key]
+
+    def build_plan(
+        self, shape: tuple[int, int], inverse: bool, precision: str
+    ) -> pyfftw.FFTW:
+        """
+        Build an FFTW plan, and save the updated wisdom
+
+        :param shape: Shape of real array
+        :param inverse: Whether the plan is for the inverse transform
+        :param precision: Precision of plan
+        :return: FFTW plan
+        """
+        logger.debug(
+            f"Building {['forward', 'inverse'][inverse]} {precision} "
+            f"precision FFT plan for shape {shape}"
+        )
+        real_dtype, complex_dtype = FFT_PRECISIONS[precision]
+        real_array = pyfftw.empty_aligned(shape, dtype=real_dtype)
+        complex_array = pyfftw.empty_aligned(
+            (*shape[:-1], shape[-1] // 2 + 1), dtype=complex_dtype
+        )
+
+        if inverse:
+            plan = pyfftw.FFTW(
+                complex_array,
+                real_array,
+                axes=(-2, -1),
+                direction="FFTW_BACKWARD",
+                flags=(self.planner_effort, "FFTW_DESTROY_INPUT"),
+                threads=self.n_threads,
+            )
+        else:
+            plan = pyfftw.FFTW(
+                real_array,
+                complex_array,
+                axes=(-2, -1),
+                direction="FFTW_FORWARD",
+                flags=(self.planner_effort,),
+                threads=self.n_threads,
+            )
+
+        if self.wisdom_path is not None:
+            save_wisdom(self.wisdom_path)
+
+        return plan
+
+    def rfft2(self, data: np.ndarray, exact: bool = False) -> np.ndarray:
+        """
+        Real-to-complex 2D Fourier transform
+
+        Transforms with exact=True are always performed in double precision
+        (and then converted to the context precision). This is needed for
+        PSFs: their transforms fall far below the single precision rounding
+        error at high frequencies, and ZOGY divides by them.
+
+        :param data: Real array
+        :param exact: Whether to transform in double precision
+        :return: Half of the Fourier transform, of shape (ny, nx // 2 + 1)
+        """
+        plan, lock = self.get_plan(
+            data.shape, inverse=False, precision="double" if exact else None
+        )
+        with lock:
+            plan.input_array[...] = data
+            plan()
+            return plan.output_array.astype(self.complex_dtype, copy=True)
+
+    def irfft2(self, data_hat: np.ndarray, shape: tuple[int, int]) -> np.ndarray:
+        """
+        Complex-to-real inverse 2D Fourier transform, equivalent to taking
+        the real part of the full inverse transform
+
+        :param data_hat: Half of a Fourier transform
+        :param shape: Shape of real array
+        :return: Real array
+        """
+        plan, lock = self.get_plan(shape, inverse=True)
+        with lock:
+            # The input array of the plan is destroyed, rather than data_hat
+            plan.input_array[...] = data_hat
+            plan()
+            return plan.output_array.copy()
+
+    def cached_rfft2(self, data: np.ndarray, exact: bool = False) -> np.ndarray:
+        """
+        Real-to-complex 2D Fourier transform, reusing the result of
+        a previous transform of identical data
+
+        :param data: Real array
+        :param exact: Whether to transform in double precision
+        :return: Half of the Fourier transform, of shape (ny, nx // 2 + 1)
+        """
+        if self.max_cached_ffts < 1:
+            return self.rfft2(data, exact=exact)
+
+        key = (self.precision, exact, *get_fft_cache_key(data))
+
+        with self._lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+
+        data_hat = self.rfft2(data, exact=exact)
+        data_hat.flags.writeable = False
+
+        with self._lock:
+            self.cache[key] = data_hat
+            while len(self.cache) > self.max_cached_ffts:
+                self.cache.popitem(last=False)
+
+        return data_hat
+
+    def clear_cache(self):
+        """
+        Clear all cached transforms
+
+        :return: None
+        """
+        with self._lock:
+            self.cache.clear()
+
+
+@functools.cache
+def get_default_zogy_fft() -> ZOGYFFT:
+    """
+    Get a shared default ZOGY FFT context
+
+    :return: ZOGYFFT
+    """
+    return ZOGYFFT()
@@ -1,12 +1,22 @@
 """
-Base class for unit testing, with common cleanup method
+Base class for unit testing, with common cleanup method, and synthetic
+images and database tables shared by the unit tests
 """
 
 import tempfile
 import unittest
+from typing import ClassVar
 
+import numpy as np
+from astropy.io.fits import Header
+from sqlalchemy import VARCHAR, Column, Float, Integer
+from sqlalchemy.orm import DeclarativeBase
+
+from mirar.data import Dataset, Image, ImageBatch
 from mirar.data.cache import cache
-from mirar.paths import TEMP_DIR
+from mirar.database.base_model import BaseDB
+from mirar.database.base_table import BaseTable
+from mirar.paths import BASE_NAME_KEY, PROC_HISTORY_KEY, RAW_IMG_KEY, TEMP_DIR
 
 
 class BaseTestCase(unittest.TestCase):
@@ -18,3 +28,93 @@ class BaseTestCase(unittest.TestCase):
         self.temp_dir = tempfile.TemporaryDirectory(dir=TEMP_DIR)
         cache.set_cache_dir(self.temp_dir.name)
         self.addCleanup(self.temp_dir.cleanup)
+
+
+def make_test_image(
+    name: str = "image.fits",
+    value: float = 0.0,
+    shape: tuple[int, ...] = (8, 8),
+    data: np.ndarray | None = None,
+    header_values: dict | None = None,
+) -> Image:
+    """
+    Make a small synthetic image
+
+    :param name: Name of image
+    :param value: Value of each pixel (if data is None)
+    :param shape: Shape of image (if data is None)
+    :param data: Image data, or None for a constant image
+    :param header_values: Additional header values
+    :return: Image
+    """
+    header = Header()
+    header[BASE_NAME_KEY] = name
+    header[RAW_IMG_KEY] = f"/raw/{name}"
+    header[PROC_HISTORY_KEY] = ""
+    for key, val in (header_values or {}).items():
+        header[key] = val
+
+    if data is None:
+        data = np.full(shape, value)
+
+    return Image(data=data, header=header)
+
+
+def make_test_dataset(n_batches: int = 6) -> Dataset:
+    """
+    Make a dataset of small synthetic images, one per batch, with image i
+    having a value of i and an OBJECT of field_i
+
+    :param n_batches: Number of batches
+    :return: Dataset
+    """
+    return Dataset(
+        [
+            ImageBatch(
+                make_test_image(
+                    f"image_{i}.fits",
+                    value=float(i),
+                    header_values={"OBJECT": f"field_{i}"},
+                )
+            )
+            for i in range(n_batches)
+        ]
+    )
+
+
+class ExampleBase(DeclarativeBase, BaseTable):
+    """
+    Parent class for test tables
+    """
+
+    db_name = "test"
+
+
+class ExampleSourceTable(ExampleBase):  # pylint: disable=too-few-public-methods
+    """
+    Example table of sources
+    """
+
+    __tablename__ = "example_sources"
+
+    sourceid = Column(Integer, primary_key=True, unique=True)
+    name = Column(VARCHAR(20), unique=True)
+    ra = Column(Float)
+    dec = Column(Float)
+    jd = Column(Float)
+    value = Column(Float)
+
+
+class ExampleSource(BaseDB):
+    """
+    Example source model
+    """
+
+    sql_model: ClassVar = ExampleSourceTable
+
+    sourceid: int | None = None
+    name: str
+    ra: float | None = None
+    dec: float | None = None
+    jd: float | None = None
+    value: float | None = None
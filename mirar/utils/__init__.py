@@ -6,6 +6,8 @@ from mirar.utils.execute_cmd import (
     ExecutionError,
     TimeoutExecutionError,
     execute,
+    get_execution_statistics,
+    reset_execution_statistics,
     run_docker,
     run_local,
 )
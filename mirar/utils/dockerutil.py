@@ -2,16 +2,21 @@
 Module containing docker integration (beta-stage)
 """
 
+import atexit
 import io
 import logging
 import os
 import tarfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
 import docker
 from docker.errors import DockerException
 from docker.models.containers import Container
 
+from mirar.paths import max_n_cpu
+
 logger = logging.getLogger(__name__)
 
 DOCKER_IMAGE_NAME = "robertdstein/astrodocker"
@@ -48,6 +53,153 @@ def new_container():
     return client.containers.run(DOCKER_IMAGE_NAME, tty=True, detach=True)
 
 
+def list_container_files(container: Container) -> list[str]:
+    """
+    List the files in the work directory of a container
+
+    :param container: A docker.models.container.Container object
+    :return: List of file names
+    """
+    return (
+        container.exec_run("ls", stderr=True, stdout=True).output.decode().split("\n")
+    )
+
+
+class ContainerPool:
+    """
+    Pool of long-lived docker containers, so that a container is not created
+    (and destroyed) for every command. Each container is used by one command
+    at a time, and files added to its work directory are removed after each
+    command.
+    """
+
+    def __init__(self, max_idle: int = max_n_cpu):
+        """
+        :param max_idle: Maximum number of idle containers to keep
+        """
+        self.max_idle = max_idle
+        self.idle = []
+        self.base_files = {}
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        atexit.register(self.close)
+
+    def check_pid(self):
+        """
+        Forget any containers inherited from a parent process, as their
+        connections to the docker daemon cannot be shared
+
+        :return: None
+        """
+        if self.pid != os.getpid():
+            self.idle = []
+            self.base_files = {}
+            self.pid = os.getpid()
+
+    def acquire(self) -> Container:
+        """
+        Get an idle container, or start a new one
+
+        :return: Container
+        """
+        with self.lock:
+            self.check_pid()
+            if len(self.idle) > 0:
+                return self.idle.pop()
+
+        container = new_container()
+        base_files = list_container_files(container)
+        with self.lock:
+            self.base_files[container.id] = base_files
+        return container
+
+    def clean(self, container: Container):
+        """
+        Remove all files added to the work directory of a container
+
+        :param container: Container
+        :return: None
+        """
+        new_files = [
+            x
+            for x in list_container_files(container)
+            if (len(x) > 0) & (x not in self.base_files[container.id])
+        ]
+        if len(new_files) > 0:
+            container.exec_run(["rm", "-rf"] + new_files)
+
+    def release(self, container: Container, healthy: bool = True):
+        """
+        Clean a container and return it to the pool, or remove it if it is
+        unhealthy or the pool is full
+
+        :param container: Container
+        :param healthy: Whether the container can be reused
+        :return: None
+        """
+        if healthy:
+            try:
+                self.clean(container)
+            except docker.errors.APIError as exc:
+                logger.warning(f"Could not clean docker container: {exc}")
+                healthy = False
+
+        with self.lock:
+            if healthy & (len(self.idle) < self.max_idle):
+                self.idle.append(container)
+                return
+            self.base_files.pop(container.id, None)
+
+        remove_container(container)
+
+    @contextmanager
+    def get_container(self):
+        """
+        Context manager to use a container from the pool
+
+        :return: Container
+        """
+        container = self.acquire()
+        healthy = True
+        try:
+            yield container
+        except docker.errors.APIError:
+            healthy = False
+            raise
+        finally:
+            self.release(container, healthy=healthy)
+
+    def close(self):
+        """
+        Remove all idle containers
+
+        :return: None
+        """
+        with self.lock:
+            self.check_pid()
+            idle, self.idle = self.idle, []
+            self.base_files = {}
+        for container in idle:
+            remove_container(container)
+
+
+def remove_container(container: Container):
+    """
+    Kill and remove a container, ignoring errors
+
+    :param container: Container
+    :return: None
+    """
+    try:
+        container.kill()
+        container.remove()
+    except docker.errors.APIError as exc:
+        logger.warning(f"Could not remove docker container: {exc}")
+
+
+container_pool = ContainerPool()
+
+
 def docker_path(file_path: str | Path) -> Path:
     """
     Converts a local path to the corresponding path in the docker container
@@ -122,9 +274,7 @@ def docker_batch_put(container: Container, local_paths: str | list):
     for local_path in local_paths:
         docker_put(container, local_path)
 
-    return (
-        container.exec_run("ls", stderr=True, stdout=True).output.decode().split("\n")
-    )
+    return list_container_files(container)
 
 
 def docker_get_new_files(
@@ -163,13 +313,7 @@ def docker_get_new_files(
     -------
     """
 
-    new_files = [
-        x
-        for x in container.exec_run("ls", stderr=True, stdout=True)
-        .output.decode()
-        .split("\n")
-        if x not in ignore_files
-    ]
+    new_files = [x for x in list_container_files(container) if x not in ignore_files]
 
     # Make output directory if it doesn't exist
 
@@ -1,20 +1,29 @@
 """
 Module for executing bash commands
+
+The wall time, and the total size of input and output files named on the
+command line (including files listed in '@' list files), are recorded for each
+tool, and can be retrieved with :func:`get_execution_statistics`.
+Statistics are recorded separately by each process.
 """
 
 import logging
 import os
 import subprocess
+import threading
+import time
 from pathlib import Path
 from subprocess import TimeoutExpired
 
 import docker
 
 from mirar.utils.dockerutil import (
+    container_pool,
     docker_batch_put,
     docker_get_new_files,
     docker_path,
     new_container,
+    remove_container,
 )
 
 logger = logging.getLogger(__name__)
@@ -30,6 +39,106 @@ class TimeoutExecutionError(Exception):
 
 DEFAULT_TIMEOUT = 300.0
 
+_execution_statistics = {}
+_statistics_lock = threading.Lock()
+
+
+def get_command_paths(cmd: str) -> list[Path]:
+    """
+    Get the paths of existing files named in a command, including those
+    listed in '@' list files (as used e.g. by swarp)
+
+    :param cmd: command
+    :return: List of paths
+    """
+    paths = []
+    for arg in cmd.split()[1:]:
+        for token in arg.strip("'\"").split(","):
+            if token.startswith("@"):
+                list_path = Path(token[1:])
+                if list_path.is_file():
+                    paths.append(list_path)
+                    with open(list_path, "r", encoding="utf8") as list_file:
+                        paths += [
+                            Path(x)
+                            for x in list_file.read().split()
+                            if Path(x).is_file()
+                        ]
+            elif (len(token) > 0) and Path(token).is_file():
+                paths.append(Path(token))
+    return list(dict.fromkeys(paths))
+
+
+def get_total_size(paths: list[Path], modified_after: float | None = None) -> int:
+    """
+    Get the total size of a list of files, optionally only counting files
+    modified after a given time
+
+    :param paths: List of paths
+    :param modified_after: Unix time, or None to count all files
+    :return: Total size in bytes
+    """
+    total = 0
+    for path in paths:
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        if (modified_after is None) or (stat.st_mtime >= modified_after):
+            total += stat.st_size
+    return total
+
+
+def record_execution(
+    tool: str, wall_time: float, input_bytes: int, output_bytes: int, failed: bool
+):
+    """
+    Record the execution of a tool
+
+    :param tool: Name of tool
+    :param wall_time: Wall time in seconds
+    :param input_bytes: Total size of input files
+    :param output_bytes: Total size of output files
+    :param failed: Whether the execution failed
+    :return: None
+    """
+    with _statistics_lock:
+        stats = _execution_statistics.setdefault(
+            tool,
+            {
+                "n_calls": 0,
+                "n_failures": 0,
+                "wall_time_s": 0.0,
+                "input_bytes": 0,
+                "output_bytes": 0,
+            },
+        )
+        stats["n_calls"] += 1
+        stats["n_failures"] += int(failed)
+        stats["wall_time_s"] += wall_time
+        stats["input_bytes"] += input_bytes
+        stats["output_bytes"] += output_bytes
+
+
+def get_execution_statistics() -> dict[str, dict]:
+    """
+    Get the statistics of executed tools, in this process
+
+    :return: Dictionary of statistics for each tool
+    """
+    with _statistics_lock:
+        return {tool: stats.copy() for tool, stats in _execution_statistics.items()}
+
+
+def reset_execution_statistics():
+    """
+    Reset the statistics of executed tools
+
+    :return: None
+    """
+    with _statistics_lock:
+        _execution_statistics.clear()
+
 
 def run_local(cmd: str, timeout: float = DEFAULT_TIMEOUT):
     """
@@ -94,10 +203,10 @@ def temp_config(config_path: str | Path, output_dir: str | Path) -> Path:
     return Path(output_dir).joinpath(basename)
 
 
-def run_docker(cmd: str, output_dir: Path | str = "."):
+def run_docker(cmd: str, output_dir: Path | str = ".", reuse_container: bool = True):
     """Function to run a command via Docker.
-    A container will be generated automatically,
-    but a Docker server must be running first.
+    A container will be generated automatically (or reused from a pool of
+    long-lived containers), but a Docker server must be running first.
     You can start one via the Desktop application,
     or on the command line with `docker start'.
 
@@ -110,139 +219,156 @@ def run_docker(cmd: str, output_dir: Path | str = "."):
     An example would be:
         cmd = 'image01.fits -c sex.config'
     output_dir: A local directory to save the output files to.
+    reuse_container: Whether to reuse a container from the pool, rather than
+    creating a new container for this command
 
     Returns
     -------
 
     """
 
-    container = new_container()
-
     try:
-        container.attach()
+        if reuse_container:
+            with container_pool.get_container() as container:
+                run_in_container(container, cmd, output_dir=output_dir)
+        else:
+            container = new_container()
+            try:
+                run_in_container(container, cmd, output_dir=output_dir)
+            finally:
+                # In any case, clean up by killing the container and removing files
+                remove_container(container)
+    except docker.errors.APIError as err:
+        logger.error(err)
+        raise ExecutionError(err) from err
 
-        container.start()
 
-        split = cmd.split(" -")
+def run_in_container(container, cmd: str, output_dir: Path | str = "."):
+    """
+    Function to run a command in a docker container, copying in any files
+    named in the command, and copying out any new files to 'output_dir'
 
-        # Reorganise the commands so that each '-x' argument is grouped together
-        # Basically still work even if someone puts the filename in a weird place
+    :param container: A docker.models.container.Container object
+    :param cmd: command
+    :param output_dir: A local directory to save the output files to.
+    :return: None
+    """
+    container.attach()
 
-        sorted_split = []
+    container.start()
 
-        for i, arg in enumerate(split):
-            sep = arg.split(" ")
-            sorted_split.append(" ".join(sep[:2]))
-            if len(sep) > 2:
-                sorted_split[0] += " " + " ".join(sep[2:])
+    split = cmd.split(" -")
 
-        new_split = []
+    # Reorganise the commands so that each '-x' argument is grouped together
+    # Basically still work even if someone puts the filename in a weird place
 
-        # Loop over sextractor command, and
-        # copy everything that looks like a file into container
-        # Go through everything that looks like a file with paths in it after
+    sorted_split = []
 
-        copy_list = []
-        temp_files = []
+    for i, arg in enumerate(split):
+        sep = arg.split(" ")
+        sorted_split.append(" ".join(sep[:2]))
+        if len(sep) > 2:
+            sorted_split[0] += " " + " ".join(sep[2:])
 
-        files_of_files = []
+    new_split = []
 
-        for i, arg in enumerate(sorted_split):
-            sep = arg.split(" ")
+    # Loop over sextractor command, and
+    # copy everything that looks like a file into container
+    # Go through everything that looks like a file with paths in it after
 
-            if sep[0] == "c":
-                files_of_files.append(sep[1])
+    copy_list = []
+    temp_files = []
 
-            new = list(sep)
+    files_of_files = []
 
-            for j, x in enumerate(sep):
-                if len(x) > 0:
-                    if os.path.isfile(x):
-                        new[j] = docker_path(sep[j])
-                        copy_list.append(sep[j])
-                    elif x[0] == "@":
-                        files_of_files.append(x[1:])
-                    elif os.path.isdir(os.path.dirname(x)):
-                        new[j] = docker_path(sep[j])
+    for i, arg in enumerate(sorted_split):
+        sep = arg.split(" ")
 
-            new_split.append(" ".join(new))
+        if sep[0] == "c":
+            files_of_files.append(sep[1])
 
-        cmd = " -".join(new_split)
+        new = list(sep)
 
-        # Be extra clever: go through files and check there too!
+        for j, x in enumerate(sep):
+            if len(x) > 0:
+                if os.path.isfile(x):
+                    new[j] = docker_path(sep[j])
+                    copy_list.append(sep[j])
+                elif x[0] == "@":
+                    files_of_files.append(x[1:])
+                elif os.path.isdir(os.path.dirname(x)):
+                    new[j] = docker_path(sep[j])
 
-        logger.debug(
-            f"Found the following files which should contain paths: {files_of_files}"
-        )
+        new_split.append(" ".join(new))
 
-        for path in files_of_files:
-            new_file = []
+    cmd = " -".join(new_split)
 
-            with open(path, "rb", encoding="utf8") as local_file:
-                for line in local_file.readlines():
-                    args = [x for x in line.decode().split(" ") if x not in [""]]
-                    new_args = list(args)
-                    for i, arg in enumerate(args):
-                        if os.path.isfile(arg):
-                            copy_list.append(arg)
-                            new_args[i] = docker_path(arg)
-                        elif os.path.isfile(arg.strip("\n")):
-                            copy_list.append(arg.strip("\n"))
-                            new_args[i] = str(docker_path(arg.strip("\n"))) + "\n"
-                    new_file.append(" ".join(new_args))
+    # Be extra clever: go through files and check there too!
 
-            temp_file_path = temp_config(path, output_dir)
+    logger.debug(
+        f"Found the following files which should contain paths: {files_of_files}"
+    )
 
-            with open(temp_file_path, "w", encoding="utf8") as temp_file:
-                temp_file.writelines(new_file)
+    for path in files_of_files:
+        new_file = []
 
-            copy_list.append(temp_file_path)
+        with open(path, "rb", encoding="utf8") as local_file:
+            for line in local_file.readlines():
+                args = [x for x in line.decode().split(" ") if x not in [""]]
+                new_args = list(args)
+                for i, arg in enumerate(args):
+                    if os.path.isfile(arg):
+                        copy_list.append(arg)
+                        new_args[i] = docker_path(arg)
+                    elif os.path.isfile(arg.strip("\n")):
+                        copy_list.append(arg.strip("\n"))
+                        new_args[i] = str(docker_path(arg.strip("\n"))) + "\n"
+                new_file.append(" ".join(new_args))
 
-            cmd = cmd.replace(path + " ", str(docker_path(temp_file_path)) + " ")
+        temp_file_path = temp_config(path, output_dir)
 
-        # Copy in files, and see what files are already there
+        with open(temp_file_path, "w", encoding="utf8") as temp_file:
+            temp_file.writelines(new_file)
 
-        copy_list = list(set(copy_list))
+        copy_list.append(temp_file_path)
 
-        logger.debug(f"Copying {copy_list} into container")
+        cmd = cmd.replace(path + " ", str(docker_path(temp_file_path)) + " ")
 
-        ignore_files = docker_batch_put(container=container, local_paths=copy_list)
+    # Copy in files, and see what files are already there
 
-        # Run command
+    copy_list = list(set(copy_list))
 
-        log = container.exec_run(cmd, stderr=True, stdout=True)
+    logger.debug(f"Copying {copy_list} into container")
 
-        for temp_file_path in temp_files:
-            logger.debug(f"Deleting temporary file {temp_file_path}")
-            os.remove(temp_file_path)
+    ignore_files = docker_batch_put(container=container, local_paths=copy_list)
 
-        if not log.output == b"":
-            logger.info(f"Output: {log.output.decode()}")
+    # Run command
 
-        if not log.exit_code == 0:
-            err = (
-                f"Error running command: \n '{cmd}'\n "
-                f"which resulted in returncode '{log.exit_code}' and"
-                f"the following error message: \n '{log.output.decode()}'"
-            )
-            logger.error(err)
-            raise subprocess.CalledProcessError(
-                returncode=log.exit_code, cmd=cmd, stderr=log.output.decode()
-            )
+    log = container.exec_run(cmd, stderr=True, stdout=True)
 
-        # Copy out any files which did not exist before running sextractor
+    for temp_file_path in temp_files:
+        logger.debug(f"Deleting temporary file {temp_file_path}")
+        os.remove(temp_file_path)
 
-        docker_get_new_files(
-            container=container, output_dir=output_dir, ignore_files=ignore_files
-        )
+    if not log.output == b"":
+        logger.info(f"Output: {log.output.decode()}")
 
-    except docker.errors.APIError as err:
+    if not log.exit_code == 0:
+        err = (
+            f"Error running command: \n '{cmd}'\n "
+            f"which resulted in returncode '{log.exit_code}' and"
+            f"the following error message: \n '{log.output.decode()}'"
+        )
         logger.error(err)
-        raise ExecutionError(err) from err
-    finally:
-        # In any case, clean up by killing the container and removing files
-        container.kill()
-        container.remove()
+        raise subprocess.CalledProcessError(
+            returncode=log.exit_code, cmd=cmd, stderr=log.output.decode()
+        )
+
+    # Copy out any files which did not exist before running sextractor
+
+    docker_get_new_files(
+        container=container, output_dir=output_dir, ignore_files=ignore_files
+    )
 
 
 def execute(
@@ -263,7 +389,24 @@ def execute(
     logger.debug(
         f"Using '{['docker', 'local'][local]}' " f" installation to run `{cmd}`"
     )
-    if local:
-        run_local(cmd, timeout=timeout)
-    else:
-        run_docker(cmd, output_dir=output_dir)
+    input_paths = get_command_paths(cmd)
+    input_bytes = get_total_size(input_paths)
+
+    start_time = time.time()
+    failed = True
+    try:
+        if local:
+            run_local(cmd, timeout=timeout)
+        else:
+            run_docker(cmd, output_dir=output_dir)
+        failed = False
+    finally:
+        wall_time = time.time() - start_time
+        output_bytes = get_total_size(get_command_paths(cmd), modified_after=start_time)
+        record_execution(
+            tool=Path(cmd.split()[0]).name,
+            wall_time=wall_time,
+            input_bytes=input_bytes,
+            output_bytes=output_bytes,
+            failed=failed,
+        )
@@ -0,0 +1,48 @@
+"""
+Module with helper functions for HEALPix tiles of the sky, used e.g to tile
+the catalog store and to lock regions of sky in the database
+"""
+
+import astropy.units as u
+import numpy as np
+from mocpy import MOC
+
+
+def get_tile_ids(
+    ra_deg: float | np.ndarray,
+    dec_deg: float | np.ndarray,
+    radius_deg: float,
+    depth: int,
+) -> np.ndarray:
+    """
+    Get the HEALPix tiles overlapping one or more cones
+
+    :param ra_deg: RA of cone centre(s)
+    :param dec_deg: Dec of cone centre(s)
+    :param radius_deg: Radius of cones
+    :param depth: HEALPix depth of tiles
+    :return: Sorted array of unique tile ids
+    """
+    tile_ids = [
+        MOC.from_cone(
+            lon=ra * u.deg,
+            lat=dec * u.deg,
+            radius=radius_deg * u.deg,
+            max_depth=depth,
+        ).flatten()
+        for ra, dec in zip(np.atleast_1d(ra_deg), np.atleast_1d(dec_deg))
+    ]
+    return np.unique(np.concatenate(tile_ids)).astype(int)
+
+
+def get_tile_moc(tile_id: int, depth: int) -> MOC:
+    """
+    Get the MOC of a single HEALPix tile
+
+    :param tile_id: Tile id
+    :param depth: HEALPix depth of tile
+    :return: MOC
+    """
+    return MOC.from_healpix_cells(
+        ipix=np.array([tile_id]), depth=np.array([depth]), max_depth=depth
+    )
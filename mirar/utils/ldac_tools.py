@@ -44,7 +44,35 @@ def convert_hdu_to_ldac(
     return tbl1, tbl2
 
 
-def convert_table_to_ldac(tbl: astropy.table.Table) -> astropy.io.fits.HDUList:
+def get_ldac_image_header(header: astropy.io.fits.Header) -> fits.BinTableHDU:
+    """
+    Get an LDAC_IMHEAD table holding the cards of an image header, as written
+    by Sextractor (and read by Scamp/PSFex)
+
+    Parameters
+    ----------
+    header: `astropy.io.fits.Header`
+        Image header
+
+    Returns
+    -------
+    tbl: `astropy.io.fits.BinTableHDU`
+        Header info for fits table (LDAC_IMHEAD)
+    """
+    cards = [card.image for card in header.cards] + ["END".ljust(80)]
+    tblhdr = np.array(["".join(cards)])
+    col1 = fits.Column(
+        name="Field Header Card", array=tblhdr, format=f"{80 * len(cards)}A"
+    )
+    tbl = fits.BinTableHDU.from_columns(fits.ColDefs([col1]))
+    tbl.header["TDIM1"] = f"(80, {len(cards)})"
+    tbl.header["EXTNAME"] = "LDAC_IMHEAD"
+    return tbl
+
+
+def convert_table_to_ldac(
+    tbl: astropy.table.Table, image_header: astropy.io.fits.Header | None = None
+) -> astropy.io.fits.HDUList:
     """
     Convert an astropy table to a fits_ldac
 
@@ -52,6 +80,8 @@ def convert_table_to_ldac(tbl: astropy.table.Table) -> astropy.io.fits.HDUList:
     ----------
     tbl: `astropy.table.Table`
         Table to convert to ldac format
+    image_header: `astropy.io.fits.Header`, optional
+        Image header to store in LDAC_IMHEAD (instead of the table header)
     Returns
     -------
     hdulist: `astropy.io.fits.HDUList`
@@ -68,12 +98,19 @@ def convert_table_to_ldac(tbl: astropy.table.Table) -> astropy.io.fits.HDUList:
             temp_file.seek(0)
             with fits.open(temp_file, mode="update") as hdulist:
                 tbl1, tbl2 = convert_hdu_to_ldac(hdulist[1].copy())
+                if image_header is not None:
+                    tbl1 = get_ldac_image_header(image_header)
                 new_hdulist = [hdulist[0].copy(), tbl1, tbl2]
                 new_hdulist = fits.HDUList(new_hdulist)
     return new_hdulist
 
 
-def save_table_as_ldac(tbl: astropy.table.Table, file_path: str | Path, **kwargs):
+def save_table_as_ldac(
+    tbl: astropy.table.Table,
+    file_path: str | Path,
+    image_header: astropy.io.fits.Header | None = None,
+    **kwargs,
+):
     """
     Save a table as a fits LDAC file
 
@@ -83,10 +120,12 @@ def save_table_as_ldac(tbl: astropy.table.Table, file_path: str | Path, **kwargs
         Table to save
     file_path: str
         Filename to save table
+    image_header: `astropy.io.fits.Header`, optional
+        Image header to store in LDAC_IMHEAD (instead of the table header)
     kwargs:
         Keyword arguments to pass to hdulist.writeto
     """
-    hdulist = convert_table_to_ldac(tbl)
+    hdulist = convert_table_to_ldac(tbl, image_header=image_header)
     hdulist.writeto(file_path, overwrite=True, **kwargs)
 
 
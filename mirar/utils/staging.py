@@ -0,0 +1,205 @@
+"""
+Module for staging the temporary files of external tools (e.g. the astromatic
+suite) on a fast local area, such as a tmpfs mounted at /dev/shm.
+
+Staging is enabled by setting STAGING_DIR. Temporary input files are then
+written to a subdirectory of it for each process, rather than next to the
+outputs (often on network storage). The total size of staged files is limited
+by a quota (STAGING_QUOTA_GB, with a default of 1), and by the free space of
+the staging area. Files which do not fit are instead written to the usual
+temporary path, so staging never causes a tool to fail.
+"""
+
+import atexit
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+
+from mirar.paths import PACKAGE_NAME, get_temp_path
+
+logger = logging.getLogger(__name__)
+
+_staging_dir = os.getenv("STAGING_DIR")
+STAGING_QUOTA_GB: float = float(os.getenv("STAGING_QUOTA_GB", "1"))
+
+# Fraction of the free space of the staging area which can be used
+MAX_FREE_SPACE_FRACTION = 0.5
+
+
+class StagingArea:
+    """
+    Class to stage temporary files on a fast local area, with size accounting
+    """
+
+    def __init__(
+        self,
+        staging_dir: Path | None = None,
+        quota_bytes: int = int(STAGING_QUOTA_GB * 1.0e9),
+    ):
+        """
+        :param staging_dir: Staging directory (None to disable staging)
+        :param quota_bytes: Maximum total size of staged files
+        """
+        self.staging_dir = None if staging_dir is None else Path(staging_dir)
+        self.quota_bytes = quota_bytes
+        self.reservations = {}
+        self.peak_bytes = 0
+        self.n_staged = 0
+        self.n_spilled = 0
+        self.lock = threading.Lock()
+        self._pid = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        state["reservations"] = {}
+        state["_pid"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether staging is enabled
+
+        :return: Boolean
+        """
+        return self.staging_dir is not None
+
+    @property
+    def used_bytes(self) -> int:
+        """
+        Total size of files currently staged
+
+        :return: Size in bytes
+        """
+        return sum(self.reservations.values())
+
+    def get_process_dir(self) -> Path:
+        """
+        Get the staging subdirectory for this process, creating it (and
+        registering its cleanup at exit) on first use
+
+        :return: Directory
+        """
+        process_dir = self.staging_dir.joinpath(f"{PACKAGE_NAME}_{os.getpid()}")
+        if self._pid != os.getpid():
+            process_dir.mkdir(parents=True, exist_ok=True)
+            atexit.register(shutil.rmtree, process_dir, ignore_errors=True)
+            self._pid = os.getpid()
+        return process_dir
+
+    def reserve(self, path: Path, n_bytes: int) -> bool:
+        """
+        Reserve space for a staged file, if the quota and the free space of
+        the staging area allow it
+
+        :param path: Staged path
+        :param n_bytes: Size of file
+        :return: Boolean whether space was reserved
+        """
+        with self.lock:
+            new_usage = self.used_bytes + n_bytes
+            if new_usage > self.quota_bytes:
+                return False
+
+            free_bytes = shutil.disk_usage(self.staging_dir).free
+            if n_bytes > MAX_FREE_SPACE_FRACTION * free_bytes:
+                return False
+
+            self.reservations[Path(path)] = n_bytes
+            self.peak_bytes = max(self.peak_bytes, new_usage)
+        return True
+
+    def get_temp_path(
+        self, output_dir: Path, file_path: Path | str, n_bytes: int
+    ) -> Path:
+        """
+        Get a temporary path for a file, on the staging area if there is
+        space, and otherwise as for :func:`mirar.paths.get_temp_path`
+
+        :param output_dir: Output directory (used if the file is not staged)
+        :param file_path: Current path (or name) of file
+        :param n_bytes: Expected size of temporary file(s) for this path
+        :return: Temporary path
+        """
+        if self.enabled:
+            # Files of different output directories may share a name
+            sub_dir = hashlib.md5(str(output_dir).encode()).hexdigest()[:12]
+            staged_dir = self.get_process_dir().joinpath(sub_dir)
+            staged_path = get_temp_path(staged_dir, file_path)
+
+            if self.reserve(staged_path, n_bytes):
+                staged_dir.mkdir(exist_ok=True)
+                with self.lock:
+                    self.n_staged += 1
+                return staged_path
+
+            logger.debug(
+                f"Not enough staging space for {n_bytes} bytes "
+                f"({self.used_bytes} of {self.quota_bytes} bytes used), "
+                f"so {Path(file_path).name} will not be staged"
+            )
+            with self.lock:
+                self.n_spilled += 1
+
+        return get_temp_path(output_dir, file_path)
+
+    def copy_temp_file(self, output_dir: Path, file_path: Path) -> Path:
+        """
+        Copy a file to a temporary path, on the staging area if there is
+        space, as for :func:`mirar.paths.copy_temp_file`
+
+        :param output_dir: Output directory (used if the file is not staged)
+        :param file_path: Path of file
+        :return: Temporary path
+        """
+        temp_path = self.get_temp_path(
+            output_dir, file_path, n_bytes=Path(file_path).stat().st_size
+        )
+        logger.debug(f"Copying from {file_path} to {temp_path}")
+        try:
+            shutil.copyfile(file_path, temp_path)
+        except OSError:
+            self.release(temp_path)
+            raise
+        return temp_path
+
+    def release(self, path: Path | str):
+        """
+        Delete a temporary file, and release any space reserved for it
+
+        :param path: Temporary path
+        :return: None
+        """
+        path = Path(path)
+        path.unlink(missing_ok=True)
+        with self.lock:
+            self.reservations.pop(path, None)
+
+    def get_statistics(self) -> dict:
+        """
+        Get statistics about usage of the staging area
+
+        :return: Dictionary of statistics
+        """
+        with self.lock:
+            return {
+                "staging_dir": (
+                    None if self.staging_dir is None else str(self.staging_dir)
+                ),
+                "quota_bytes": self.quota_bytes,
+                "used_bytes": self.used_bytes,
+                "peak_bytes": self.peak_bytes,
+                "n_staged": self.n_staged,
+                "n_spilled": self.n_spilled,
+            }
+
+
+staging = StagingArea(None if _staging_dir is None else Path(_staging_dir))
@@ -0,0 +1,138 @@
+"""
+Module to test crossmatching of image sources with reference sources in
+:module:`mirar.processors.astrometry.autoastrometry.crossmatch`
+"""
+
+import logging
+
+import numpy as np
+
+from mirar.processors.astrometry.autoastrometry.crossmatch import (
+    crosscheck_source_lists,
+    distance_match,
+)
+from mirar.processors.astrometry.autoastrometry.sources import (
+    BaseSource,
+    SextractorSource,
+)
+from mirar.processors.astrometry.autoastrometry.utils import median
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+RA_0 = 150.0
+DEC_0 = 30.0
+PIXEL_SCALE_DEG = 1.0 / 3600.0
+ROTATION_DEG = 0.8
+
+
+def make_source_lists(
+    n_ref: int = 120, n_img: int = 90, seed: int = 0
+) -> tuple[list[SextractorSource], list[BaseSource], np.ndarray]:
+    """
+    Make a list of reference sources, and a list of image sources which are
+    a rotated and shifted subset of them (plus some unmatched sources)
+
+    :param n_ref: Number of reference sources
+    :param n_img: Number of image sources
+    :param seed: Random seed
+    :return: image sources, reference sources, reference index of each image source
+        (-1 if unmatched)
+    """
+    rng = np.random.default_rng(seed)
+    ra_scale = np.cos(np.radians(DEC_0))
+
+    ref_x = rng.uniform(-300.0, 300.0, n_ref)
+    ref_y = rng.uniform(-300.0, 300.0, n_ref)
+    ref_mags = rng.uniform(12.0, 20.0, n_ref)
+    ref_src_list = [
+        BaseSource(
+            RA_0 + x * PIXEL_SCALE_DEG / ra_scale, DEC_0 + y * PIXEL_SCALE_DEG, mag
+        )
+        for x, y, mag in zip(ref_x, ref_y, ref_mags)
+    ]
+
+    n_fake = n_img // 5
+    ref_inds = np.concatenate(
+        [rng.permutation(n_ref)[: n_img - n_fake], -np.ones(n_fake, dtype=int)]
+    )
+    img_x = np.where(ref_inds >= 0, ref_x[ref_inds], rng.uniform(-300, 300, n_img))
+    img_y = np.where(ref_inds >= 0, ref_y[ref_inds], rng.uniform(-300, 300, n_img))
+    img_mags = np.where(ref_inds >= 0, ref_mags[ref_inds], 15.0)
+    img_x = img_x + rng.normal(0.0, 0.1, n_img) + 5.0
+    img_y = img_y + rng.normal(0.0, 0.1, n_img) - 3.0
+
+    rotation = np.radians(ROTATION_DEG)
+    rot_x = np.cos(rotation) * img_x - np.sin(rotation) * img_y
+    rot_y = np.sin(rotation) * img_x + np.cos(rotation) * img_y
+
+    img_src_list = [
+        SextractorSource(
+            f"{x + 1000.0} {y + 1000.0} "
+            f"{RA_0 + x * PIXEL_SCALE_DEG / ra_scale} {DEC_0 + y * PIXEL_SCALE_DEG} "
+            f"{mag} 0.01 0.1 2.0"
+        )
+        for x, y, mag in zip(rot_x, rot_y, img_mags)
+    ]
+    return img_src_list, ref_src_list, ref_inds
+
+
+class TestAutoastrometryCrossmatch(BaseTestCase):
+    """
+    Class to test crossmatching for autoastrometry
+    """
+
+    def test_distance_match(self):
+        """
+        Test that matched sources correspond to each other, and that the
+        rotation between image and reference is recovered
+
+        :return: None
+        """
+        img_src_list, ref_src_list, ref_inds = make_source_lists()
+
+        primary_match_img, primary_match_ref, mpa = distance_match(
+            img_src_list=img_src_list,
+            ref_src_list=ref_src_list,
+            base_output_path="",
+            max_rad=90.0,
+            min_rad=5.0,
+        )
+
+        self.assertGreater(len(primary_match_img), 3)
+        self.assertEqual(len(primary_match_img), len(primary_match_ref))
+        for img_i, ref_i in zip(primary_match_img, primary_match_ref):
+            self.assertEqual(ref_inds[img_i], ref_i)
+        self.assertAlmostEqual(median(mpa), -ROTATION_DEG, delta=0.2)
+
+    def test_crosscheck_source_lists(self):
+        """
+        Test that the fainter source of each close pair is removed,
+        from both image and reference sources
+
+        :return: None
+        """
+        img_src_list, ref_src_list, _ = make_source_lists(seed=1)
+
+        close_img = BaseSource(
+            img_src_list[0].ra_deg, img_src_list[0].dec_deg + 1.0 / 3600.0, 25.0
+        )
+        close_ref = BaseSource(
+            ref_src_list[0].ra_deg + 1.0 / 3600.0, ref_src_list[0].dec_deg, 25.0
+        )
+
+        new_img_src_list, _, _, new_ref_src_list, _, _ = crosscheck_source_lists(
+            img_src_list=img_src_list + [close_img],
+            n_img=len(img_src_list) + 1,
+            img_density=1.0,
+            ref_src_list=ref_src_list + [close_ref],
+            n_ref=len(ref_src_list) + 1,
+            ref_density=1.0,
+            box_size_arcsec=300.0,
+            area_sq_min=100.0,
+        )
+
+        self.assertNotIn(close_img, new_img_src_list)
+        self.assertIn(img_src_list[0], new_img_src_list)
+        self.assertNotIn(close_ref, new_ref_src_list)
+        self.assertIn(ref_src_list[0], new_ref_src_list)
@@ -0,0 +1,185 @@
+"""
+Module to test the benchmark pipeline of :module:`mirar.pipelines.benchmark`
+"""
+
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mirar.paths import OBSCLASS_KEY
+from mirar.pipelines.benchmark.run_benchmark import (
+    THROUGHPUT_COLUMNS,
+    compare_to_baseline,
+    get_data_settings,
+    get_host_key,
+    load_baseline,
+    run_benchmark,
+    update_baseline,
+)
+from mirar.pipelines.benchmark.synthetic_data import write_benchmark_data
+from mirar.pipelines.winter.load_winter_image import load_winter_mef_image
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+TEST_SETTINGS = {
+    "n_stars": 2000,
+    "n_science": 2,
+    "n_darks": 2,
+    "n_flats": 2,
+    "n_reduced": 1,
+    "board_ids": [4],
+    "shape": (274, 496),
+}
+
+
+def make_throughput_table(throughputs: list[float], n_blocks: int = 10) -> pd.DataFrame:
+    """
+    Make a throughput table for a single configuration
+
+    :param throughputs: Throughput of each step
+    :param n_blocks: Number of data blocks of each step
+    :return: Table of throughputs
+    """
+    return pd.DataFrame(
+        [
+            {
+                "configuration": "calibration",
+                "step": i + 1,
+                "processor": f"Processor{i}",
+                "n_blocks": n_blocks,
+                "wall_time_s": n_blocks / throughput,
+                "cpu_time_s": n_blocks / throughput,
+                "peak_rss_delta_bytes": 0,
+                "throughput_blocks_per_s": throughput,
+            }
+            for i, throughput in enumerate(throughputs)
+        ],
+        columns=THROUGHPUT_COLUMNS,
+    )
+
+
+class TestBenchmark(BaseTestCase):
+    """
+    Class to test the benchmark pipeline
+    """
+
+    def test_synthetic_data(self):
+        """
+        Test that synthetic raw exposures load as WINTER images
+
+        :return: None
+        """
+        night_dir = Path(self.temp_dir.name).joinpath("night")
+        catalog_path = write_benchmark_data(night_dir, **TEST_SETTINGS)
+        self.assertTrue(catalog_path.exists())
+
+        raw_paths = sorted(night_dir.joinpath("raw").glob("*.fits"))
+        self.assertEqual(len(raw_paths), 6)
+
+        obsclasses = []
+        for path in raw_paths:
+            images = load_winter_mef_image(path.as_posix())
+            self.assertEqual(len(images), 1)
+            self.assertFalse(images[0].is_loaded())
+            self.assertEqual(images[0].get_data().shape, TEST_SETTINGS["shape"])
+            obsclasses.append(images[0][OBSCLASS_KEY])
+
+        self.assertEqual(sorted(set(obsclasses)), ["dark", "flat", "science"])
+        self.assertEqual(len(list(night_dir.joinpath("reduced").glob("*.fits"))), 1)
+
+    def test_baseline(self):
+        """
+        Test that slower steps are flagged as regressions, and only for
+        baselines of the same host with the same data settings, and for steps
+        which are long enough to time reliably
+
+        :return: None
+        """
+        baseline_path = Path(self.temp_dir.name).joinpath("baseline.json")
+        settings = get_data_settings(**TEST_SETTINGS)
+
+        self.assertEqual(load_baseline(baseline_path), {"hosts": {}})
+
+        update_baseline(
+            make_throughput_table([10.0, 10.0, 100.0]), baseline_path, settings
+        )
+        baseline = load_baseline(baseline_path)
+        self.assertEqual(
+            baseline["hosts"][get_host_key()]["configurations"]["calibration"][
+                "settings"
+            ]["shape"],
+            list(TEST_SETTINGS["shape"]),
+        )
+
+        # The third step took 0.1 s in the baseline, so is not compared
+        results = compare_to_baseline(
+            make_throughput_table([9.0, 5.0, 5.0]), baseline, settings, tolerance=0.2
+        )
+        self.assertEqual(results["compared"].tolist(), [True, True, False])
+        self.assertEqual(results["regression"].tolist(), [False, True, False])
+        self.assertTrue(np.allclose(results["throughput_ratio"], [0.9, 0.5, 0.05]))
+
+        results = compare_to_baseline(
+            make_throughput_table([9.0, 5.0, 5.0], n_blocks=1), baseline, settings
+        )
+        self.assertFalse(results["compared"].any())
+
+        other_settings = get_data_settings(**{**TEST_SETTINGS, "seed": 1})
+        for kwargs in [
+            {"settings": other_settings},
+            {"settings": settings, "host_key": "other_host"},
+        ]:
+            results = compare_to_baseline(
+                make_throughput_table([9.0, 5.0, 5.0]), baseline, **kwargs
+            )
+            self.assertFalse(results["regression"].any())
+            self.assertTrue(results["baseline_throughput_blocks_per_s"].isna().all())
+
+        # Baselines of other hosts are kept
+        update_baseline(
+            make_throughput_table([1.0]), baseline_path, settings, host_key="other"
+        )
+        self.assertEqual(
+            sorted(load_baseline(baseline_path)["hosts"]),
+            sorted([get_host_key(), "other"]),
+        )
+
+    def test_run_benchmark(self):
+        """
+        Test running the calibration benchmark, and updating its baseline
+
+        :return: None
+        """
+        output_dir = Path(self.temp_dir.name).joinpath("output")
+        baseline_path = Path(self.temp_dir.name).joinpath("baseline.json")
+
+        results = run_benchmark(
+            ["calibration"],
+            output_dir=output_dir,
+            baseline_path=baseline_path,
+            update=True,
+            **TEST_SETTINGS,
+        )
+
+        self.assertIn("DarkCalibrator", results["processor"].tolist())
+        self.assertTrue((results["throughput_blocks_per_s"] > 0.0).all())
+        self.assertFalse(results["regression"].any())
+        self.assertEqual(
+            len(list(output_dir.glob("*/calibrated/*.fits"))),
+            TEST_SETTINGS["n_science"],
+        )
+
+        with open(baseline_path, "r", encoding="utf8") as baseline_file:
+            baseline = json.load(baseline_file)
+        self.assertEqual(
+            len(
+                baseline["hosts"][get_host_key()]["configurations"]["calibration"][
+                    "steps"
+                ]
+            ),
+            len(results),
+        )
@@ -0,0 +1,164 @@
+"""
+Module to test the image cache in :module:`mirar.data.cache`
+"""
+
+import copy
+import logging
+from unittest import mock
+
+import numpy as np
+
+from mirar.data import cache
+from mirar.data.cache import USE_CACHE, CacheQuotaError, get_file_pid
+from mirar.testing import BaseTestCase, make_test_image
+
+logger = logging.getLogger(__name__)
+
+
+class TestCache(BaseTestCase):
+    """
+    Class to test the image cache
+    """
+
+    def setUp(self):
+        if not USE_CACHE:
+            self.skipTest("Cache is disabled")
+
+    def tearDown(self):
+        cache.set_ram_budget(0)
+        cache.reset_statistics()
+
+    def test_memmap(self):
+        """
+        Test that cached data is read as a copy-on-write memory map
+
+        :return: None
+        """
+        image = make_test_image(value=1.0)
+        data = image.get_data()
+        self.assertTrue(isinstance(data, np.memmap))
+
+        # Setting read-only data back does not rewrite the file
+        inode = image.cache_path.stat().st_ino
+        read_only = image.get_data(writable=False)
+        self.assertFalse(read_only.flags.writeable)
+        image.set_data(read_only)
+        self.assertEqual(image.cache_path.stat().st_ino, inode)
+
+        # Writable data is assumed to be modified, so is written
+        image.set_data(data)
+        self.assertNotEqual(image.cache_path.stat().st_ino, inode)
+
+        # Read-only data is only clean until the file is written again
+        inode = image.cache_path.stat().st_ino
+        image.set_data(read_only)
+        self.assertNotEqual(image.cache_path.stat().st_ino, inode)
+
+        # Modifying the returned array does not modify the cache
+        data[0, 0] = 5.0
+        self.assertEqual(image.get_data()[0, 0], 1.0)
+
+        image.set_data(data)
+        self.assertEqual(image.get_data()[0, 0], 5.0)
+
+    def test_hot_tier(self):
+        """
+        Test the LRU hot tier in front of the npy store
+
+        :return: None
+        """
+        images = [make_test_image(f"image_{i}.fits", value=float(i)) for i in range(5)]
+        nbytes = images[0].get_data().nbytes
+        cache.set_ram_budget(2 * nbytes)
+        cache.reset_statistics()
+
+        for i, image in enumerate(images):
+            data = image.get_data()
+            data += 10.0
+            image.set_data(data)
+
+        stats = cache.get_statistics()
+        self.assertEqual(stats["hot_tier_entries"], 2)
+        self.assertLessEqual(stats["hot_tier_bytes"], 2 * nbytes)
+        self.assertGreater(stats["evictions"], 0)
+
+        # The last image was recently used, so is still in memory
+        self.assertTrue(np.all(images[-1].get_data() == 14.0))
+        self.assertEqual(cache.get_statistics()["hits"], stats["hits"] + 1)
+
+        # Evicted images were spilled to disk with their latest data
+        for i, image in enumerate(images):
+            self.assertTrue(np.all(image.get_data() == float(i) + 10.0))
+
+    def test_refcounts(self):
+        """
+        Test that copies share a cache file until modified, and that files are
+        deleted when no longer referenced
+
+        :return: None
+        """
+        image = make_test_image(value=1.0)
+        path = image.cache_path
+
+        new = copy.deepcopy(image)
+        self.assertEqual(new.cache_path, path)
+        self.assertEqual(cache.get_refcount(path), 2)
+
+        new.set_data(new.get_data() + 1.0)
+        self.assertNotEqual(new.cache_path, path)
+        self.assertEqual(cache.get_refcount(path), 1)
+        self.assertTrue(np.all(image.get_data() == 1.0))
+        self.assertTrue(np.all(new.get_data() == 2.0))
+
+        del image
+        self.assertFalse(path.exists())
+        self.assertEqual(cache.get_refcount(path), 0)
+
+    def test_sweep(self):
+        """
+        Test that the sweeper deletes orphaned files, and respects the quota
+
+        :return: None
+        """
+        image = make_test_image(value=1.0)
+        orphan = cache.get_new_path()
+        np.save(orphan, np.zeros(3))
+        dead_process_file = cache.get_cache_dir().joinpath("999999999_abc.npy")
+        np.save(dead_process_file, np.zeros(3))
+
+        self.assertEqual(cache.sweep(), 2)
+        self.assertFalse(orphan.exists())
+        self.assertFalse(dead_process_file.exists())
+        self.assertTrue(image.cache_path.exists())
+
+        cache.set_disk_quota(image.cache_path.stat().st_size + 10)
+        try:
+            with self.assertRaises(CacheQuotaError):
+                make_test_image("other.fits", value=2.0)
+        finally:
+            cache.set_disk_quota(0)
+
+    def test_sweep_concurrent_write(self):
+        """
+        Test that the sweeper does not delete a file which is registered
+        and written while the sweep is running
+
+        :return: None
+        """
+        path = cache.get_new_path()
+        np.save(path, np.zeros(3))
+        self.addCleanup(cache.release, path)
+
+        def register_during_sweep(file_path):
+            if file_path == path:
+                cache.register(path)
+                cache.save_data(path, np.ones(3))
+            return get_file_pid(file_path)
+
+        with mock.patch(
+            "mirar.data.cache.get_file_pid", side_effect=register_during_sweep
+        ):
+            cache.sweep()
+
+        self.assertTrue(path.exists())
+        self.assertTrue(np.all(cache.load_data(path) == 1.0))
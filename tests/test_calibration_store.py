@@ -0,0 +1,181 @@
+"""
+Module to test the master calibration store in
+:module:`mirar.processors.calibration_store`
+"""
+
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from mirar.data import Image, ImageBatch
+from mirar.errors import ImageNotFoundError
+from mirar.paths import (
+    COADD_KEY,
+    EXPTIME_KEY,
+    GAIN_KEY,
+    OBSCLASS_KEY,
+    PROC_FAIL_KEY,
+    TARGET_KEY,
+    TIME_KEY,
+)
+from mirar.pipelines import get_pipeline
+from mirar.processors.base_processor import ProcessorWithCache
+from mirar.processors.bias import BiasCalibrator
+from mirar.processors.calibration_store import (
+    REALTIME_STORE_MAX_AGE_DAYS,
+    CalibrationStore,
+    calibration_store,
+)
+from mirar.testing import BaseTestCase, make_test_image
+
+logger = logging.getLogger(__name__)
+
+
+def make_image(name: str, obsclass: str, date: str, value: float = 0.0) -> Image:
+    """
+    Make a small synthetic image with all core fields
+
+    :param name: Name of image
+    :param obsclass: Observation class
+    :param date: DATE-OBS of image
+    :param value: Mean pixel value
+    :return: Image
+    """
+    header_values = {
+        OBSCLASS_KEY: obsclass,
+        TARGET_KEY: obsclass,
+        TIME_KEY: date,
+        COADD_KEY: 1,
+        GAIN_KEY: 1.0,
+        PROC_FAIL_KEY: False,
+        EXPTIME_KEY: 1.0,
+    }
+    data = value + np.arange(12, dtype=float).reshape(3, 4)
+    return make_test_image(name, data=data, header_values=header_values)
+
+
+class CountingBiasCalibrator(BiasCalibrator):
+    """
+    Bias calibrator which counts how many master biases it makes
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.n_made = 0
+
+    def make_image(self, images: ImageBatch) -> Image:
+        self.n_made += 1
+        return super().make_image(images)
+
+
+class TestCalibrationStore(BaseTestCase):
+    """
+    Class to test the calibration store
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.store = CalibrationStore(Path(self.temp_dir.name))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def get_processor(self, **kwargs) -> CountingBiasCalibrator:
+        """
+        Get a bias calibrator using the test store
+
+        :param kwargs: Additional arguments
+        :return: Processor
+        """
+        processor = CountingBiasCalibrator(
+            try_load_cache=False,
+            write_to_cache=False,
+            calibration_store=self.store,
+            **kwargs,
+        )
+        processor.set_night("test/20230101")
+        return processor
+
+    def test_store(self):
+        """
+        Test that masters are reused across batches and nights
+
+        :return: None
+        """
+        biases = [
+            make_image(f"bias_{i}.fits", "bias", "2023-01-01T02:00:00", value=i)
+            for i in range(3)
+        ]
+
+        processor = self.get_processor()
+        master = processor.get_cache_file(ImageBatch(biases))
+        self.assertEqual(processor.n_made, 1)
+        self.assertEqual(len(self.store.list_entries("test", "bias")), 1)
+
+        # The same frames, in another order, reuse the stored master
+        processor = self.get_processor()
+        stored = processor.get_cache_file(ImageBatch(biases[::-1]))
+        self.assertEqual(processor.n_made, 0)
+        self.assertTrue(np.allclose(stored.get_data(), master.get_data()))
+
+        # Different settings need a new master
+        processor = self.get_processor(combine_method="mean")
+        processor.get_cache_file(ImageBatch(biases))
+        self.assertEqual(processor.n_made, 1)
+
+        # Science images from the next night can use the best available master
+        science = ImageBatch(
+            [make_image("sci.fits", "science", "2023-01-02T03:00:00", value=100.0)]
+        )
+        processor = self.get_processor(store_max_age_days=2.0)
+        processor.get_cache_file(science)
+        self.assertEqual(processor.n_made, 0)
+
+        processor = self.get_processor(store_max_age_days=0.5)
+        with self.assertRaises(ImageNotFoundError):
+            processor.get_cache_file(science)
+
+        # Images in another readout mode cannot use the master
+        science[0]["READOUTM"] = "CDS"
+        processor = self.get_processor(store_max_age_days=2.0)
+        with self.assertRaises(ImageNotFoundError):
+            processor.get_cache_file(science)
+
+    def test_store_metadata(self):
+        """
+        Test the header metadata which must match for a master to be reused
+
+        :return: None
+        """
+        image = make_image("sci.fits", "science", "2023-01-02T03:00:00")
+        image["READOUTM"] = "CDS"
+
+        processor = self.get_processor(cache_image_name_header_keys=GAIN_KEY)
+        metadata = processor.get_store_metadata(ImageBatch([image]))
+        self.assertEqual(metadata, {GAIN_KEY: 1.0, "READOUTM": "CDS"})
+        self.assertEqual(processor.cache_image_name_header_keys, GAIN_KEY)
+
+    def test_realtime_configurations(self):
+        """
+        Test that realtime configurations reuse recent masters from the store
+
+        :return: None
+        """
+        for pipeline_name, n_expected in [("summer", 2), ("winter", 1)]:
+            pipeline = get_pipeline(
+                pipeline_name, selected_configurations="realtime", night="20230101"
+            )
+            processors = [
+                x
+                for x in pipeline.all_pipeline_configurations["realtime"]
+                if isinstance(x, ProcessorWithCache)
+                and x.store_max_age_days is not None
+            ]
+            self.assertEqual(len(processors), n_expected)
+            for processor in processors:
+                self.assertIs(processor.calibration_store, calibration_store)
+                self.assertEqual(
+                    processor.store_max_age_days, REALTIME_STORE_MAX_AGE_DAYS
+                )
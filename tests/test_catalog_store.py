@@ -0,0 +1,163 @@
+"""
+Module to test the HEALPix-tiled catalog store in
+:module:`mirar.catalog.base.catalog_store`
+"""
+
+import logging
+import tempfile
+from typing import ClassVar
+
+import astropy.units as u
+import numpy as np
+from astropy.coordinates import SkyCoord
+from astropy.table import Table
+
+from mirar.catalog.base.base_catalog import BaseCatalog
+from mirar.catalog.base.base_xmatch_catalog import BaseXMatchCatalog
+from mirar.catalog.base.catalog_store import CatalogStore, select_cone_sources
+from mirar.catalog.base.seed_catalog_store import seed_catalog_store
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+# A grid of sources, every 0.05 deg, around RA 150, Dec 2
+grid_ra, grid_dec = np.meshgrid(
+    np.arange(146.0, 154.0, 0.05), np.arange(-2.0, 6.0, 0.05)
+)
+all_sources = Table(
+    {
+        "ra": grid_ra.ravel(),
+        "dec": grid_dec.ravel(),
+        "magnitude": np.linspace(10.0, 20.0, grid_ra.size),
+        "source_id": np.arange(grid_ra.size),
+    }
+)
+
+
+class GridCatalog(BaseCatalog):
+    """
+    Catalog returning sources of a fixed grid, which records each query
+    """
+
+    abbreviation = "grid"
+
+    queries: ClassVar[list] = []
+
+    def get_catalog(self, ra_deg: float, dec_deg: float) -> Table:
+        self.queries.append(self.search_radius_arcmin)
+        table = all_sources[
+            (all_sources["magnitude"] > self.min_mag)
+            & (all_sources["magnitude"] < self.max_mag)
+        ]
+        return select_cone_sources(
+            table, ra_deg, dec_deg, radius_deg=self.search_radius_arcmin / 60.0
+        )
+
+
+class GridXMatchCatalog(BaseXMatchCatalog):
+    """
+    Crossmatch catalog returning sources of a fixed grid
+    """
+
+    abbreviation = "gridxm"
+    catalog_name = "grid"
+    projection = {"source_id": 1, "ra": 1, "dec": 1}
+    column_names = {"source_id": "gridid", "ra": "gridra", "dec": "griddec"}
+    column_dtypes = {"gridid": float, "gridra": float, "griddec": float}
+    ra_column_name = "gridra"
+    dec_column_name = "griddec"
+
+    def fetch_tile(self, ra_deg: float, dec_deg: float, radius_deg: float) -> Table:
+        return select_cone_sources(all_sources, ra_deg, dec_deg, radius_deg)
+
+
+class TestCatalogStore(BaseTestCase):
+    """
+    Class to test the catalog store
+    """
+
+    def test_catalog_store(self):
+        """
+        Test that catalog queries are served from tiles, with tiles fetched
+        only on a miss, and that the store matches a direct query
+
+        :return: None
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            catalog = GridCatalog(
+                search_radius_arcmin=30.0,
+                min_mag=12.0,
+                max_mag=18.0,
+                filter_name="r",
+                use_catalog_store=True,
+            )
+            catalog.catalog_store = CatalogStore(store_dir=temp_dir)
+
+            GridCatalog.queries.clear()
+            stored = catalog.query_catalog(ra_deg=150.0, dec_deg=2.0)
+            self.assertGreater(len(GridCatalog.queries), 0)
+
+            direct = catalog.get_catalog(ra_deg=150.0, dec_deg=2.0)
+            self.assertEqual(sorted(stored["source_id"]), sorted(direct["source_id"]))
+
+            # A repeated query is served from the store
+            GridCatalog.queries.clear()
+            repeated = catalog.query_catalog(ra_deg=150.0, dec_deg=2.0)
+            self.assertEqual(GridCatalog.queries, [])
+            self.assertEqual(len(repeated), len(stored))
+
+            # Other magnitude cuts use a different partition
+            other = GridCatalog(
+                search_radius_arcmin=30.0,
+                min_mag=10.0,
+                max_mag=18.0,
+                filter_name="r",
+                use_catalog_store=True,
+            )
+            other.catalog_store = catalog.catalog_store
+            self.assertNotEqual(
+                other.get_store_partition(), catalog.get_store_partition()
+            )
+
+            # Seeding only fetches missing tiles
+            GridCatalog.queries.clear()
+            n_tiles = seed_catalog_store(
+                other, ra_deg=np.array([150.0, 151.0]), dec_deg=np.array([2.0, 2.0])
+            )
+            self.assertEqual(len(GridCatalog.queries), n_tiles)
+            self.assertEqual(
+                seed_catalog_store(other, ra_deg=151.0, dec_deg=2.0, radius_deg=0.3),
+                0,
+            )
+
+    def test_xmatch_catalog_store(self):
+        """
+        Test crossmatching sources against the catalog store
+
+        :return: None
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            catalog = GridXMatchCatalog(
+                search_radius_arcmin=4.0, num_sources=2, use_catalog_store=True
+            )
+            catalog.catalog_store = CatalogStore(store_dir=temp_dir)
+
+            coords = {"q0": [150.001, 2.001], "q1": [152.0, 3.0], "q2": [160.0, 2.0]}
+            results = catalog.query_store(coords)
+
+            self.assertEqual(results["q2"], [])
+
+            # Matches are limited to num_sources, and sorted by distance
+            self.assertEqual(len(results["q0"]), 2)
+            separations = [
+                SkyCoord(match["ra"], match["dec"], unit=u.deg)
+                .separation(SkyCoord(150.001, 2.001, unit=u.deg))
+                .arcsec
+                for match in results["q0"]
+            ]
+            self.assertLess(separations[0], 10.0)
+            self.assertLess(separations[0], separations[1])
+
+            match = results["q1"][0]
+            self.assertEqual(set(match.keys()), {"source_id", "ra", "dec"})
+            self.assertIsInstance(match["source_id"], int)
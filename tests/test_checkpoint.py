@@ -0,0 +1,218 @@
+"""
+Module to test pipeline checkpoints, of :module:`mirar.pipelines.checkpoint`
+"""
+
+import logging
+import pickle
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mirar.data import Dataset, ImageBatch, SourceBatch, SourceTable
+from mirar.errors import ErrorReport, ErrorStack, ProcessorError
+from mirar.paths import BASE_NAME_KEY, RAW_IMG_KEY
+from mirar.pipelines.benchmark.benchmark_pipeline import BenchmarkPipeline
+from mirar.pipelines.benchmark.synthetic_data import make_star_catalog, write_raw_night
+from mirar.pipelines.checkpoint import Checkpointer, get_processor_key
+from mirar.processors.utils import ImageListLoader, ImageSaver
+from mirar.testing import BaseTestCase, make_test_image
+from mirar.utils.ldac_tools import save_table_as_ldac
+
+logger = logging.getLogger(__name__)
+
+
+def make_error_stack() -> ErrorStack:
+    """
+    Make an error stack with a single report
+
+    :return: Error stack
+    """
+    try:
+        raise ProcessorError("Synthetic error")
+    except ProcessorError as exc:
+        return ErrorStack([ErrorReport(exc, "test_processor", ["/raw/image_2.fits"])])
+
+
+class TestCheckpoint(BaseTestCase):
+    """
+    Class to test pipeline checkpoints
+    """
+
+    def test_save_and_load(self):
+        """
+        Test that images, source tables and errors are restored from a checkpoint
+
+        :return: None
+        """
+        checkpointer = Checkpointer(
+            "test", "night", base_dir=Path(self.temp_dir.name).joinpath("checkpoints")
+        )
+        source_table = SourceTable(
+            pd.DataFrame({"ra": [1.0, 2.0]}),
+            metadata={BASE_NAME_KEY: "image_1.fits", RAW_IMG_KEY: "/raw/image_1.fits"},
+        )
+        checkpointer.save(
+            Dataset(SourceBatch([source_table])),
+            ErrorStack(),
+            configuration="default",
+            step=1,
+            key="key_1",
+            processor=ImageSaver(output_dir_name="test"),
+        )
+        step_dir = checkpointer.save(
+            Dataset(ImageBatch([make_test_image("image_0.fits")])),
+            make_error_stack(),
+            configuration="default",
+            step=2,
+            key="key_2",
+            processor=ImageSaver(output_dir_name="test"),
+        )
+        self.assertTrue(step_dir.exists())
+
+        self.assertEqual(checkpointer.find_latest("default", ["key_1", "key_2"]), 2)
+        self.assertEqual(checkpointer.find_latest("default", ["key_1", "other"]), 1)
+        self.assertIsNone(checkpointer.find_latest("default", ["other", "other"]))
+        self.assertIsNone(checkpointer.find_latest("other", ["key_1", "key_2"]))
+
+        source_dataset, _ = checkpointer.load("default", 1)
+        self.assertEqual(source_dataset[0][0].get_data()["ra"].tolist(), [1.0, 2.0])
+
+        image_dataset, err_stack = checkpointer.load("default", 2)
+
+        image = image_dataset[0][0]
+        self.assertFalse(image.is_loaded())
+        self.assertEqual(image[BASE_NAME_KEY], "image_0.fits")
+        self.assertTrue(np.all(image.get_data() == 0.0))
+
+        self.assertEqual(len(err_stack.reports), 1)
+        self.assertEqual(err_stack.reports[0].get_error_name(), "ProcessorError")
+        self.assertIn("Synthetic error", err_stack.summarise_error_stack())
+
+    def test_error_report_pickle(self):
+        """
+        Test that error reports keep their traceback when pickled
+
+        :return: None
+        """
+        report = make_error_stack().reports[0]
+        new_report = pickle.loads(pickle.dumps(report))
+        self.assertEqual(new_report.get_error_line(), report.get_error_line())
+        self.assertEqual(
+            new_report.generate_full_traceback(), report.generate_full_traceback()
+        )
+
+    def test_processor_key(self):
+        """
+        Test that processor keys change with the settings of a processor, the
+        source of its functions and the contents of its files, and only then
+
+        :return: None
+        """
+        config_path = Path(self.temp_dir.name).joinpath("config.txt")
+        config_path.write_text("a", encoding="utf8")
+
+        processor = ImageSaver(output_dir_name="test")
+        processor.config_path = config_path
+        processor.function = make_test_image
+        key = get_processor_key(processor)
+
+        self.assertEqual(get_processor_key(processor), key)
+        new_processor = ImageSaver(output_dir_name="test")
+        new_processor.config_path = config_path.as_posix()
+        new_processor.function = make_test_image
+        self.assertEqual(get_processor_key(new_processor), key)
+
+        processor.output_dir_name = "other"
+        self.assertNotEqual(get_processor_key(processor), key)
+        processor.output_dir_name = "test"
+
+        processor.function = make_error_stack
+        self.assertNotEqual(get_processor_key(processor), key)
+        processor.function = make_test_image
+
+        config_path.write_text("b", encoding="utf8")
+        self.assertNotEqual(get_processor_key(processor), key)
+
+    def test_input_key(self):
+        """
+        Test that step keys change with the files read by any loader
+
+        :return: None
+        """
+        image_path = Path(self.temp_dir.name).joinpath("image.fits")
+        image_path.write_text("a", encoding="utf8")
+
+        processors = [ImageListLoader(img_list=[image_path])]
+        keys = Checkpointer.get_step_keys("start", "default", processors)
+        self.assertEqual(
+            Checkpointer.get_step_keys("start", "default", processors), keys
+        )
+
+        image_path.write_text("bb", encoding="utf8")
+        self.assertNotEqual(
+            Checkpointer.get_step_keys("start", "default", processors), keys
+        )
+
+    def test_resume(self):
+        """
+        Test that a pipeline resumes from its latest valid checkpoint
+
+        :return: None
+        """
+        night_dir = Path(self.temp_dir.name).joinpath("checkpoint_night")
+        catalog_path = night_dir.joinpath("catalog.ldac")
+        catalog_path.parent.mkdir(parents=True)
+        save_table_as_ldac(make_star_catalog(200, seed=0), catalog_path)
+        write_raw_night(
+            night_dir,
+            catalog_path=catalog_path,
+            n_science=1,
+            n_darks=2,
+            n_flats=2,
+            board_ids=[4],
+            shape=(64, 128),
+        )
+
+        pipeline = BenchmarkPipeline(
+            selected_configurations="calibration",
+            night=night_dir.as_posix(),
+            checkpoint_after=["DarkCalibrator", "FlatCalibrator"],
+        )
+        checkpointer = Checkpointer(pipeline.name, pipeline.night)
+        self.addCleanup(shutil.rmtree, checkpointer.get_night_dir(), True)
+
+        _, err_stack = pipeline.reduce_images(catch_all_errors=False)
+        self.assertEqual(len(err_stack.reports), 0)
+        self.assertEqual(len(pipeline.latest_metrics), 10)
+        output_path = next(night_dir.glob("calibrated/*.fits"))
+        output_mtime = output_path.stat().st_mtime_ns
+
+        # Resume after the flat calibration, skipping the first 7 steps
+        pipeline.reduce_images(catch_all_errors=False, resume=True)
+        self.assertEqual(
+            pipeline.latest_metrics["processor"].tolist(),
+            ["ImageSelector", "ImageRebatcher", "ImageSaver"],
+        )
+        self.assertNotEqual(output_path.stat().st_mtime_ns, output_mtime)
+
+        # Changing the flat calibration invalidates its checkpoint,
+        # but not the earlier checkpoint of the dark calibration
+        processors = pipeline.all_pipeline_configurations["calibration"]
+        flat_calibrator = processors[6]
+        flat_calibrator.flat_nan_threshold = 0.01
+        try:
+            pipeline.reduce_images(catch_all_errors=False, resume=True)
+        finally:
+            flat_calibrator.flat_nan_threshold = 0.0
+        self.assertEqual(pipeline.latest_metrics["processor"].iloc[0], "ImageSelector")
+        self.assertEqual(len(pipeline.latest_metrics), 6)
+
+        # New input files invalidate every checkpoint
+        shutil.copy(
+            next(night_dir.glob("raw/*.fits")),
+            night_dir.joinpath("raw", "WINTERcamera_20240301-090000-000_mef.fits"),
+        )
+        pipeline.reduce_images(catch_all_errors=False, resume=True)
+        self.assertEqual(len(pipeline.latest_metrics), 10)
@@ -0,0 +1,66 @@
+"""
+Module to test making cutouts with :module:`mirar.data.utils.cutouts`
+"""
+
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from astropy.io import fits
+
+from mirar.data.utils import CutoutCache, CutoutError, extract_cutouts
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class TestCutouts(BaseTestCase):
+    """
+    Class to test making cutouts
+    """
+
+    def test_extract_cutouts(self):
+        """
+        Test vectorised cutouts, including padding at the image edges
+
+        :return: None
+        """
+        data = np.arange(50, dtype=float).reshape(5, 10) + 1.0
+
+        cutouts = extract_cutouts(data, [5, 0, 9], [2, 0, 4], half_size=1)
+        self.assertEqual(cutouts.shape, (3, 3, 3))
+        self.assertTrue(np.all(cutouts[0] == data[1:4, 4:7]))
+
+        # Corners are padded with zeros
+        self.assertTrue(np.all(cutouts[1][0] == 0.0))
+        self.assertTrue(np.all(cutouts[1][:, 0] == 0.0))
+        self.assertTrue(np.all(cutouts[1][1:, 1:] == data[:2, :2]))
+        self.assertTrue(np.all(cutouts[2][2] == 0.0))
+        self.assertTrue(np.all(cutouts[2][:, 2] == 0.0))
+        self.assertTrue(np.all(cutouts[2][:2, :2] == data[3:, 8:]))
+
+        with self.assertRaises(CutoutError):
+            extract_cutouts(data, [5, 20], [2, 2], half_size=1)
+
+    def test_cutout_cache(self):
+        """
+        Test that images are read once, and re-read if they change
+
+        :return: None
+        """
+        cache = CutoutCache(max_images=1)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir).joinpath("image.fits")
+            fits.PrimaryHDU(np.ones((20, 20))).writeto(path)
+
+            cutouts = cache.get_cutouts(path, [5, 10], [5, 10], half_size=2)
+            self.assertTrue(np.all(cutouts == 1.0))
+            self.assertIs(cache.get_data(path), cache.get_data(path))
+
+            fits.PrimaryHDU(np.full((40, 40), 2.0)).writeto(path, overwrite=True)
+            cutouts = cache.get_cutouts(path, [5], [5], half_size=2)
+            self.assertTrue(np.all(cutouts == 2.0))
+
+            cache.discard(path)
+            self.assertEqual(len(cache._data), 0)  # pylint: disable=W0212
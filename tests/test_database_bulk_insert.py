@@ -0,0 +1,276 @@
+"""
+Module to test bulk validation and insertion of database entries in
+:module:`mirar.database.base_model` and :module:`mirar.database.transactions.insert`
+"""
+
+import logging
+from typing import ClassVar
+from unittest import mock
+
+import pandas as pd
+from pydantic import ValidationError
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+
+from mirar.database.transactions.insert import _bulk_insert_in_table
+from mirar.testing import BaseTestCase, ExampleSource, ExampleSourceTable
+
+logger = logging.getLogger(__name__)
+
+
+class Example(ExampleSource):
+    """
+    Example model, which records how entries are inserted
+    """
+
+    sql_model: ClassVar = ExampleSourceTable
+
+    inserted: ClassVar[list] = []
+
+    @classmethod
+    def _insert_entries(
+        cls, entries, duplicate_protocol, returning_key_names=None
+    ) -> pd.DataFrame:
+        cls.inserted.append(("bulk", len(entries)))
+        return pd.DataFrame({"sourceid": range(len(entries))})
+
+    @classmethod
+    def _insert_each_entry(
+        cls, entries, duplicate_protocol, returning_key_names=None
+    ) -> pd.DataFrame:
+        cls.inserted.append(("each", len(entries)))
+        return pd.DataFrame({"sourceid": range(len(entries))})
+
+
+class CustomExample(Example):
+    """
+    Example model with a custom insert_entry
+    """
+
+    sql_model: ClassVar = ExampleSourceTable
+
+    def insert_entry(self, duplicate_protocol, returning_key_names=None):
+        return self._insert_entry(duplicate_protocol, returning_key_names)
+
+
+class CustomBulkExample(ExampleSource):
+    """
+    Example model with a custom insert_entry, using the default inserts
+    """
+
+    sql_model: ClassVar = ExampleSourceTable
+
+    def insert_entry(self, duplicate_protocol, returning_key_names=None):
+        return self._insert_entry(duplicate_protocol, returning_key_names)
+
+
+class FakeExampleDatabase:
+    """
+    Minimal stand-in for a postgres database holding the example sources table.
+    Each statement is compiled with the postgresql dialect, and recorded.
+    """
+
+    def __init__(self, existing: dict[str, int]):
+        self.ids = dict(existing)
+        self.statements = []
+
+    def connect(self):
+        """
+        Connect to the database
+
+        :return: connection
+        """
+        connection = mock.MagicMock()
+        connection.__enter__.return_value = connection
+        connection.execute.side_effect = self.execute
+        return connection
+
+    def execute(self, stmt, parameters=None) -> mock.MagicMock:
+        """
+        Execute a statement, returning (name, sourceid) rows
+
+        :param stmt: Statement to execute
+        :param parameters: Optional list of parameters, for executemany
+        :return: Result
+        """
+        compiled = stmt.compile(dialect=postgresql.dialect())
+        sql = str(compiled)
+        self.statements.append(sql)
+
+        if parameters is not None:
+            names = [x["name"] for x in parameters]
+        else:
+            names = []
+            for key, value in compiled.params.items():
+                if key.startswith("name"):
+                    names += value if isinstance(value, list) else [value]
+
+        rows = []
+        for name in names:
+            if sql.startswith("INSERT") and ("ON CONFLICT" not in sql):
+                if name in self.ids:
+                    raise IntegrityError(sql, parameters, Exception("duplicate"))
+            if sql.startswith("SELECT"):
+                rows.append((name, self.ids[name]))
+            elif name not in self.ids:
+                self.ids[name] = len(self.ids) + 100
+                rows.append((name, self.ids[name]))
+            elif "DO UPDATE" in sql:
+                rows.append((name, self.ids[name]))
+
+        result = mock.MagicMock()
+
+        if parameters is not None:
+            # Rows are sorted by parameter order with executemany
+            result.fetchall.return_value = [(x[1],) for x in rows]
+        else:
+            # Otherwise, rows are not necessarily in the order of the entries
+            result.fetchall.return_value = rows[::-1]
+
+        return result
+
+
+class TestDatabaseBulkInsert(BaseTestCase):
+    """
+    Class to test bulk database inserts
+    """
+
+    def test_bulk_insert(self):
+        """
+        Test bulk validation, and choice of bulk or individual inserts
+
+        :return: None
+        """
+        entries = Example.validate_entries(
+            [{"name": f"example_{i}", "value": float(i), "other": 1} for i in range(3)]
+        )
+        self.assertEqual(
+            [x.name for x in entries], ["example_0", "example_1", "example_2"]
+        )
+
+        with self.assertRaises(ValidationError):
+            Example.validate_entries([{"name": "example", "value": "not a float"}])
+
+        # Primary keys are missing, so duplicates can only be resolved on name
+        self.assertEqual(Example.get_bulk_conflict_key(entries), "name")
+        entries[1].name = entries[0].name
+        self.assertIsNone(Example.get_bulk_conflict_key(entries))
+
+        Example.inserted.clear()
+        res = Example.insert_entries(entries, duplicate_protocol="replace")
+        self.assertEqual(len(res), 3)
+        self.assertEqual(Example.inserted, [("bulk", 3)])
+
+        # Models with a custom insert_entry are inserted one by one
+        custom_entries = CustomExample.validate_entries(
+            [{"name": "example", "value": 1.0}]
+        )
+        Example.inserted.clear()
+        CustomExample.insert_entries(custom_entries, duplicate_protocol="fail")
+        self.assertEqual(Example.inserted, [("each", 1)])
+
+        # Inserting no entries returns an empty dataframe, with either model
+        for model in [ExampleSource, CustomBulkExample]:
+            res = model.insert_entries([], duplicate_protocol="fail")
+            self.assertEqual(len(res), 0)
+
+    @staticmethod
+    def bulk_insert(
+        duplicate_protocol: str, existing: dict[str, int]
+    ) -> tuple[pd.DataFrame, FakeExampleDatabase]:
+        """
+        Bulk insert five entries into a fake database
+
+        :param duplicate_protocol: protocol to follow if duplicate entry is found
+        :param existing: Names and ids of the existing rows in the database
+        :return: Returned keys, and the fake database
+        """
+        database = FakeExampleDatabase(existing=existing)
+        entries = [
+            {"sourceid": None, "name": f"example_{i}", "value": float(i)}
+            for i in range(5)
+        ]
+        with mock.patch(
+            "mirar.database.transactions.insert.get_engine", return_value=database
+        ), mock.patch(
+            "mirar.database.transactions.insert.MAX_BULK_INSERT_PARAMETERS", 6
+        ):
+            res = _bulk_insert_in_table(
+                entries,
+                sql_table=ExampleSourceTable,
+                duplicate_protocol=duplicate_protocol,
+                returning_keys="sourceid",
+                conflict_key=None if duplicate_protocol == "fail" else "name",
+            )
+        return res, database
+
+    def test_bulk_insert_statements(self):
+        """
+        Test the generated postgres statements, and the mapping of returned
+        keys back to entries, for each duplicate protocol
+
+        :return: None
+        """
+        # Replace: existing rows are updated, and returned by the insert
+        res, database = self.bulk_insert("replace", existing={"example_1": 1})
+        self.assertEqual(res["sourceid"].tolist(), [101, 1, 102, 103, 104])
+        self.assertEqual(len(database.statements), 3)
+        for sql in database.statements:
+            self.assertTrue(sql.startswith("INSERT INTO example_sources"))
+            self.assertIn(
+                "ON CONFLICT (name) DO UPDATE SET value = excluded.value", sql
+            )
+            self.assertNotIn("sourceid = excluded.sourceid", sql)
+            self.assertTrue(
+                sql.endswith("RETURNING example_sources.name, example_sources.sourceid")
+            )
+        # Each chunk has at most MAX_BULK_INSERT_PARAMETERS // 3 = 2 rows
+        self.assertEqual([x.count("%(name_m") for x in database.statements], [2, 2, 1])
+
+        # Ignore: existing rows are not returned, so are selected afterwards
+        res, database = self.bulk_insert("ignore", existing={"example_1": 1})
+        self.assertEqual(res["sourceid"].tolist(), [101, 1, 102, 103, 104])
+        self.assertEqual(len(database.statements), 4)
+        for sql in database.statements[:3]:
+            self.assertIn("ON CONFLICT DO NOTHING", sql)
+        self.assertTrue(
+            database.statements[3].startswith("SELECT example_sources.name")
+        )
+        self.assertIn("WHERE example_sources.name IN", database.statements[3])
+
+        # Fail: a single executemany, returning rows in the order of entries
+        res, database = self.bulk_insert("fail", existing={"example_9": 1})
+        self.assertEqual(res["sourceid"].tolist(), [101, 102, 103, 104, 105])
+        self.assertEqual(len(database.statements), 1)
+        self.assertNotIn("ON CONFLICT", database.statements[0])
+        self.assertTrue(
+            database.statements[0].endswith("RETURNING example_sources.sourceid")
+        )
+
+        # Fail: any duplicate raises an error
+        with self.assertRaises(IntegrityError):
+            self.bulk_insert("fail", existing={"example_1": 1})
+
+    def test_bulk_insert_fallback(self):
+        """
+        Test that entries are inserted one by one if the bulk insert fails
+
+        :return: None
+        """
+        entries = ExampleSource.validate_entries(
+            [{"name": f"example_{i}", "value": float(i)} for i in range(3)]
+        )
+        each_result = pd.DataFrame({"sourceid": [1, 2, 3]})
+
+        with mock.patch(
+            "mirar.database.base_model._bulk_insert_in_table",
+            side_effect=IntegrityError("INSERT", {}, Exception("duplicate")),
+        ) as bulk_insert, mock.patch.object(
+            ExampleSource, "_insert_each_entry", return_value=each_result
+        ) as insert_each:
+            res = ExampleSource.insert_entries(entries, duplicate_protocol="ignore")
+
+        self.assertEqual(bulk_insert.call_args.kwargs["conflict_key"], "name")
+        self.assertEqual(bulk_insert.call_args.kwargs["returning_keys"], ["sourceid"])
+        insert_each.assert_called_once()
+        self.assertEqual(res["sourceid"].tolist(), [1, 2, 3])
@@ -0,0 +1,71 @@
+"""
+Module to test the database engine registry in :module:`mirar.database.engine`
+"""
+
+import logging
+import multiprocessing
+
+from mirar.database import engine as engine_module
+from mirar.database.engine import (
+    DB_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+    dispose_engines,
+    get_engine,
+    get_pool_capacity,
+    get_pool_statistics,
+)
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+def count_inherited_engines() -> int:
+    """
+    Count the engines visible in a child process before any are created
+
+    :return: Number of engines
+    """
+    get_engine(db_name="child_db")
+    return len(engine_module._engines)  # pylint: disable=protected-access
+
+
+class TestDatabaseEngine(BaseTestCase):
+    """
+    Class to test the database engine registry
+    """
+
+    def setUp(self):
+        dispose_engines()
+
+    def tearDown(self):
+        dispose_engines()
+
+    def test_engine_reuse(self):
+        """
+        Test that engines are reused within a process, but not across a fork
+
+        :return: None
+        """
+        engine = get_engine(db_name="test_db")
+        self.assertIs(get_engine(db_name="test_db"), engine)
+        self.assertIsNot(get_engine(db_name="other_db"), engine)
+        self.assertIsNot(get_engine(db_name="test_db", db_port=5433), engine)
+
+        statistics = get_pool_statistics()
+        self.assertEqual(len(statistics), 3)
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            with multiprocessing.get_context("fork").Pool(1) as pool:
+                self.assertEqual(pool.apply(count_inherited_engines), 1)
+
+        dispose_engines()
+        self.assertEqual(len(get_pool_statistics()), 0)
+
+    def test_pool_capacity(self):
+        """
+        Test the number of connections the pool of an engine can hold
+
+        :return: None
+        """
+        expected = DB_POOL_SIZE + DB_MAX_OVERFLOW if DB_POOL_SIZE > 0 else None
+        self.assertEqual(get_pool_capacity(db_name="test_db"), expected)
@@ -0,0 +1,97 @@
+"""
+Module to test the spatial crossmatch selectors of
+:module:`mirar.processors.database.database_selector`
+"""
+
+import logging
+from unittest import mock
+
+import pandas as pd
+
+from mirar.database.constraints import DBQueryConstraints
+from mirar.processors.database.database_selector import (
+    DatabaseHistorySelector,
+    SpatialCrossmatchSourceWithDatabase,
+)
+from mirar.testing import BaseTestCase, ExampleSource
+
+logger = logging.getLogger(__name__)
+
+SELECTOR_MODULE = "mirar.processors.database.database_selector"
+
+
+class BrightCrossmatch(SpatialCrossmatchSourceWithDatabase):
+    """
+    Crossmatch with an extra per-source constraint, but no join constraint
+    """
+
+    def get_constraints(self, data: dict) -> DBQueryConstraints:
+        query_constraints = self.get_source_crossmatch_constraints(data)
+        query_constraints.add_constraint(
+            column="jd", comparison_type="<", accepted_values=data["jd"]
+        )
+        return query_constraints
+
+
+class BrightHistorySelector(DatabaseHistorySelector):
+    """
+    History selector with an extra per-source constraint, but no join constraint
+    """
+
+    def get_constraints(self, data: dict) -> DBQueryConstraints:
+        query_constraints = super().get_constraints(data)
+        query_constraints.add_constraint(
+            column="name", comparison_type="!=", accepted_values="bright"
+        )
+        return query_constraints
+
+
+class TestDatabaseSelector(BaseTestCase):
+    """
+    Class to test spatial crossmatch selectors
+    """
+
+    def test_constraints_fallback(self):
+        """
+        Test that selectors which only override get_constraints query each
+        source separately, so that their constraints are applied
+
+        :return: None
+        """
+        candidate_table = pd.DataFrame(
+            {"ra": [10.0, 20.0], "dec": [1.0, 2.0], "jd": [100.0, 200.0]}
+        )
+        kwargs = {
+            "db_table": ExampleSource,
+            "db_output_columns": ["name"],
+            "crossmatch_radius_arcsec": 2.0,
+        }
+
+        q3c_result = pd.DataFrame({"src_index": [1], "name": ["match"]})
+        for processor, set_based in [
+            (SpatialCrossmatchSourceWithDatabase(**kwargs), True),
+            (DatabaseHistorySelector(history_duration_days=10.0, **kwargs), True),
+            (BrightCrossmatch(**kwargs), False),
+            (BrightHistorySelector(history_duration_days=10.0, **kwargs), False),
+        ]:
+            self.assertEqual(processor.uses_join_constraints(), set_based)
+
+            with mock.patch(
+                f"{SELECTOR_MODULE}.select_q3c_crossmatch", return_value=q3c_result
+            ) as q3c_crossmatch, mock.patch(
+                f"{SELECTOR_MODULE}.select_from_table",
+                return_value=pd.DataFrame({"name": ["match"]}),
+            ) as select:
+                results = processor.query_for_sources(candidate_table, {})
+
+            self.assertEqual(len(results), 2)
+            if set_based:
+                q3c_crossmatch.assert_called_once()
+                select.assert_not_called()
+                self.assertEqual(len(results[0]), 0)
+                self.assertEqual(results[1]["name"].tolist(), ["match"])
+            else:
+                q3c_crossmatch.assert_not_called()
+                self.assertEqual(select.call_count, 2)
+                constraints = select.call_args.kwargs["db_constraints"]
+                self.assertIn("jd < '200.0'", constraints.parse_constraints())
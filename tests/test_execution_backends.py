@@ -0,0 +1,229 @@
+"""
+Module to test the execution backends of
+:class:`~mirar.processors.base_processor.BaseProcessor`, and streaming
+with :class:`~mirar.pipelines.streaming.BatchStream`
+"""
+
+import logging
+import pickle
+
+import numpy as np
+
+from mirar.data import cache
+from mirar.paths import EXECUTION_BACKENDS
+from mirar.pipelines.streaming import BatchStream, split_into_segments
+from mirar.processors.base_processor import ExecutionBackendError
+from mirar.processors.utils import HeaderAnnotator, HeaderEditor, ImageRebatcher
+from mirar.testing import BaseTestCase, make_test_dataset
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchingEditor(HeaderEditor):
+    """
+    Header editor which prepares the full dataset in base_apply
+    """
+
+    def base_apply(self, dataset, execution_backend=None):
+        """
+        Log the full dataset, and then apply the editor to it
+
+        :param dataset: Input dataset
+        :param execution_backend: Backend selected for the pipeline run
+        :return: Updated dataset, and any caught errors
+        """
+        logger.debug(f"Prefetching for {len(dataset)} batches")
+        return super().base_apply(dataset, execution_backend=execution_backend)
+
+
+class TestExecutionBackends(BaseTestCase):
+    """
+    Class to test that all execution backends give identical results
+    """
+
+    def test_backends(self):
+        """
+        Test each backend on the same dataset
+
+        :return: None
+        """
+        for backend in EXECUTION_BACKENDS:
+            processor = HeaderAnnotator(input_keys="OBJECT", output_key="TARGET")
+            processor.max_n_cpu = 3
+            processor.set_night("test/20240101")
+
+            dataset, errorstack = processor.base_apply(
+                make_test_dataset(), execution_backend=backend
+            )
+
+            self.assertEqual(len(errorstack.reports), 0)
+            self.assertEqual(len(dataset), 6)
+            for i, batch in enumerate(dataset):
+                image = batch[0]
+                self.assertEqual(image.get_name(), f"image_{i}.fits")
+                self.assertEqual(image["TARGET"], f"field_{i}")
+                self.assertTrue(np.all(image.get_data() == float(i)))
+
+    def test_process_pickling(self):
+        """
+        Test that processors are sent to worker processes without the
+        rest of the pipeline
+
+        :return: None
+        """
+        editor = HeaderEditor(edit_keys="OBJECT", values="edited")
+        processor = HeaderAnnotator(input_keys="OBJECT", output_key="TARGET")
+        processor.set_preceding_steps([editor])
+        processor.max_n_cpu = 2
+        processor.set_night("test/20240101")
+
+        new_processor = pickle.loads(processor.pickle_for_workers())
+        self.assertIsNone(new_processor.preceding_steps)
+        self.assertEqual(processor.preceding_steps, [editor])
+
+        dataset, errorstack = processor.base_apply(
+            make_test_dataset(n_batches=3), execution_backend="process"
+        )
+        self.assertEqual(len(errorstack.reports), 0)
+        self.assertEqual(
+            [batch[0]["TARGET"] for batch in dataset],
+            [f"field_{i}" for i in range(3)],
+        )
+
+    def test_process_with_sweeper(self):
+        """
+        Test that worker processes run while the cache sweeper is running,
+        and that the sweeper keeps running in the parent process
+
+        :return: None
+        """
+        processor = HeaderAnnotator(input_keys="OBJECT", output_key="TARGET")
+        processor.max_n_cpu = 2
+        processor.set_night("test/20240101")
+
+        input_dataset = make_test_dataset(n_batches=4)
+        cache.start_sweeper(interval_s=0.01)
+        self.addCleanup(cache.stop_sweeper)
+
+        dataset, errorstack = processor.base_apply(
+            input_dataset, execution_backend="process"
+        )
+
+        self.assertTrue(cache.sweeper.is_alive())
+        self.assertEqual(len(errorstack.reports), 0)
+        for i, batch in enumerate(dataset):
+            self.assertEqual(batch[0]["TARGET"], f"field_{i}")
+            self.assertTrue(np.all(batch[0].get_data() == float(i)))
+
+        # Inputs of the parent process are untouched by the workers
+        for i, batch in enumerate(input_dataset):
+            self.assertTrue(np.all(batch[0].get_data() == float(i)))
+
+    def test_processor_backend_precedence(self):
+        """
+        Test that a backend pinned on a processor overrides the run backend
+
+        :return: None
+        """
+        processor = HeaderAnnotator(input_keys="OBJECT", output_key="TARGET")
+        self.assertEqual(processor.get_execution_backend("process"), "process")
+        processor.set_execution_backend("serial")
+        self.assertEqual(processor.get_execution_backend("process"), "serial")
+
+        with self.assertRaises(ExecutionBackendError):
+            processor.set_execution_backend("gpu")
+
+    def test_process_errors(self):
+        """
+        Test that errors raised in worker processes are merged back
+
+        :return: None
+        """
+        processor = HeaderAnnotator(input_keys="MISSING", output_key="TARGET")
+        processor.max_n_cpu = 2
+        processor.set_night("test/20240101")
+
+        dataset, errorstack = processor.base_apply(
+            make_test_dataset(n_batches=3), execution_backend="process"
+        )
+
+        self.assertEqual(len(dataset), 0)
+        self.assertEqual(len(errorstack.reports), 3)
+        self.assertTrue(isinstance(errorstack.reports[0].error, KeyError))
+
+
+class TestStreaming(BaseTestCase):
+    """
+    Class to test streaming batches through consecutive processors
+    """
+
+    def test_streaming(self):
+        """
+        Test that streaming matches applying each processor in turn
+
+        :return: None
+        """
+        processors = [
+            HeaderAnnotator(input_keys="OBJECT", output_key="TARGET"),
+            HeaderEditor(edit_keys="GROUP", values="all"),
+            ImageRebatcher(split_key="GROUP"),
+            HeaderAnnotator(input_keys=["TARGET", "GROUP"], output_key="LABEL"),
+            HeaderEditor(edit_keys="DONE", values=True),
+        ]
+        for processor in processors:
+            processor.set_night("test/20240101")
+
+        segments = split_into_segments(processors)
+        self.assertEqual([len(x) for x in segments], [2, 1, 2])
+
+        dataset = make_test_dataset()
+        for segment in segments:
+            if len(segment) == 1:
+                dataset, errorstack = segment[0].base_apply(dataset)
+            else:
+                dataset, errorstack = BatchStream(segment, n_cpu=3).apply(dataset)
+            self.assertEqual(len(errorstack.reports), 0)
+
+        self.assertEqual(len(dataset), 1)
+        self.assertEqual(processors[0].latest_n_input_batches, 6)
+        self.assertEqual(processors[-1].latest_n_output_blocks, 6)
+
+        for i, image in enumerate(dataset[0]):
+            self.assertEqual(image.get_name(), f"image_{i}.fits")
+            self.assertEqual(image["LABEL"], f"field_{i}all")
+            self.assertTrue(image["DONE"])
+
+    def test_base_apply_barrier(self):
+        """
+        Test that processors overriding base_apply are not streamed
+
+        :return: None
+        """
+        processors = [
+            HeaderAnnotator(input_keys="OBJECT", output_key="TARGET"),
+            PrefetchingEditor(edit_keys="DONE", values=True),
+            HeaderEditor(edit_keys="GROUP", values="all"),
+        ]
+
+        segments = split_into_segments(processors)
+        self.assertEqual([len(x) for x in segments], [1, 1, 1])
+        self.assertIs(segments[1][0], processors[1])
+
+    def test_streaming_errors(self):
+        """
+        Test that failed batches drop out of the stream
+
+        :return: None
+        """
+        processors = [
+            HeaderAnnotator(input_keys="MISSING", output_key="TARGET"),
+            HeaderEditor(edit_keys="DONE", values=True),
+        ]
+
+        dataset, errorstack = BatchStream(processors).apply(
+            make_test_dataset(n_batches=2)
+        )
+
+        self.assertEqual(len(dataset), 0)
+        self.assertEqual(len(errorstack.reports), 2)
+        self.assertEqual(processors[1].latest_n_input_batches, 0)
@@ -0,0 +1,78 @@
+"""
+Module to test the image dtype policy in :module:`mirar.data.image_data`
+"""
+
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from astropy.io import fits
+
+from mirar.data import IMAGE_DTYPE, Image
+from mirar.io import open_fits, open_raw_image, save_fits
+from mirar.paths import (
+    BASE_NAME_KEY,
+    COADD_KEY,
+    EXPTIME_KEY,
+    GAIN_KEY,
+    OBSCLASS_KEY,
+    PROC_FAIL_KEY,
+    PROC_HISTORY_KEY,
+    RAW_IMG_KEY,
+    TARGET_KEY,
+    TIME_KEY,
+)
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class TestImageDtype(BaseTestCase):
+    """
+    Class to test the image dtype policy
+    """
+
+    def test_image_dtype(self):
+        """
+        Test that floating-point data is stored with IMAGE_DTYPE,
+        and that raw images are loaded with it
+
+        :return: None
+        """
+        header = fits.Header()
+        for key, value in [
+            (BASE_NAME_KEY, "image.fits"),
+            (RAW_IMG_KEY, "/raw/image.fits"),
+            (OBSCLASS_KEY, "science"),
+            (TARGET_KEY, "science"),
+            (TIME_KEY, "2023-01-01T00:00:00"),
+            (COADD_KEY, 1),
+            (GAIN_KEY, 1.0),
+            (PROC_HISTORY_KEY, ""),
+            (PROC_FAIL_KEY, False),
+            (EXPTIME_KEY, 1.0),
+        ]:
+            header[key] = value
+
+        image = Image(data=np.ones((3, 4), dtype=np.float64), header=header)
+        self.assertEqual(image.get_data().dtype, IMAGE_DTYPE)
+
+        image.set_data(image.get_data() * np.float64(2.0))
+        self.assertEqual(image.get_data().dtype, IMAGE_DTYPE)
+
+        # Non-floating data, such as boolean masks, is left unchanged
+        mask = Image(data=np.ones((3, 4), dtype=bool), header=header)
+        self.assertEqual(mask.get_data().dtype, bool)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir).joinpath("image.fits")
+            fits.PrimaryHDU(np.ones((3, 4), dtype=np.uint16), header=header).writeto(
+                path
+            )
+            raw_image = open_raw_image(path)
+            self.assertEqual(raw_image.get_data().dtype, IMAGE_DTYPE)
+
+            save_fits(raw_image, path)
+            data, _ = open_fits(path)
+            self.assertEqual(data.dtype.itemsize, IMAGE_DTYPE.itemsize)
@@ -0,0 +1,166 @@
+"""
+Module to test loading images with :module:`mirar.processors.utils.image_loader`
+"""
+
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from astropy.io import fits
+
+from mirar.data import Image
+from mirar.io import check_file_is_complete, open_fits, open_raw_image
+from mirar.paths import (
+    BASE_NAME_KEY,
+    COADD_KEY,
+    EXPTIME_KEY,
+    GAIN_KEY,
+    OBSCLASS_KEY,
+    PROC_FAIL_KEY,
+    PROC_HISTORY_KEY,
+    TARGET_KEY,
+    TIME_KEY,
+)
+from mirar.processors.utils.image_loader import (
+    INVALID_STATUS,
+    LOADED_STATUS,
+    InvalidImage,
+    LoadManifest,
+    load_from_dir,
+)
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+def open_test_image(path: str | Path) -> Image:
+    """
+    Open a test image, rejecting those with an 'invalid' observation class
+
+    :param path: Path of image
+    :return: Image
+    """
+    _, header = open_fits(path)
+    if header[OBSCLASS_KEY] == "invalid":
+        raise InvalidImage(f"Image {path} is invalid")
+    return open_raw_image(path)
+
+
+class TestImageLoader(BaseTestCase):
+    """
+    Class to test loading images
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.input_dir = Path(self.temp_dir.name).joinpath("raw")
+        self.input_dir.mkdir()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_image(
+        self, name: str, value: float = 1.0, obsclass: str = "science"
+    ) -> Path:
+        """
+        Write a small raw image
+
+        :param name: Name of file
+        :param value: Pixel value
+        :param obsclass: Observation class
+        :return: Path of file
+        """
+        header = fits.Header()
+        header[OBSCLASS_KEY] = obsclass
+        header[TARGET_KEY] = "science"
+        header[TIME_KEY] = "2023-01-01T00:00:00"
+        header[COADD_KEY] = 1
+        header[PROC_HISTORY_KEY] = ""
+        header[PROC_FAIL_KEY] = False
+        header[EXPTIME_KEY] = 1.0
+        header[GAIN_KEY] = 1.0
+        path = self.input_dir.joinpath(name)
+        fits.PrimaryHDU(np.full((3, 4), value), header=header).writeto(
+            path, overwrite=True
+        )
+        return path
+
+    def test_load_with_manifest(self):
+        """
+        Test parallel loading, and incremental loading with a manifest
+
+        :return: None
+        """
+        for i in range(6):
+            self.write_image(f"image_{i}.fits", value=float(i))
+        invalid_path = self.write_image("image_invalid.fits", obsclass="invalid")
+
+        manifest_path = Path(self.temp_dir.name).joinpath("manifest.json")
+        manifest = LoadManifest(manifest_path)
+
+        images = load_from_dir(
+            self.input_dir, open_f=open_test_image, n_cpu=3, manifest=manifest
+        )
+        self.assertEqual(
+            [x[BASE_NAME_KEY] for x in images], [f"image_{i}.fits" for i in range(6)]
+        )
+        self.assertEqual(manifest.get_status(invalid_path), INVALID_STATUS)
+
+        # The manifest persists, so a re-run only loads new or changed files
+        manifest = LoadManifest(manifest_path)
+        self.assertEqual(len(manifest.entries), 7)
+        path = self.input_dir.joinpath("image_0.fits")
+        self.assertEqual(manifest.get_status(path), LOADED_STATUS)
+        self.assertEqual(
+            manifest.entries[str(path)]["headers"][0][OBSCLASS_KEY], "science"
+        )
+
+        images = load_from_dir(
+            self.input_dir,
+            open_f=open_test_image,
+            manifest=manifest,
+            incremental=True,
+        )
+        self.assertEqual(len(images), 0)
+
+        self.write_image("image_2.fits", value=10.0)
+        self.write_image("image_6.fits")
+        images = load_from_dir(
+            self.input_dir,
+            open_f=open_test_image,
+            n_cpu=2,
+            manifest=manifest,
+            incremental=True,
+        )
+        self.assertEqual(
+            sorted(x[BASE_NAME_KEY] for x in images), ["image_2.fits", "image_6.fits"]
+        )
+
+    def test_file_is_complete(self):
+        """
+        Test that partially-transferred files are detected from their headers
+
+        :return: None
+        """
+        path = self.write_image("image.fits")
+        self.assertTrue(check_file_is_complete(path))
+
+        mef_path = self.input_dir.joinpath("mef.fits")
+        fits.HDUList(
+            [
+                fits.PrimaryHDU(),
+                fits.ImageHDU(np.ones((50, 60))),
+                fits.CompImageHDU(np.ones((40, 30), dtype=np.float32)),
+            ]
+        ).writeto(mef_path)
+        self.assertTrue(check_file_is_complete(mef_path))
+
+        with open(mef_path, "rb") as mef_file:
+            contents = mef_file.read()
+        for size in [100, 4000, len(contents) - 1000, len(contents) - 1]:
+            with open(path, "wb") as partial_file:
+                partial_file.write(contents[:size])
+            self.assertFalse(check_file_is_complete(path))
+
+        self.assertFalse(check_file_is_complete(self.input_dir.joinpath("missing")))
@@ -0,0 +1,217 @@
+"""
+Module to test in-process source extraction with
+:module:`mirar.processors.astromatic.sextractor.inprocess_sextractor`
+"""
+
+import logging
+from pathlib import Path
+
+import numpy as np
+from astropy import units as u
+from astropy.io import fits
+
+from mirar.data import Image, ImageBatch
+from mirar.paths import (
+    BASE_NAME_KEY,
+    COADD_KEY,
+    EXPTIME_KEY,
+    OBSCLASS_KEY,
+    PROC_FAIL_KEY,
+    PROC_HISTORY_KEY,
+    RAW_IMG_KEY,
+    SEXTRACTOR_HEADER_KEY,
+    TARGET_KEY,
+    TIME_KEY,
+)
+from mirar.processors.astromatic.sextractor.extraction import (
+    extract_sources,
+    get_extraction_settings,
+    parse_sextractor_parameters,
+)
+from mirar.processors.astromatic.sextractor.inprocess_sextractor import (
+    InProcessSextractor,
+)
+from mirar.processors.astromatic.sextractor.sextractor import sextractor_checkimg_map
+from mirar.processors.astromatic.sextractor.sourceextractor import (
+    default_config_path,
+    default_filter_name,
+    default_param_path,
+)
+from mirar.testing import BaseTestCase
+from mirar.utils.ldac_tools import get_table_from_ldac
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SHAPE = (200, 240)
+SIGMA = 1.5
+
+# Isolated stars (x, y, flux), plus a saturated star and a star on the edge
+STARS = [
+    (40.3, 50.7, 2.0e4),
+    (120.0, 60.2, 1.0e4),
+    (200.6, 150.1, 3.0e4),
+    (80.5, 160.5, 1.5e4),
+    (160.2, 100.8, 2.0e6),
+    (1.0, 100.0, 2.0e4),
+]
+
+
+def make_header() -> fits.Header:
+    """
+    Make an image header with a simple WCS
+
+    :return: Header
+    """
+    header = fits.Header()
+    header[BASE_NAME_KEY] = "image.fits"
+    header[RAW_IMG_KEY] = "/raw/image.fits"
+    header[PROC_HISTORY_KEY] = ""
+    header[PROC_FAIL_KEY] = False
+    header[OBSCLASS_KEY] = "science"
+    header[TARGET_KEY] = "science"
+    header[TIME_KEY] = "2024-01-01T00:00:00"
+    header[COADD_KEY] = 1
+    header[EXPTIME_KEY] = 1.0
+    header["CTYPE1"] = "RA---TAN"
+    header["CTYPE2"] = "DEC--TAN"
+    header["CRVAL1"] = 150.0
+    header["CRVAL2"] = 2.0
+    header["CRPIX1"] = 120.0
+    header["CRPIX2"] = 100.0
+    header["CD1_1"] = -1.0e-4
+    header["CD1_2"] = 0.0
+    header["CD2_1"] = 0.0
+    header["CD2_2"] = 1.0e-4
+    header["GAIN"] = 1.0
+    header["SATURATE"] = 5.0e4
+    return header
+
+
+def make_data(stars: list[tuple[float, float, float]]) -> np.ndarray:
+    """
+    Make image data with gaussian stars and noise
+
+    :param stars: List of (x, y, flux), 0-indexed
+    :return: Image data
+    """
+    y_grid, x_grid = np.mgrid[: IMAGE_SHAPE[0], : IMAGE_SHAPE[1]]
+    data = np.full(IMAGE_SHAPE, 100.0)
+    for x_pos, y_pos, flux in stars:
+        data += (
+            flux
+            / (2.0 * np.pi * SIGMA**2)
+            * np.exp(-((x_grid - x_pos) ** 2 + (y_grid - y_pos) ** 2) / (2 * SIGMA**2))
+        )
+    return data + np.random.default_rng(0).normal(0.0, 5.0, IMAGE_SHAPE)
+
+
+class TestInProcessSextractor(BaseTestCase):
+    """
+    Class to test in-process source extraction
+    """
+
+    def test_extract_sources(self):
+        """
+        Test that sources are detected and measured with Sextractor conventions
+
+        :return: None
+        """
+        settings = get_extraction_settings(default_config_path, default_filter_name)
+        settings["phot_autoparams"] = (2.5, 3.5)
+        settings["saturation"] = 5.0e4
+        parameters = parse_sextractor_parameters(default_param_path) + [
+            ("NUMBER", ()),
+            ("ALPHA_J2000", ()),
+        ]
+
+        catalog, check_images = extract_sources(
+            make_data(STARS), parameters, settings, header=make_header()
+        )
+
+        self.assertEqual(len(catalog), len(STARS))
+        self.assertNotIn("CLASS_STAR", catalog.colnames)
+        self.assertEqual(catalog["FLUX_APER"].shape, (len(STARS), 4))
+        self.assertEqual(catalog["VIGNET"].shape, (len(STARS), 41, 41))
+        self.assertEqual(check_images["SEGMENTATION"].max(), len(STARS))
+
+        for x_pos, y_pos, flux in STARS[:4]:
+            dist = np.hypot(
+                catalog["XWIN_IMAGE"] - 1.0 - x_pos, catalog["YWIN_IMAGE"] - 1.0 - y_pos
+            )
+            row = catalog[np.argmin(dist)]
+            self.assertLess(np.min(dist), 0.05)
+            self.assertEqual(row["FLAGS"], 0)
+            self.assertAlmostEqual(row["FLUX_AUTO"] / flux, 1.0, delta=0.05)
+            self.assertAlmostEqual(row["FWHM_IMAGE"], 2.3548 * SIGMA, delta=0.3)
+            self.assertAlmostEqual(
+                row["FLUX_RADIUS"], SIGMA * np.sqrt(2.0 * np.log(2.0)), delta=0.15
+            )
+            self.assertGreater(row["SNR_WIN"], 50.0)
+            self.assertAlmostEqual(row["BACKGROUND"], 100.0, delta=2.0)
+            self.assertAlmostEqual(
+                row["ALPHAWIN_J2000"],
+                150.0 - (x_pos + 1.0 - 120.0) * 1.0e-4 / np.cos(np.radians(2.0)),
+                delta=1.0e-5,
+            )
+            self.assertAlmostEqual(
+                row["DELTAWIN_J2000"],
+                2.0 + (y_pos + 1.0 - 100.0) * 1.0e-4,
+                delta=1.0e-5,
+            )
+
+        # World columns are in degrees, as for Sextractor
+        for column in ["ALPHA_J2000", "ALPHAWIN_J2000", "DELTAWIN_J2000", "FWHM_WORLD"]:
+            self.assertEqual(catalog[column].unit, u.deg)
+        self.assertIsNone(catalog["FWHM_IMAGE"].unit)
+
+        flags = {int(np.rint(row["X_IMAGE"] - 1.0)): row["FLAGS"] for row in catalog}
+        self.assertEqual(flags[160], 4)
+        self.assertEqual(flags[1], 8)
+
+        # No sources gives an empty catalog with the same columns
+        empty_catalog, _ = extract_sources(
+            make_data([]), parameters, settings, header=make_header()
+        )
+        self.assertEqual(len(empty_catalog), 0)
+        self.assertEqual(empty_catalog.colnames, catalog.colnames)
+
+    def test_processor(self):
+        """
+        Test that the processor writes an LDAC catalog and check images
+
+        :return: None
+        """
+        output_dir = Path(self.temp_dir.name).joinpath("sextractor")
+
+        processor = InProcessSextractor(
+            output_sub_dir=output_dir.as_posix(),
+            checkimage_type=["-BACKGROUND"],
+            catalog_purifier=lambda table, image: table[table["FLAGS"] == 0],
+        )
+        batch = processor.apply(
+            ImageBatch([Image(data=make_data(STARS), header=make_header())])
+        )
+        image = batch[0]
+
+        catalog_path = Path(image[SEXTRACTOR_HEADER_KEY])
+        self.assertEqual(catalog_path, output_dir.joinpath("image.cat"))
+
+        catalog = get_table_from_ldac(catalog_path)
+        self.assertEqual(len(catalog), 4)
+        self.assertIn("SNR_WIN", catalog.colnames)
+        for column in ["ALPHAWIN_J2000", "DELTAWIN_J2000", "FWHM_WORLD"]:
+            self.assertEqual(catalog[column].unit, u.deg)
+
+        # The image header is stored in LDAC_IMHEAD, as for Sextractor
+        with fits.open(catalog_path) as hdul:
+            self.assertEqual(hdul[1].header["EXTNAME"], "LDAC_IMHEAD")
+            cards = np.atleast_1d(hdul[1].data[0][0])
+        image_header = fits.Header.fromstring("\n".join(cards), sep="\n")
+        self.assertEqual(image_header["CRVAL1"], 150.0)
+
+        bkgsub_path = Path(image[sextractor_checkimg_map["-BACKGROUND"]])
+        self.assertTrue(bkgsub_path.exists())
+        self.assertAlmostEqual(np.median(fits.getdata(bkgsub_path)), 0.0, delta=1.0)
+
+        with self.assertRaises(ValueError):
+            InProcessSextractor(output_sub_dir="test", checkimage_type="APERTURES")
@@ -0,0 +1,172 @@
+"""
+Module to test lazy loading of images
+"""
+
+import copy
+import logging
+import pickle
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from astropy.io import fits
+
+from mirar.data import IMAGE_DTYPE, ImageBatch
+from mirar.io import open_lazy_image, open_lazy_mef_image, open_mef_fits
+from mirar.paths import (
+    BASE_NAME_KEY,
+    COADD_KEY,
+    EXPTIME_KEY,
+    GAIN_KEY,
+    OBSCLASS_KEY,
+    PROC_FAIL_KEY,
+    PROC_HISTORY_KEY,
+    RAW_IMG_KEY,
+    TARGET_KEY,
+    TIME_KEY,
+)
+from mirar.processors.utils import ImageLoader, MEFLoader
+from mirar.processors.utils.image_selector import ImageSelector
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class TestLazyLoading(BaseTestCase):
+    """
+    Class to test lazy loading of images
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def make_header(obsclass: str) -> fits.Header:
+        """
+        Make the header of a small raw image
+
+        :param obsclass: Observation class
+        :return: Header
+        """
+        header = fits.Header()
+        header[OBSCLASS_KEY] = obsclass
+        header[TARGET_KEY] = obsclass
+        header[TIME_KEY] = "2023-01-01T00:00:00"
+        header[COADD_KEY] = 1
+        header[GAIN_KEY] = 1.0
+        header[PROC_HISTORY_KEY] = ""
+        header[PROC_FAIL_KEY] = False
+        header[EXPTIME_KEY] = 1.0
+        return header
+
+    def write_image(self, name: str, obsclass: str) -> Path:
+        """
+        Write a small raw image to the temporary directory
+
+        :param name: Name of file
+        :param obsclass: Observation class
+        :return: Path of file
+        """
+        path = Path(self.temp_dir.name).joinpath(name)
+        data = np.arange(12, dtype=np.uint16).reshape(3, 4)
+        fits.PrimaryHDU(data, header=self.make_header(obsclass)).writeto(path)
+        return path
+
+    def write_mef_image(self, name: str, n_extensions: int = 3) -> Path:
+        """
+        Write a small raw MEF image to the temporary directory,
+        where each extension is filled with its index
+
+        :param name: Name of file
+        :param n_extensions: Number of extensions
+        :return: Path of file
+        """
+        path = Path(self.temp_dir.name).joinpath(name)
+        header = self.make_header("flat")
+        header[BASE_NAME_KEY] = name
+        header[RAW_IMG_KEY] = path.as_posix()
+        hdus = [fits.PrimaryHDU(header=header)]
+        for i in range(n_extensions):
+            hdus.append(fits.ImageHDU(data=np.full((3, 4), i, dtype=np.uint16)))
+        fits.HDUList(hdus).writeto(path)
+        return path
+
+    def test_lazy_loading(self):
+        """
+        Test that lazy images only read their data when needed
+
+        :return: None
+        """
+        images = ImageBatch(
+            [
+                open_lazy_image(self.write_image("flat.fits", "flat")),
+                open_lazy_image(self.write_image("science.fits", "science")),
+            ]
+        )
+        self.assertFalse(any(x.is_loaded() for x in images))
+
+        # Selecting on headers does not load the data
+        selector = ImageSelector((OBSCLASS_KEY, "science"))
+        science = selector.apply(images)
+        self.assertEqual(len(science), 1)
+        self.assertFalse(science[0].is_loaded())
+
+        # Copies and pickled images stay unloaded
+        image = copy.deepcopy(science[0])
+        self.assertFalse(image.is_loaded())
+        image = pickle.loads(pickle.dumps(image))
+        self.assertFalse(image.is_loaded())
+
+        data = image.get_data()
+        self.assertTrue(image.is_loaded())
+        self.assertEqual(data.dtype, IMAGE_DTYPE)
+        self.assertTrue(np.all(data == np.arange(12).reshape(3, 4)))
+        self.assertFalse(science[0].is_loaded())
+
+        # Setting data replaces any unloaded data
+        science[0].set_data(np.zeros((3, 4)))
+        self.assertTrue(science[0].is_loaded())
+        self.assertTrue(np.all(science[0].get_data() == 0.0))
+
+    def test_lazy_mef_loading(self):
+        """
+        Test that each extension of a lazy MEF image only reads its own data
+
+        :return: None
+        """
+        path = self.write_mef_image("mef.fits")
+        images = open_lazy_mef_image(path)
+        self.assertEqual(len(images), 3)
+        self.assertFalse(any(x.is_loaded() for x in images))
+
+        image = pickle.loads(pickle.dumps(images[1]))
+        self.assertTrue(np.all(image.get_data() == 1.0))
+        self.assertEqual(image.get_data().dtype, IMAGE_DTYPE)
+        self.assertFalse(images[2].is_loaded())
+
+        _, split_data, _ = open_mef_fits(path)
+        for image, data in zip(images, split_data):
+            self.assertTrue(np.all(image.get_data() == data))
+
+    def test_loaders_are_lazy(self):
+        """
+        Test that the image loaders only read headers by default
+
+        :return: None
+        """
+        self.write_image("science.fits", "science")
+        loader = ImageLoader(input_sub_dir="", input_img_dir=self.temp_dir.name)
+        loader.set_night("")
+        images = loader.apply(ImageBatch())
+        self.assertEqual(len(images), 1)
+        self.assertFalse(images[0].is_loaded())
+
+        self.write_mef_image("mef.fits")
+        loader = MEFLoader(input_sub_dir="", input_img_dir=self.temp_dir.name)
+        loader.set_night("")
+        images = loader.apply(ImageBatch())
+        self.assertEqual(len(images), 3)
+        self.assertFalse(any(x.is_loaded() for x in images))
@@ -0,0 +1,233 @@
+"""
+Module to test assigning names to sources with
+:module:`mirar.processors.sources.namer`
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from mirar.data import SourceBatch, SourceTable
+from mirar.database.name_reservation import increment_name_letters
+from mirar.database.sky_locks import get_sky_cell_keys
+from mirar.paths import BASE_NAME_KEY, PROC_HISTORY_KEY, RAW_IMG_KEY, TIME_KEY
+from mirar.processors.sources.namer import CandidateNamer
+from mirar.testing import BaseTestCase, ExampleSource
+
+logger = logging.getLogger(__name__)
+
+
+class FakeSkyDatabase:
+    """
+    Fake database of named sources, with postgres-like advisory locks. Crossmatches
+    are slow, so that unserialised namers would both name the same source.
+    """
+
+    def __init__(self):
+        self.sources = []
+        self.n_names = 0
+        self.lock = threading.Lock()
+        self.advisory_locks = defaultdict(threading.Lock)
+
+    def connect(self):
+        """
+        Get a connection, which holds advisory locks
+
+        :return: Connection
+        """
+        return mock.MagicMock(
+            __enter__=lambda _: mock.Mock(execute=self.execute),
+            __exit__=lambda *args: None,
+        )
+
+    def execute(self, statement):
+        """
+        Take or release an advisory lock
+
+        :param statement: pg_advisory_lock or pg_advisory_unlock statement
+        :return: None
+        """
+        function = statement.selected_columns[0]
+        key = tuple(x.value for x in function.clauses)
+        with self.lock:
+            advisory_lock = self.advisory_locks[key]
+        if function.name == "pg_advisory_lock":
+            advisory_lock.acquire()  # pylint: disable=consider-using-with
+        else:
+            advisory_lock.release()
+
+    def query_for_sources(
+        self, candidate_table: pd.DataFrame, _metadata: dict
+    ) -> list[pd.DataFrame]:
+        """
+        Crossmatch sources to the database
+
+        :param candidate_table: Table of sources
+        :param _metadata: Source table metadata
+        :return: Matches for each source
+        """
+        with self.lock:
+            sources = pd.DataFrame(self.sources, columns=["name", "ra", "dec"])
+        time.sleep(0.1)
+        return [
+            sources[
+                np.hypot(sources["ra"] - row["ra"], sources["dec"] - row["dec"])
+                < 1.0 / 3600.0
+            ][["name"]].reset_index(drop=True)
+            for _, row in candidate_table.iterrows()
+        ]
+
+    def reserve_names(self, _detection_time, n_names: int) -> list[str]:
+        """
+        Reserve new names
+
+        :param _detection_time: Detection time
+        :param n_names: Number of names
+        :return: List of names
+        """
+        with self.lock:
+            names = [f"name{self.n_names + i}" for i in range(n_names)]
+            self.n_names += n_names
+        return names
+
+    def insert_entries(
+        self, entries, duplicate_protocol, returning_key_names=None
+    ) -> pd.DataFrame:
+        """
+        Insert new sources
+
+        :param entries: Entries to insert
+        :param duplicate_protocol: Duplicate protocol
+        :param returning_key_names: Columns to return
+        :return: Inserted rows
+        """
+        assert duplicate_protocol == "fail"
+        rows = [(x.name, x.ra, x.dec) for x in entries]
+        with self.lock:
+            self.sources.extend(rows)
+        return pd.DataFrame(rows, columns=["name", "ra", "dec"])[returning_key_names]
+
+
+class TestNamer(BaseTestCase):
+    """
+    Class to test assigning names to sources
+    """
+
+    def test_increment_names(self):
+        """
+        Test that names reserved in blocks follow the sequential naming scheme
+
+        :return: None
+        """
+        expected = {
+            "aaa": "aab",
+            "aaz": "aba",
+            "azz": "baa",
+            "abcz": "abda",
+        }
+        for letters, new_letters in expected.items():
+            self.assertEqual(CandidateNamer.increment_string(letters), new_letters)
+
+        self.assertEqual(increment_name_letters("aaa", 27), "abb")
+        self.assertEqual(increment_name_letters("zzy", 2), "aaaa")
+        self.assertEqual(increment_name_letters("zzz", 26), "aaaz")
+        self.assertEqual(increment_name_letters("zzz"), "aaaa")
+        self.assertEqual(increment_name_letters("aaaaa", 0), "aaaaa")
+
+    def test_sky_cell_keys(self):
+        """
+        Test that sky cells cover every position within the crossmatch radius
+
+        :return: None
+        """
+        keys = get_sky_cell_keys(10.0, 1.0, 2.0)
+        self.assertEqual(len(keys), 1)
+
+        # Positions near a cell edge lock both cells
+        crds = np.linspace(9.0, 11.0, 2001)
+        for ra in crds:
+            for offset in [-1.9, 1.9]:
+                self.assertTrue(
+                    set(get_sky_cell_keys(ra + offset / 3600.0, 1.0, 0.0)).issubset(
+                        get_sky_cell_keys(ra, 1.0, 2.0)
+                    )
+                )
+
+    def test_pool_limit(self):
+        """
+        Test that parallel namers are limited by the connection pool of their
+        database
+
+        :return: None
+        """
+        with mock.patch(
+            "mirar.processors.sources.namer.get_pool_capacity", return_value=6
+        ) as get_pool_capacity:
+            namer = CandidateNamer(
+                db_table=ExampleSource,
+                base_name="TEST",
+                db_name_field="name",
+                db_output_columns=["name"],
+                crossmatch_radius_arcsec=2.0,
+            )
+        get_pool_capacity.assert_called_once_with(
+            db_name=ExampleSource.sql_model.db_name
+        )
+        self.assertEqual(namer.max_n_cpu, min(CandidateNamer.max_n_cpu, 2))
+
+    def test_concurrent_naming(self):
+        """
+        Test that namers running in parallel on the same new source give it a
+        single name
+
+        :return: None
+        """
+        fake_db = FakeSkyDatabase()
+        namer = CandidateNamer(
+            db_table=ExampleSource,
+            base_name="TEST",
+            db_name_field="name",
+            name_key="name",
+            db_output_columns=["name"],
+            crossmatch_radius_arcsec=2.0,
+        )
+
+        def name_source(ra: float) -> SourceBatch:
+            source_table = SourceTable(
+                pd.DataFrame({"ra": [ra], "dec": [1.0]}),
+                metadata={
+                    BASE_NAME_KEY: "image.fits",
+                    RAW_IMG_KEY: "/raw/image.fits",
+                    PROC_HISTORY_KEY: "",
+                    TIME_KEY: "2024-03-01T00:00:00",
+                },
+            )
+            return namer.apply(SourceBatch([source_table]))
+
+        with mock.patch(
+            "mirar.database.sky_locks.get_engine", return_value=fake_db
+        ), mock.patch.object(
+            namer, "query_for_sources", fake_db.query_for_sources
+        ), mock.patch.object(
+            namer, "reserve_new_names", fake_db.reserve_names
+        ), mock.patch.object(
+            ExampleSource, "insert_entries", fake_db.insert_entries
+        ):
+            batches = []
+            threads = [
+                threading.Thread(target=lambda x=ra: batches.append(name_source(x)))
+                for ra in [10.0, 10.0001]
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        names = [batch[0].get_data()["name"].iloc[0] for batch in batches]
+        self.assertEqual(len(fake_db.sources), 1)
+        self.assertEqual(names, [fake_db.sources[0][0]] * 2)
@@ -0,0 +1,130 @@
+"""
+Module to test the processor metrics of :module:`mirar.processors.metrics`
+"""
+
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mirar.paths import EXECUTION_BACKENDS
+from mirar.pipelines.streaming import BatchStream
+from mirar.processors.metrics import (
+    THREAD_IO_PATH,
+    BatchMetrics,
+    get_metrics_table,
+    write_metrics_report,
+    write_prometheus_metrics,
+)
+from mirar.processors.utils import HeaderAnnotator, HeaderEditor
+from mirar.testing import BaseTestCase, make_test_dataset
+
+logger = logging.getLogger(__name__)
+
+
+class TestProcessorMetrics(BaseTestCase):
+    """
+    Class to test processor metrics
+    """
+
+    def test_batch_metrics(self):
+        """
+        Test that CPU time and I/O of a batch are measured
+
+        :return: None
+        """
+        output_path = Path(self.temp_dir.name).joinpath("data.bin")
+
+        with BatchMetrics() as batch_metrics:
+            output_path.write_bytes(b"0" * 100000)
+            output_path.read_bytes()
+            np.linalg.eigvalsh(np.ones((200, 200)))
+
+        self.assertGreater(batch_metrics.wall_time_s, 0.0)
+        self.assertGreater(batch_metrics.cpu_time_s, 0.0)
+        self.assertGreaterEqual(batch_metrics.peak_rss_delta_bytes, 0)
+        if THREAD_IO_PATH.exists():
+            self.assertGreaterEqual(batch_metrics.read_bytes, 100000)
+            self.assertGreaterEqual(batch_metrics.write_bytes, 100000)
+
+    def test_backends(self):
+        """
+        Test that every batch is recorded with each backend, and with streaming
+
+        :return: None
+        """
+        for backend in EXECUTION_BACKENDS:
+            processor = HeaderAnnotator(input_keys="OBJECT", output_key="TARGET")
+            processor.max_n_cpu = 3
+            processor.set_night("test/20240101")
+            processor.base_apply(make_test_dataset(), execution_backend=backend)
+
+            summary = processor.latest_metrics.get_summary()
+            self.assertEqual(summary["n_batches"], 6)
+            self.assertGreater(summary["wall_time_s"], 0.0)
+            self.assertLessEqual(summary["latency_p50_s"], summary["latency_max_s"])
+            self.assertAlmostEqual(
+                summary["latency_mean_s"] * 6, summary["batch_time_s"]
+            )
+
+        processors = [
+            HeaderAnnotator(input_keys="OBJECT", output_key="TARGET"),
+            HeaderEditor(edit_keys="DONE", values=True),
+        ]
+        for processor in processors:
+            processor.set_night("test/20240101")
+        BatchStream(processors).apply(make_test_dataset())
+        for processor in processors:
+            self.assertEqual(processor.latest_metrics.get_summary()["n_batches"], 6)
+
+        # Metrics are reset for each run
+        processors[0].base_apply(make_test_dataset(n_batches=2))
+        self.assertEqual(processors[0].latest_metrics.get_summary()["n_batches"], 2)
+
+    def test_reports(self):
+        """
+        Test that reports are written as JSON, CSV and Prometheus text
+
+        :return: None
+        """
+        processors = [
+            HeaderAnnotator(input_keys="OBJECT", output_key="TARGET"),
+            HeaderAnnotator(input_keys="MISSING", output_key="TARGET"),
+            HeaderEditor(edit_keys="DONE", values=True),
+        ]
+        dataset = make_test_dataset(n_batches=3)
+        for processor in processors:
+            processor.set_night("test/20240101")
+            dataset, _ = processor.base_apply(dataset)
+
+        metrics_table = get_metrics_table(processors)
+        self.assertEqual(list(metrics_table["n_errors"]), [0, 3, 0])
+        self.assertEqual(list(metrics_table["n_batches"]), [3, 3, 0])
+
+        json_path, csv_path = write_metrics_report(
+            metrics_table,
+            Path(self.temp_dir.name).joinpath("run_metrics.json"),
+            run_info={"night": "20240101"},
+        )
+        with open(json_path, "r", encoding="utf8") as json_file:
+            report = json.load(json_file)
+        self.assertEqual(report["night"], "20240101")
+        self.assertEqual(report["steps"][0]["processor"], "HeaderAnnotator")
+        # Latencies of a processor without batches are null rather than NaN
+        self.assertIsNone(report["steps"][2]["latency_p90_s"])
+
+        csv_table = pd.read_csv(csv_path)
+        self.assertEqual(list(csv_table.columns), list(metrics_table.columns))
+
+        prom_path = Path(self.temp_dir.name).joinpath("mirar.prom")
+        write_prometheus_metrics(metrics_table, prom_path, labels={"night": "20240101"})
+        lines = prom_path.read_text(encoding="utf8").splitlines()
+        self.assertIn("# TYPE mirar_processor_wall_time_s gauge", lines)
+        self.assertIn(
+            'mirar_processor_n_errors{night="20240101",step="2",'
+            'processor="HeaderAnnotator"} 3.0',
+            lines,
+        )
+        self.assertFalse(any(x.endswith("nan") for x in lines))
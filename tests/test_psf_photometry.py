@@ -0,0 +1,123 @@
+"""
+Module to test PSF photometry with :module:`mirar.processors.photometry.utils`
+"""
+
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from astropy.io import fits
+
+from mirar.processors.photometry.utils import (
+    get_psf_shifted_array,
+    psf_photometry,
+    psf_photometry_batch,
+)
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+def loop_psf_photometry(
+    image_cutout: np.ndarray, image_unc_cutout: np.ndarray, psfmodels: np.ndarray
+) -> tuple[float, float, float, int]:
+    """
+    Reference PSF photometry, fitting each PSF model in turn
+
+    :param image_cutout: 2D numpy array of the image cutout
+    :param image_unc_cutout: 2D numpy array of the image uncertainty cutout
+    :param psfmodels: 3D numpy array of the PSF models
+    :return: flux, flux uncertainty, chi2 and index of the best-fit model
+    """
+    chi2s, psf_fluxes, psf_flux_uncs = [], [], []
+    for ind in range(psfmodels.shape[2]):
+        psfmodel = psfmodels[:, :, ind]
+        psf_flux = np.nansum(psfmodel * image_cutout) / np.nansum(np.square(psfmodel))
+        psf_flux_unc = np.sqrt(
+            np.nansum(np.square(psfmodel) * np.square(image_unc_cutout))
+        ) / np.nansum(np.square(psfmodel))
+        deg_freedom = np.size(image_cutout) - 1
+        chi2 = (
+            np.nansum(
+                np.square(image_cutout - psfmodel * psf_flux)
+                / np.square(image_unc_cutout)
+            )
+            / deg_freedom
+        )
+        psf_fluxes.append(psf_flux)
+        psf_flux_uncs.append(psf_flux_unc)
+        chi2s.append(chi2)
+
+    best_ind = int(np.argmin(chi2s))
+    return psf_fluxes[best_ind], psf_flux_uncs[best_ind], chi2s[best_ind], best_ind
+
+
+class TestPSFPhotometry(BaseTestCase):
+    """
+    Class to test PSF photometry
+    """
+
+    def test_psf_photometry_batch(self):
+        """
+        Test that batched PSF photometry recovers fluxes and shifts,
+        matches single-source photometry, and reuses the PSF model grid
+
+        :return: None
+        """
+        y_grid, x_grid = np.mgrid[-12:13, -12:13]
+        psf = np.exp(-(x_grid**2 + y_grid**2) / 8.0)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            psf_path = Path(temp_dir).joinpath("image.psf.fits")
+            fits.PrimaryHDU(psf).writeto(psf_path)
+            psfmodels = get_psf_shifted_array(psf_path, cutout_size_psf_phot=10)
+            self.assertIs(
+                get_psf_shifted_array(psf_path, cutout_size_psf_phot=10), psfmodels
+            )
+
+        self.assertEqual(psfmodels.shape, (21, 21, 81))
+
+        rng = np.random.default_rng(42)
+        true_fluxes = np.array([100.0, 500.0, 2000.0])
+        model_inds = np.array([41, 30, 50])
+        image_cutouts = (
+            true_fluxes[:, None, None] * np.moveaxis(psfmodels[:, :, model_inds], 2, 0)
+        ) + rng.normal(0.0, 0.01, (3, 21, 21))
+        unc_cutouts = np.full((3, 21, 21), 0.01)
+        image_cutouts[0, 0, 0] = np.nan
+
+        fluxes, fluxuncs, chi2s, xshifts, yshifts, best_inds = psf_photometry_batch(
+            image_cutouts, unc_cutouts, psfmodels
+        )
+        self.assertTrue(np.all(best_inds == model_inds))
+        self.assertTrue(np.allclose(fluxes, true_fluxes, rtol=1e-3))
+        self.assertEqual(list(xshifts), [0, -2, 0])
+        self.assertEqual(list(yshifts), [0, -1, 1])
+
+        for ind in range(3):
+            flux, fluxunc, chi2, best_ind = loop_psf_photometry(
+                image_cutouts[ind], unc_cutouts[ind], psfmodels
+            )
+            self.assertEqual(best_ind, best_inds[ind])
+            self.assertAlmostEqual(flux / fluxes[ind], 1.0)
+            self.assertAlmostEqual(fluxunc / fluxuncs[ind], 1.0)
+            self.assertAlmostEqual(chi2 / chi2s[ind], 1.0, places=5)
+
+            single = psf_photometry(image_cutouts[ind], unc_cutouts[ind], psfmodels)
+            self.assertAlmostEqual(single[0], fluxes[ind])
+            self.assertEqual((single[3], single[4]), (xshifts[ind], yshifts[ind]))
+
+    def test_psf_photometry_no_sources(self):
+        """
+        Test that batched PSF photometry of no sources returns empty results
+
+        :return: None
+        """
+        psfmodels = np.random.default_rng(0).random((21, 21, 81))
+        results = psf_photometry_batch(
+            np.zeros((0, 21, 21)), np.zeros((0, 21, 21)), psfmodels
+        )
+        self.assertEqual(len(results), 6)
+        for res in results:
+            self.assertEqual(len(res), 0)
@@ -0,0 +1,104 @@
+"""
+Module to test the strip-by-strip image combination in
+:module:`mirar.data.utils.stack`
+"""
+
+import logging
+
+import numpy as np
+
+from mirar.data import Image, cache
+from mirar.data.utils.stack import COMBINE_METHODS, StackingError, stack_images
+from mirar.testing import BaseTestCase, make_test_image
+
+logger = logging.getLogger(__name__)
+
+
+def make_images(n_frames: int = 7, shape: tuple[int, int] = (23, 11)) -> list[Image]:
+    """
+    Make a stack of random images
+
+    :param n_frames: Number of images
+    :param shape: Shape of each image
+    :return: List of images
+    """
+    rng = np.random.default_rng(42)
+    return [
+        make_test_image(f"image_{i}.fits", data=rng.normal(100.0, 5.0, size=shape))
+        for i in range(n_frames)
+    ]
+
+
+class TestStack(BaseTestCase):
+    """
+    Class to test image stacking
+    """
+
+    def test_strips_match_full_combine(self):
+        """
+        Test that combining in small strips over several threads matches
+        combining the full cube in one go
+
+        :return: None
+        """
+        images = make_images()
+        cube = np.array([x.get_data() for x in images])
+        scales = [1.0 + 0.1 * i for i in range(len(images))]
+
+        full = stack_images(images, memory_budget_bytes=1.0e12, n_threads=1)
+        strips = stack_images(images, memory_budget_bytes=1.0, n_threads=4)
+        self.assertTrue(np.allclose(full, np.nanmedian(cube, axis=0)))
+        self.assertTrue(np.allclose(strips, full))
+
+        scaled = stack_images(images, scales=scales, memory_budget_bytes=1.0)
+        expected = np.nanmedian(cube / np.array(scales)[:, None, None], axis=0)
+        self.assertTrue(np.allclose(scaled, expected))
+
+        for method in COMBINE_METHODS:
+            combined = stack_images(images, method=method, memory_budget_bytes=1.0)
+            self.assertEqual(combined.shape, cube.shape[1:])
+            self.assertTrue(np.all(np.isfinite(combined)))
+
+    def test_rejection(self):
+        """
+        Test that outliers and masked pixels are rejected
+
+        :return: None
+        """
+        images = make_images(n_frames=15)
+        data = images[0].get_data()
+        data[3, 4] = 1.0e6
+        images[0].set_data(data)
+
+        mask = Image(data=np.ones(data.shape), header=images[0].get_header())
+        mask_data = mask.get_data()
+        mask_data[3, 4] = 0.0
+        mask.set_data(mask_data)
+        masks = [mask] + [None] * (len(images) - 1)
+
+        self.assertGreater(stack_images(images, method="mean")[3, 4], 1.0e4)
+        for method in ["sigma_clipped_mean", "minmax"]:
+            self.assertLess(stack_images(images, method=method)[3, 4], 200.0)
+        self.assertLess(stack_images(images, method="mean", masks=masks)[3, 4], 200.0)
+
+        with self.assertRaises(StackingError):
+            stack_images(images, method="mode")
+
+    def test_shapes(self):
+        """
+        Test that image shapes are checked without reading the image data
+
+        :return: None
+        """
+        images = make_images(n_frames=3)
+        # Count every read from the npy store as a miss
+        cache.set_ram_budget(1)
+        self.addCleanup(cache.set_ram_budget, 0)
+        cache.reset_statistics()
+        self.assertEqual([x.get_shape() for x in images], [(23, 11)] * 3)
+        self.assertEqual(cache.get_statistics()["misses"], 0)
+        self.assertEqual(cache.get_statistics()["hits"], 0)
+
+        images += make_images(n_frames=1, shape=(11, 23))
+        with self.assertRaises(StackingError):
+            stack_images(images)
@@ -0,0 +1,152 @@
+"""
+Module to test staging of temporary files with :module:`mirar.utils.staging`,
+and the execution statistics of :module:`mirar.utils.execute_cmd`
+"""
+
+import logging
+import pickle
+from pathlib import Path
+from unittest import mock
+
+from mirar.data import ImageBatch
+from mirar.paths import BASE_NAME_KEY, PROC_HISTORY_KEY, RAW_IMG_KEY, core_fields
+from mirar.processors.astromatic.sextractor import sextractor
+from mirar.testing import BaseTestCase, make_test_image
+from mirar.utils.execute_cmd import (
+    execute,
+    get_execution_statistics,
+    reset_execution_statistics,
+)
+from mirar.utils.staging import StagingArea
+
+logger = logging.getLogger(__name__)
+
+
+class TestStaging(BaseTestCase):
+    """
+    Class to test staging and execution statistics
+    """
+
+    def test_staging(self):
+        """
+        Test that files are staged within the quota, and spill over otherwise
+
+        :return: None
+        """
+        staging_dir = Path(self.temp_dir.name).joinpath("staging")
+        output_dir = Path(self.temp_dir.name).joinpath("output")
+        output_dir.mkdir()
+
+        staging = StagingArea(staging_dir, quota_bytes=1000)
+
+        staged_path = staging.get_temp_path(output_dir, "image.fits", n_bytes=600)
+        self.assertTrue(staged_path.parent.is_dir())
+        self.assertTrue(staged_path.is_relative_to(staging_dir))
+        self.assertEqual(staged_path.name, "temp_image.fits")
+        self.assertEqual(staging.used_bytes, 600)
+
+        # Over quota, so the file is written beside the outputs
+        spilled_path = staging.get_temp_path(output_dir, "other.fits", n_bytes=600)
+        self.assertEqual(spilled_path, output_dir.joinpath("temp_other.fits"))
+
+        staged_path.write_bytes(b"0" * 600)
+        staging.release(staged_path)
+        self.assertFalse(staged_path.exists())
+        self.assertEqual(staging.used_bytes, 0)
+
+        # Copies are staged, and released, in the same way
+        source_path = output_dir.joinpath("catalog.cat")
+        source_path.write_bytes(b"0" * 100)
+        copy_path = staging.copy_temp_file(output_dir, source_path)
+        self.assertTrue(copy_path.is_relative_to(staging_dir))
+        self.assertEqual(copy_path.read_bytes(), source_path.read_bytes())
+        staging.release(copy_path)
+
+        statistics = staging.get_statistics()
+        self.assertEqual(statistics["n_staged"], 2)
+        self.assertEqual(statistics["n_spilled"], 1)
+        self.assertEqual(statistics["peak_bytes"], 600)
+
+        # Pickled copies (for other processes) start without reservations
+        new_staging = pickle.loads(pickle.dumps(staging))
+        self.assertEqual(new_staging.staging_dir, staging_dir)
+        self.assertEqual(new_staging.used_bytes, 0)
+
+        # Without a staging directory, files are never staged
+        disabled = StagingArea(None)
+        self.assertFalse(disabled.enabled)
+        self.assertEqual(
+            disabled.get_temp_path(output_dir, "image.fits", n_bytes=1),
+            output_dir.joinpath("temp_image.fits"),
+        )
+
+    def test_release_on_failure(self):
+        """
+        Test that staged files, and their reserved space, are released when
+        an astromatic tool fails
+
+        :return: None
+        """
+        staging_dir = Path(self.temp_dir.name).joinpath("staging")
+        output_dir = Path(self.temp_dir.name).joinpath("sextractor")
+        output_dir.mkdir()
+
+        staging = StagingArea(staging_dir, quota_bytes=10**6)
+
+        header_values = {
+            key: 1
+            for key in core_fields
+            if key not in [BASE_NAME_KEY, RAW_IMG_KEY, PROC_HISTORY_KEY]
+        }
+        batch = ImageBatch([make_test_image(header_values=header_values)])
+
+        param_path = Path(self.temp_dir.name).joinpath("sex.param")
+        param_path.write_text("NUMBER\n", encoding="utf8")
+
+        processor = sextractor.Sextractor(
+            output_sub_dir="sextractor",
+            config_path="sex.config",
+            parameter_path=param_path.as_posix(),
+            filter_path="sex.conv",
+            starnnw_path="sex.nnw",
+        )
+
+        with mock.patch.object(sextractor, "staging", staging), mock.patch.object(
+            processor, "get_sextractor_output_dir", return_value=output_dir
+        ), mock.patch.object(
+            sextractor,
+            "run_sextractor_single",
+            side_effect=RuntimeError("Sextractor failed"),
+        ):
+            with self.assertRaises(RuntimeError):
+                processor.apply(batch)
+
+        self.assertEqual(staging.get_statistics()["n_staged"], 1)
+        self.assertEqual(staging.used_bytes, 0)
+        self.assertEqual(list(staging_dir.rglob("*.fits")), [])
+
+    def test_execution_statistics(self):
+        """
+        Test that wall time and file sizes are recorded for each tool
+
+        :return: None
+        """
+        input_path = Path(self.temp_dir.name).joinpath("input.txt")
+        input_path.write_bytes(b"0" * 100)
+        output_path = Path(self.temp_dir.name).joinpath("output.txt")
+
+        reset_execution_statistics()
+        execute(f"cp {input_path} {output_path}", local=True)
+        execute(f"cp {input_path} {output_path}", local=True)
+
+        statistics = get_execution_statistics()
+        self.assertEqual(list(statistics), ["cp"])
+        self.assertEqual(statistics["cp"]["n_calls"], 2)
+        self.assertEqual(statistics["cp"]["n_failures"], 0)
+        self.assertGreater(statistics["cp"]["wall_time_s"], 0.0)
+        # The output of the first call is also an input of the second call
+        self.assertEqual(statistics["cp"]["input_bytes"], 300)
+        self.assertEqual(statistics["cp"]["output_bytes"], 200)
+
+        reset_execution_statistics()
+        self.assertEqual(get_execution_statistics(), {})
@@ -0,0 +1,103 @@
+"""
+Module to test crossmatching with :module:`mirar.processors.xmatch`,
+using a local mock Kowalski server
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from mirar.catalog.kowalski import PS1
+from mirar.catalog.kowalski.mock_kowalski import MockKowalskiServer
+from mirar.data import Dataset, SourceBatch, SourceTable
+from mirar.paths import BASE_NAME_KEY, PROC_HISTORY_KEY, RAW_IMG_KEY
+from mirar.processors.xmatch import XMatch
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+ps1_catalog = pd.DataFrame(
+    {
+        "_id": [1, 2, 3, 4],
+        "raMean": [150.0, 150.001, 150.1, 151.0],
+        "decMean": [2.0, 2.0, 2.1, 2.5],
+        "gMeanPSFMag": [18.0, 19.0, np.nan, 17.0],
+        "rMeanPSFMag": [17.5, 18.5, 20.0, 16.5],
+        "iMeanPSFMag": [17.0, 18.0, 19.5, 16.0],
+        "zMeanPSFMag": [16.5, 17.5, 19.0, 15.5],
+    }
+)
+
+
+def make_batch(name: str, ras: list[float], decs: list[float]) -> SourceBatch:
+    """
+    Make a source batch with candidates at the given positions
+
+    :param name: Name of image
+    :param ras: RA of candidates
+    :param decs: Dec of candidates
+    :return: Source batch
+    """
+    candidate_table = pd.DataFrame({"ra": ras, "dec": decs})
+    metadata = {RAW_IMG_KEY: name, BASE_NAME_KEY: name, PROC_HISTORY_KEY: ""}
+    return SourceBatch([SourceTable(source_list=candidate_table, metadata=metadata)])
+
+
+class TestXMatch(BaseTestCase):
+    """
+    Class to test crossmatching against a mock Kowalski server
+    """
+
+    def test_xmatch(self):
+        """
+        Test that all sources of a dataset are queried in chunks, and that
+        matches are joined onto each candidate table
+
+        :return: None
+        """
+        with MockKowalskiServer(
+            catalogs={"PS1_DR1": ps1_catalog},
+            coordinate_keys={"PS1_DR1": ("raMean", "decMean")},
+        ) as server:
+            catalog = PS1(
+                num_sources=2,
+                search_radius_arcmin=0.5,
+                kowalski=server.get_kowalski(),
+            )
+            processor = XMatch(
+                catalog=catalog, query_chunk_size=2, max_concurrent_queries=2
+            )
+
+            dataset = Dataset(
+                [
+                    make_batch("image_1.fits", [150.0, 150.1], [2.0, 2.1]),
+                    make_batch("image_2.fits", [151.0, 160.0, 150.0], [2.5, 2.0, 2.0]),
+                ]
+            )
+
+            server.queries.clear()
+            dataset, errors = processor.base_apply(dataset, execution_backend="serial")
+
+        self.assertEqual(len(errors.reports), 0)
+
+        # 4 unique positions, in chunks of 2, with no queries per batch
+        near_queries = [x for x in server.queries if x["query_type"] == "near"]
+        self.assertEqual(len(near_queries), 2)
+        self.assertEqual(processor.prefetched_matches, {})
+
+        first = dataset[0][0].get_data()
+        self.assertEqual(list(first["nmtchps"]), [2, 1])
+        self.assertEqual(list(first["psobjectid1"]), [1.0, 3.0])
+        self.assertEqual(first["psobjectid2"][0], 2.0)
+        self.assertIsNone(first["psobjectid2"][1])
+        self.assertIsNone(first["sgmag1"][1])
+        self.assertAlmostEqual(first["distpsnr1"][0], 0.0)
+        self.assertAlmostEqual(first["distpsnr2"][0], 3.598, places=3)
+
+        second = dataset[1][0].get_data()
+        self.assertEqual(list(second["nmtchps"]), [1, 0, 2])
+        self.assertEqual(second["srmag1"][0], 16.5)
+        self.assertIsNone(second["psra1"][1])
+        self.assertIsNone(second["distpsnr1"][1])
+        self.assertEqual(second["psobjectid1"][2], 1.0)
@@ -0,0 +1,150 @@
+"""
+Module to test the reusable Fourier transforms of ZOGY in
+:module:`mirar.processors.zogy.zogy_fft`
+"""
+
+import logging
+import pickle
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from mirar.processors.zogy.pyzogy import pyzogy
+from mirar.processors.zogy.zogy_fft import ZOGYFFT
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SHAPE = (128, 96)
+
+
+def make_psf(sigma: float) -> np.ndarray:
+    """
+    Make a normalised gaussian PSF
+
+    :param sigma: Width of PSF
+    :return: PSF
+    """
+    y_grid, x_grid = np.mgrid[-7:8, -7:8]
+    psf = np.exp(-(x_grid**2 + y_grid**2) / (2 * sigma**2))
+    return psf / psf.sum()
+
+
+def make_image(psf: np.ndarray, transient: bool = False, seed: int = 0) -> np.ndarray:
+    """
+    Make an image of a fixed field of stars, with noise
+
+    :param psf: PSF of image
+    :param transient: Whether to add a transient source
+    :param seed: Random seed for noise
+    :return: Image
+    """
+    field_rng = np.random.default_rng(42)
+    data = np.zeros(IMAGE_SHAPE)
+    y_pos = field_rng.integers(10, IMAGE_SHAPE[0] - 10, 20)
+    x_pos = field_rng.integers(10, IMAGE_SHAPE[1] - 10, 20)
+    data[y_pos, x_pos] = field_rng.uniform(1.0e3, 1.0e4, 20)
+    if transient:
+        data[64, 48] += 5.0e3
+
+    half = psf.shape[0] // 2
+    padded = np.pad(data, half)
+    convolved = np.zeros(IMAGE_SHAPE)
+    for i in range(psf.shape[0]):
+        for j in range(psf.shape[1]):
+            convolved += (
+                psf[i, j] * padded[i : i + IMAGE_SHAPE[0], j : j + IMAGE_SHAPE[1]]
+            )
+
+    noise_rng = np.random.default_rng(seed)
+    return convolved + 100.0 + noise_rng.normal(0.0, 5.0, IMAGE_SHAPE)
+
+
+class TestZOGYFFT(BaseTestCase):
+    """
+    Class to test the ZOGY FFT context
+    """
+
+    def test_transforms(self):
+        """
+        Test that transforms match numpy, that plans and reference transforms
+        are reused, and that wisdom is saved
+
+        :return: None
+        """
+        rng = np.random.default_rng(0)
+        data = rng.normal(size=IMAGE_SHAPE)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            wisdom_path = Path(temp_dir).joinpath("wisdom.json")
+            fft_context = ZOGYFFT(wisdom_path=wisdom_path)
+
+            data_hat = fft_context.rfft2(data)
+            self.assertTrue(np.allclose(data_hat, np.fft.rfft2(data)))
+            self.assertTrue(np.allclose(fft_context.irfft2(data_hat, data.shape), data))
+            self.assertTrue(wisdom_path.exists())
+
+            # The input of the inverse transform is preserved
+            self.assertTrue(np.allclose(data_hat, np.fft.rfft2(data)))
+
+            fft_context.rfft2(rng.normal(size=IMAGE_SHAPE))
+            self.assertEqual(len(fft_context.plans), 2)
+
+            # Identical data reuses the cached transform
+            cached = fft_context.cached_rfft2(data)
+            self.assertIs(fft_context.cached_rfft2(data.copy()), cached)
+            self.assertIsNot(fft_context.cached_rfft2(data + 1.0), cached)
+
+            # Plans and cache are rebuilt after pickling
+            new_context = pickle.loads(pickle.dumps(fft_context))
+            self.assertEqual(len(new_context.plans), 0)
+            self.assertTrue(np.allclose(new_context.rfft2(data), data_hat))
+
+            single_context = ZOGYFFT(precision="single", wisdom_path=None)
+            single_hat = single_context.rfft2(data)
+            self.assertEqual(single_hat.dtype, np.complex64)
+            self.assertTrue(np.allclose(single_hat, data_hat, atol=1.0e-3))
+
+        with self.assertRaises(ValueError):
+            ZOGYFFT(precision="half")
+
+    def test_pyzogy(self):
+        """
+        Test that ZOGY finds a transient, in double and single precision
+
+        :return: None
+        """
+        new_psf = make_psf(1.5)
+        ref_psf = make_psf(2.0)
+        ref_data = make_image(ref_psf, seed=1)
+
+        results = {}
+        for precision in ["double", "single"]:
+            fft_context = ZOGYFFT(precision=precision, wisdom_path=None)
+            for seed in [2, 3]:
+                diff, _, scorr = pyzogy(
+                    new_data=make_image(new_psf, transient=True, seed=seed),
+                    ref_data=ref_data.copy(),
+                    new_psf=new_psf,
+                    ref_psf=ref_psf,
+                    new_sigma=np.full(IMAGE_SHAPE, 5.0),
+                    ref_sigma=np.full(IMAGE_SHAPE, 5.0),
+                    new_avg_unc=5.0,
+                    ref_avg_unc=5.0,
+                    fft_context=fft_context,
+                )
+                self.assertEqual(
+                    np.unravel_index(np.nanargmax(diff), IMAGE_SHAPE), (64, 48)
+                )
+                scorr_peak = np.unravel_index(np.nanargmax(scorr), IMAGE_SHAPE)
+                self.assertLessEqual(np.abs(np.subtract(scorr_peak, (64, 48))).max(), 1)
+
+            # Reference image, PSF and variance transforms are cached once
+            self.assertEqual(len(fft_context.cache), 3)
+            results[precision] = diff
+
+        self.assertEqual(results["single"].dtype, np.float32)
+        self.assertTrue(
+            np.allclose(results["single"], results["double"], rtol=0.0, atol=0.01)
+        )